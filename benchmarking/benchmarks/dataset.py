@@ -6,14 +6,26 @@ import shutil
 import tempfile
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 
 import qcodes
 from qcodes import ManualParameter
+from qcodes.dataset.data_export import (datatype_from_setpoints_2d,
+                                        reshape_2D_data)
+from qcodes.dataset.data_set import DataSet, load_many
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.measurements import Measurement
 from qcodes.dataset.experiment_container import new_experiment
-from qcodes.dataset.sqlite.database import initialise_database
+from qcodes.dataset.exporters import export_to_npy_columns, export_to_text
+from qcodes.dataset.sqlite.connection import atomic
+from qcodes.dataset.sqlite.database import (connect, initialise_database,
+                                            set_journal_mode)
+from qcodes.dataset.sqlite.query_helpers import insert_many_values
+from qcodes.utils.plotting import (bin_scatter, decimate_lttb,
+                                   decimate_min_max, thin_scatter)
 
 
 class Adding5Params:
@@ -129,3 +141,715 @@ class Adding5Params:
         # force writing to database so that it is written before we exit
         # the datasaver context manager
         self.datasaver.flush_data_to_database()
+
+
+class LoadNumericData:
+    """
+    This benchmark measures how much time it takes to load a large run of
+    numeric data with ``DataSet.get_parameter_data``. Parametrization is used
+    to alter the number of rows in the run.
+    """
+
+    # Loading does not alter the database, so the run that is created in
+    # setup_cache can be reused for all the iterations
+    number = 1
+    repeat = 4
+
+    params = [10**6, 10**7]
+    param_names = ['n_rows']
+
+    # creating and loading the largest run takes a while
+    timeout = 600
+
+    timer = time.perf_counter
+
+    def setup_cache(self):
+        # the database file is created in the current directory which asv
+        # keeps around for the lifetime of this benchmark
+        paths = {}
+        for n_rows in self.params:
+            path = os.path.abspath(f'load_numeric_{n_rows}.db')
+            if os.path.exists(path):
+                os.remove(path)
+            conn = connect(path)
+            exp = new_experiment("test-experiment",
+                                 sample_name="test-sample", conn=conn)
+            x = ParamSpecBase('x', 'numeric')
+            y = ParamSpecBase('y', 'numeric')
+            z = ParamSpecBase('z', 'numeric')
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(
+                InterDependencies_(dependencies={z: (x, y)}))
+            ds.mark_started()
+            chunk = 10**6
+            for _ in range(n_rows // chunk):
+                values = np.random.rand(chunk, 3).tolist()
+                insert_many_values(conn, ds.table_name, ['x', 'y', 'z'],
+                                   values)
+            ds.mark_completed()
+            paths[n_rows] = path
+            conn.close()
+        return paths
+
+    def setup(self, paths, n_rows):
+        self.conn = connect(paths[n_rows])
+        self.dataset = DataSet(conn=self.conn, run_id=1)
+
+    def teardown(self, paths, n_rows):
+        self.conn.close()
+
+    def time_get_parameter_data(self, paths, n_rows):
+        self.dataset.get_parameter_data('z')
+
+    def peakmem_get_parameter_data(self, paths, n_rows):
+        self.dataset.get_parameter_data('z')
+
+
+class InsertManyValues:
+    """
+    This benchmark compares the strategies of ``insert_many_values`` for
+    inserting rows of numeric values into a results table. The results are
+    used to pick the strategy automatically, see
+    ``qcodes.dataset.sqlite.query_helpers.EXECUTEMANY_MIN_COLUMNS``.
+    """
+
+    number = 1
+    repeat = 8
+
+    params = [[5, 50, 500], [10, 1000], ['multi_row', 'executemany', None]]
+    param_names = ['n_columns', 'n_rows', 'strategy']
+
+    timer = time.perf_counter
+
+    def setup(self, n_columns, n_rows, strategy):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conn = connect(os.path.join(self.tmpdir, 'temp.db'))
+        exp = new_experiment("test-experiment",
+                             sample_name="test-sample", conn=self.conn)
+        self.columns = [f'x{n}' for n in range(n_columns)]
+        params = [ParamSpecBase(name, 'numeric') for name in self.columns]
+        self.dataset = DataSet(conn=self.conn, exp_id=exp.exp_id)
+        self.dataset.set_interdependencies(
+            InterDependencies_(standalones=tuple(params)))
+        self.dataset.mark_started()
+        self.values = np.random.rand(n_rows, n_columns).tolist()
+
+    def teardown(self, n_columns, n_rows, strategy):
+        self.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_insert_many_values(self, n_columns, n_rows, strategy):
+        insert_many_values(self.conn, self.dataset.table_name, self.columns,
+                           self.values, strategy=strategy)
+
+
+class SliceGridByOneSetpoint:
+    """
+    This benchmark measures how much time it takes to select one line of a
+    2D grid by the value of one of its setpoints with the ``filters`` of
+    ``DataSet.get_parameter_data``, with and without an index on that
+    setpoint. With the index, the time grows with the length of the line
+    rather than with the size of the grid.
+    """
+
+    number = 1
+    repeat = 8
+
+    params = [[100, 1000], [True, False]]
+    param_names = ['n_points_per_axis', 'indexed']
+
+    timer = time.perf_counter
+
+    def setup_cache(self):
+        paths = {}
+        for n_points in self.params[0]:
+            for indexed in self.params[1]:
+                path = os.path.abspath(f'slice_grid_{n_points}_{indexed}.db')
+                if os.path.exists(path):
+                    os.remove(path)
+                conn = connect(path)
+                exp = new_experiment("test-experiment",
+                                     sample_name="test-sample", conn=conn)
+                x = ParamSpecBase('x', 'numeric')
+                y = ParamSpecBase('y', 'numeric')
+                z = ParamSpecBase('z', 'numeric')
+                ds = DataSet(conn=conn, exp_id=exp.exp_id)
+                ds.set_interdependencies(
+                    InterDependencies_(dependencies={z: (x, y)}))
+                ds.mark_started()
+                axis = np.arange(n_points, dtype=float)
+                xs, ys = np.meshgrid(axis, axis, indexing='ij')
+                values = np.stack([xs.ravel(), ys.ravel(),
+                                   np.random.rand(n_points**2)], axis=1)
+                insert_many_values(conn, ds.table_name, ['x', 'y', 'z'],
+                                   values.tolist())
+                ds.mark_completed()
+                if indexed:
+                    ds.add_index('x')
+                paths[(n_points, indexed)] = path
+                conn.close()
+        return paths
+
+    def setup(self, paths, n_points_per_axis, indexed):
+        self.conn = connect(paths[(n_points_per_axis, indexed)])
+        self.dataset = DataSet(conn=self.conn, run_id=1)
+        self.x = float(n_points_per_axis // 2)
+
+    def teardown(self, paths, n_points_per_axis, indexed):
+        self.conn.close()
+
+    def time_get_parameter_data_filtered(self, paths, n_points_per_axis,
+                                         indexed):
+        self.dataset.get_parameter_data('z', filters={'x': self.x})
+
+
+class ArrayCompression:
+    """
+    This benchmark measures the trade-off of the compression of 'array'
+    parameters (see ``DataSet.set_compression``) between the size of the
+    stored arrays and the time it takes to write and read them, for
+    typical data: digitized scope traces as floats, raw digitizer counts
+    as integers, and IQ records as complex numbers.
+    """
+
+    number = 1
+    repeat = 8
+
+    params = [['float64', 'int16', 'complex128'],
+              [None, 'zlib', 'zlib+shuffle', 'lzma', 'lzma+shuffle']]
+    param_names = ['dtype', 'compression']
+
+    n_traces = 100
+    trace_length = 10000
+
+    timer = time.perf_counter
+
+    def setup(self, dtype, compression):
+        self.tmpdir = tempfile.mkdtemp()
+        self.conn = connect(os.path.join(self.tmpdir, 'temp.db'))
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample",
+                                         conn=self.conn)
+        time_axis = np.linspace(0, 1e-6, self.trace_length)
+        # an 8 bit digitizer with a noisy signal
+        counts = [np.clip(np.round(
+            100 * np.sin(2e7 * np.pi * time_axis + n)
+            + np.random.normal(0, 5, self.trace_length)), -128, 127)
+            for n in range(self.n_traces)]
+        if dtype == 'complex128':
+            traces = [(c + 1j * np.roll(c, 10)) / 128 for c in counts]
+        else:
+            traces = [(c if dtype == 'int16' else c / 128).astype(dtype)
+                      for c in counts]
+        self.results = [{'t': time_axis, 'trace': trace} for trace in traces]
+
+        # a run that already holds the traces for reading them
+        self.dataset = self._new_dataset(compression)
+        self.dataset.add_results(self.results)
+        self.dataset.mark_completed()
+
+    def _new_dataset(self, compression):
+        t = ParamSpecBase('t', 'array')
+        trace = ParamSpecBase('trace', 'array')
+        dataset = DataSet(conn=self.conn, exp_id=self.experiment.exp_id)
+        dataset.set_interdependencies(
+            InterDependencies_(dependencies={trace: (t,)}))
+        if compression is not None:
+            dataset.set_compression({'t': compression,
+                                     'trace': compression})
+        dataset.mark_started()
+        return dataset
+
+    def teardown(self, dtype, compression):
+        self.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_add_results(self, dtype, compression):
+        self._new_dataset(compression).add_results(self.results)
+
+    def time_get_parameter_data(self, dtype, compression):
+        self.dataset.get_parameter_data('trace')
+
+    def track_stored_bytes_per_value(self, dtype, compression):
+        sql = (f'SELECT SUM(LENGTH(CAST(trace AS BLOB))) '
+               f'FROM "{self.dataset.table_name}"')
+        n_bytes = self.conn.execute(sql).fetchone()[0]
+        return n_bytes / (self.n_traces * self.trace_length)
+
+
+class InferGrid:
+    """
+    This benchmark measures how much time it takes to infer the grid of 2D
+    data (as done when plotting a dataset) and to put the data onto that
+    grid, for complete, interrupted and shuffled square sweeps.
+    """
+
+    number = 1
+    repeat = 5
+
+    params = [[10**4, 10**5, 10**6, 10**7],
+              ['complete', 'partial', 'shuffled']]
+    param_names = ['n_points', 'kind']
+
+    timer = time.perf_counter
+
+    def setup(self, n_points, kind):
+        n_per_axis = int(np.sqrt(n_points))
+        axis = np.linspace(0, 1, n_per_axis)
+        xs, ys = np.meshgrid(axis, axis, indexing='ij')
+        self.x = xs.ravel()
+        self.y = ys.ravel()
+        if kind == 'partial':
+            self.x = self.x[:-n_per_axis // 2]
+            self.y = self.y[:-n_per_axis // 2]
+        elif kind == 'shuffled':
+            order = np.random.permutation(len(self.x))
+            self.x = self.x[order]
+            self.y = self.y[order]
+        self.z = np.random.rand(len(self.x))
+
+    def time_datatype_from_setpoints_2d(self, n_points, kind):
+        datatype_from_setpoints_2d(self.x, self.y)
+
+    def time_reshape_2D_data(self, n_points, kind):
+        reshape_2D_data(self.x, self.y, self.z)
+
+
+class PlotDecimation:
+    """
+    This benchmark measures how much time it takes to decimate large line
+    and scatter plots to the resolution of a typical plot (as done by
+    ``plot_dataset``), i.e. 800x600 pixels.
+    """
+
+    number = 1
+    repeat = 5
+
+    params = [10**5, 10**6, 10**7]
+    param_names = ['n_points']
+
+    timer = time.perf_counter
+
+    def setup(self, n_points):
+        self.x = np.linspace(0, 1, n_points)
+        self.y = np.sin(50 * self.x) + 0.1 * np.random.randn(n_points)
+        self.z = np.random.rand(n_points)
+
+    def time_decimate_min_max(self, n_points):
+        decimate_min_max(self.x, self.y, 800)
+
+    def time_decimate_lttb(self, n_points):
+        decimate_lttb(self.x, self.y, 1600)
+
+    def time_thin_scatter(self, n_points):
+        thin_scatter(self.x, self.y, (800, 600))
+
+    def time_bin_scatter(self, n_points):
+        bin_scatter(self.x, self.y, self.z, (200, 150))
+
+
+class ExportNumericData:
+    """
+    This benchmark measures how much time and memory it takes to export a
+    large run of numeric data to text files and to ``.npy`` column files,
+    which are written in chunks, such that the peak memory should not grow
+    with the number of rows.
+    """
+
+    number = 1
+    repeat = 2
+
+    params = [10**6, 4 * 10**6]
+    param_names = ['n_rows']
+
+    timeout = 600
+
+    timer = time.perf_counter
+
+    def setup_cache(self):
+        paths = {}
+        for n_rows in self.params:
+            path = os.path.abspath(f'export_numeric_{n_rows}.db')
+            if os.path.exists(path):
+                os.remove(path)
+            conn = connect(path)
+            exp = new_experiment("test-experiment",
+                                 sample_name="test-sample", conn=conn)
+            x = ParamSpecBase('x', 'numeric')
+            y = ParamSpecBase('y', 'numeric')
+            z = ParamSpecBase('z', 'numeric')
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(
+                InterDependencies_(dependencies={z: (x, y)}))
+            ds.mark_started()
+            chunk = 10**6
+            for _ in range(n_rows // chunk):
+                values = np.random.rand(chunk, 3).tolist()
+                insert_many_values(conn, ds.table_name, ['x', 'y', 'z'],
+                                   values)
+            ds.mark_completed()
+            paths[n_rows] = path
+            conn.close()
+        return paths
+
+    def setup(self, paths, n_rows):
+        self.conn = connect(paths[n_rows])
+        self.dataset = DataSet(conn=self.conn, run_id=1)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def teardown(self, paths, n_rows):
+        self.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_export_to_text(self, paths, n_rows):
+        export_to_text(self.dataset, self.tmpdir)
+
+    def time_export_to_npy_columns(self, paths, n_rows):
+        export_to_npy_columns(self.dataset, self.tmpdir)
+
+    def peakmem_export_to_npy_columns(self, paths, n_rows):
+        export_to_npy_columns(self.dataset, self.tmpdir)
+
+
+class ConvertGridData:
+    """
+    This benchmark measures how much time and memory it takes to convert a
+    large run of numeric data measured on a grid to pandas and xarray
+    objects. The grid is swept in nested loops, such that the objects can
+    be built on the loaded columns without copying them.
+    """
+
+    number = 1
+    repeat = 2
+
+    params = [10**6, 4 * 10**6]
+    param_names = ['n_rows']
+
+    timeout = 600
+
+    timer = time.perf_counter
+
+    def setup_cache(self):
+        paths = {}
+        for n_rows in self.params:
+            path = os.path.abspath(f'convert_grid_{n_rows}.db')
+            if os.path.exists(path):
+                os.remove(path)
+            conn = connect(path)
+            exp = new_experiment("test-experiment",
+                                 sample_name="test-sample", conn=conn)
+            x = ParamSpecBase('x', 'numeric')
+            y = ParamSpecBase('y', 'numeric')
+            z = ParamSpecBase('z', 'numeric')
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(
+                InterDependencies_(dependencies={z: (x, y)}))
+            ds.mark_started()
+            n_inner = 1000
+            for x_value in range(n_rows // n_inner):
+                values = np.empty((n_inner, 3))
+                values[:, 0] = x_value
+                values[:, 1] = np.linspace(0, 1, n_inner)
+                values[:, 2] = np.random.rand(n_inner)
+                insert_many_values(conn, ds.table_name, ['x', 'y', 'z'],
+                                   values.tolist())
+            ds.mark_completed()
+            paths[n_rows] = path
+            conn.close()
+        return paths
+
+    def setup(self, paths, n_rows):
+        self.conn = connect(paths[n_rows])
+        self.dataset = DataSet(conn=self.conn, run_id=1)
+
+    def teardown(self, paths, n_rows):
+        self.conn.close()
+
+    def time_get_data_as_pandas_dataframe(self, paths, n_rows):
+        self.dataset.get_data_as_pandas_dataframe()
+
+    def peakmem_get_data_as_pandas_dataframe(self, paths, n_rows):
+        self.dataset.get_data_as_pandas_dataframe()
+
+    def time_to_pandas(self, paths, n_rows):
+        self.dataset.to_pandas()
+
+    def peakmem_to_pandas(self, paths, n_rows):
+        self.dataset.to_pandas()
+
+    def time_to_xarray(self, paths, n_rows):
+        self.dataset.to_xarray()
+
+    def peakmem_to_xarray(self, paths, n_rows):
+        self.dataset.to_xarray()
+
+
+class AddResultOverhead:
+    """
+    This benchmark measures the overhead of a single ``add_result`` call
+    with single values of 5 parameters, i.e. the time it takes to unpack,
+    validate and enqueue the values before anything is written to the
+    database.
+    """
+
+    params = ['numeric', 'array']
+    param_names = ['paramtype']
+
+    timer = time.perf_counter
+
+    def setup(self, paramtype):
+        self.tmpdir = tempfile.mkdtemp()
+        qcodes.config["core"]["db_location"] = os.path.join(self.tmpdir,
+                                                            'temp.db')
+        qcodes.config["core"]["db_debug"] = False
+        initialise_database()
+        self.experiment = new_experiment("test-experiment",
+                                         sample_name="test-sample")
+
+        meas = Measurement(self.experiment)
+        # never flush in the middle of the benchmark
+        meas.write_period = 10**9
+        x1, x2, x3, y1, y2 = (ManualParameter(name) for name in
+                              ('x1', 'x2', 'x3', 'y1', 'y2'))
+        for setpoint in (x1, x2, x3):
+            meas.register_parameter(setpoint, paramtype=paramtype)
+        for measured in (y1, y2):
+            meas.register_parameter(measured, setpoints=[x1, x2, x3],
+                                    paramtype=paramtype)
+        self.results = [(x1, 0.1), (x2, 0.2), (x3, 0.3), (y1, 1.), (y2, 2.)]
+
+        self.runner = meas.run()
+        self.datasaver = self.runner.__enter__()
+
+    def teardown(self, paramtype):
+        # drop the results instead of writing them
+        self.datasaver._results = []
+        self.runner.__exit__(None, None, None)
+        self.experiment.conn.close()
+        shutil.rmtree(self.tmpdir)
+
+    def time_add_result(self, paramtype):
+        self.datasaver.add_result(*self.results)
+
+
+class LoadManyRuns:
+    """
+    This benchmark measures how the time it takes to load the data of many
+    runs with ``load_many`` scales with the number of worker threads or
+    processes. The runs hold zlib compressed traces, which are
+    decompressed by the workers.
+    """
+
+    number = 1
+    repeat = 4
+
+    params = [[1, 2, 4, 8], [False, True]]
+    param_names = ['max_workers', 'use_processes']
+
+    n_runs = 64
+    n_traces = 100
+    trace_length = 10000
+
+    timeout = 600
+
+    timer = time.perf_counter
+
+    def setup_cache(self):
+        path = os.path.abspath('load_many_runs.db')
+        if os.path.exists(path):
+            os.remove(path)
+        conn = connect(path)
+        exp = new_experiment("test-experiment", sample_name="test-sample",
+                             conn=conn)
+        x = ParamSpecBase('x', 'numeric')
+        trace = ParamSpecBase('trace', 'array')
+        guids = []
+        for _ in range(self.n_runs):
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(
+                InterDependencies_(dependencies={trace: (x,)}))
+            ds.set_compression({'trace': 'zlib'})
+            ds.mark_started()
+            ds.add_results([{'x': i,
+                             'trace': np.round(np.random.normal(
+                                 0, 10, self.trace_length))}
+                            for i in range(self.n_traces)])
+            ds.mark_completed()
+            guids.append(ds.guid)
+        conn.close()
+        return path, guids
+
+    def time_load_many(self, cache, max_workers, use_processes):
+        path, guids = cache
+        load_many(guids, 'trace', path_to_db=path, max_workers=max_workers,
+                  use_processes=use_processes)
+
+
+def _write_in_transactions(path, run_id, n_transactions, rows_per_transaction):
+    """
+    Add rows to a run in write transactions of the given size, and return
+    the (wall clock) start and end time of the writing together with the
+    time it took to take the write lock for each transaction
+    """
+    qcodes.config['core']['db_write_coordination'] = {
+        'enabled': True, 'busy_timeout': 5.0, 'retries': 5,
+        'max_rows_per_transaction': rows_per_transaction}
+    conn = connect(path)
+    ds = DataSet(run_id=run_id, conn=conn)
+    rows = [[float(i), float(i) ** 2] for i in range(rows_per_transaction)]
+    lock_waits = []
+    start = time.time()
+    for _ in range(n_transactions):
+        requested = time.perf_counter()
+        with atomic(conn):
+            lock_waits.append(time.perf_counter() - requested)
+            insert_many_values(conn, ds.table_name, ['x', 'y'], rows)
+    end = time.time()
+    conn.close()
+    return start, end, lock_waits
+
+
+class ConcurrentWriters:
+    """
+    This benchmark stresses a WAL database file with several processes that
+    each add results to their own run at the same time, with the writes
+    coordinated as set in the ``core.db_write_coordination`` config option.
+    The throughput of all writers together and the time the writers wait
+    for the write lock are tracked.
+    """
+
+    number = 1
+    repeat = 3
+
+    params = [1, 2, 4, 8]
+    param_names = ['n_writers']
+
+    n_transactions = 200
+    rows_per_transaction = 100
+
+    timeout = 600
+
+    timer = time.perf_counter
+
+    def setup(self, n_writers):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'concurrent_writers.db')
+        conn = connect(self.path)
+        set_journal_mode(conn, 'WAL')
+        exp = new_experiment("test-experiment", sample_name="test-sample",
+                             conn=conn)
+        x = ParamSpecBase('x', 'numeric')
+        y = ParamSpecBase('y', 'numeric')
+        self.run_ids = []
+        for _ in range(n_writers):
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(
+                InterDependencies_(dependencies={y: (x,)}))
+            ds.mark_started()
+            self.run_ids.append(ds.run_id)
+        conn.close()
+        self.executor = ProcessPoolExecutor(max_workers=n_writers)
+
+    def teardown(self, n_writers):
+        self.executor.shutdown()
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self):
+        futures = [self.executor.submit(_write_in_transactions, self.path,
+                                        run_id, self.n_transactions,
+                                        self.rows_per_transaction)
+                   for run_id in self.run_ids]
+        return [future.result() for future in futures]
+
+    def time_concurrent_writes(self, n_writers):
+        self._write()
+
+    def track_rows_per_second(self, n_writers):
+        results = self._write()
+        start = min(result[0] for result in results)
+        end = max(result[1] for result in results)
+        n_rows = n_writers * self.n_transactions * self.rows_per_transaction
+        return n_rows / (end - start)
+
+    track_rows_per_second.unit = 'rows/s'
+
+    def track_lock_wait_99th_percentile(self, n_writers):
+        lock_waits = np.concatenate([result[2] for result in self._write()])
+        return 1e3 * np.percentile(lock_waits, 99)
+
+    track_lock_wait_99th_percentile.unit = 'ms'
+
+
+class ReadLowCardinalityText:
+    """
+    This benchmark measures how much time and memory it takes to read a
+    large run with a 'text' parameter that only has a few distinct values
+    (e.g. the mode of an instrument), when the values are stored as they
+    are and with categorical compression, and how large the database file
+    is.
+    """
+
+    number = 1
+    repeat = 2
+
+    params = [None, 'categorical']
+    param_names = ['compression']
+
+    n_rows = 10**6
+    modes = ['continuous', 'triggered', 'averaged', 'single shot']
+
+    timeout = 600
+
+    timer = time.perf_counter
+
+    def setup_cache(self):
+        paths = {}
+        for compression in self.params:
+            path = os.path.abspath(f'low_cardinality_text_{compression}.db')
+            if os.path.exists(path):
+                os.remove(path)
+            conn = connect(path)
+            exp = new_experiment("test-experiment",
+                                 sample_name="test-sample", conn=conn)
+            x = ParamSpecBase('x', 'numeric')
+            mode = ParamSpecBase('mode', 'text')
+            y = ParamSpecBase('y', 'numeric')
+            ds = DataSet(conn=conn, exp_id=exp.exp_id)
+            ds.set_interdependencies(
+                InterDependencies_(dependencies={y: (x, mode)}))
+            ds.set_compression({'mode': compression})
+            ds.mark_started()
+            chunk = 10**5
+            for start in range(0, self.n_rows, chunk):
+                ds.add_result_columns([{
+                    'x': np.arange(start, start + chunk),
+                    'mode': np.random.choice(self.modes, chunk),
+                    'y': np.random.rand(chunk)}])
+            ds.mark_completed()
+            paths[compression] = path
+            conn.close()
+        return paths
+
+    def setup(self, paths, compression):
+        self.conn = connect(paths[compression])
+        self.dataset = DataSet(conn=self.conn, run_id=1)
+
+    def teardown(self, paths, compression):
+        self.conn.close()
+
+    def time_get_parameter_data(self, paths, compression):
+        self.dataset.get_parameter_data()
+
+    def peakmem_get_parameter_data(self, paths, compression):
+        self.dataset.get_parameter_data()
+
+    def time_to_pandas(self, paths, compression):
+        self.dataset.to_pandas()
+
+    def peakmem_to_pandas(self, paths, compression):
+        self.dataset.to_pandas()
+
+    def track_db_file_size(self, paths, compression):
+        return os.path.getsize(paths[compression])
+
+    track_db_file_size.unit = 'bytes'
@@ -0,0 +1,371 @@
+"""
+This module contains a catalog of the runs in many database files.
+
+When the database file is rotated, e.g. per cooldown or per month, finding a
+run by its GUID or by its run specification means opening every database
+file in turn. A :class:`DatabaseCatalog` instead keeps an index of the runs
+of the database files registered with it in a small SQLite file of its own:
+their GUIDs, captured run ids and counters, experiment and sample names,
+timestamps and parameter names. The index mirrors the columns of the
+'runs' and 'experiments' tables that are needed to look up runs, such that
+the runs are selected with the same queries as in a single database file.
+
+A database file is only indexed again when its modification time or size
+(or those of its write-ahead log) have changed since it was last indexed,
+which is checked before every lookup.
+
+If the path of a catalog file is set in the ``core.db_catalog`` config
+option, :func:`.load_by_guid` and :func:`.load_by_run_spec` look up runs in
+all the database files registered with that catalog.
+"""
+import logging
+import os
+import sqlite3
+from os.path import abspath, expanduser, normpath
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+from urllib.request import pathname2url
+
+import numpy as np
+
+import qcodes.config
+from qcodes.dataset.sqlite.queries import (RUN_CATALOG_FIELDS,
+                                           _build_run_spec_condition)
+
+log = logging.getLogger(__name__)
+
+_CATALOG_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS files (
+        file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        path TEXT UNIQUE NOT NULL,
+        signature TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS experiments (
+        file_id INTEGER NOT NULL,
+        exp_id INTEGER NOT NULL,
+        name TEXT,
+        sample_name TEXT,
+        PRIMARY KEY (file_id, exp_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS runs (
+        file_id INTEGER NOT NULL,
+        run_id INTEGER NOT NULL,
+        exp_id INTEGER,
+        name TEXT,
+        guid TEXT,
+        captured_run_id INTEGER,
+        captured_counter INTEGER,
+        result_counter INTEGER,
+        run_timestamp REAL,
+        completed_timestamp REAL,
+        is_completed INTEGER,
+        parameters TEXT,
+        PRIMARY KEY (file_id, run_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS IX_runs_guid ON runs (guid)",
+    """
+    CREATE INDEX IF NOT EXISTS IX_runs_captured_run_id
+    ON runs (captured_run_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS run_parameters (
+        file_id INTEGER NOT NULL,
+        run_id INTEGER NOT NULL,
+        parameter TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS IX_run_parameters_parameter
+    ON run_parameters (parameter)
+    """,
+)
+
+# the columns of the 'runs' table that are indexed; older database files
+# have no captured run id and counter, which are then the run id and the
+# result counter, like when the database file is upgraded
+_RUN_COLUMNS = ('run_id', 'exp_id', 'name', 'guid', 'captured_run_id',
+                'captured_counter', 'result_counter', 'run_timestamp',
+                'completed_timestamp', 'is_completed', 'parameters')
+_RUN_COLUMN_FALLBACKS = {'captured_run_id': 'run_id',
+                         'captured_counter': 'result_counter'}
+
+
+def _normalize_path(path_to_db: str) -> str:
+    return normpath(abspath(expanduser(path_to_db)))
+
+
+def _file_signature(path_to_db: str) -> Optional[str]:
+    """
+    The modification times and sizes of a database file and its write-ahead
+    log, or None if the database file does not exist
+    """
+    parts = []
+    for path in (path_to_db, path_to_db + '-wal'):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            if path == path_to_db:
+                return None
+            continue
+        parts.append(f'{stat.st_mtime_ns}:{stat.st_size}')
+    return ','.join(parts)
+
+
+def _read_runs(path_to_db: str
+               ) -> Tuple[List[Tuple[Any, ...]], List[Tuple[Any, ...]]]:
+    """
+    Read the experiments and the runs of a database file, without upgrading
+    or otherwise modifying it
+
+    Returns:
+        The rows of the experiments (exp_id, name, sample_name) and the rows
+        of the runs (with the columns of ``_RUN_COLUMNS``)
+    """
+    uri = f'file:{pathname2url(path_to_db)}?mode=ro'
+    conn = sqlite3.connect(uri, uri=True)
+    try:
+        existing = {row[1] for row in conn.execute('PRAGMA table_info(runs)')}
+        columns = ', '.join(
+            column if column in existing else _RUN_COLUMN_FALLBACKS[column]
+            for column in _RUN_COLUMNS)
+        experiments = conn.execute(
+            'SELECT exp_id, name, sample_name FROM experiments').fetchall()
+        runs = conn.execute(f'SELECT {columns} FROM runs').fetchall()
+    finally:
+        conn.close()
+    return experiments, runs
+
+
+class DatabaseCatalog:
+    """
+    A catalog of the runs in the database files registered with it, kept
+    in an index file of its own. The database files are only read to
+    (re-)index them, and are never modified.
+
+    The catalog can be used as a context manager, which closes the
+    connection to the index file on exit.
+
+    Args:
+        path_to_catalog: the path of the index file, which is created if it
+            does not exist
+    """
+
+    def __init__(self, path_to_catalog: str) -> None:
+        self.path = _normalize_path(path_to_catalog)
+        self.conn = sqlite3.connect(self.path)
+        with self.conn:
+            for statement in _CATALOG_SCHEMA:
+                self.conn.execute(statement)
+
+    def __enter__(self) -> 'DatabaseCatalog':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @property
+    def registered_files(self) -> List[str]:
+        """
+        The paths of the registered database files, in the order in which
+        they were registered
+        """
+        cursor = self.conn.execute('SELECT path FROM files ORDER BY file_id')
+        return [row[0] for row in cursor.fetchall()]
+
+    def register(self, *paths_to_db: str) -> None:
+        """
+        Register database files with the catalog and index their runs.
+        Registering a file again re-indexes it if it has changed.
+
+        Raises:
+            FileNotFoundError: if a database file does not exist
+        """
+        for path_to_db in paths_to_db:
+            path = _normalize_path(path_to_db)
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f'No database file at {path}')
+            with self.conn:
+                self.conn.execute('INSERT OR IGNORE INTO files (path) '
+                                  'VALUES (?)', (path,))
+        self.refresh()
+
+    def unregister(self, path_to_db: str) -> None:
+        """
+        Remove a database file and the index of its runs from the catalog
+        """
+        path = _normalize_path(path_to_db)
+        row = self.conn.execute('SELECT file_id FROM files WHERE path = ?',
+                                (path,)).fetchone()
+        if row is None:
+            return
+        with self.conn:
+            self._clear(row[0])
+            self.conn.execute('DELETE FROM files WHERE file_id = ?', row)
+
+    def refresh(self) -> List[str]:
+        """
+        Index the registered database files that have changed since they
+        were last indexed. Database files that no longer exist stay
+        registered, without runs.
+
+        Returns:
+            The paths of the database files that were (re-)indexed
+        """
+        indexed = []
+        files = self.conn.execute(
+            'SELECT file_id, path, signature FROM files').fetchall()
+        for file_id, path, signature in files:
+            new_signature = _file_signature(path)
+            if new_signature == signature:
+                continue
+            experiments: List[Tuple[Any, ...]] = []
+            runs: List[Tuple[Any, ...]] = []
+            if new_signature is not None:
+                try:
+                    experiments, runs = _read_runs(path)
+                except sqlite3.Error as e:
+                    log.warning(f'Could not index database file {path}: {e}')
+                    new_signature = None
+            with self.conn:
+                self._clear(file_id)
+                self._insert(file_id, experiments, runs)
+                self.conn.execute('UPDATE files SET signature = ? '
+                                  'WHERE file_id = ?',
+                                  (new_signature, file_id))
+            indexed.append(path)
+        return indexed
+
+    def _clear(self, file_id: int) -> None:
+        for table in ('experiments', 'runs', 'run_parameters'):
+            self.conn.execute(f'DELETE FROM {table} WHERE file_id = ?',
+                              (file_id,))
+
+    def _insert(self, file_id: int,
+                experiments: Sequence[Tuple[Any, ...]],
+                runs: Sequence[Tuple[Any, ...]]) -> None:
+        self.conn.executemany(
+            'INSERT INTO experiments VALUES (?, ?, ?, ?)',
+            [(file_id, *row) for row in experiments])
+        placeholders = ', '.join('?' * (len(_RUN_COLUMNS) + 1))
+        self.conn.executemany(
+            f'INSERT INTO runs (file_id, {", ".join(_RUN_COLUMNS)}) '
+            f'VALUES ({placeholders})',
+            [(file_id, *row) for row in runs])
+        parameters = _RUN_COLUMNS.index('parameters')
+        self.conn.executemany(
+            'INSERT INTO run_parameters VALUES (?, ?, ?)',
+            [(file_id, row[0], name) for row in runs
+             for name in (row[parameters] or '').split(',') if name])
+
+    def locate_guid(self, guid: str) -> Optional[str]:
+        """
+        The path of the database file that holds the run with the given
+        GUID. If the run has been copied into several database files, the
+        first registered of them is returned.
+
+        Returns:
+            The path of the database file, or None if no registered
+            database file holds the run
+        """
+        self.refresh()
+        row = self.conn.execute(
+            'SELECT f.path FROM runs AS r '
+            'JOIN files AS f ON r.file_id = f.file_id '
+            'WHERE r.guid = ? ORDER BY f.file_id LIMIT 1', (guid,)).fetchone()
+        return None if row is None else row[0]
+
+    def get_run_catalog(self,
+                        captured_run_id: Optional[int] = None,
+                        captured_counter: Optional[int] = None,
+                        experiment_name: Optional[str] = None,
+                        sample_name: Optional[str] = None,
+                        sample_id: Optional[int] = None,
+                        location: Optional[int] = None,
+                        work_station: Optional[int] = None,
+                        start_time: Optional[float] = None,
+                        end_time: Optional[float] = None,
+                        parameter: Optional[str] = None) -> np.ndarray:
+        """
+        Get a summary of the runs in all the registered database files that
+        match the supplied run specifications, like
+        :func:`.load_run_catalog` does for a single database file. The
+        arguments are the same as those of :func:`.load_run_catalog`, except
+        for:
+
+        Args:
+            parameter: the name of a parameter that the runs should have
+
+        Returns:
+            A structured array with one row per run, ordered by database
+            file and run_id, with the fields of ``RUN_CATALOG_FIELDS`` and
+            the 'path' of the database file
+        """
+        self.refresh()
+        where_clause, inputs = _build_run_spec_condition(
+            captured_run_id=captured_run_id,
+            captured_counter=captured_counter,
+            experiment_name=experiment_name, sample_name=sample_name,
+            sample_id=sample_id, location=location,
+            work_station=work_station, start_time=start_time,
+            end_time=end_time)
+        if parameter is not None:
+            condition = ('EXISTS (SELECT 1 FROM run_parameters AS p '
+                         'WHERE p.file_id = r.file_id '
+                         'AND p.run_id = r.run_id AND p.parameter = ?)')
+            where_clause = (f'{where_clause} AND {condition}' if where_clause
+                            else f'WHERE {condition}')
+            inputs.append(parameter)
+
+        columns = ', '.join(column for _, _, column in RUN_CATALOG_FIELDS)
+        query = f"""
+                SELECT {columns}, f.path
+                FROM runs AS r
+                JOIN experiments AS e
+                ON r.file_id = e.file_id AND r.exp_id = e.exp_id
+                JOIN files AS f ON r.file_id = f.file_id
+                {where_clause}
+                ORDER BY r.file_id, r.run_id
+                """
+        rows = self.conn.execute(query, inputs).fetchall()
+        dtype = [(name, type_) for name, type_, _ in RUN_CATALOG_FIELDS]
+        dtype.append(('path', object))
+        return np.array(rows, dtype=dtype)
+
+    def get_guids_from_run_spec(self, **run_spec: Any) -> Dict[str, str]:
+        """
+        Get the GUIDs of the runs in all the registered database files that
+        match the supplied run specifications, see :meth:`get_run_catalog`.
+
+        Returns:
+            The paths of the database files of the matching runs by their
+            GUIDs, in the order of the database files and run_ids. A run
+            that has been copied into several database files is only found
+            in the first registered of them.
+        """
+        catalog = self.get_run_catalog(**run_spec)
+        paths: Dict[str, str] = {}
+        for guid, path in zip(catalog['guid'], catalog['path']):
+            paths.setdefault(guid, path)
+        return paths
+
+
+def catalog_from_config() -> Optional[DatabaseCatalog]:
+    """
+    The catalog at the path set in the ``core.db_catalog`` config option,
+    or None if no catalog is set
+    """
+    path = qcodes.config['core']['db_catalog']
+    if path is None:
+        return None
+    return DatabaseCatalog(path)
@@ -1,4 +1,5 @@
-from typing import List, Any, Sequence, Tuple, Dict, Union, cast
+from typing import (List, Any, NamedTuple, Optional, Sequence, Tuple, Dict,
+                    Union, cast)
 import logging
 
 import numpy as np
@@ -6,7 +7,7 @@ import numpy as np
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.sqlite.queries import (get_dependencies, get_dependents,
                                            get_layout)
-from qcodes.dataset.data_set import load_by_id
+from qcodes.dataset.data_set import DataSet, load_by_id
 
 log = logging.getLogger(__name__)
 
@@ -70,12 +71,18 @@ def get_data_by_id(run_id: int) -> \
         ]
 
     """
-    ds = load_by_id(run_id)
+    return _get_data_from_ds(load_by_id(run_id))
+
 
+def _get_data_from_ds(ds: DataSet) -> \
+        List[List[Dict[str, Union[str, np.ndarray]]]]:
+    """
+    Get the data of a dataset in the format of :func:`get_data_by_id`
+    """
     dependent_parameters: Tuple[ParamSpecBase, ...] = ds.dependent_parameters
 
     parameter_data = ds.get_parameter_data(
-        *[ps.name for ps in dependent_parameters])
+        *[ps.name for ps in dependent_parameters], reshape=False)
 
     output = []
 
@@ -111,31 +118,242 @@ def get_data_by_id(run_id: int) -> \
     return output
 
 
-def _all_steps_multiples_of_min_step(rows: np.ndarray) -> bool:
+# the kinds of grids that setpoints can be on, see infer_grid
+GRID_COMPLETE = 'complete'
+GRID_PARTIAL = 'partial'
+GRID_IRREGULAR = 'irregular'
+
+
+class GridInfo(NamedTuple):
     """
-    Are all steps integer multiples of the smallest step?
-    This is used in determining whether the setpoints correspond
-    to a regular grid
+    The grid that data points are on, as inferred by :func:`infer_grid`.
+
+    Attributes:
+        kind: ``GRID_COMPLETE`` if there is exactly one data point for each
+            point of the grid spanned by the unique setpoint values,
+            ``GRID_PARTIAL`` if the data points are on that grid without
+            duplicates, and all slices of the grid along the outermost axis
+            are complete except for the one of the last data point, as for
+            an interrupted sweep, and ``GRID_IRREGULAR`` otherwise
+        axes: the sorted unique setpoint values, one array per axis
+        indices: the index of each data point along each of the axes
+        order: the axes ordered from the outermost (the most slowly
+            changing in the order of the data points) to the innermost
+    """
+    kind: str
+    axes: Tuple[np.ndarray, ...]
+    indices: Tuple[np.ndarray, ...]
+    order: Tuple[int, ...]
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple(len(axis) for axis in self.axes)
+
+    def on_grid(self, values: np.ndarray) -> np.ndarray:
+        """
+        Put the values of the data points onto the grid, i.e. into an
+        array of the shape of the grid, where the points of the grid
+        without a data point are NaN (or empty strings for strings). Of
+        several data points on the same point of the grid, the last one is
+        taken.
+        """
+        values = np.asarray(values)
+        if values.size > 0 and isinstance(values.flat[0], str):
+            gridded = np.full(self.shape, '', dtype=values.dtype)
+        elif values.dtype.kind == 'c':
+            gridded = np.full(self.shape, np.nan, dtype=values.dtype)
+        elif values.dtype.kind == 'O':
+            gridded = np.full(self.shape, None, dtype=object)
+        else:
+            gridded = np.full(self.shape, np.nan)
+        gridded[self.indices] = values
+        return gridded
+
+
+def infer_grid(*setpoints: np.ndarray) -> GridInfo:
+    """
+    Infer the grid that data points are on from their setpoints. This
+    works for any number of setpoints (axes), and takes time O(N log N) for
+    N data points.
 
     Args:
-        rows: the output of _rows_from_datapoints
+        *setpoints: the values of each of the setpoints of the data points,
+            one-dimensional arrays of equal length
 
     Returns:
-        The answer to the question
+        The grid, see :class:`GridInfo`
+    """
+    axes: List[np.ndarray] = []
+    indices: List[np.ndarray] = []
+    for values in setpoints:
+        values = np.asarray(values).ravel()
+        # much faster than np.unique with return_inverse for large data
+        axis = np.unique(values)
+        axes.append(axis)
+        indices.append(np.searchsorted(axis, values))
+    n_points = len(indices[0]) if indices else 0
+
+    # the outer axes change less often than the inner ones
+    n_changes = [np.count_nonzero(np.diff(index)) for index in indices]
+    order = tuple(int(axis) for axis in np.argsort(n_changes, kind='stable'))
+    grid = GridInfo(GRID_IRREGULAR, tuple(axes), tuple(indices), order)
+    if n_points == 0:
+        return grid
+
+    # axes with a single value do not tell anything about the grid, and
+    # would make the one slice along them look like an incomplete last slice
+    varying = [axis for axis in order if len(axes[axis]) > 1]
+    if not varying:
+        return (grid._replace(kind=GRID_COMPLETE) if n_points == 1
+                else grid)
+    shape = tuple(len(axes[axis]) for axis in varying)
+    size = int(np.prod(shape, dtype=np.int64))
+    slice_size = size // shape[0]
+    # all slices but one must be complete, which also bounds the size of
+    # the grid that is worth looking at to less than twice the number of
+    # data points
+    if (shape[0] - 1) * slice_size > n_points:
+        return grid
+
+    flat_index = np.ravel_multi_index(
+        tuple(indices[axis] for axis in varying), shape)
+    if np.unique(flat_index).size != n_points:
+        return grid
+    if n_points == size:
+        return grid._replace(kind=GRID_COMPLETE)
+
+    outer_index = indices[varying[0]]
+    n_in_slices = np.bincount(outer_index, minlength=shape[0])
+    incomplete = np.flatnonzero(n_in_slices != slice_size)
+    if len(incomplete) == 1 and incomplete[0] == outer_index[-1]:
+        return grid._replace(kind=GRID_PARTIAL)
+    return grid
+
+
+def sweep_grid(*setpoints: np.ndarray,
+               shape: Optional[Sequence[int]] = None
+               ) -> Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
     """
+    Find the grid of data points that were measured in nested loops over
+    their setpoints, i.e. that are in C order on a complete grid. The data
+    of such points can be viewed as an array of the shape of the grid
+    without copying it. Unlike :func:`infer_grid`, this does not sort the
+    setpoint values, and the values along an axis need not be sorted.
+
+    Args:
+        *setpoints: the values of each of the setpoints of the data points,
+            arrays of equal size
+        shape: the shape of the grid, if known, with the setpoints as the
+            axes in the given order. If None, the shape and the order of
+            the axes are inferred from the data.
+
+    Returns:
+        The setpoints ordered from the outermost to the innermost loop, and
+        the shape of the grid in that order, or None if the data points are
+        not in C order on a complete grid with distinct values along each
+        axis
+    """
+    flat = [np.asarray(values).reshape(-1) for values in setpoints]
+    n_points = len(flat[0]) if flat else 0
+    if n_points == 0:
+        return None
+
+    if shape is not None:
+        order = tuple(range(len(flat)))
+        grid_shape = tuple(shape)
+        if (len(grid_shape) != len(flat)
+                or int(np.prod(grid_shape, dtype=np.int64)) != n_points):
+            return None
+    else:
+        # the number of blocks of equal consecutive values of an axis is
+        # the number of points of the grid spanned by it and the outer axes
+        n_blocks = [np.count_nonzero(values[1:] != values[:-1]) + 1
+                    for values in flat]
+        order = tuple(int(axis)
+                      for axis in np.argsort(n_blocks, kind='stable'))
+        sizes = []
+        n_outer = 1
+        for axis in order:
+            if n_blocks[axis] % n_outer != 0:
+                return None
+            sizes.append(n_blocks[axis] // n_outer)
+            n_outer = n_blocks[axis]
+        if n_outer != n_points:
+            return None
+        grid_shape = tuple(sizes)
+
+    for position, axis in enumerate(order):
+        on_grid = flat[axis].reshape(grid_shape)
+        line = _grid_line(on_grid, position)
+        # the values along an axis are its coordinates, which must be unique
+        if len(np.unique(line)) != len(line):
+            return None
+        if not np.all(on_grid == _grid_line(on_grid, position, keepdims=True)):
+            return None
+    return order, grid_shape
+
+
+def _grid_line(on_grid: np.ndarray, position: int,
+               keepdims: bool = False) -> np.ndarray:
+    """
+    The values of an array on a grid along one of its axes, at the first
+    point along all the other axes
+    """
+    line = on_grid[tuple(slice(None) if dim == position else 0
+                         for dim in range(on_grid.ndim))]
+    if keepdims:
+        line = line.reshape(tuple(-1 if dim == position else 1
+                                  for dim in range(on_grid.ndim)))
+    return line
+
+
+def grid_coordinates(setpoints: np.ndarray, order: Sequence[int],
+                     shape: Sequence[int]) -> List[np.ndarray]:
+    """
+    The coordinates of the axes of a grid found by :func:`sweep_grid`, as
+    views on the given setpoint values.
+
+    Args:
+        setpoints: the values of the setpoints, in the order in which they
+            were passed to :func:`sweep_grid`
+        order: the order of the setpoints returned by :func:`sweep_grid`
+        shape: the shape of the grid returned by :func:`sweep_grid`
+    """
+    return [_grid_line(np.asarray(setpoints[axis]).reshape(shape), position)
+            for position, axis in enumerate(order)]
 
-    steps: List[np.ndarray] = []
-    for row in rows:
-        # TODO: What is an appropriate precision?
-        steps += list(np.unique(np.diff(row).round(decimals=15)))
 
-    steps = np.unique((steps))
+def _steps_are_multiples_of_min_step(axis: np.ndarray) -> bool:
+    """
+    Are all steps between the sorted unique values of an axis integer
+    multiples of the smallest step? This is used in determining whether
+    the setpoints correspond to a regular grid
+    """
+    # TODO: What is an appropriate precision?
+    steps = np.unique(np.diff(axis).round(decimals=15))
+    if len(steps) < 2:
+        return True
     remainders = np.mod(steps[1:]/steps[0], 1)
 
     # TODO: What are reasonable tolerances for allclose?
-    asmoms = bool(np.allclose(remainders, np.zeros_like(remainders)))
+    return bool(np.allclose(remainders, np.zeros_like(remainders)))
+
+
+def _all_steps_multiples_of_min_step(rows: np.ndarray) -> bool:
+    """
+    Are all steps integer multiples of the smallest step?
+    This is used in determining whether the setpoints correspond
+    to a regular grid
 
-    return asmoms
+    Args:
+        rows: the output of _rows_from_datapoints
+
+    Returns:
+        The answer to the question
+    """
+    # the first row holds all unique values, the steps of the other rows
+    # are sums of its steps
+    return _steps_are_multiples_of_min_step(np.asarray(rows[0]))
 
 
 def _rows_from_datapoints(inputsetpoints: np.ndarray) -> np.ndarray:
@@ -143,7 +361,8 @@ def _rows_from_datapoints(inputsetpoints: np.ndarray) -> np.ndarray:
     Cast the (potentially) unordered setpoints into rows
     of sorted, unique setpoint values. Because of the way they are ordered,
     these rows do not necessarily correspond to actual rows of the scan,
-    but they can nonetheless be used to identify certain scan types
+    but they can nonetheless be used to identify certain scan types.
+    Row ``k`` holds the values that occur more than ``k`` times.
 
     Args:
         setpoints: The raw setpoints as a one-dimensional array
@@ -151,27 +370,15 @@ def _rows_from_datapoints(inputsetpoints: np.ndarray) -> np.ndarray:
     Returns:
         A ndarray of the rows
     """
+    values, counts = np.unique(inputsetpoints, return_counts=True)
+    distinct_counts = np.unique(counts)
+    if len(distinct_counts) == 1:
+        return np.tile(values, (distinct_counts[0], 1))
 
-    rows = []
-    setpoints = inputsetpoints.copy()
-
-    # first check if there is only one unique array in which case we can avoid the
-    # potentially slow loop below
-    temp, inds, count = np.unique(setpoints, return_index=True,
-                                  return_counts=True)
-    num_repeats_array = np.unique(count)
-    if len(num_repeats_array) == 1 and count.sum() == len(inputsetpoints):
-        return np.tile(temp, (num_repeats_array[0], 1))
-    else:
-        rows.append(temp)
-        setpoints = np.delete(setpoints, inds)
-
-    while len(setpoints) > 0:
-        temp, inds = np.unique(setpoints, return_index=True)
-        rows.append(temp)
-        setpoints = np.delete(setpoints, inds)
-
-    return np.array(rows)
+    rows = np.empty(counts.max(), dtype=object)
+    for k in range(len(rows)):
+        rows[k] = values[counts > k]
+    return rows
 
 
 def _all_in_group_or_subgroup(rows: np.ndarray) -> bool:
@@ -191,33 +398,16 @@ def _all_in_group_or_subgroup(rows: np.ndarray) -> bool:
         A boolean indicating whether the setpoints meet the
             criterion
     """
-
-    groups = 1
-    comp_to = rows[0]
-
-    aigos = True
-    switchindex = 0
-
-    for rowind, row in enumerate(rows[1:]):
-        if np.array_equal(row, comp_to):
-            continue
-        else:
-            groups += 1
-            comp_to = row
-            switchindex = rowind
-            if groups > 2:
-                aigos = False
-                break
-
+    # the indices of the rows that differ from their previous row
+    switches = [i for i in range(1, len(rows))
+                if len(rows[i]) != len(rows[i-1])
+                or not np.array_equal(rows[i], rows[i-1])]
+    if len(switches) > 1:
+        return False
     # if there are two groups, check that the rows of one group
     # are all contained in the rows of the other
-    if aigos and switchindex > 0:
-        for row in rows[1+switchindex:]:
-            if sum([r in rows[0] for r in row]) != len(row):
-                aigos = False
-                break
-
-    return aigos
+    return all(np.isin(row, rows[0]).all()
+               for row in rows[switches[0]:]) if switches else True
 
 
 def _strings_as_ints(inputarray: np.ndarray) -> np.ndarray:
@@ -229,10 +419,7 @@ def _strings_as_ints(inputarray: np.ndarray) -> np.ndarray:
     Args:
         inputarray: A 1D array of strings
     """
-    newdata = np.zeros(len(inputarray))
-    for n, word in enumerate(np.unique(inputarray)):
-        newdata += ((inputarray == word).astype(int)*n)
-    return newdata
+    return np.unique(inputarray, return_inverse=True)[1].astype(float)
 
 
 def get_1D_plottype(xpoints: np.ndarray, ypoints: np.ndarray) -> str:
@@ -348,25 +535,12 @@ def datatype_from_setpoints_2d(xpoints: np.ndarray,
 
     # Now check if this is a simple rectangular sweep,
     # possibly interrupted in the middle of one row
-
-    xrows = _rows_from_datapoints(xpoints)
-    yrows = _rows_from_datapoints(ypoints)
-
-    x_check = _all_in_group_or_subgroup(xrows)
-    y_check = _all_in_group_or_subgroup(yrows)
-
-    x_check = x_check and (len(xrows[0]) == len(yrows))
-    y_check = y_check and (len(yrows[0]) == len(xrows))
-
-    # this is the check that we are on a "simple" grid
-    if y_check and x_check:
+    grid = infer_grid(xpoints, ypoints)
+    if grid.kind != GRID_IRREGULAR:
         return '2D_grid'
 
-    x_check = _all_steps_multiples_of_min_step(xrows)
-    y_check = _all_steps_multiples_of_min_step(yrows)
-
     # this is the check that we are on an equidistant grid
-    if y_check and x_check:
+    if all(_steps_are_multiples_of_min_step(axis) for axis in grid.axes):
         return '2D_equidistant'
 
     return '2D_unknown'
@@ -374,28 +548,45 @@ def datatype_from_setpoints_2d(xpoints: np.ndarray,
 
 def reshape_2D_data(x: np.ndarray, y: np.ndarray, z: np.ndarray
                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-    xrow = np.array(_rows_from_datapoints(x)[0])
-    yrow = np.array(_rows_from_datapoints(y)[0])
-    nx = len(xrow)
-    ny = len(yrow)
+    """
+    Put 2D data onto the grid spanned by the unique values of its
+    setpoints.
 
-    # potentially slow method of filling in the data, should be optimised
+    Returns:
+        The unique x values, the unique y values, and z on the grid, of
+        shape (len(y), len(x)), with NaN (or empty strings) where there is
+        no data point
+    """
     log.debug('Sorting 2D data onto grid')
+    grid = infer_grid(x, y)
+    xrow, yrow = grid.axes
+    return xrow, yrow, grid.on_grid(z).T
 
-    if isinstance(z[0], str):
-        z_to_plot = np.full((ny, nx), '', dtype=z.dtype)
-    else:
-        z_to_plot = np.full((ny, nx), np.nan)
-    x_index = np.zeros_like(x, dtype=np.int)
-    y_index = np.zeros_like(y, dtype=np.int)
-    for i, xval in enumerate(xrow):
-        x_index[np.where(x == xval)[0]] = i
-    for i, yval in enumerate(yrow):
-        y_index[np.where(y == yval)[0]] = i
 
-    z_to_plot[y_index, x_index] = z
+def _reshape_2D_data_by_shape(x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                              shape: Sequence[int]
+                              ) -> Optional[Tuple[np.ndarray, np.ndarray,
+                                                  np.ndarray]]:
+    """
+    Reshape 2D data that is known to be measured on a grid of the given
+    shape into the output format of :func:`reshape_2D_data`, i.e. the
+    setpoints of the x and y axes and z of shape (len(y), len(x)).
 
-    return xrow, yrow, z_to_plot
+    Returns:
+        The reshaped data, or None if the data does not fill the shape or
+        the setpoints do not form a grid of that shape
+    """
+    if len(shape) != 2 or x.size != np.prod(shape) or x.size == 0:
+        return None
+    xs = x.reshape(shape)
+    ys = y.reshape(shape)
+    zs = z.reshape(shape)
+    # the outer setpoint is constant along the inner axis
+    if np.all(xs == xs[:, :1]) and np.all(ys == ys[:1, :]):
+        return xs[:, 0], ys[0, :], zs.T
+    if np.all(ys == ys[:, :1]) and np.all(xs == xs[:1, :]):
+        return xs[0, :], ys[:, 0], zs
+    return None
 
 
 def get_shaped_data_by_runid(run_id: int) -> List:
@@ -403,7 +594,10 @@ def get_shaped_data_by_runid(run_id: int) -> List:
     Get data for a given run ID, but shaped according to its nature
 
     The data might get flattened, and additionally reshaped if it falls on a
-    grid (equidistant or not).
+    grid (equidistant or not). If the dependent parameter has a declared
+    2D shape (see :meth:`.DataSet.set_shapes`) and the data fills that
+    shape, the grid is taken from the shape instead of being inferred from
+    the setpoints.
 
     Args:
         run_id: The ID of the run for which to get data
@@ -411,7 +605,9 @@ def get_shaped_data_by_runid(run_id: int) -> List:
     Returns:
         List of lists of dictionaries, the same as for `get_data_by_id`
     """
-    mydata = get_data_by_id(run_id)
+    ds = load_by_id(run_id)
+    shapes = ds.shapes
+    mydata = _get_data_from_ds(ds)
 
     for independet in mydata:
         data_length_long_enough = len(independet) == 3 \
@@ -424,6 +620,21 @@ def get_shaped_data_by_runid(run_id: int) -> List:
             independet[1]['data'] = flatten_1D_data_for_plot(
                 independet[1]['data'])
 
+            shape = shapes.get(cast(str, independet[2]['name']))
+            if shape is not None:
+                shaped = _reshape_2D_data_by_shape(
+                    cast(np.ndarray, independet[0]['data']),
+                    cast(np.ndarray, independet[1]['data']),
+                    cast(np.ndarray, independet[2]['data']),
+                    shape)
+                if shaped is not None:
+                    (
+                        independet[0]['data'],
+                        independet[1]['data'],
+                        independet[2]['data']
+                    ) = shaped
+                    continue
+
             datatype = datatype_from_setpoints_2d(
                 cast(np.ndarray, independet[0]['data']),
                 cast(np.ndarray, independet[1]['data'])
@@ -2,21 +2,27 @@ import functools
 import importlib
 import json
 import logging
-import os
+import sqlite3
 import time
 import uuid
-from queue import Empty, Queue
-from threading import Thread
-from typing import (Any, Callable, Dict, List, Optional, Sequence, Sized,
-                    Tuple, Union, TYPE_CHECKING, Mapping)
+from contextlib import closing
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from itertools import repeat
+from threading import Condition, Lock, Thread
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Sequence,
+                    Sized, Tuple, Union, TYPE_CHECKING, Mapping)
+from weakref import WeakValueDictionary
 
 if TYPE_CHECKING:
     import pandas as pd
+    import xarray as xr
 
 import numpy
 
 import qcodes.config
 import qcodes.dataset.descriptions.versioning.serialization as serial
+from qcodes.dataset.catalog import DatabaseCatalog, catalog_from_config
 from qcodes.dataset.descriptions.dependencies import (DependencyError,
                                                       InterDependencies_)
 from qcodes.dataset.descriptions.param_spec import ParamSpec, ParamSpecBase
@@ -25,29 +31,48 @@ from qcodes.dataset.descriptions.versioning.converters import (new_to_old,
                                                                old_to_new,
                                                                v1_to_v0)
 from qcodes.dataset.descriptions.versioning.v0 import InterDependencies
+from qcodes.dataset.exporters import (CHUNK_TARGET_BYTES,
+                                      FIRST_CHUNK_SIZE, DataLengthException,
+                                      DataPathException, ProgressCallback,
+                                      export_to_text,
+                                      parameter_tree_to_dataframe,
+                                      parameter_tree_to_pandas,
+                                      parameter_tree_to_xarray)
 from qcodes.dataset.guids import (
-    filter_guids_by_parts, generate_guid, parse_guid)
+    generate_guid, parse_guid)
 from qcodes.dataset.linked_datasets.links import (Link, links_to_str,
                                                   str_to_links)
 from qcodes.dataset.sqlite.connection import (ConnectionPlus, atomic,
                                               atomic_transaction,
                                               transaction)
 from qcodes.dataset.sqlite.database import (
-    connect, get_DB_location, conn_from_dbpath_or_conn)
+    TEXT_COMPRESSIONS, _adapt_array, _can_store_in_sidecar,
+    _encode_sidecar_reference, _validate_compression, connect,
+    conn_from_dbpath_or_conn, get_DB_location)
 from qcodes.dataset.sqlite.queries import (
-    add_meta_data, add_parameter, completed, create_run,
-    get_completed_timestamp_from_run_id, get_data,
+    add_categories, add_meta_data, add_parameter, completed,
+    create_categories_table, create_result_table_index,
+    create_run, get_categories, get_completed_timestamp_from_run_id, get_data,
     get_experiment_name_from_experiment_id, get_experiments,
     get_guid_from_run_id, get_guids_from_run_spec,
     get_last_experiment, get_metadata, get_metadata_from_run_id,
-    get_parameter_data, get_parent_dataset_links, get_run_description,
+    get_last_result_id, get_parameter_data, get_parent_dataset_links,
+    get_result_table_indexed_columns, get_run_catalog, get_run_describer,
     get_run_timestamp_from_run_id, get_runid_from_guid,
     get_sample_name_from_experiment_id, get_setpoints, get_values,
-    mark_run_complete, remove_trigger, run_exists, set_run_timestamp,
-    update_parent_datasets, update_run_description)
-from qcodes.dataset.sqlite.query_helpers import (VALUE, insert_many_values,
+    mark_run_complete, remove_trigger, reshape_parameter_data, run_exists,
+    set_run_timestamp, update_parent_datasets, update_run_description)
+from qcodes.dataset.sqlite.query_helpers import (VALUE, insert_column,
+                                                 insert_many_columns,
+                                                 insert_many_values,
                                                  insert_values, length, one,
                                                  select_one_where, VALUES)
+from qcodes.dataset.sqlite.sidecars import (append_to_sidecar,
+                                            sidecar_file_name)
+from qcodes.dataset.sqlite.snapshots import (get_run_snapshot_id,
+                                             get_run_snapshot_raw,
+                                             get_snapshot_raw,
+                                             set_run_snapshot)
 from qcodes.instrument.parameter import _BaseParameter
 from qcodes.utils.deprecate import deprecate
 
@@ -80,17 +105,18 @@ SpecsOrInterDeps = Union[SPECS, InterDependencies_]
 class CompletedError(RuntimeError):
     pass
 
-class DataLengthException(Exception):
-    pass
-
-class DataPathException(Exception):
-    pass
-
 
 class _Subscriber(Thread):
     """
     Class to add a subscriber to a :class:`.DataSet`. The subscriber gets called every
-    time an insert is made to the results_table.
+    time results are added to the :class:`.DataSet`.
+
+    The results are published to the subscriber by the :class:`.DataSet`
+    right after they have been written to the database, as the batch of rows
+    that has been written. The thread of the subscriber waits on a condition
+    variable for enough results to be published and then calls the callback
+    with the results as a list of tuples of values of all the parameters of
+    the :class:`.DataSet`.
 
     The _Subscriber is not meant to be instantiated directly, but rather used
     via the 'subscribe' method of the :class:`.DataSet`.
@@ -119,9 +145,17 @@ class _Subscriber(Thread):
 
         self.state = state
 
-        self.data_queue: Queue = Queue()
+        # batches of published results as tuples of the names of the
+        # parameters and the rows of values
+        self._published: List[Tuple[Sequence[str], Sequence[Sequence[Any]]]]
+        self._published = []
         self._queue_length: int = 0
         self._stop_signal: bool = False
+        self._done: bool = False
+        self._condition = Condition()
+        # the callback may be called by the subscriber thread and by
+        # done_callback, but never concurrently
+        self._callback_lock = Lock()
         # convert milliseconds to seconds
         self._loop_sleep_time = loop_sleep_time / 1000
         self.min_queue_length = min_queue_length
@@ -131,80 +165,132 @@ class _Subscriber(Thread):
         else:
             self.callback = functools.partial(callback, **callback_kwargs)
 
-        self.callback_id = f"callback{self._id}"
-        self.trigger_id = f"sub{self._id}"
-
-        conn = dataSet.conn
-
-        conn.create_function(self.callback_id, -1, self._cache_data_to_queue)
-
-        parameters = dataSet.get_parameters()
-        sql_param_list = ",".join([f"NEW.{p.name}" for p in parameters])
-        sql_create_trigger_for_callback = f"""
-        CREATE TRIGGER {self.trigger_id}
-            AFTER INSERT ON '{self.table_name}'
-        BEGIN
-            SELECT {self.callback_id}({sql_param_list});
-        END;"""
-        atomic_transaction(conn, sql_create_trigger_for_callback)
+        self._parameter_names = [p.name for p in dataSet.get_parameters()]
 
         self.log = logging.getLogger(f"_Subscriber {self._id}")
 
-    def _cache_data_to_queue(self, *args: Any) -> None:
-        self.log.debug(f"Args:{args} put into queue for {self.callback_id}")
-        self.data_queue.put(args)
-        self._data_set_len += 1
-        self._queue_length += 1
+    def publish(self, names: Sequence[str],
+                rows: Sequence[Sequence[Any]]) -> None:
+        """
+        Hand over a batch of results that have been written to the
+        :class:`.DataSet`.
+
+        Args:
+            names: the names of the parameters of the values in the rows
+            rows: the results, one sequence of values per result
+        """
+        with self._condition:
+            self._published.append((names, rows))
+            self._data_set_len += len(rows)
+            self._queue_length += len(rows)
+            self._condition.notify()
+        self.log.debug(f"{len(rows)} results published")
 
     def run(self) -> None:
         self.log.debug("Starting subscriber")
         self._loop()
 
-    @staticmethod
-    def _exhaust_queue(queue: Queue) -> List:
-        result_list = []
-        while True:
-            try:
-                result_list.append(queue.get(block=False))
-            except Empty:
-                break
+    def _to_result_list(
+            self,
+            published: List[Tuple[Sequence[str], Sequence[Sequence[Any]]]]
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Turn the published batches into tuples of values of all the
+        parameters of the :class:`.DataSet` (None for missing values)
+        """
+        result_list: List[Tuple[Any, ...]] = []
+        for names, rows in published:
+            indices = {name: index for index, name in enumerate(names)}
+            positions = [indices.get(name) for name in self._parameter_names]
+            result_list += [tuple(None if pos is None else row[pos]
+                                  for pos in positions)
+                            for row in rows]
         return result_list
 
     def _call_callback_on_queue_data(self) -> None:
-        result_list = self._exhaust_queue(self.data_queue)
-        self.callback(result_list, self._data_set_len, self.state)
+        with self._callback_lock:
+            with self._condition:
+                published = self._published
+                self._published = []
+                self._queue_length = 0
+                data_set_len = self._data_set_len
+            result_list = self._to_result_list(published)
+            self.callback(result_list, data_set_len, self.state)
         self.log.debug(f"{self.callback} called with "
                        f"result_list: {result_list}.")
 
+    def _finished(self) -> bool:
+        return self._stop_signal or self._done
+
     def _loop(self) -> None:
         while True:
-            if self._stop_signal:
-                self._clean_up()
-                break
-
-            if self._queue_length >= self.min_queue_length:
-                self._call_callback_on_queue_data()
-                self._queue_length = 0
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: (self._finished()
+                             or self._queue_length >= self.min_queue_length))
+                if self._finished():
+                    break
 
-            time.sleep(self._loop_sleep_time)
+            self._call_callback_on_queue_data()
 
-            if self.dataSet.completed:
-                self._call_callback_on_queue_data()
-                break
+            if self._loop_sleep_time > 0:
+                with self._condition:
+                    self._condition.wait_for(self._finished,
+                                             timeout=self._loop_sleep_time)
+        self._clean_up()
 
     def done_callback(self) -> None:
         self.log.debug("Done callback")
+        with self._condition:
+            self._done = True
+            self._condition.notify()
         self._call_callback_on_queue_data()
 
     def schedule_stop(self) -> None:
-        if not self._stop_signal:
-            self.log.debug("Scheduling stop")
-            self._stop_signal = True
+        with self._condition:
+            if not self._stop_signal:
+                self.log.debug("Scheduling stop")
+                self._stop_signal = True
+                self._condition.notify()
 
     def _clean_up(self) -> None:
         self.log.debug("Stopped subscriber")
 
 
+class _RunSubscribers(Dict[str, _Subscriber]):
+    """
+    The subscribers of a run by their id. Unlike a plain dict, this can be
+    weakly referenced.
+    """
+
+
+# The subscribers of the runs by the path to the database file and the
+# run_id. All DataSet objects of a run in this process share the subscribers
+# of the run, such that the results written through any of them are
+# published to all the subscribers. The entry of a run is dropped once no
+# DataSet object of the run is left.
+_subscribers_of_runs: 'WeakValueDictionary[Tuple[str, int], _RunSubscribers]'
+_subscribers_of_runs = WeakValueDictionary()
+_subscribers_of_runs_lock = Lock()
+
+
+def _get_subscribers_of_run(conn: ConnectionPlus,
+                            run_id: int) -> _RunSubscribers:
+    """
+    Return the subscribers of the specified run, which are shared by all
+    the DataSet objects of the run in this process
+    """
+    # in-memory databases have no path, and are only shared by way of
+    # their connection
+    path = conn.path_to_dbfile or f':memory: {id(conn)}'
+    with _subscribers_of_runs_lock:
+        subscribers = _subscribers_of_runs.get((path, run_id))
+        if subscribers is None:
+            subscribers = _RunSubscribers()
+            _subscribers_of_runs[(path, run_id)] = subscribers
+    return subscribers
+
+
 class DataSet(Sized):
 
     # the "persistent traits" are the attributes/properties of the DataSet
@@ -252,9 +338,26 @@ class DataSet(Sized):
         self.conn = conn_from_dbpath_or_conn(conn, path_to_db)
 
         self._debug = False
-        self.subscribers: Dict[str, _Subscriber] = {}
         self._interdeps: InterDependencies_
         self._parent_dataset_links: List[Link]
+        self._table_name: Optional[str] = None
+        # the parameters in the old ParamSpec format, computed on demand
+        self._parameters: Optional[SPECS] = None
+        # the snapshot id and the parsed snapshot, computed on demand
+        self._snapshot_cache: Optional[Tuple[int, dict]] = None
+        self._compression: Dict[str, str] = {}
+        # the codes of the values of the parameters with categorical
+        # compression, loaded from the database when results are added
+        self._category_codes: Dict[str, Dict[str, int]] = {}
+        # the categories of those parameters, loaded from the database when
+        # results are read, see _get_categories
+        self._categories: Optional[Dict[str, List[str]]] = None
+        self._shapes: Dict[str, Tuple[int, ...]] = {}
+        self._guid: Optional[str] = None
+        # arrays larger than this number of bytes are stored in the sidecar
+        # file of the run instead of the database file, None disables that
+        self.sidecar_threshold: Optional[int] = \
+            qcodes.config['core']['db_sidecar_threshold']
 
         if run_id is not None:
             if not run_exists(self.conn, run_id):
@@ -264,6 +367,8 @@ class DataSet(Sized):
             self._completed = completed(self.conn, self.run_id)
             run_desc = self._get_run_description_from_db()
             self._interdeps = run_desc.interdeps
+            self._compression = dict(run_desc.compression)
+            self._shapes = dict(run_desc.shapes)
             self._metadata = get_metadata_from_run_id(self.conn, self.run_id)
             self._started = self.run_timestamp_raw is not None
             self._parent_dataset_links = str_to_links(
@@ -280,11 +385,12 @@ class DataSet(Sized):
                                      "You can start a new one with:"
                                      " new_experiment(name, sample_name)")
             name = name or "dataset"
-            _, run_id, __ = create_run(self.conn, exp_id, name,
-                                       generate_guid(),
-                                       parameters=None,
-                                       values=values,
-                                       metadata=metadata)
+            _, run_id, table_name = create_run(self.conn, exp_id, name,
+                                               generate_guid(),
+                                               parameters=None,
+                                               values=values,
+                                               metadata=metadata)
+            self._table_name = table_name
             # this is really the UUID (an ever increasing count in the db)
             self._run_id = run_id
             self._completed = False
@@ -298,6 +404,9 @@ class DataSet(Sized):
             self._metadata = get_metadata_from_run_id(self.conn, self.run_id)
             self._parent_dataset_links = []
 
+        self.subscribers: Dict[str, _Subscriber] = _get_subscribers_of_run(
+            self.conn, self.run_id)
+
     @property
     def run_id(self) -> int:
         return self._run_id
@@ -318,8 +427,13 @@ class DataSet(Sized):
 
     @property
     def table_name(self) -> str:
-        return select_one_where(self.conn, "runs",
-                                "result_table_name", "run_id", self.run_id)
+        # the name of the results table never changes, so it is only looked
+        # up once
+        if self._table_name is None:
+            self._table_name = select_one_where(self.conn, "runs",
+                                                "result_table_name",
+                                                "run_id", self.run_id)
+        return self._table_name
 
     @property
     def guid(self) -> str:
@@ -327,18 +441,29 @@ class DataSet(Sized):
 
     @property
     def snapshot(self) -> Optional[dict]:
-        """Snapshot of the run as dictionary (or None)"""
-        snapshot_json = self.snapshot_raw
-        if snapshot_json is not None:
-            return json.loads(snapshot_json)
-        else:
-            return None
+        """
+        Snapshot of the run as dictionary (or None). The snapshot is only
+        parsed once per :class:`.DataSet`, hence the returned dictionary is
+        shared between calls and should not be modified.
+        """
+        snapshot_id = get_run_snapshot_id(self.conn, self.run_id)
+        if snapshot_id is None:
+            snapshot_json = self.snapshot_raw
+            if snapshot_json is not None:
+                return json.loads(snapshot_json)
+            else:
+                return None
+
+        if self._snapshot_cache is None \
+                or self._snapshot_cache[0] != snapshot_id:
+            snapshot = json.loads(get_snapshot_raw(self.conn, snapshot_id))
+            self._snapshot_cache = (snapshot_id, snapshot)
+        return self._snapshot_cache[1]
 
     @property
     def snapshot_raw(self) -> Optional[str]:
         """Snapshot of the run as a JSON-formatted string (or None)"""
-        return select_one_where(self.conn, "runs", "snapshot",
-                                "run_id", self.run_id)
+        return get_run_snapshot_raw(self.conn, self.run_id)
 
     @property
     def number_of_results(self) -> int:
@@ -402,7 +527,9 @@ class DataSet(Sized):
 
     @property
     def description(self) -> RunDescriber:
-        return RunDescriber(interdeps=self._interdeps)
+        return RunDescriber(interdeps=self._interdeps,
+                            compression=self._compression,
+                            shapes=self._shapes)
 
     @property
     def metadata(self) -> Dict:
@@ -519,18 +646,23 @@ class DataSet(Sized):
 
     def _get_run_description_from_db(self) -> RunDescriber:
         """
-        Look up the run_description from the database
+        Look up the run_description from the database. The descriptions of
+        started runs are cached, see
+        :func:`qcodes.dataset.sqlite.queries.get_run_describer`.
         """
-        desc_str = get_run_description(self.conn, self.run_id)
-        return serial.from_json_to_current(desc_str)
+        return get_run_describer(self.conn, self.run_id)
 
     def toggle_debug(self) -> None:
         """
         Toggle debug mode, if debug mode is on all the queries made are
-        echoed back.
+        echoed back. The :class:`.DataSet` then gets a connection of its
+        own. A connection from the connection pool (see the
+        ``core.db_connection_pool`` config option) is shared with other
+        :class:`.DataSet` objects, hence it is left open.
         """
         self._debug = not self._debug
-        self.conn.close()
+        if not self.conn.pooled:
+            self.conn.close()
         self.conn = connect(self.path_to_db, self._debug)
 
     def add_parameter(self, spec: ParamSpec) -> None:
@@ -556,11 +688,263 @@ class DataSet(Sized):
             raise RuntimeError(mssg)
 
         self._interdeps = interdeps
+        self._parameters = None
+
+    @property
+    def compression(self) -> Dict[str, str]:
+        """
+        The compression of the values of the 'array' and 'text' parameters
+        of this :class:`.DataSet` by parameter name, see
+        :meth:`set_compression`
+        """
+        return dict(self._compression)
+
+    @property
+    def categories(self) -> Dict[str, List[str]]:
+        """
+        The distinct values of the parameters with categorical compression
+        of this :class:`.DataSet` by parameter name, see
+        :meth:`set_compression`. The position of a value in its list is its
+        code, as returned by :meth:`get_parameter_data` with
+        ``decode_categories=False``.
+        """
+        if self._categories is not None and not self.completed:
+            # the categories of a run in progress may have been added to by
+            # another DataSet object of the run
+            self._categories.update(get_categories(self.conn,
+                                                   self.table_name))
+        return {name: list(values)
+                for name, values in self._get_categories().items()}
+
+    def _get_categories(self) -> Dict[str, List[str]]:
+        """
+        The categories of the parameters with categorical compression,
+        loaded from the database once. The dict is passed on to
+        :func:`~qcodes.dataset.sqlite.queries.get_parameter_data`, which
+        reloads it if the data has codes that it does not include yet.
+        Without categorical parameters, the database is not looked at.
+        """
+        if self._categories is None:
+            categorical = [name for name, codec in self._compression.items()
+                           if codec in TEXT_COMPRESSIONS]
+            loaded = (get_categories(self.conn, self.table_name)
+                      if categorical else {})
+            self._categories = {name: loaded.get(name, [])
+                                for name in categorical}
+        return self._categories
+
+    def set_compression(self, compression: Mapping[str, Optional[str]]
+                        ) -> None:
+        """
+        Set the compression of the values of 'array' and 'text' parameters
+        of this :class:`.DataSet`. The compression is stored in the run
+        description and applied when results are added. Values are
+        decompressed transparently when they are read.
+
+        The 'categorical' compression of a 'text' parameter, whose values
+        are typically few distinct strings like the modes of an instrument,
+        stores each distinct value once in the categories table of the run
+        (see :attr:`categories`), and the integer code of the value in each
+        result. Results can be filtered by the values of such a parameter
+        (see :meth:`get_parameter_data`), but not by ranges of its values.
+
+        Args:
+            compression: mapping from the names of 'array' parameters to
+                one of
+                :data:`qcodes.dataset.sqlite.database.ARRAY_COMPRESSIONS`,
+                e.g. 'zlib+shuffle' for arrays of floats, and from the names
+                of 'text' parameters to 'categorical', or None for no
+                compression
+        """
+        if not self.pristine:
+            raise RuntimeError('Can not set the compression of a DataSet '
+                               'that has been started.')
+        self._validate_parameter_names(*compression)
+        for name, codec in compression.items():
+            _validate_compression(self._interdeps._id_to_paramspec[name].type,
+                                  codec)
+
+        new_compression = dict(self._compression)
+        for name, codec in compression.items():
+            if codec is None:
+                new_compression.pop(name, None)
+            else:
+                new_compression[name] = codec
+        self._compression = new_compression
+
+    @property
+    def shapes(self) -> Dict[str, Tuple[int, ...]]:
+        """
+        The declared shapes of the data of the parameters of this
+        :class:`.DataSet` by parameter name, see :meth:`set_shapes`
+        """
+        return dict(self._shapes)
+
+    def set_shapes(self, shapes: Mapping[str, Optional[Sequence[int]]]
+                   ) -> None:
+        """
+        Declare the expected shapes of the data of parameters of this
+        :class:`.DataSet`. The shapes are stored in the run description, and
+        :meth:`get_parameter_data` returns the data of a parameter and its
+        setpoints in the shape of the parameter.
+
+        Args:
+            shapes: mapping from the names of parameters to the shape of
+                their data as returned by :meth:`get_parameter_data`, e.g.
+                ``(n_x, n_y)`` for a parameter measured on a grid of
+                ``n_x`` times ``n_y`` setpoints, or ``(n_x, n_points)`` for
+                an 'array' parameter of ``n_points`` values measured at
+                ``n_x`` setpoints. None removes the shape of a parameter.
+        """
+        if not self.pristine:
+            raise RuntimeError('Can not set the shapes of a DataSet that '
+                               'has been started.')
+        self._validate_parameter_names(*shapes)
+        new_shapes = dict(self._shapes)
+        for name, shape in shapes.items():
+            if shape is None:
+                new_shapes.pop(name, None)
+                continue
+            shape = tuple(shape)
+            if not all(isinstance(dim, (int, numpy.integer)) and dim >= 0
+                       for dim in shape):
+                raise ValueError(f'Invalid shape {shape} of parameter '
+                                 f'{name}, a shape must be a sequence of '
+                                 f'non-negative integers.')
+            new_shapes[name] = tuple(int(dim) for dim in shape)
+        self._shapes = new_shapes
+
+    def _encode_rows(self, names: Sequence[str],
+                     rows: List[VALUES]) -> List[VALUES]:
+        """
+        Encode the values of the given rows for inserting them into the
+        database, see :meth:`_encode_columns`
+        """
+        if not self._needs_encoding(names):
+            return rows
+        columns = self._encode_columns(
+            names, [list(column) for column in zip(*rows)])
+        return [list(row) for row in zip(*columns)]
+
+    def _needs_encoding(self, names: Sequence[str]) -> bool:
+        return (any(name in self._compression for name in names)
+                or any(self._uses_sidecar(names)))
+
+    def _encode_columns(self, names: Sequence[str],
+                        columns: List[List[VALUE]]) -> List[List[VALUE]]:
+        """
+        Encode the values of the compressed parameters among the given
+        names for inserting them into the database, and append the arrays
+        that are larger than ``sidecar_threshold`` to the sidecar file of
+        the run, see :mod:`qcodes.dataset.sqlite.sidecars`. The given
+        columns are left as they are, the encoded columns are new lists.
+        """
+        if not self._needs_encoding(names):
+            return columns
+        codecs = [self._compression.get(name) for name in names]
+        use_sidecar = self._uses_sidecar(names)
+        columns = [list(column) if codec is not None or sidecar else column
+                   for column, codec, sidecar
+                   in zip(columns, codecs, use_sidecar)]
+        if any(use_sidecar):
+            self._move_to_sidecar(use_sidecar, columns)
+        for index, (name, codec) in enumerate(zip(names, codecs)):
+            if codec in TEXT_COMPRESSIONS:
+                self._encode_categories(name, columns[index])
+            elif codec is not None:
+                columns[index] = [_adapt_array(value, codec)
+                                  if isinstance(value, numpy.ndarray)
+                                  else value
+                                  for value in columns[index]]
+        return columns
+
+    def _encode_categories(self, name: str, values: List[VALUE]) -> None:
+        """
+        Replace the given values of a parameter with categorical compression
+        by their codes, and add the values that have no code yet to the
+        categories of the parameter
+        """
+        distinct = dict.fromkeys(str(value) for value in values
+                                 if value is not None)
+        codes = self._category_codes.get(name)
+        if codes is None or not distinct.keys() <= codes.keys():
+            # the categories may have been added to by another DataSet
+            # object of this run since they were loaded
+            codes = {value: code for code, value in enumerate(
+                get_categories(self.conn, self.table_name).get(name, []))}
+            self._category_codes[name] = codes
+        new_values = [value for value in distinct if value not in codes]
+        first_code = len(codes)
+        if new_values:
+            add_categories(self.conn, self.table_name, name, first_code,
+                           new_values)
+            codes.update((value, code) for code, value
+                         in enumerate(new_values, start=first_code))
+            if self._categories is not None:
+                self._categories[name] = list(codes)
+        values[:] = [None if value is None else codes[str(value)]
+                     for value in values]
+
+    def _decode_rows(self, names: Sequence[str],
+                     rows: List[List[Any]]) -> List[List[Any]]:
+        """
+        Decode the codes of the parameters with categorical compression
+        among the given names in rows read from the database
+        """
+        if not any(self._compression.get(name) in TEXT_COMPRESSIONS
+                   for name in names):
+            return rows
+        categories = self._get_categories()
+        if any(value is not None and value >= len(categories.get(name, []))
+               for row in rows
+               for name, value in zip(names, row) if name in categories):
+            categories.update(get_categories(self.conn, self.table_name))
+        decoders = [categories.get(name, []) for name in names]
+        return [[decoder[value] if decoder and value is not None else value
+                 for value, decoder in zip(row, decoders)]
+                for row in rows]
+
+    def _uses_sidecar(self, names: Sequence[str]) -> List[bool]:
+        """
+        Whether the values of the given parameters may be stored in the
+        sidecar file of the run
+        """
+        if self.sidecar_threshold is None or self.path_to_db == '':
+            return [False] * len(names)
+        return [self._interdeps._id_to_paramspec[name].type == 'array'
+                for name in names]
+
+    def _move_to_sidecar(self, use_sidecar: Sequence[bool],
+                         columns: List[List[VALUE]]) -> None:
+        """
+        Append the large arrays among the values of the given columns to
+        the sidecar file of the run, and replace them in the columns by
+        their references
+        """
+        assert self.sidecar_threshold is not None
+        positions = [(j, i) for j, column in enumerate(columns)
+                     if use_sidecar[j]
+                     for i, value in enumerate(column)
+                     if isinstance(value, numpy.ndarray)
+                     and value.nbytes > self.sidecar_threshold
+                     and _can_store_in_sidecar(value)]
+        if not positions:
+            return
+        if self._guid is None:
+            self._guid = self.guid
+        arrays = [columns[j][i] for j, i in positions]
+        offsets = append_to_sidecar(self.path_to_db, self._guid, arrays)
+        file_name = sidecar_file_name(self._guid)
+        for (j, i), arr, offset in zip(positions, arrays, offsets):
+            columns[j][i] = sqlite3.Binary(
+                _encode_sidecar_reference(arr, file_name, offset))
 
     def get_parameters(self) -> SPECS:
-        rd_v0 = v1_to_v0(self.description)
-        old_interdeps = rd_v0.interdeps
-        return list(old_interdeps.paramspecs)
+        if self._parameters is None:
+            rd_v0 = v1_to_v0(self.description)
+            old_interdeps = rd_v0.interdeps
+            self._parameters = list(old_interdeps.paramspecs)
+        return list(self._parameters)
 
     def add_metadata(self, tag: str, metadata: Any) -> None:
         """
@@ -577,17 +961,27 @@ class DataSet(Sized):
         with atomic(self.conn) as conn:
             add_meta_data(conn, self.run_id, {tag: metadata})
 
-    def add_snapshot(self, snapshot: str, overwrite: bool = False) -> None:
+    def add_snapshot(self, snapshot: str, overwrite: bool = False,
+                     delta_encode: Optional[bool] = None) -> None:
         """
-        Adds a snapshot to this run
+        Adds a snapshot to this run. Runs with identical snapshots share
+        the stored snapshot.
 
         Args:
             snapshot: the raw JSON dump of the snapshot
             overwrite: force overwrite an existing snapshot
-        """
-        if self.snapshot is None or overwrite:
-            add_meta_data(self.conn, self.run_id, {'snapshot': snapshot})
-        elif self.snapshot is not None and not overwrite:
+            delta_encode: store the snapshot as the difference to the
+                snapshot of the previous run if that is much smaller than
+                the snapshot itself. If None, the value of
+                ``qcodes.config['core']['db_snapshot_delta_encoding']`` is
+                used.
+        """
+        if delta_encode is None:
+            delta_encode = qcodes.config['core']['db_snapshot_delta_encoding']
+        if self.snapshot_raw is None or overwrite:
+            set_run_snapshot(self.conn, self.run_id, snapshot,
+                             delta_encode=delta_encode)
+        else:
             log.warning('This dataset already has a snapshot. Use overwrite'
                         '=True to overwrite that')
 
@@ -647,6 +1041,15 @@ class DataSet(Sized):
         """
         paramspecs = new_to_old(self._interdeps).paramspecs
 
+        categorical = [name for name, codec in self._compression.items()
+                       if codec in TEXT_COMPRESSIONS]
+        if categorical:
+            create_categories_table(self.conn, self.table_name)
+            # the codes are stored in INTEGER columns, since columns of the
+            # type of the 'text' parameters would convert them to text
+            for name in categorical:
+                insert_column(self.conn, self.table_name, name, 'INTEGER')
+
         for spec in paramspecs:
             add_parameter(self.conn, self.table_name, spec)
 
@@ -710,10 +1113,11 @@ class DataSet(Sized):
             raise ValueError(
                 'Can not add result, missing setpoint values') from de
 
-        index = insert_values(self.conn, self.table_name,
-                              list(results.keys()),
-                              list(results.values())
-                              )
+        names = list(results.keys())
+        values = list(results.values())
+        index = insert_values(self.conn, self.table_name, names,
+                              self._encode_rows(names, [values])[0])
+        self._publish(names, [values])
         return index
 
     def add_results(self, results: Sequence[Mapping[str, VALUE]]) -> int:
@@ -749,10 +1153,104 @@ class DataSet(Sized):
 
         len_before_add = length(self.conn, self.table_name)
 
-        insert_many_values(self.conn, self.table_name, list(expected_keys),
-                           values)
+        names = list(expected_keys)
+        insert_many_values(self.conn, self.table_name, names,
+                           self._encode_rows(names, values))
+        self._publish(names, values)
+        return len_before_add
+
+    def add_result_columns(
+            self, columns: Sequence[Mapping[str, Union[numpy.ndarray,
+                                                       Sequence[VALUE]]]]
+    ) -> int:
+        """
+        Adds a sequence of results given as columns to the
+        :class:`.DataSet`. This avoids building one dictionary per result
+        like :meth:`add_results` requires.
+
+        Args:
+            columns: list of chunks of results, where each chunk is a
+                dictionary mapping parameter names to equally long
+                one-dimensional arrays or sequences of values. Each chunk
+                provides as many results as its columns have values. The
+                results are added in the order of the chunks.
+
+        Returns:
+            the index in the :class:`.DataSet` that the **first** result was
+            stored at
+
+        It is an error to provide a value for a key or keyword that is not
+        the name of a parameter in this :class:`.DataSet`.
+
+        It is an error to add results to a completed :class:`.DataSet`.
+        """
+
+        if self.pristine:
+            raise RuntimeError('This DataSet has not been marked as started. '
+                               'Please mark the DataSet as started before '
+                               'adding results to it.')
+
+        if self.completed:
+            raise CompletedError('This DataSet is complete, no further '
+                                 'results can be added to it.')
+
+        len_before_add = length(self.conn, self.table_name)
+
+        # consecutive chunks with the same parameters are inserted together;
+        # the values stay in columns all the way into the INSERT statements
+        batches: List[Tuple[List[str], List[List[VALUE]]]] = []
+        names: Tuple[str, ...] = ()
+        merged: List[List[VALUE]] = []
+        for chunk in columns:
+            chunk_names = tuple(chunk)
+            if chunk_names != names:
+                if merged and merged[0]:
+                    batches.append((list(names), merged))
+                names = chunk_names
+                merged = [[] for _ in names]
+            for merged_column, name in zip(merged, names):
+                column = chunk[name]
+                if isinstance(column, numpy.ndarray):
+                    column = column.tolist()
+                merged_column.extend(column)
+        if merged and merged[0]:
+            batches.append((list(names), merged))
+
+        # the values are encoded before the results are inserted, since
+        # the new categories of categorical parameters are inserted in their
+        # own transaction
+        encoded_batches = [(batch_names,
+                            self._encode_columns(batch_names, batch_columns))
+                           for batch_names, batch_columns in batches]
+        coordination = self.conn.write_coordination
+        if (coordination is None
+                or coordination.max_rows_per_transaction is None):
+            with atomic(self.conn) as conn:
+                for batch_names, batch_columns in encoded_batches:
+                    insert_many_columns(conn, self.table_name, batch_names,
+                                        batch_columns)
+        else:
+            # in transactions of bounded size, such that other processes
+            # writing to the database file get their turn
+            for batch_names, batch_columns in encoded_batches:
+                insert_many_columns(self.conn, self.table_name, batch_names,
+                                    batch_columns)
+
+        # the subscribers get the results row by row
+        if self.subscribers:
+            for batch_names, batch_columns in batches:
+                self._publish(batch_names, list(zip(*batch_columns)))
+
         return len_before_add
 
+    def _publish(self, names: Sequence[str],
+                 rows: Sequence[Sequence[VALUE]]) -> None:
+        """
+        Publish results that have just been written to the subscribers
+        """
+        for sub in list(self.subscribers.values()):
+            sub.publish(names, rows)
+
     @staticmethod
     def _validate_parameters(*params: Union[str, ParamSpec, _BaseParameter]
                              ) -> List[str]:
@@ -810,11 +1308,13 @@ class DataSet(Sized):
             list of lists SQL rows of data by SQL columns. Each SQL row is a
             datapoint and each SQL column is a parameter. Each element will
             be of the datatypes stored in the database (numeric, array or
-            string)
+            string). Arrays are read-only views on the stored data, copy
+            them (e.g. ``arr.copy()``) to modify them in place.
         """
         valid_param_names = self._validate_parameters(*params)
-        return get_data(self.conn, self.table_name, valid_param_names,
-                        start, end)
+        return self._decode_rows(valid_param_names,
+                                 get_data(self.conn, self.table_name,
+                                          valid_param_names, start, end))
 
     def get_parameter_data(
             self,
@@ -822,7 +1322,11 @@ class DataSet(Sized):
             start: Optional[int] = None,
             end: Optional[int] = None,
             where_statement: Optional[str] = None,
-            include_setpoints = True) -> Dict[str, Dict[str, numpy.ndarray]]:
+            include_setpoints = True,
+            filters: Optional[Mapping[str, Any]] = None,
+            reshape: bool = True,
+            decode_categories: bool = True
+    ) -> Dict[str, Dict[str, numpy.ndarray]]:
         """
         Returns the values stored in the :class:`.DataSet` for the specified parameters
         and their dependencies. If no paramerers are supplied the values will
@@ -852,23 +1356,184 @@ class DataSet(Sized):
                 None
             include_setpoints: if False, only return the values for the
                 top level parameters instead of the entire trees
+            filters: only return the results where the values of the
+                given parameters fulfill the given conditions. The keys are
+                the names of the parameters and the values are either a
+                value that the parameter must be equal to, or a tuple
+                ``(low, high)`` of the range (both ends included) that the
+                parameter must be within, where an end may be None. The
+                filters are applied before the range selected with start and
+                end. Filtering on parameters that have been indexed (see
+                :meth:`add_index`) does not need to look at all the results.
+            reshape: if True, the data of the parameters with a declared
+                shape (see :meth:`set_shapes`) is returned in that shape
+                when all the results are requested, i.e. without a range,
+                where statement or filters. The data of runs that have not
+                been completed (or were interrupted) is padded with NaN
+                (or None for non-numeric data) to the declared shape.
+            decode_categories: if False, the values of the parameters with
+                categorical compression (see :meth:`set_compression`) are
+                returned as integer codes into their :attr:`categories`,
+                with -1 for missing values. Together with the categories,
+                this is the data of a :py:class:`pandas.Categorical`
+                without the strings being expanded into an array.
 
         Returns:
             Dictionary from requested parameters to Dict of parameter names
             to numpy arrays containing the data points of type numeric,
-            array or string.
+            array or string. The arrays of 'array' parameters stored in the
+            sidecar file of the run (see :attr:`sidecar_threshold`) are
+            read-only memory maps of that file, copy them (e.g.
+            ``arr.copy()``) to modify them in place.
         """
         if len(params) == 0:
             valid_param_names = [ps.name
                                  for ps in self._interdeps.non_dependencies]
         else:
             valid_param_names = self._validate_parameters(*params)
-        return get_parameter_data(self.conn, self.table_name,
+        if filters is not None:
+            self._validate_parameter_names(*filters.keys())
+        data = get_parameter_data(self.conn, self.table_name,
                                   valid_param_names,
                                   start=start,
                                   end=end,
-                                  where_statement=where_statement, 
-                                  include_setpoints=include_setpoints)
+                                  where_statement=where_statement,
+                                  include_setpoints=include_setpoints,
+                                  interdeps=self._interdeps,
+                                  filters=filters,
+                                  decode_categories=decode_categories,
+                                  categories=self._get_categories())
+        if (reshape and self._shapes and start is None and end is None
+                and where_statement is None and filters is None):
+            data = reshape_parameter_data(data, self._shapes)
+        return data
+
+    def add_index(self, *params: Union[str, ParamSpec, _BaseParameter]
+                  ) -> None:
+        """
+        Index the values of the given parameters in the database, such that
+        results can be selected by the values of these parameters (see the
+        ``filters`` of :meth:`get_parameter_data`) without looking at all
+        the results. Indexing a parameter makes adding results slightly
+        slower, hence it is typically done for the setpoints of a
+        measurement once the measurement is done. Indexing a parameter that
+        is already indexed does nothing.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects
+        """
+        param_names = self._validate_parameters(*params)
+        self._validate_parameter_names(*param_names)
+        for param_name in param_names:
+            create_result_table_index(self.conn, self.table_name, param_name)
+
+    @property
+    def indexed_parameters(self) -> List[str]:
+        """
+        The names of the parameters that have been indexed with
+        :meth:`add_index`
+        """
+        return get_result_table_indexed_columns(self.conn, self.table_name)
+
+    def _validate_parameter_names(self, *param_names: str) -> None:
+        """
+        Validate that parameters of the given names are part of this
+        :class:`.DataSet`
+        """
+        for param_name in param_names:
+            if param_name not in self._interdeps._id_to_paramspec:
+                raise ValueError(f'Unknown parameter: {param_name}.')
+
+    def reader(self,
+               *params: Union[str, ParamSpec, _BaseParameter],
+               include_setpoints: bool = True) -> 'DataSetReader':
+        """
+        Return a reader that incrementally reads the data of this
+        :class:`.DataSet` as it grows, see :class:`.DataSetReader`.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be read.
+            include_setpoints: if False, only read the values for the
+                top level parameters instead of the entire trees
+        """
+        if len(params) == 0:
+            valid_param_names = [ps.name
+                                 for ps in self._interdeps.non_dependencies]
+        else:
+            valid_param_names = self._validate_parameters(*params)
+        return DataSetReader(self, valid_param_names,
+                             include_setpoints=include_setpoints)
+
+    def iter_parameter_data(self,
+                            *params: Union[str, ParamSpec, _BaseParameter],
+                            chunk_size: Optional[int] = None,
+                            include_setpoints: bool = True,
+                            progress: Optional[ProgressCallback] = None
+                            ) -> Iterator[Dict[str, Dict[str, numpy.ndarray]]]:
+        """
+        Iterate over the data of this :class:`.DataSet` in chunks of rows
+        of the results table, such that data that does not fit into memory
+        can be processed, e.g. exported (see :mod:`.exporters`). Each chunk
+        is a range of the primary key of the results table, hence reading
+        a chunk costs time proportional to its size, not to the size of the
+        run. Only the results that are present when the iteration starts
+        are read.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be read.
+            chunk_size: the number of rows of the results table to read at
+                a time. If None, the number of rows is adapted such that a
+                chunk holds about ``exporters.CHUNK_TARGET_BYTES`` of data.
+            include_setpoints: if False, only read the values for the
+                top level parameters instead of the entire trees
+            progress: called after each chunk with the number of rows read
+                and the total number of rows
+
+        Yields:
+            The data of the chunks, in the same format as
+            :meth:`get_parameter_data`. Parameters without data in a chunk
+            map to (a dict of) empty arrays.
+        """
+        if len(params) == 0:
+            valid_param_names = [ps.name
+                                 for ps in self._interdeps.non_dependencies]
+        else:
+            valid_param_names = self._validate_parameters(*params)
+        self._validate_parameter_names(*valid_param_names)
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f'The chunk size must be positive, '
+                             f'not {chunk_size}.')
+
+        last_id = get_last_result_id(self.conn, self.table_name)
+        n_rows = chunk_size if chunk_size is not None else FIRST_CHUNK_SIZE
+        first_id = 0
+        while True:
+            chunk_last_id = min(first_id + n_rows, last_id)
+            data = get_parameter_data(self.conn, self.table_name,
+                                      valid_param_names,
+                                      include_setpoints=include_setpoints,
+                                      id_range=(first_id, chunk_last_id),
+                                      interdeps=self._interdeps,
+                                      categories=self._get_categories())
+            yield data
+            if progress is not None:
+                progress(chunk_last_id, last_id)
+            if chunk_last_id >= last_id:
+                break
+            if chunk_size is None:
+                n_bytes = sum(values.nbytes for tree in data.values()
+                              for values in tree.values())
+                if n_bytes > 0:
+                    n_rows = max(int(n_rows * CHUNK_TARGET_BYTES / n_bytes),
+                                 1)
+            first_id = chunk_last_id
 
     def get_data_as_pandas_dataframe(self,
                                      *params: Union[str,
@@ -876,8 +1541,9 @@ class DataSet(Sized):
                                                     _BaseParameter],
                                      start: Optional[int] = None,
                                      end: Optional[int] = None,
-                                     where_statement: Optional[str] = None) -> \
-            Dict[str, "pd.DataFrame"]:
+                                     where_statement: Optional[str] = None,
+                                     filters: Optional[Mapping[str, Any]] = None
+                                     ) -> Dict[str, "pd.DataFrame"]:
         """
         Returns the values stored in the :class:`.DataSet` for the specified parameters
         and their dependencies as a dict of :py:class:`pandas.DataFrame` s
@@ -907,6 +1573,8 @@ class DataSet(Sized):
                 if None
             end: end value of selection range (by results count); ignored if
                 None
+            filters: conditions on the values of the parameters that the
+                results must fulfill, see :meth:`get_parameter_data`
 
         Returns:
             Dictionary from requested parameter names to
@@ -914,46 +1582,156 @@ class DataSet(Sized):
             a column and a indexed by a :py:class:`pandas.MultiIndex` formed
             by the dependencies.
         """
-        import pandas as pd
-        dfs = {}
         datadict = self.get_parameter_data(*params,
                                            start=start,
                                            end=end,
-                                           where_statement=where_statement)
-        for name, subdict in datadict.items():
-            keys = list(subdict.keys())
-            if len(keys) == 0:
-                dfs[name] = pd.DataFrame()
-                continue
-            if len(keys) == 1:
-                index = None
-            elif len(keys) == 2:
-                index = pd.Index(subdict[keys[1]].ravel(), name=keys[1])
-            else:
-                indexdata = tuple(numpy.concatenate(subdict[key])
-                                  if subdict[key].dtype == numpy.dtype('O')
-                                  else subdict[key].ravel()
-                                  for key in keys[1:])
-                index = pd.MultiIndex.from_arrays(
-                    indexdata,
-                    names=keys[1:])
-
-            if subdict[keys[0]].dtype == numpy.dtype('O'):
-                # ravel will not fully unpack a numpy array of arrays
-                # which are of "object" dtype. This can happen if a variable
-                # length array is stored in the db. We use concatenate to
-                # flatten these
-                mydata = numpy.concatenate(subdict[keys[0]])
-            else:
-                mydata = subdict[keys[0]].ravel()
-            df = pd.DataFrame(mydata, index=index,
-                              columns=[keys[0]])
-            dfs[name] = df
-        return dfs
+                                           where_statement=where_statement,
+                                           filters=filters,
+                                           reshape=False,
+                                           decode_categories=False)
+        categories = self._categories_of_trees(datadict)
+        return {name: parameter_tree_to_dataframe(subdict,
+                                                  categories=categories)
+                for name, subdict in datadict.items()}
+
+    def to_pandas(self,
+                  *params: Union[str, ParamSpec, _BaseParameter]
+                  ) -> Dict[str, "pd.DataFrame"]:
+        """
+        Returns the values stored in the :class:`.DataSet` for the specified
+        parameters and their dependencies as a dict of
+        :py:class:`pandas.DataFrame` s, like
+        :meth:`get_data_as_pandas_dataframe`, but without copying the data
+        where possible.
+
+        The data of a parameter that was measured in nested loops over its
+        setpoints (as inferred from the data, or given by its declared
+        shape, see :meth:`set_shapes`) is a column indexed by a
+        :py:class:`pandas.MultiIndex` that is the product of the setpoint
+        values along each loop, and the column is a view on the data read
+        from the database. The data of other parameters is returned in
+        long format, i.e. with a column for each setpoint followed by the
+        parameter, and a default index.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be returned.
+
+        Returns:
+            Dictionary from requested parameter names to
+            :py:class:`pandas.DataFrame` s
+        """
+        datadict = self.get_parameter_data(*params, reshape=False,
+                                           decode_categories=False)
+        categories = self._categories_of_trees(datadict)
+        return {name: parameter_tree_to_pandas(subdict,
+                                               self._shapes.get(name),
+                                               categories)
+                for name, subdict in datadict.items()}
+
+    def _categories_of_trees(self,
+                             datadict: Dict[str, Dict[str, numpy.ndarray]]
+                             ) -> Dict[str, List[str]]:
+        """
+        The categories of the parameters with categorical compression in
+        the given data. The categories have been reloaded when the data was
+        read if it had codes that they did not include.
+        """
+        names = {name for tree in datadict.values() for name in tree}
+        return {name: list(values)
+                for name, values in self._get_categories().items()
+                if name in names}
+
+    def to_xarray_dataarray_dict(self,
+                                 *params: Union[str, ParamSpec,
+                                                _BaseParameter]
+                                 ) -> Dict[str, "xr.DataArray"]:
+        """
+        Returns the values stored in the :class:`.DataSet` for the specified
+        parameters and their dependencies as a dict of
+        :py:class:`xarray.DataArray` s, without copying the data where
+        possible.
+
+        The data array of a parameter that was measured in nested loops over
+        its setpoints (as inferred from the data, or given by its declared
+        shape, see :meth:`set_shapes`) has a dimension per loop, with the
+        setpoint values as coordinates, and is a view on the data read from
+        the database. The data array of other parameters has a single
+        dimension ``<name>_index``, along which the setpoints are
+        coordinates. The units and labels of the parameters are added as
+        the attributes ``units`` and ``long_name``.
+
+        This requires the optional dependency xarray, which is installed
+        with ``pip install qcodes[xarray]``.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be returned.
+
+        Returns:
+            Dictionary from requested parameter names to
+            :py:class:`xarray.DataArray` s
+        """
+        datadict = self.get_parameter_data(*params, reshape=False)
+        paramspecs = self.paramspecs
+        return {name: parameter_tree_to_xarray(subdict,
+                                               self._shapes.get(name),
+                                               paramspecs)
+                for name, subdict in datadict.items()
+                if len(subdict) > 0}
+
+    def to_xarray(self,
+                  *params: Union[str, ParamSpec, _BaseParameter]
+                  ) -> "xr.Dataset":
+        """
+        Returns the values stored in the :class:`.DataSet` for the specified
+        parameters and their dependencies as an :py:class:`xarray.Dataset`
+        that holds the data arrays of :meth:`to_xarray_dataarray_dict`.
+
+        The data arrays of parameters that share setpoints can only be
+        combined if they are either all on the same grid or none of them
+        is on a grid. Use :meth:`to_xarray_dataarray_dict` for other data.
+
+        Args:
+            *params: string parameter names, QCoDeS Parameter objects, and
+                ParamSpec objects. If no parameters are supplied data for
+                all parameters that are not a dependency of another
+                parameter will be returned.
+
+        Raises:
+            ValueError: if the data arrays can not be combined
+        """
+        import xarray as xr
+        data_arrays = self.to_xarray_dataarray_dict(*params)
+        try:
+            dataset = xr.merge(data_arrays.values(), join='exact',
+                               compat='no_conflicts', combine_attrs='drop')
+            # xarray drops a setpoint of scattered data points if it is also
+            # the axis of a grid, rather than raising
+            for name, data_array in data_arrays.items():
+                if not set(data_array.coords) <= set(dataset[name].coords):
+                    raise ValueError(f'The setpoints of {name} were dropped')
+        except (ValueError, xr.MergeError) as e:
+            raise ValueError('The data of the parameters can not be '
+                             'combined into one xarray Dataset, use '
+                             'to_xarray_dataarray_dict instead.') from e
+        dataset.attrs['guid'] = self.guid
+        dataset.attrs['run_id'] = self.run_id
+        dataset.attrs['captured_run_id'] = self.captured_run_id
+        dataset.attrs['exp_name'] = self.exp_name
+        dataset.attrs['sample_name'] = self.sample_name
+        return dataset
 
     def write_data_to_text_file(self, path: str,
                                 single_file: bool = False,
-                                single_file_name: Optional[str] = None) -> None:
+                                single_file_name: Optional[str] = None,
+                                chunk_size: Optional[int] = None,
+                                progress: Optional[ProgressCallback] = None
+                                ) -> None:
         """
         An auxiliary function to export data to a text file. When the data with more
         than one dependent variables, say "y(x)" and "z(x)", is concatenated to a single file
@@ -975,11 +1753,18 @@ class DataSet(Sized):
                     ..    ..      ..
                     kN  yN(kN)  zN(kN)
 
+        The data is read and written in chunks, see :func:`.export_to_text`.
+        For exports to other formats see :mod:`.exporters`.
+
         Args:
             path: User defined path where the data to be exported
             single_file: If true, merges the data of same length of multiple
                          dependent parameters to a single file.
             single_file_name: User defined name for the data to be concatenated.
+            chunk_size: The number of rows of the results table to read at a
+                        time, see :meth:`iter_parameter_data`.
+            progress: Called after each chunk with the number of rows
+                      exported and the total number of rows.
 
         Raises:
             DataLengthException: If the data of multiple parameters have not same
@@ -987,43 +1772,26 @@ class DataSet(Sized):
             DataPathException: If the data of multiple parameters are wanted to be merged
                                in a single file but no filename provided.
         """
-        import pandas as pd
-        dfdict = self.get_data_as_pandas_dataframe()
-        dfs_to_save = list()
-        for parametername, df in dfdict.items():
-            if not single_file:
-                dst = os.path.join(path, f'{parametername}.dat')
-                df.to_csv(path_or_buf=dst, header=False, sep='\t')
-            else:
-                dfs_to_save.append(df)
-        if single_file:
-            df_length = len(dfs_to_save[0])
-            if any(len(df) != df_length for df in dfs_to_save):
-                raise DataLengthException("You cannot concatenate data " +
-                                          "with different length to a " +
-                                          "single file.")
-            if single_file_name == None:
-                raise DataPathException("Please provide the desired file name " +
-                                        "for the concatenated data.")
-            else:
-                dst = os.path.join(path, f'{single_file_name}.dat')
-                df_to_save = pd.concat(dfs_to_save, axis=1)
-                df_to_save.to_csv(path_or_buf=dst, header=False, sep='\t')
+        export_to_text(self, path, single_file=single_file,
+                       single_file_name=single_file_name,
+                       chunk_size=chunk_size, progress=progress)
 
     def get_values(self, param_name: str) -> List[List[Any]]:
         """
-        Get the values (i.e. not NULLs) of the specified parameter
+        Get the values (i.e. not NULLs) of the specified parameter. Arrays
+        are read-only views on the stored data, as for :meth:`get_data`.
         """
         if param_name not in self.parameters:
             raise ValueError('Unknown parameter, not in this DataSet')
 
         values = get_values(self.conn, self.table_name, param_name)
 
-        return values
+        return self._decode_rows([param_name], values)
 
     def get_setpoints(self, param_name: str) -> Dict[str, List[List[Any]]]:
         """
-        Get the setpoints for the specified parameter
+        Get the setpoints for the specified parameter. Arrays are read-only
+        views on the stored data, as for :meth:`get_data`.
 
         Args:
             param_name: The name of the parameter for which to get the
@@ -1040,7 +1808,8 @@ class DataSet(Sized):
 
         setpoints = get_setpoints(self.conn, self.table_name, param_name)
 
-        return setpoints
+        return {name: self._decode_rows([name], values)
+                for name, values in setpoints.items()}
 
     def subscribe(self,
                   callback: Callable[[Any, int, Optional[Any]], None],
@@ -1049,6 +1818,28 @@ class DataSet(Sized):
                   state: Optional[Any] = None,
                   callback_kwargs: Optional[Mapping[str, Any]] = None
                   ) -> str:
+        """
+        Subscribe a callback to the results of this :class:`.DataSet`, see
+        :class:`_Subscriber`.
+
+        The subscribers of a run are shared by all the :class:`.DataSet`
+        objects of the run in this process, and get the results written
+        through any of them. Results written to the run by other processes
+        are not published to the subscribers.
+
+        Args:
+            callback: called with the list of new results, the number of
+                results of the :class:`.DataSet` and the state
+            min_wait: the minimal time in milliseconds between calls of the
+                callback
+            min_count: the minimal number of new results for the callback to
+                be called
+            state: passed to the callback
+            callback_kwargs: keyword arguments passed to the callback
+
+        Returns:
+            The id of the subscriber, see :meth:`unsubscribe`
+        """
         subscriber_id = uuid.uuid4().hex
         subscriber = _Subscriber(self, subscriber_id, callback, state,
                                  min_wait, min_count, callback_kwargs)
@@ -1092,17 +1883,18 @@ class DataSet(Sized):
         """
         Remove subscriber with the provided uuid
         """
-        with atomic(self.conn) as conn:
-            sub = self.subscribers[uuid]
-            remove_trigger(conn, sub.trigger_id)
-            sub.schedule_stop()
-            sub.join()
-            del self.subscribers[uuid]
+        sub = self.subscribers[uuid]
+        sub.schedule_stop()
+        sub.join()
+        del self.subscribers[uuid]
 
     def unsubscribe_all(self) -> None:
         """
-        Remove all subscribers
+        Remove all subscribers of the run, including the ones subscribed
+        through other :class:`.DataSet` objects of the run
         """
+        # subscribers used to be implemented with triggers, which may still
+        # be around in databases written by older versions of QCoDeS
         sql = "select * from sqlite_master where type = 'trigger';"
         triggers = atomic_transaction(self.conn, sql).fetchall()
         with atomic(self.conn) as conn:
@@ -1114,6 +1906,9 @@ class DataSet(Sized):
             self.subscribers.clear()
 
     def get_metadata(self, tag: str) -> str:
+        if tag == 'snapshot':
+            # the snapshot is stored in the snapshots table
+            return self.snapshot_raw
         return get_metadata(self.conn, tag, self.table_name)
 
     def __len__(self) -> int:
@@ -1132,6 +1927,70 @@ class DataSet(Sized):
         return "\n".join(out)
 
 
+class DataSetReader:
+    """
+    Incremental reader of the data of a :class:`.DataSet`, e.g. for live
+    plotting of a running measurement. Every call to :meth:`read_new`
+    returns only the results that have been added since the previous call.
+
+    The reader remembers the id of the last read row for every parameter
+    tree and only selects the rows after it, which is a range of the
+    primary key of the results table. Reading hence costs time proportional
+    to the number of new rows, not to the size of the run. The
+    interdependencies of the run are taken from the dataset once, instead
+    of being parsed from the run description on every read.
+
+    Use :meth:`DataSet.reader` to create a reader.
+    """
+
+    def __init__(self, dataset: DataSet, param_names: Sequence[str],
+                 include_setpoints: bool = True) -> None:
+        self._dataset = dataset
+        self._interdeps = dataset._interdeps
+        self._include_setpoints = include_setpoints
+        self.last_ids: Dict[str, int] = {name: 0 for name in param_names}
+
+    def read_new(self, *params: Union[str, ParamSpec, _BaseParameter]
+                 ) -> Dict[str, Dict[str, numpy.ndarray]]:
+        """
+        Read the results that have been added since the last read.
+
+        Args:
+            *params: the parameters (trees) to read, which must be among the
+                parameters of the reader. If no parameters are supplied,
+                all the parameters of the reader are read.
+
+        Returns:
+            Dictionary from requested parameters to Dict of parameter names
+            to numpy arrays containing the new data points, in the same
+            format as :meth:`DataSet.get_parameter_data`. Parameters without
+            new data points map to an empty dict.
+        """
+        if len(params) == 0:
+            param_names = list(self.last_ids)
+        else:
+            param_names = self._dataset._validate_parameters(*params)
+            unknown = set(param_names).difference(self.last_ids)
+            if unknown:
+                raise ValueError(f'Parameters {sorted(unknown)} are not '
+                                 f'read by this reader.')
+
+        # all trees are read up to the same row, such that a single read
+        # returns a consistent snapshot of the data
+        last_id = get_last_result_id(self._dataset.conn,
+                                     self._dataset.table_name)
+        output: Dict[str, Dict[str, numpy.ndarray]] = {}
+        for name in param_names:
+            output.update(get_parameter_data(
+                self._dataset.conn, self._dataset.table_name, [name],
+                include_setpoints=self._include_setpoints,
+                id_range=(self.last_ids[name], last_id),
+                interdeps=self._interdeps,
+                categories=self._dataset._get_categories()))
+            self.last_ids[name] = last_id
+        return output
+
+
 # public api
 def load_by_id(run_id: int, conn: Optional[ConnectionPlus] = None) -> DataSet:
     """
@@ -1154,7 +2013,7 @@ def load_by_id(run_id: int, conn: Optional[ConnectionPlus] = None) -> DataSet:
     if run_id is None:
         raise ValueError('run_id has to be a positive integer, not None.')
 
-    conn = conn or connect(get_DB_location())
+    conn = conn_from_dbpath_or_conn(conn, path_to_db=None)
 
     d = DataSet(conn=conn, run_id=run_id)
     return d
@@ -1189,6 +2048,11 @@ def load_by_run_spec(*,
         conn: An optional connection to the database. If no connection is
           supplied a connection to the default database will be opened.
 
+    If no connection is supplied and a catalog is set in the
+    ``core.db_catalog`` config option, the runs are looked up in all the
+    database files registered with the catalog (see
+    :class:`.DatabaseCatalog`) as well as in the default database.
+
     Raises:
         NameError: if no run or more than one run with the given specification
          exists in the database
@@ -1196,15 +2060,23 @@ def load_by_run_spec(*,
     Returns:
         :class:`.DataSet` matching the provided specification.
     """
-    conn = conn or connect(get_DB_location())
-    guids = get_guids_from_run_spec(conn,
-                                    captured_run_id=captured_run_id,
-                                    captured_counter=captured_counter,
-                                    experiment_name=experiment_name,
-                                    sample_name=sample_name)
-
-    matched_guids = filter_guids_by_parts(guids, location, sample_id,
-                                          work_station)
+    run_spec = dict(captured_run_id=captured_run_id,
+                    captured_counter=captured_counter,
+                    experiment_name=experiment_name,
+                    sample_name=sample_name,
+                    sample_id=sample_id,
+                    location=location,
+                    work_station=work_station)
+    catalog = catalog_from_config() if conn is None else None
+    conn = conn_from_dbpath_or_conn(conn, path_to_db=None)
+    matched_guids = get_guids_from_run_spec(conn, **run_spec)
+    if catalog is not None:
+        with catalog:
+            matched_in_catalog = catalog.get_guids_from_run_spec(**run_spec)
+        matched_guids += [guid for guid in matched_in_catalog
+                          if guid not in matched_guids]
+        # look up the runs in the catalog when loading them
+        conn = None
 
     if len(matched_guids) == 1:
         return load_by_guid(matched_guids[0], conn)
@@ -1229,6 +2101,11 @@ def load_by_guid(guid: str, conn: Optional[ConnectionPlus] = None) -> DataSet:
         guid: guid of the dataset
         conn: connection to the database to load from
 
+    If no connection is provided and a catalog is set in the
+    ``core.db_catalog`` config option, the run is looked up in all the
+    database files registered with the catalog (see
+    :class:`.DatabaseCatalog`) first.
+
     Returns:
         :class:`.DataSet` with the given guid
 
@@ -1236,7 +2113,13 @@ def load_by_guid(guid: str, conn: Optional[ConnectionPlus] = None) -> DataSet:
         NameError: if no run with the given GUID exists in the database
         RuntimeError: if several runs with the given GUID are found
     """
-    conn = conn or connect(get_DB_location())
+    catalog = catalog_from_config() if conn is None else None
+    if catalog is not None:
+        with catalog:
+            path_to_db = catalog.locate_guid(guid)
+        if path_to_db is not None:
+            conn = connect(path_to_db)
+    conn = conn_from_dbpath_or_conn(conn, path_to_db=None)
 
     # this function raises a RuntimeError if more than one run matches the GUID
     run_id = get_runid_from_guid(conn, guid)
@@ -1267,7 +2150,7 @@ def load_by_counter(counter: int, exp_id: int,
     Returns:
         :class:`.DataSet` of the given counter in the given experiment
     """
-    conn = conn or connect(get_DB_location())
+    conn = conn_from_dbpath_or_conn(conn, path_to_db=None)
     sql = """
     SELECT run_id
     FROM
@@ -1283,6 +2166,119 @@ def load_by_counter(counter: int, exp_id: int,
     return d
 
 
+RunSpec = Union[str, Mapping[str, Any]]
+
+
+def load_many(run_specs: Sequence[RunSpec],
+              *params: Union[str, ParamSpec, _BaseParameter],
+              path_to_db: Optional[str] = None,
+              max_workers: Optional[int] = None,
+              use_processes: bool = False
+              ) -> List[Dict[str, Dict[str, numpy.ndarray]]]:
+    """
+    Load the data of many runs in parallel. The runs are read by a pool of
+    worker threads (or processes), each run through its own read-only
+    connection to the database file, such that the queries and the
+    decoding of the arrays of different runs overlap.
+
+    Args:
+        run_specs: the runs to load, each given either by its GUID or by a
+            mapping of the keyword arguments of :func:`load_by_run_spec`
+            that identify the run
+        *params: the parameters to load the data of, as in
+            :meth:`.DataSet.get_parameter_data`. If no parameters are
+            supplied, the data of all parameters that are not a dependency
+            of another parameter is loaded.
+        path_to_db: the database file to load the runs from. If None, the
+            runs are loaded from the default database, or, if a catalog is
+            set in the ``core.db_catalog`` config option, from the database
+            files in which the catalog finds them.
+        max_workers: the number of worker threads or processes. By default
+            the default number of workers of the pool.
+        use_processes: if True, the runs are read by worker processes
+            instead of threads. Threads only run in parallel while SQLite
+            reads and while compressed arrays are decompressed, whereas
+            processes also convert the results in parallel, but the data
+            has to be copied back from the processes.
+
+    Returns:
+        The data of the runs, in the order of ``run_specs``, in the format
+        of :meth:`.DataSet.get_parameter_data`
+
+    Raises:
+        NameError: if no run or more than one run matches a run
+            specification
+    """
+    param_names = tuple(DataSet._validate_parameters(*params))
+    catalog = catalog_from_config() if path_to_db is None else None
+    paths = [path_to_db or get_DB_location()] * len(run_specs)
+    if catalog is not None:
+        with catalog:
+            paths, run_specs = _locate_runs_in_catalog(catalog, paths,
+                                                       run_specs)
+    if len(run_specs) == 0:
+        return []
+
+    executor: Executor
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers)
+    with executor:
+        return list(executor.map(_load_run_data, paths, run_specs,
+                                 repeat(param_names)))
+
+
+def _locate_runs_in_catalog(
+        catalog: DatabaseCatalog, default_paths: Sequence[str],
+        run_specs: Sequence[RunSpec]) -> Tuple[List[str], List[RunSpec]]:
+    """
+    Look up the database files of runs in a catalog. The runs that are not
+    found in the catalog (or, for specifications that are not a GUID, that
+    are not found exactly once) are loaded from the default paths.
+
+    Returns:
+        The paths of the database files of the runs, and their
+        specifications, where the runs found in the catalog are given by
+        their GUID
+    """
+    paths = list(default_paths)
+    located_specs = list(run_specs)
+    for i, run_spec in enumerate(run_specs):
+        if isinstance(run_spec, str):
+            path = catalog.locate_guid(run_spec)
+            if path is not None:
+                paths[i] = path
+            continue
+        matches = catalog.get_guids_from_run_spec(**run_spec)
+        if len(matches) == 1:
+            (located_specs[i], paths[i]), = matches.items()
+    return paths, located_specs
+
+
+def _load_run_data(path_to_db: str, run_spec: RunSpec,
+                   param_names: Sequence[str]
+                   ) -> Dict[str, Dict[str, numpy.ndarray]]:
+    """
+    Load the data of a run in a worker of :func:`load_many`, through a
+    read-only connection to the database file that is closed afterwards
+    """
+    with closing(connect(path_to_db, read_only=True)) as conn:
+        if isinstance(run_spec, str):
+            guid = run_spec
+        else:
+            guids = get_guids_from_run_spec(conn, **run_spec)
+            if len(guids) != 1:
+                raise NameError(f'{len(guids)} runs matching '
+                                f'{dict(run_spec)} found, rather than one.')
+            guid = guids[0]
+        run_id = get_runid_from_guid(conn, guid)
+        if run_id == -1:
+            raise NameError(f'No run with GUID: {guid} found in database.')
+        return DataSet(conn=conn,
+                       run_id=run_id).get_parameter_data(*param_names)
+
+
 def new_data_set(name: str,
                  exp_id: Optional[int] = None,
                  specs: Optional[SPECS] = None,
@@ -1339,3 +2335,63 @@ def generate_dataset_table(guids: Sequence[str],
                       parsed_guid['sample'], parsed_guid['location'],
                       parsed_guid['work_station']])
     return tabulate(table, headers=headers)
+
+
+def load_run_catalog(*,
+                     exp_id: Optional[int] = None,
+                     captured_run_id: Optional[int] = None,
+                     captured_counter: Optional[int] = None,
+                     experiment_name: Optional[str] = None,
+                     sample_name: Optional[str] = None,
+                     sample_id: Optional[int] = None,
+                     location: Optional[int] = None,
+                     work_station: Optional[int] = None,
+                     start_time: Optional[float] = None,
+                     end_time: Optional[float] = None,
+                     conn: Optional[ConnectionPlus] = None) -> numpy.ndarray:
+    """
+    Load a summary of the runs matching the supplied run specification with
+    a single query, without loading a :class:`.DataSet` per run. All fields
+    are optional, runs have to match all supplied fields.
+
+    Args:
+        exp_id: The id of the experiment of the runs.
+        captured_run_id: The ``run_id`` that was originally assigned to a run
+          at the time of capture.
+        captured_counter: The counter that was originally assigned to a run
+          at the time of capture.
+        experiment_name: name of the experiment that the runs were captured
+        sample_name: The name of the sample given when creating the experiment.
+        sample_id: The sample_id assigned as part of the GUID.
+        location: The location code assigned as part of GUID.
+        work_station: The workstation assigned as part of the GUID.
+        start_time: The earliest run timestamp (in seconds since the epoch).
+        end_time: The latest run timestamp (in seconds since the epoch).
+        conn: An optional connection to the database. If no connection is
+          supplied a connection to the default database will be opened.
+
+    Returns:
+        A structured array with one row per run with the fields 'run_id',
+        'exp_id', 'name', 'experiment_name', 'sample_name', 'guid',
+        'captured_run_id', 'captured_counter', 'result_counter',
+        'run_timestamp', 'completed_timestamp' and 'is_completed'.
+    """
+    conn = conn_from_dbpath_or_conn(conn, path_to_db=None)
+    return get_run_catalog(conn, exp_id=exp_id,
+                           captured_run_id=captured_run_id,
+                           captured_counter=captured_counter,
+                           experiment_name=experiment_name,
+                           sample_name=sample_name, sample_id=sample_id,
+                           location=location, work_station=work_station,
+                           start_time=start_time, end_time=end_time)
+
+
+def load_run_catalog_as_dataframe(**run_spec: Any) -> "pd.DataFrame":
+    """
+    Load the summary of the runs matching the supplied run specification as
+    a :py:class:`pandas.DataFrame` indexed by ``run_id``. The keyword
+    arguments are the same as those of :func:`load_run_catalog`.
+    """
+    import pandas as pd
+    return pd.DataFrame.from_records(load_run_catalog(**run_spec),
+                                     index='run_id')
@@ -1,32 +1,57 @@
-from typing import Union, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
 from warnings import warn
 import os
+import sys
 
 import numpy as np
+from tqdm import tqdm
 
+from qcodes.dataset.descriptions.rundescriber import RunDescriber
 from qcodes.dataset.descriptions.versioning.converters import new_to_old
+import qcodes.dataset.descriptions.versioning.serialization as serial
 from qcodes.dataset.data_set import DataSet
 from qcodes.dataset.experiment_container import load_or_create_experiment
-from qcodes.dataset.sqlite.connection import atomic, ConnectionPlus
-from qcodes.dataset.sqlite.database import connect, \
+from qcodes.dataset.sqlite.connection import atomic, ConnectionPlus, \
+    transaction
+from qcodes.dataset.sqlite.database import TEXT_COMPRESSIONS, connect, \
     get_db_version_and_newest_available_version
-from qcodes.dataset.sqlite.queries import add_meta_data, create_run, \
-    get_exp_ids_from_run_ids, get_matching_exp_ids, get_runid_from_guid, \
-    is_run_id_in_database, mark_run_complete, new_experiment
-from qcodes.dataset.sqlite.query_helpers import select_many_where, \
-    sql_placeholder_string
+from qcodes.dataset.sqlite.queries import _categories_table_name, \
+    create_run, get_exp_ids_from_run_ids, get_matching_exp_ids, \
+    get_runid_from_guid, is_run_id_in_database, mark_run_complete, \
+    new_experiment, _update_run_description
+from qcodes.dataset.sqlite.query_helpers import many_many, \
+    select_many_where
+from qcodes.dataset.sqlite.sidecars import copy_run_sidecar
+from qcodes.dataset.sqlite.snapshots import set_run_snapshot
 from qcodes.dataset.linked_datasets.links import links_to_str
 
 
+# the name under which the source DB file is attached to the connection to
+# the target DB file
+SOURCE_SCHEMA = 'extract_source'
+
+# the number of rows of a results table that are copied per INSERT statement;
+# copying in chunks allows for reporting the progress on large runs
+EXTRACT_CHUNK_SIZE = 100000
+
+
 def extract_runs_into_db(source_db_path: str,
                          target_db_path: str, *run_ids: int,
                          upgrade_source_db: bool = False,
-                         upgrade_target_db: bool = False) -> None:
+                         upgrade_target_db: bool = False,
+                         show_progress: bool = False) -> None:
     """
-    Extract a selection of runs into another DB file. All runs must come from
-    the same experiment. They will be added to an experiment with the same name
-    and ``sample_name`` in the target db. If such an experiment does not exist, it
-    will be created.
+    Extract a selection of runs into another DB file. The runs may come from
+    several experiments. Each run will be added to an experiment with the
+    same name and ``sample_name`` as its experiment in the target db. If such
+    an experiment does not exist, it will be created.
+
+    The results are copied by SQLite itself, with the source DB file attached
+    to the connection to the target DB file, and all the runs are inserted in
+    a single transaction. The sidecar files of the runs, that hold their
+    large arrays (see :mod:`qcodes.dataset.sqlite.sidecars`), are copied
+    into the sidecar directory of the target DB file.
 
     Args:
         source_db_path: Path to the source DB file
@@ -37,6 +62,8 @@ def extract_runs_into_db(source_db_path: str,
           not the newest, should it be upgraded?
         upgrade_target_db: If the target DB is found to be in a version that is
           not the newest, should it be upgraded?
+        show_progress: If True, a progress bar of the copied results is
+          displayed
     """
     # Check for versions
     (s_v, new_v) = get_db_version_and_newest_available_version(source_db_path)
@@ -66,57 +93,128 @@ def extract_runs_into_db(source_db_path: str,
                     f"{non_existing_ids}")
         raise ValueError(err_mssg)
 
-    # Validate that all runs are from the same experiment
+    # Fetch the attributes of the runs' experiments
+    # hopefully, this is enough to uniquely identify the experiments
 
     source_exp_ids = np.unique(get_exp_ids_from_run_ids(source_conn, run_ids))
-    if len(source_exp_ids) != 1:
-        source_conn.close()
-        raise ValueError('Did not receive runs from a single experiment. '
-                         f'Got runs from experiments {source_exp_ids}')
-
-    # Fetch the attributes of the runs' experiment
-    # hopefully, this is enough to uniquely identify the experiment
 
     exp_attr_names = ['name', 'sample_name', 'start_time', 'end_time',
                       'format_string']
 
-    exp_attr_vals = select_many_where(source_conn,
-                                      'experiments',
-                                      *exp_attr_names,
-                                      where_column='exp_id',
-                                      where_value=source_exp_ids[0])
-
-    exp_attrs = dict(zip(exp_attr_names, exp_attr_vals))
+    exps_attrs: Dict[int, Dict[str, Any]] = {}
+    for source_exp_id in source_exp_ids:
+        exp_attr_vals = select_many_where(source_conn,
+                                          'experiments',
+                                          *exp_attr_names,
+                                          where_column='exp_id',
+                                          where_value=int(source_exp_id))
+        exps_attrs[int(source_exp_id)] = dict(zip(exp_attr_names,
+                                                  exp_attr_vals))
 
     # Massage the target DB file to accomodate the runs
-    # (create new experiment if needed)
+    # (create new experiments if needed)
 
     target_conn = connect(target_db_path)
 
+    # a database can not be attached within a transaction
+    transaction(target_conn, f"ATTACH DATABASE ? AS {SOURCE_SCHEMA}",
+                source_db_path)
+
     # this function raises if the target DB file has several experiments
     # matching both the name and sample_name
 
     try:
         with atomic(target_conn) as target_conn:
 
-            target_exp_id = _create_exp_if_needed(target_conn,
-                                                  exp_attrs['name'],
-                                                  exp_attrs['sample_name'],
-                                                  exp_attrs['format_string'],
-                                                  exp_attrs['start_time'],
-                                                  exp_attrs['end_time'])
+            target_exp_ids: Dict[int, int] = {}
+            for source_exp_id, exp_attrs in exps_attrs.items():
+                target_exp_ids[source_exp_id] = _create_exp_if_needed(
+                    target_conn,
+                    exp_attrs['name'],
+                    exp_attrs['sample_name'],
+                    exp_attrs['format_string'],
+                    exp_attrs['start_time'],
+                    exp_attrs['end_time'])
+
+            datasets = [DataSet(run_id=run_id, conn=source_conn)
+                        for run_id in run_ids]
+
+            pbar = None
+            if show_progress:
+                n_results = sum(_get_id_range(target_conn, ds.table_name)[1]
+                                for ds in datasets)
+                pbar = tqdm(total=n_results, file=sys.stdout, unit='results')
+                pbar.set_description(f"Extracting runs into {target_db_path}")
 
             # Finally insert the runs
-            for run_id in run_ids:
-                _extract_single_dataset_into_db(DataSet(run_id=run_id,
-                                                        conn=source_conn),
-                                                target_conn,
-                                                target_exp_id)
+            for dataset in datasets:
+                _extract_single_dataset_into_db(
+                    dataset,
+                    target_conn,
+                    target_exp_ids[dataset.exp_id],
+                    pbar=pbar)
+
+            if pbar is not None:
+                pbar.close()
     finally:
         source_conn.close()
+        transaction(target_conn, f"DETACH DATABASE {SOURCE_SCHEMA}")
         target_conn.close()
 
 
+def extract_runs_into_dbs(source_db_path: str,
+                          run_ids_per_target: Mapping[str, Sequence[int]],
+                          upgrade_source_db: bool = False,
+                          upgrade_target_db: bool = False,
+                          show_progress: bool = False,
+                          max_workers: Optional[int] = None) -> None:
+    """
+    Extract selections of runs into several DB files at once. Each
+    selection is extracted with :func:`extract_runs_into_db` in a separate
+    thread. If the extraction into one of the DB files fails, the other
+    extractions are carried out nonetheless, and the first error is raised
+    once all the extractions are done.
+
+    Args:
+        source_db_path: Path to the source DB file
+        run_ids_per_target: A mapping from the path of a target DB file to
+          the ``run_id``'s of the runs to copy into that file
+        upgrade_source_db: If the source DB is found to be in a version that is
+          not the newest, should it be upgraded?
+        upgrade_target_db: If a target DB is found to be in a version that is
+          not the newest, should it be upgraded?
+        show_progress: If True, a progress bar of the copied results is
+          displayed per target DB file
+        max_workers: The maximal number of DB files to extract into at the
+          same time. If None, the default of
+          :class:`concurrent.futures.ThreadPoolExecutor` is used.
+    """
+    # the source DB file is upgraded once here, such that the threads do not
+    # race to upgrade it
+    (s_v, new_v) = get_db_version_and_newest_available_version(source_db_path)
+    if s_v < new_v:
+        if not upgrade_source_db:
+            warn(f'Source DB version is {s_v}, but this function needs it to '
+                 f'be in version {new_v}. Run this function again with '
+                 'upgrade_source_db=True to auto-upgrade the source DB file.')
+            return
+        connect(source_db_path).close()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(extract_runs_into_db,
+                                   source_db_path,
+                                   target_db_path,
+                                   *run_ids,
+                                   upgrade_target_db=upgrade_target_db,
+                                   show_progress=show_progress)
+                   for target_db_path, run_ids
+                   in run_ids_per_target.items()]
+    errors: List[BaseException] = [future.exception() for future in futures
+                                   if future.exception() is not None]
+    if errors:
+        raise errors[0]
+
+
 def _create_exp_if_needed(target_conn: ConnectionPlus,
                           exp_name: str,
                           sample_name: str,
@@ -156,7 +254,8 @@ def _create_exp_if_needed(target_conn: ConnectionPlus,
 
 def _extract_single_dataset_into_db(dataset: DataSet,
                                     target_conn: ConnectionPlus,
-                                    target_exp_id: int) -> None:
+                                    target_exp_id: int,
+                                    pbar: Optional[tqdm] = None) -> None:
     """
     NB: This function should only be called from within
     meth:`extract_runs_into_db`
@@ -168,9 +267,11 @@ def _extract_single_dataset_into_db(dataset: DataSet,
 
     Args:
         dataset: A dataset representing the run to be copied
-        target_conn: connection to the DB. Must be atomically guarded
+        target_conn: connection to the DB. Must be atomically guarded and
+          have the DB file of the dataset attached as ``SOURCE_SCHEMA``
         target_exp_id: The ``exp_id`` of the (target DB) experiment in which to
           insert the run
+        pbar: progress bar to update with the number of copied results
     """
 
     if not dataset.completed:
@@ -178,11 +279,11 @@ def _extract_single_dataset_into_db(dataset: DataSet,
                          'can not be copied. The incomplete dataset has '
                          f'GUID: {dataset.guid} and run_id: {dataset.run_id}')
 
-    source_conn = dataset.conn
-
     run_id = get_runid_from_guid(target_conn, dataset.guid)
 
     if run_id != -1:
+        if pbar is not None:
+            pbar.update(_get_id_range(target_conn, dataset.table_name)[1])
         return
 
     if dataset.parameters is not None:
@@ -209,10 +310,31 @@ def _extract_single_dataset_into_db(dataset: DataSet,
             captured_counter=captured_counter,
             parent_dataset_links=parent_dataset_links)
 
-    _populate_results_table(source_conn,
-                            target_conn,
+    # the values of categorical parameters are copied decoded, hence their
+    # compression is dropped from the copied run description. The other
+    # compressions and the shapes are carried over, as the encoded arrays
+    # are copied as they are
+    categorical = [name for name, codec in dataset.compression.items()
+                   if codec in TEXT_COMPRESSIONS]
+    description = dataset.description
+    target_description = RunDescriber(
+        description.interdeps,
+        compression={name: codec
+                     for name, codec in description.compression.items()
+                     if name not in categorical},
+        shapes=description.shapes)
+    _update_run_description(target_conn, target_run_id,
+                            serial.to_json_for_storage(target_description))
+
+    # the references to the sidecar file in the copied results stay valid,
+    # as the sidecar file is named after the GUID of the run
+    copy_run_sidecar(dataset.path_to_db, target_conn.path_to_dbfile,
+                     dataset.guid)
+    _populate_results_table(target_conn,
                             dataset.table_name,
-                            target_table_name)
+                            target_table_name,
+                            pbar=pbar,
+                            categorical=categorical)
     mark_run_complete(target_conn, target_run_id)
     _rewrite_timestamps(target_conn,
                         target_run_id,
@@ -220,34 +342,64 @@ def _extract_single_dataset_into_db(dataset: DataSet,
                         dataset.completed_timestamp_raw)
 
     if snapshot_raw is not None:
-        add_meta_data(target_conn, target_run_id, {'snapshot': snapshot_raw})
+        set_run_snapshot(target_conn, target_run_id, snapshot_raw)
 
 
-def _populate_results_table(source_conn: ConnectionPlus,
-                            target_conn: ConnectionPlus,
+def _get_id_range(target_conn: ConnectionPlus,
+                  source_table_name: str) -> Tuple[int, int]:
+    """
+    Get the first id and the number of ids of a results table of the
+    attached source DB file
+    """
+    query = f"""
+            SELECT IFNULL(MIN(id), 1), IFNULL(MAX(id) - MIN(id) + 1, 0)
+            FROM {SOURCE_SCHEMA}."{source_table_name}"
+            """
+    first_id, n_ids = transaction(target_conn, query).fetchone()
+    return first_id, n_ids
+
+
+def _populate_results_table(target_conn: ConnectionPlus,
                             source_table_name: str,
-                            target_table_name: str) -> None:
+                            target_table_name: str,
+                            pbar: Optional[tqdm] = None,
+                            categorical: Sequence[str] = ()) -> None:
     """
-    Copy over all the entries of the results table
+    Copy over all the entries of the results table of the attached source DB
+    file. The values are copied as they are stored, in chunks of
+    ``EXTRACT_CHUNK_SIZE`` rows, except for the codes of the values of the
+    given parameters with categorical compression, which are decoded.
     """
-    get_data_query = f"""
-                     SELECT *
-                     FROM "{source_table_name}"
-                     """
-
-    source_cursor = source_conn.cursor()
-    target_cursor = target_conn.cursor()
-
-    for row in source_cursor.execute(get_data_query):
-        column_names = ','.join(row.keys()[1:])  # the first key is "id"
-        values = tuple(val for val in row[1:])
-        value_placeholders = sql_placeholder_string(len(values))
-        insert_data_query = f"""
-                             INSERT INTO "{target_table_name}"
-                             ({column_names})
-                             values {value_placeholders}
-                             """
-        target_cursor.execute(insert_data_query, values)
+    cursor = transaction(target_conn,
+                         f'PRAGMA {SOURCE_SCHEMA}.table_info'
+                         f'("{source_table_name}")')
+    # the first column is "id"
+    names = [row[0] for row in many_many(cursor, 'name')[1:]]
+    if len(names) == 0:
+        return
+    column_names = ','.join(names)
+    categories_table = _categories_table_name(source_table_name)
+    selected = ','.join(
+        f'(SELECT value FROM {SOURCE_SCHEMA}."{categories_table}" '
+        f'WHERE parameter = ? AND code = {name})'
+        if name in categorical else name
+        for name in names)
+    categorical_names = [name for name in names if name in categorical]
+
+    first_id, n_ids = _get_id_range(target_conn, source_table_name)
+    insert_data_query = f"""
+                         INSERT INTO "{target_table_name}" ({column_names})
+                         SELECT {selected}
+                         FROM {SOURCE_SCHEMA}."{source_table_name}"
+                         WHERE id >= ? AND id < ?
+                         ORDER BY id
+                         """
+    for chunk_start in range(first_id, first_id + n_ids, EXTRACT_CHUNK_SIZE):
+        chunk_end = min(chunk_start + EXTRACT_CHUNK_SIZE, first_id + n_ids)
+        transaction(target_conn, insert_data_query, *categorical_names,
+                    chunk_start, chunk_end)
+        if pbar is not None:
+            pbar.update(chunk_end - chunk_start)
 
 
 def _rewrite_timestamps(target_conn: ConnectionPlus, target_run_id: int,
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Optional, Sequence, Tuple
 
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 
@@ -10,13 +10,23 @@ class RunDescriber:
     column in the runs table.
 
     Extension of this object is planned for the future, for now it holds the
-    parameter interdependencies. Extensions should be objects that can
+    parameter interdependencies and the compression of the 'array' and
+    'text' parameters (a mapping from parameter name to one of
+    :data:`qcodes.dataset.sqlite.database.ARRAY_COMPRESSIONS` or
+    :data:`qcodes.dataset.sqlite.database.TEXT_COMPRESSIONS`, which is only
+    serialized if not empty) and the shapes of the parameters (a mapping
+    from parameter name to the expected shape of its data, see
+    :meth:`qcodes.dataset.measurements.Measurement.set_shapes`, which is
+    only serialized if not empty). Extensions should be objects that can
     convert themselves to dictionary and added as attributes to the
     RunDescriber, such that the RunDescriber can iteratively convert its
     attributes when converting itself to dictionary.
     """
 
-    def __init__(self, interdeps: InterDependencies_) -> None:
+    def __init__(self, interdeps: InterDependencies_,
+                 compression: Optional[Mapping[str, str]] = None,
+                 shapes: Optional[Mapping[str, Sequence[int]]] = None
+                 ) -> None:
 
         if not isinstance(interdeps, InterDependencies_):
             raise ValueError('The interdeps arg must be of type: '
@@ -24,6 +34,9 @@ class RunDescriber:
                              f'Got {type(interdeps)}.')
 
         self.interdeps = interdeps
+        self.compression: Dict[str, str] = dict(compression or {})
+        self.shapes: Dict[str, Tuple[int, ...]] = {
+            name: tuple(shape) for name, shape in (shapes or {}).items()}
 
         self._version = 1
 
@@ -39,6 +52,11 @@ class RunDescriber:
         ser: Dict[str, Any] = {}
         ser['version'] = self._version
         ser['interdependencies'] = self.interdeps._to_dict()
+        if self.compression:
+            ser['compression'] = dict(self.compression)
+        if self.shapes:
+            ser['shapes'] = {name: list(shape)
+                             for name, shape in self.shapes.items()}
 
         return ser
 
@@ -50,7 +68,9 @@ class RunDescriber:
         """
 
         rundesc = cls(
-            InterDependencies_._from_dict(ser['interdependencies']))
+            InterDependencies_._from_dict(ser['interdependencies']),
+            compression=ser.get('compression'),
+            shapes=ser.get('shapes'))
 
         return rundesc
 
@@ -59,6 +79,10 @@ class RunDescriber:
             return False
         if self.interdeps != other.interdeps:
             return False
+        if self.compression != other.compression:
+            return False
+        if self.shapes != other.shapes:
+            return False
         return True
 
     def __repr__(self) -> str:
@@ -105,7 +105,9 @@ def v0_to_v1(old: v0.RunDescriber) -> current.RunDescriber:
     old_idps = old.interdeps
     new_idps = old_to_new(old_idps)
 
-    return current.RunDescriber(interdeps=new_idps)
+    return current.RunDescriber(interdeps=new_idps,
+                                compression=old.compression,
+                                shapes=old.shapes)
 
 
 def v1_to_v0(new: current.RunDescriber) -> v0.RunDescriber:
@@ -120,4 +122,6 @@ def v1_to_v0(new: current.RunDescriber) -> v0.RunDescriber:
     new_idps = new.interdeps
     old_idps = new_to_old(new_idps)
 
-    return v0.RunDescriber(interdeps=old_idps)
+    return v0.RunDescriber(interdeps=old_idps,
+                           compression=new.compression,
+                           shapes=new.shapes)
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Mapping, Optional, Sequence, Tuple
 
 from qcodes.dataset.descriptions.param_spec import ParamSpec
 
@@ -64,7 +64,9 @@ class RunDescriber:
     attributes when converting itself to dictionary.
     """
 
-    def __init__(self, interdeps: InterDependencies):
+    def __init__(self, interdeps: InterDependencies,
+                 compression: Optional[Mapping[str, str]] = None,
+                 shapes: Optional[Mapping[str, Sequence[int]]] = None):
 
         if not isinstance(interdeps, InterDependencies):
             raise ValueError('The interdeps arg must be of type: '
@@ -73,6 +75,13 @@ class RunDescriber:
 
         self._version = 0
         self.interdeps = interdeps
+        # the compression of the 'array' parameters, an optional extension
+        # that is only serialized if not empty
+        self.compression: Dict[str, str] = dict(compression or {})
+        # the expected shapes of the data of the parameters, an optional
+        # extension that is only serialized if not empty
+        self.shapes: Dict[str, Tuple[int, ...]] = {
+            name: tuple(shape) for name, shape in (shapes or {}).items()}
 
     @property
     def version(self) -> int:
@@ -86,6 +95,11 @@ class RunDescriber:
         ser: Dict[str, Any] = {}
         ser['version'] = self._version
         ser['interdependencies'] = self.interdeps._to_dict()
+        if self.compression:
+            ser['compression'] = dict(self.compression)
+        if self.shapes:
+            ser['shapes'] = {name: list(shape)
+                             for name, shape in self.shapes.items()}
 
         return ser
 
@@ -96,11 +110,17 @@ class RunDescriber:
         intended to be used only by the deserialization routines.
         """
 
-        return cls(InterDependencies._from_dict(ser['interdependencies']))
+        return cls(InterDependencies._from_dict(ser['interdependencies']),
+                   compression=ser.get('compression'),
+                   shapes=ser.get('shapes'))
 
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, RunDescriber):
             return False
         if not self.interdeps == other.interdeps:
             return False
+        if self.compression != other.compression:
+            return False
+        if self.shapes != other.shapes:
+            return False
         return True
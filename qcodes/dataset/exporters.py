@@ -0,0 +1,602 @@
+"""
+This module contains the export of the data of a :class:`.DataSet` to files
+that can be read without QCoDeS, i.e. text files, HDF5 files and
+directories of ``.npy`` column files, and to pandas and xarray objects.
+
+All exporters read the results of the run in chunks of rows (see
+:meth:`.DataSet.iter_parameter_data`) and write the data of each parameter
+tree incrementally, such that runs that are larger than the available
+memory can be exported. An optional progress callback is called after each
+chunk with the number of rows of the results table that have been exported
+and the total number of rows.
+"""
+import json
+import os
+import struct
+from typing import (IO, TYPE_CHECKING, Any, Callable, Dict, Mapping,
+                    Optional, Sequence, Tuple, Union)
+
+import numpy as np
+
+import qcodes.dataset.descriptions.versioning.serialization as serial
+from qcodes.dataset.descriptions.param_spec import ParamSpec
+from qcodes.instrument.parameter import _BaseParameter
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import xarray as xr
+    from qcodes.dataset.data_set import DataSet
+
+# called with the number of rows of the results table exported so far and
+# the total number of rows
+ProgressCallback = Callable[[int, int], None]
+
+# if no chunk size is given, the number of rows per chunk is chosen such that
+# the data of a chunk takes about this many bytes
+CHUNK_TARGET_BYTES = 2**26
+# the number of rows of the first chunk if no chunk size is given
+FIRST_CHUNK_SIZE = 1024
+
+NPY_HEADER_SIZE = 256
+TEXT_COLUMN_EXTENSION = '.jsonl'
+
+
+class DataLengthException(Exception):
+    pass
+
+
+class DataPathException(Exception):
+    pass
+
+
+def parameter_tree_to_dataframe(
+        tree: Dict[str, np.ndarray],
+        first_index: int = 0,
+        categories: Optional[Mapping[str, Sequence[str]]] = None
+) -> "pd.DataFrame":
+    """
+    Make a :py:class:`pandas.DataFrame` of the data of a parameter tree, as
+    returned by :meth:`.DataSet.get_parameter_data`, with the top level
+    parameter as the column, indexed by a :py:class:`pandas.MultiIndex`
+    formed from its setpoints. The data of array parameters is flattened.
+
+    Args:
+        tree: the data of the parameter tree
+        first_index: the first index of the rows, if the parameter has no
+            setpoints and the rows are hence indexed by their number
+        categories: the categories of the parameters whose data in the tree
+            are the codes of their values (see the ``decode_categories`` of
+            :meth:`.DataSet.get_parameter_data`), which are made
+            :py:class:`pandas.Categorical` s
+    """
+    import pandas as pd
+    keys = list(tree.keys())
+    if len(keys) == 0:
+        return pd.DataFrame()
+    columns = [_pandas_values(key, _flatten(tree[key]), categories)
+               for key in keys]
+    if len(keys) == 1:
+        index = pd.RangeIndex(first_index, first_index + len(columns[0]))
+    elif len(keys) == 2:
+        index = pd.Index(columns[1], name=keys[1])
+    else:
+        index = pd.MultiIndex.from_arrays(columns[1:], names=keys[1:])
+    return pd.DataFrame(columns[0], index=index, columns=[keys[0]])
+
+
+def parameter_tree_to_pandas(
+        tree: Dict[str, np.ndarray],
+        shape: Optional[Sequence[int]] = None,
+        categories: Optional[Mapping[str, Sequence[str]]] = None
+) -> "pd.DataFrame":
+    """
+    Make a :py:class:`pandas.DataFrame` of the data of a parameter tree, as
+    returned by :meth:`.DataSet.get_parameter_data` with ``reshape=False``,
+    without copying the data where possible.
+
+    If the data points were measured in nested loops over the setpoints
+    (see :func:`.sweep_grid`), the frame holds the top level parameter as
+    the column, indexed by the product of the setpoint values along each
+    loop, which is a view on the data of the top level parameter if that
+    is contiguous. Otherwise the frame is in long format, with a column for
+    each setpoint followed by the top level parameter.
+
+    The data of parameters with categorical compression can be given as
+    the codes of their values, which are made :py:class:`pandas.Categorical`
+    s without expanding the values into an array of strings.
+
+    Args:
+        tree: the data of the parameter tree
+        shape: the declared shape of the top level parameter, if any
+        categories: the categories of the parameters whose data in the tree
+            are the codes of their values, see
+            :func:`parameter_tree_to_dataframe`
+    """
+    import pandas as pd
+    from qcodes.dataset.data_export import grid_coordinates
+    keys = list(tree.keys())
+    if len(keys) == 0:
+        return pd.DataFrame()
+    name, setpoint_names = keys[0], keys[1:]
+    setpoints = [tree[key] for key in setpoint_names]
+    grid = _sweep_grid_of_tree(setpoints, shape) if setpoints else None
+    if grid is None:
+        return pd.DataFrame({key: _pandas_values(key, _flatten(tree[key]),
+                                                 categories)
+                             for key in setpoint_names + [name]},
+                            copy=False)
+    order, grid_shape = grid
+    coordinates = grid_coordinates(setpoints, order, grid_shape)
+    names = [setpoint_names[axis] for axis in order]
+    coordinates = [_pandas_values(key, values, categories)
+                   for key, values in zip(names, coordinates)]
+    if len(coordinates) == 1:
+        index = pd.Index(coordinates[0], name=names[0])
+    else:
+        index = pd.MultiIndex.from_product(coordinates, names=names)
+    if categories is not None and name in categories:
+        return pd.DataFrame({name: _pandas_values(name, tree[name].ravel(),
+                                                  categories)},
+                            index=index)
+    return pd.DataFrame(tree[name].reshape(-1, 1), index=index,
+                        columns=[name], copy=False)
+
+
+def parameter_tree_to_xarray(tree: Dict[str, np.ndarray],
+                             shape: Optional[Sequence[int]] = None,
+                             paramspecs: Optional[Dict[str, ParamSpec]] = None
+                             ) -> "xr.DataArray":
+    """
+    Make an :py:class:`xarray.DataArray` of the data of a parameter tree,
+    as returned by :meth:`.DataSet.get_parameter_data` with
+    ``reshape=False``, without copying the data where possible.
+
+    If the data points were measured in nested loops over the setpoints
+    (see :func:`.sweep_grid`), the data array has a dimension for each
+    loop, with the setpoint values along it as the coordinate, and its data
+    is a view on the data of the top level parameter. Otherwise the data
+    array has a single dimension ``<name>_index`` along which the setpoints
+    are (non-dimension) coordinates.
+
+    Args:
+        tree: the data of the parameter tree
+        shape: the declared shape of the top level parameter, if any
+        paramspecs: the specs of the parameters, whose units and labels are
+            added as the attributes ``units`` and ``long_name``
+    """
+    import xarray as xr
+    from qcodes.dataset.data_export import grid_coordinates
+    keys = list(tree.keys())
+    name, setpoint_names = keys[0], keys[1:]
+    setpoints = [tree[key] for key in setpoint_names]
+    grid = _sweep_grid_of_tree(setpoints, shape) if setpoints else None
+    if grid is None:
+        dim = f'{name}_index'
+        data_array = xr.DataArray(
+            _flatten(tree[name]), dims=(dim,), name=name,
+            coords={key: (dim, _flatten(tree[key]))
+                    for key in setpoint_names})
+    else:
+        order, grid_shape = grid
+        coordinates = grid_coordinates(setpoints, order, grid_shape)
+        dims = [setpoint_names[axis] for axis in order]
+        data_array = xr.DataArray(tree[name].reshape(grid_shape),
+                                  dims=dims, name=name,
+                                  coords=dict(zip(dims, coordinates)))
+    if paramspecs is not None:
+        for key in keys:
+            target = data_array if key == name else data_array[key]
+            target.attrs['units'] = paramspecs[key].unit
+            target.attrs['long_name'] = paramspecs[key].label
+    return data_array
+
+
+def _sweep_grid_of_tree(setpoints: Sequence[np.ndarray],
+                        shape: Optional[Sequence[int]]
+                        ) -> Optional[Tuple[Tuple[int, ...],
+                                            Tuple[int, ...]]]:
+    """
+    The grid of the data of a parameter tree. A declared shape is tried
+    first, and is only valid for the setpoints if it has as many
+    dimensions as there are setpoints.
+    """
+    from qcodes.dataset.data_export import sweep_grid
+    if any(values.dtype == np.dtype('O') for values in setpoints):
+        return None
+    grid = None
+    if shape is not None and len(shape) == len(setpoints):
+        grid = sweep_grid(*setpoints, shape=shape)
+    if grid is None:
+        grid = sweep_grid(*setpoints)
+    return grid
+
+
+def _parameter_tree_to_text_columns(tree: Dict[str, np.ndarray],
+                                    first_index: int = 0) -> "pd.DataFrame":
+    """
+    Make a :py:class:`pandas.DataFrame` with the columns that are written to
+    text files for a parameter tree, i.e. the setpoints (or the row numbers
+    if there are none) followed by the top level parameter. This gives the
+    same text as writing :func:`parameter_tree_to_dataframe` with its index,
+    but writing a :py:class:`pandas.MultiIndex` is much slower.
+    """
+    import pandas as pd
+    keys = list(tree.keys())
+    if len(keys) == 0:
+        return pd.DataFrame()
+    columns = {key: _flatten(tree[key]) for key in keys[1:] + keys[:1]}
+    if len(keys) == 1:
+        n_rows = len(columns[keys[0]])
+        columns = {'index': np.arange(first_index, first_index + n_rows),
+                   **columns}
+    return pd.DataFrame(columns)
+
+
+def _pandas_values(name: str, values: np.ndarray,
+                   categories: Optional[Mapping[str, Sequence[str]]]
+                   ) -> Union[np.ndarray, "pd.Categorical"]:
+    """
+    The values of a parameter for a :py:class:`pandas.DataFrame`, where the
+    codes of the values of a parameter with categories are made a
+    :py:class:`pandas.Categorical`
+    """
+    if categories is None or name not in categories:
+        return values
+    import pandas as pd
+    return pd.Categorical.from_codes(values, categories[name])
+
+
+def _flatten(values: np.ndarray) -> np.ndarray:
+    if values.dtype == np.dtype('O'):
+        # ravel will not fully unpack a numpy array of arrays
+        # which are of "object" dtype. This can happen if a variable
+        # length array is stored in the db. We use concatenate to
+        # flatten these
+        return np.concatenate(values)
+    return values.ravel()
+
+
+def export_to_text(dataset: 'DataSet', path: str,
+                   *params: Union[str, ParamSpec, _BaseParameter],
+                   single_file: bool = False,
+                   single_file_name: Optional[str] = None,
+                   chunk_size: Optional[int] = None,
+                   progress: Optional[ProgressCallback] = None) -> None:
+    """
+    Export the data of a dataset to tab separated text files, one file
+    ``<name>.dat`` per parameter tree, or a single file for all of them. See
+    :meth:`.DataSet.write_data_to_text_file` for the layout of the files.
+
+    Args:
+        dataset: the dataset to export
+        path: the directory to write the files to
+        *params: the parameters (trees) to export. If no parameters are
+            supplied, all parameters that are not a dependency of another
+            parameter are exported.
+        single_file: if True, the data of all parameter trees, which must be
+            of the same length and have the same setpoints row by row, is
+            written side by side to one file
+        single_file_name: the name of the single file (without extension)
+        chunk_size: the number of rows of the results table to read at a
+            time, see :meth:`.DataSet.iter_parameter_data`
+        progress: called after each chunk with the number of rows exported
+            and the total number of rows
+
+    Raises:
+        DataLengthException: If the data of multiple parameters have not
+            the same length and are to be merged in a single file.
+        ValueError: If the data of multiple parameters have not the same
+            setpoints and are to be merged in a single file.
+        DataPathException: If the data of multiple parameters are to be
+            merged in a single file but no file name is provided.
+    """
+    import pandas as pd
+    if single_file and single_file_name is None:
+        raise DataPathException("Please provide the desired file name " +
+                                "for the concatenated data.")
+    chunks = dataset.iter_parameter_data(*params, chunk_size=chunk_size,
+                                         progress=progress)
+    if not single_file:
+        files: Dict[str, IO[str]] = {}
+        n_rows: Dict[str, int] = {}
+        try:
+            for chunk in chunks:
+                for name, tree in chunk.items():
+                    if name not in files:
+                        files[name] = open(os.path.join(path, f'{name}.dat'),
+                                           'w', newline='')
+                        n_rows[name] = 0
+                    df = _parameter_tree_to_text_columns(tree, n_rows[name])
+                    df.to_csv(path_or_buf=files[name], header=False,
+                              index=False, sep='\t')
+                    n_rows[name] += len(df)
+        finally:
+            for file in files.values():
+                file.close()
+        return
+
+    dst = os.path.join(path, f'{single_file_name}.dat')
+    # the rows of the parameter trees are written side by side as soon as
+    # they have been read for all of them, the remaining rows are kept
+    pending: Dict[str, "pd.DataFrame"] = {}
+    n_read: Dict[str, int] = {}
+    try:
+        with open(dst, 'w', newline='') as file:
+            for chunk in chunks:
+                for name, tree in chunk.items():
+                    df = _parameter_tree_to_text_columns(
+                        tree, n_read.get(name, 0))
+                    n_read[name] = n_read.get(name, 0) + len(df)
+                    pending[name] = (df if name not in pending
+                                     else pd.concat((pending[name], df)))
+                n_common = min((len(df) for df in pending.values()),
+                               default=0)
+                if n_common > 0:
+                    _write_side_by_side(
+                        file, [df.iloc[:n_common] for df in pending.values()])
+                    pending = {name: df.iloc[n_common:]
+                               for name, df in pending.items()}
+            if any(len(df) > 0 for df in pending.values()):
+                raise DataLengthException("You cannot concatenate data " +
+                                          "with different length to a " +
+                                          "single file.")
+    except (DataLengthException, ValueError):
+        os.remove(dst)
+        raise
+
+
+def _write_side_by_side(file: IO[str], dfs: Sequence["pd.DataFrame"]
+                        ) -> None:
+    """
+    Write the rows of the text columns of parameter trees side by side, i.e.
+    the setpoints followed by the top level parameter of each tree. The
+    rows are paired by position, hence their setpoints must be the same.
+    """
+    df = dfs[0].copy()
+    setpoints = df.iloc[:, :-1].to_numpy()
+    for other in dfs[1:]:
+        if not np.array_equal(other.iloc[:, :-1].to_numpy(), setpoints):
+            raise ValueError("You cannot concatenate data with different "
+                             "setpoints to a single file.")
+        df[other.columns[-1]] = other.iloc[:, -1].to_numpy()
+    df.to_csv(path_or_buf=file, header=False, index=False, sep='\t')
+
+
+def export_to_hdf5(dataset: 'DataSet', path: str,
+                   *params: Union[str, ParamSpec, _BaseParameter],
+                   chunk_size: Optional[int] = None,
+                   progress: Optional[ProgressCallback] = None) -> None:
+    """
+    Export the data of a dataset to an HDF5 file, with one group per
+    parameter tree that holds one HDF5 dataset per parameter, with the
+    results as the first dimension. The unit and label of the parameters
+    are stored as attributes of their HDF5 datasets and the GUID, run id,
+    experiment name, sample name and run description (as JSON) as
+    attributes of the file. Numeric data is stored as floating point values
+    and variable length arrays as HDF5 variable length data.
+
+    Args:
+        dataset: the dataset to export
+        path: the path of the HDF5 file to write
+        *params: the parameters (trees) to export. If no parameters are
+            supplied, all parameters that are not a dependency of another
+            parameter are exported.
+        chunk_size: the number of rows of the results table to read at a
+            time, see :meth:`.DataSet.iter_parameter_data`
+        progress: called after each chunk with the number of rows exported
+            and the total number of rows
+    """
+    import h5py
+    paramspecs = dataset.paramspecs
+    with h5py.File(path, 'w') as file:
+        file.attrs['guid'] = dataset.guid
+        file.attrs['run_id'] = dataset.run_id
+        file.attrs['captured_run_id'] = dataset.captured_run_id
+        file.attrs['exp_name'] = dataset.exp_name
+        file.attrs['sample_name'] = dataset.sample_name
+        file.attrs['run_description'] = \
+            serial.to_json_for_storage(dataset.description)
+        for chunk in dataset.iter_parameter_data(*params,
+                                                 chunk_size=chunk_size,
+                                                 progress=progress):
+            for name, tree in chunk.items():
+                group = file.require_group(name)
+                for param_name, values in tree.items():
+                    if len(values) == 0:
+                        continue
+                    if param_name not in group:
+                        h5_dataset = _create_hdf5_dataset(group, param_name,
+                                                          values)
+                        h5_dataset.attrs['unit'] = paramspecs[param_name].unit
+                        h5_dataset.attrs['label'] = \
+                            paramspecs[param_name].label
+                    _append_to_hdf5_dataset(group[param_name], values)
+
+
+def _create_hdf5_dataset(group: Any, name: str, values: np.ndarray) -> Any:
+    import h5py
+    values = _as_stored(values)
+    if values.dtype.kind == 'U':
+        dtype = h5py.string_dtype()
+    elif values.dtype.kind == 'O':
+        first = values.flat[0]
+        if isinstance(first, str):
+            dtype = h5py.string_dtype()
+        else:
+            dtype = h5py.vlen_dtype(_as_stored(np.asarray(first)).dtype)
+    else:
+        dtype = values.dtype
+    return group.create_dataset(name, shape=(0,) + values.shape[1:],
+                                maxshape=(None,) + values.shape[1:],
+                                dtype=dtype, chunks=True)
+
+
+def _append_to_hdf5_dataset(h5_dataset: Any, values: np.ndarray) -> None:
+    values = _as_stored(values)
+    if values.shape[1:] != h5_dataset.shape[1:]:
+        raise ValueError(f'Can not append data of shape {values.shape[1:]} '
+                         f'to the data of {h5_dataset.name} of shape '
+                         f'{h5_dataset.shape[1:]}.')
+    if values.dtype.kind == 'U':
+        values = values.astype(object)
+    n_rows = h5_dataset.shape[0]
+    h5_dataset.resize(n_rows + len(values), axis=0)
+    h5_dataset[n_rows:] = values
+
+
+def _as_stored(values: np.ndarray) -> np.ndarray:
+    """
+    Numeric data is stored as floating point values, irrespective of whether
+    a chunk of it happens to be read as integers
+    """
+    if values.dtype.kind in 'biu':
+        return values.astype(np.float64)
+    return values
+
+
+def export_to_npy_columns(dataset: 'DataSet', path: str,
+                          *params: Union[str, ParamSpec, _BaseParameter],
+                          chunk_size: Optional[int] = None,
+                          progress: Optional[ProgressCallback] = None
+                          ) -> None:
+    """
+    Export the data of a dataset to a columnar directory layout, with one
+    subdirectory per parameter tree that holds one ``.npy`` file per
+    parameter, with the results as the first dimension. The files can be
+    memory mapped with ``numpy.load(..., mmap_mode='r')``, see
+    :func:`load_npy_columns`. Numeric data is stored as floating point
+    values. Text data, of which the length of the values is not known in
+    advance, is stored in JSON lines files (``.jsonl``) with one row per
+    line instead.
+
+    Args:
+        dataset: the dataset to export
+        path: the directory to write the subdirectories to
+        *params: the parameters (trees) to export. If no parameters are
+            supplied, all parameters that are not a dependency of another
+            parameter are exported.
+        chunk_size: the number of rows of the results table to read at a
+            time, see :meth:`.DataSet.iter_parameter_data`
+        progress: called after each chunk with the number of rows exported
+            and the total number of rows
+
+    Raises:
+        ValueError: if a parameter holds arrays of varying length
+    """
+    writers: Dict[Tuple[str, str], Union[_NpyColumnWriter,
+                                         _TextColumnWriter]] = {}
+    try:
+        for chunk in dataset.iter_parameter_data(*params,
+                                                 chunk_size=chunk_size,
+                                                 progress=progress):
+            for name, tree in chunk.items():
+                os.makedirs(os.path.join(path, name), exist_ok=True)
+                for param_name, values in tree.items():
+                    if len(values) == 0:
+                        continue
+                    writer = writers.get((name, param_name))
+                    if writer is None:
+                        writer = _new_column_writer(
+                            os.path.join(path, name, param_name), values)
+                        writers[(name, param_name)] = writer
+                    writer.append(values)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+def load_npy_columns(path: str) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Load data exported with :func:`export_to_npy_columns`, in the format of
+    :meth:`.DataSet.get_parameter_data`. The numeric data is memory mapped
+    (read-only) instead of read into memory.
+
+    Args:
+        path: the directory the data was exported to
+    """
+    output: Dict[str, Dict[str, np.ndarray]] = {}
+    for name in sorted(os.listdir(path)):
+        tree_dir = os.path.join(path, name)
+        if not os.path.isdir(tree_dir):
+            continue
+        output[name] = {}
+        for file_name in sorted(os.listdir(tree_dir)):
+            param_name, extension = os.path.splitext(file_name)
+            file_path = os.path.join(tree_dir, file_name)
+            if extension == '.npy':
+                output[name][param_name] = np.load(file_path, mmap_mode='r')
+            elif extension == TEXT_COLUMN_EXTENSION:
+                with open(file_path, encoding='utf-8') as file:
+                    output[name][param_name] = np.array(
+                        [json.loads(line) for line in file])
+    return output
+
+
+def _new_column_writer(path: str, values: np.ndarray
+                       ) -> Union['_NpyColumnWriter', '_TextColumnWriter']:
+    if values.dtype.kind == 'U' or (values.dtype.kind == 'O'
+                                    and isinstance(values.flat[0], str)):
+        return _TextColumnWriter(path + TEXT_COLUMN_EXTENSION)
+    if values.dtype.kind == 'O':
+        raise ValueError(f'Can not export the data of {path} to a column '
+                         f'file, since it holds arrays of varying length.')
+    return _NpyColumnWriter(path + '.npy')
+
+
+class _NpyColumnWriter:
+    """
+    Writer of a ``.npy`` file to which rows are appended. Space for the
+    header of the file is reserved when it is opened, and the header is
+    written when it is closed and the final shape is known.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'wb')
+        self._file.write(b'\x00' * NPY_HEADER_SIZE)
+        self._dtype: Optional[np.dtype] = None
+        self._row_shape: Tuple[int, ...] = ()
+        self._n_rows = 0
+
+    def append(self, values: np.ndarray) -> None:
+        values = _as_stored(values)
+        if self._dtype is None:
+            self._dtype = values.dtype
+            self._row_shape = values.shape[1:]
+        if values.shape[1:] != self._row_shape:
+            raise ValueError(f'Can not append data of shape '
+                             f'{values.shape[1:]} to the data of '
+                             f'{self._file.name} of shape {self._row_shape}.')
+        self._file.write(np.ascontiguousarray(values,
+                                              dtype=self._dtype).data)
+        self._n_rows += len(values)
+
+    def close(self) -> None:
+        dtype = self._dtype if self._dtype is not None else np.dtype(float)
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype),
+                       'fortran_order': False,
+                       'shape': (self._n_rows,) + self._row_shape})
+        # the header is padded with spaces to the reserved size, as numpy
+        # does to align the data
+        prefix = np.lib.format.MAGIC_PREFIX + b'\x01\x00'
+        header_size = NPY_HEADER_SIZE - len(prefix) - 2
+        self._file.seek(0)
+        self._file.write(prefix + struct.pack('<H', header_size)
+                         + header.encode('latin1').ljust(header_size - 1)
+                         + b'\n')
+        self._file.close()
+
+
+class _TextColumnWriter:
+    """
+    Writer of a JSON lines file with one row of text data per line
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def append(self, values: np.ndarray) -> None:
+        self._file.writelines(json.dumps(row) + '\n'
+                              for row in values.tolist())
+
+    def close(self) -> None:
+        self._file.close()
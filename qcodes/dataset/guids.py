@@ -144,22 +144,21 @@ def filter_guids_by_parts(guids: Sequence[str],
     Returns:
         A list of GUIDs that matches the supplied parts.
     """
-    matched_guids = []
-    for guid in guids:
-        guid_dict = parse_guid(guid)
-        match = True
-        if sample_id is not None:
-            if guid_dict['sample'] != sample_id:
-                match = False
-        if location is not None:
-            if guid_dict['location'] != location:
-                match = False
-        if work_station is not None:
-            if guid_dict['work_station'] != work_station:
-                match = False
-
-        if match:
-            matched_guids.append(guid)
+    # compare the hex strings of the parts instead of parsing every guid
+    # (see generate_guid for the layout of the guid)
+    matched_guids = list(guids)
+    if sample_id is not None:
+        sample_str = f'{sample_id:08x}'
+        matched_guids = [guid for guid in matched_guids
+                         if guid[:8].lower() == sample_str]
+    if location is not None:
+        loc_str = f'{location:02x}'
+        matched_guids = [guid for guid in matched_guids
+                         if guid[9:11].lower() == loc_str]
+    if work_station is not None:
+        stat_str = f'{work_station:06x}'
+        matched_guids = [guid for guid in matched_guids
+                         if (guid[11:13] + guid[14:18]).lower() == stat_str]
     return matched_guids
 
 
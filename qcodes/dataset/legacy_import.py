@@ -92,7 +92,7 @@ def import_dat_file(location: str,
                              exp=exp)
     run_ids = []
     with meas.run() as datasaver:
-        datasaver.dataset.add_metadata('snapshot', json.dumps(loaded_data.snapshot()))
+        datasaver.dataset.add_snapshot(json.dumps(loaded_data.snapshot()))
         for arrayname, array in loaded_data.arrays.items():
             if not array.is_setpoint:
                 run_id = store_array_to_database(datasaver, array)
@@ -7,10 +7,12 @@ using the :class:`.Measurement` class.
 
 import json
 import logging
+from queue import Queue
+from threading import Thread
 from time import perf_counter
-from typing import (Callable, Union, Dict, Tuple, List, Sequence, cast, Set,
+from typing import (Callable, Union, Dict, Tuple, List, Sequence, cast,
                     MutableMapping, MutableSequence, Optional, Any, TypeVar,
-                    Mapping)
+                    Mapping, NamedTuple, FrozenSet)
 from inspect import signature
 from numbers import Number
 from copy import deepcopy
@@ -30,6 +32,8 @@ from qcodes.dataset.descriptions.dependencies import (
     InterDependencies_, DependencyError, InferenceError)
 from qcodes.dataset.data_set import DataSet, VALUE, load_by_guid
 from qcodes.dataset.linked_datasets.links import Link
+from qcodes.dataset.sqlite.database import (_array_compression_flags,
+                                            _validate_compression, connect)
 from qcodes.utils.helpers import NumpyJSONEncoder
 from qcodes.utils.deprecate import deprecate
 import qcodes.utils.validators as vals
@@ -47,6 +51,8 @@ res_type = Tuple[Union[_BaseParameter, str],
                  Union[scalar_res_types, np.ndarray,
                        Sequence[scalar_res_types]]]
 setpoints_type = Sequence[Union[str, _BaseParameter]]
+# a chunk of results: the equally long columns of values of some parameters
+result_columns_type = Dict[str, Union[np.ndarray, List[VALUE]]]
 
 
 class ParameterTypeError(Exception):
@@ -69,6 +75,235 @@ def is_number(thing: Any) -> bool:
         return False
 
 
+class _BackgroundWriter(Thread):
+    """
+    Thread that writes the results of a :class:`DataSaver` to the database,
+    such that ``add_result`` never has to wait for the database.
+
+    Batches of results are handed to the writer via a bounded queue. If the
+    queue is full, ``put`` blocks until the writer has caught up
+    (back-pressure). The batches are written in the order they were put.
+    The writer owns its own connection to the database, which is created
+    and closed in the writer thread.
+
+    If writing fails, the writer stops writing, and the exception is
+    re-raised (as the cause of a ``RuntimeError``) by the next call to
+    ``put`` and by ``shutdown``.
+    """
+
+    def __init__(self, dataset: DataSet, max_queue_size: int) -> None:
+        super().__init__(daemon=True)
+        if dataset.path_to_db == '':
+            raise ValueError('Can not write in the background to an '
+                             'in-memory database.')
+        self._path_to_db = dataset.path_to_db
+        self._run_id = dataset.run_id
+        self._queue: 'Queue[Optional[List[result_columns_type]]]' = Queue(
+            maxsize=max_queue_size)
+        self._exception: Optional[Exception] = None
+
+        self.n_writes = 0
+        self.total_write_time = 0.0
+        self.last_write_latency = 0.0
+        self.max_write_latency = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of batches of results waiting to be written
+        """
+        return self._queue.qsize()
+
+    def put(self, results: List[result_columns_type]) -> None:
+        """
+        Hand a batch of results over to the writer. Blocks if the queue is
+        full.
+        """
+        self._raise_if_failed()
+        self._queue.put(results)
+
+    def shutdown(self) -> None:
+        """
+        Wait for all batches to be written and stop the writer thread.
+        """
+        self._queue.put(None)
+        self.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self) -> None:
+        if self._exception is not None:
+            raise RuntimeError('Writing results to the database in the '
+                               'background failed.') from self._exception
+
+    def run(self) -> None:
+        conn = connect(self._path_to_db)
+        try:
+            # the written results are published to the subscribers of the
+            # run, which are shared with the dataset of the DataSaver
+            dataset = DataSet(conn=conn, run_id=self._run_id)
+            self._write_until_shutdown(dataset)
+        except Exception as e:
+            log.exception('Background writer failed to start')
+            self._exception = e
+            # keep draining the queue, such that nobody blocks on it
+            self._write_until_shutdown(None)
+        finally:
+            conn.close()
+
+    def _write_until_shutdown(self, dataset: Optional[DataSet]) -> None:
+        while True:
+            results = self._queue.get()
+            if results is None:
+                break
+            if dataset is None or self._exception is not None:
+                continue
+            t_start = perf_counter()
+            try:
+                dataset.add_result_columns(results)
+            except Exception as e:
+                log.exception('Could not write results to the database')
+                self._exception = e
+                continue
+            latency = perf_counter() - t_start
+            self.n_writes += 1
+            self.total_write_time += latency
+            self.last_write_latency = latency
+            self.max_write_latency = max(self.max_write_latency, latency)
+
+
+class _ShapedBuffer:
+    """
+    Preallocated in-memory buffer of the values of a parameter with a
+    declared shape. The values are filled into the buffer in the order in
+    which they are added, i.e. in C order of the shape, and the values that
+    have not been added yet are NaN (or None for non-numeric values). If
+    more values are added than the shape has, the buffer grows and loses
+    its shape.
+    """
+
+    def __init__(self, shape: Tuple[int, ...]) -> None:
+        self.shape = shape
+        self.n_values = 0
+        self._data: Optional[np.ndarray] = None
+
+    def append(self, values: np.ndarray) -> None:
+        values = values.ravel()
+        if self._data is None:
+            self._data = self._allocate(values.dtype,
+                                        int(np.prod(self.shape,
+                                                    dtype=np.int64)))
+        end = self.n_values + values.size
+        if end > self._data.size:
+            grown = self._allocate(self._data.dtype,
+                                   max(end, 2 * self._data.size))
+            grown[:self.n_values] = self._data[:self.n_values]
+            self._data = grown
+        self._data[self.n_values:end] = values
+        self.n_values = end
+
+    @staticmethod
+    def _allocate(dtype: np.dtype, size: int) -> np.ndarray:
+        if dtype.kind in 'fc':
+            return np.full(size, np.nan, dtype=dtype)
+        elif dtype.kind in 'iub':
+            return np.full(size, np.nan)
+        else:
+            return np.full(size, None, dtype=object)
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        The values in the shape of the buffer, or flat if more values than
+        the shape has have been added
+        """
+        if self._data is None:
+            return np.full(self.shape, np.nan)
+        if self.n_values > int(np.prod(self.shape, dtype=np.int64)):
+            return self._data[:self.n_values]
+        return self._data.reshape(self.shape)
+
+
+def _array_value(value: np.ndarray) -> np.ndarray:
+    """
+    An 'array' value as it is stored, a single value becomes an array of
+    one value
+    """
+    if value.shape:
+        return value
+    return np.reshape(value, (1,))
+
+
+class _ResultTree(NamedTuple):
+    """
+    A top level parameter of some results with its setpoints and the
+    parameters inferred from it
+    """
+    toplevel: ParamSpecBase
+    setpoints: Tuple[ParamSpecBase, ...]
+    inferred: Tuple[ParamSpecBase, ...]
+    # the name, the paramspec and the converter of the value of each of
+    # the parameters of the tree
+    columns: Tuple[Tuple[str, ParamSpecBase, Callable[[Any], VALUE]], ...]
+
+
+class _ResultSchema:
+    """
+    Everything that :meth:`DataSaver.add_result` works out about the
+    results of a set of parameters that does not depend on their values:
+    that the dependencies of the parameters are met, the parameter trees
+    and the allowed types and converters of the values. A schema is
+    compiled the first time results of a set of parameters are added, and
+    reused for all later results of the same set of parameters.
+
+    Args:
+        interdeps: the interdependencies of the measurement
+        params: the parameters of the results
+
+    Raises:
+        ValueError: if some setpoints or inferred parameters of the
+            parameters are missing
+    """
+
+    allowed_kinds = {'numeric': 'iuf', 'text': 'SU', 'array': 'iufc',
+                     'complex': 'c'}
+
+    converters: Dict[str, Callable[[Any], VALUE]] = {
+        'numeric': float, 'text': str, 'complex': complex,
+        'array': _array_value}
+
+    def __init__(self, interdeps: InterDependencies_,
+                 params: FrozenSet[ParamSpecBase]) -> None:
+        try:
+            interdeps.validate_subset(list(params))
+        except (DependencyError, InferenceError) as err:
+            raise ValueError('Can not add result, some required parameters '
+                             'are missing.') from err
+
+        # the results are keyed by the paramspecs of the interdependencies
+        # by name, which are looked up much faster than equal paramspecs
+        self._paramspecs = interdeps._id_to_paramspec
+        self.kinds = tuple((ps, self.allowed_kinds[ps.type])
+                           for ps in params)
+        self.trees: Tuple[_ResultTree, ...] = tuple(
+            self._tree(interdeps, toplevel)
+            for toplevel in interdeps.dependencies if toplevel in params)
+        self.standalones = tuple(self._paramspecs[ps.name]
+                                 for ps in interdeps.standalones
+                                 if ps in params)
+
+    def _tree(self, interdeps: InterDependencies_,
+              toplevel: ParamSpecBase) -> _ResultTree:
+        setpoints = tuple(self._paramspecs[ps.name]
+                          for ps in interdeps.dependencies[toplevel])
+        inferred = tuple(self._paramspecs[ps.name]
+                         for ps in interdeps.inferences.get(toplevel, ())
+                         if ps not in setpoints)
+        toplevel = self._paramspecs[toplevel.name]
+        columns = tuple((ps.name, ps, self.converters[ps.type])
+                        for ps in (toplevel, *setpoints, *inferred))
+        return _ResultTree(toplevel, setpoints, inferred, columns)
+
+
 class DataSaver:
     """
     The class used by the :class:`Runner` context manager to handle the
@@ -77,9 +312,14 @@ class DataSaver:
 
     default_callback: Optional[dict] = None
 
+    # the number of flushed batches of results that may wait to be written
+    # by the background writer before add_result blocks
+    background_write_queue_size: int = 100
+
     def __init__(self, dataset: DataSet,
                  write_period: float,
-                 interdeps: InterDependencies_) -> None:
+                 interdeps: InterDependencies_,
+                 write_in_background: bool = False) -> None:
         self._dataset = dataset
         if DataSaver.default_callback is not None \
                 and 'run_tables_subscription_callback' \
@@ -90,7 +330,7 @@ class DataSaver:
                 'run_tables_subscription_min_wait']
             min_count = DataSaver.default_callback[
                 'run_tables_subscription_min_count']
-            snapshot = dataset.get_metadata('snapshot')
+            snapshot = dataset.snapshot_raw
             self._dataset.subscribe(callback,
                                     min_wait=min_wait,
                                     min_count=min_count,
@@ -104,15 +344,33 @@ class DataSaver:
 
         self._interdeps = interdeps
         self.write_period = float(write_period)
-        # self._results will be filled by add_result
-        self._results: List[Dict[str, VALUE]] = []
+        # self._results will be filled by add_result with chunks of columns
+        self._results: List[result_columns_type] = []
         self._last_save_time = perf_counter()
-        self._known_dependencies: Dict[str, List[str]] = {}
+        # the compiled schemas of the results, by set of parameters
+        self._schemas: Dict[FrozenSet[ParamSpecBase], _ResultSchema] = {}
         self.parent_datasets: List[DataSet] = []
 
+        # the preallocated buffers of the results of the parameters with a
+        # declared shape and their setpoints, by top level parameter name
+        self._buffers: Dict[str, Dict[str, _ShapedBuffer]] = {}
+        for name, shape in self._dataset.shapes.items():
+            paramspec = interdeps._id_to_paramspec.get(name)
+            if paramspec is None:
+                continue
+            tree = [paramspec, *interdeps.dependencies.get(paramspec, ())]
+            self._buffers[name] = {ps.name: _ShapedBuffer(shape)
+                                   for ps in tree}
+
         for link in self._dataset.parent_dataset_links:
             self.parent_datasets.append(load_by_guid(link.tail))
 
+        self._background_writer: Optional[_BackgroundWriter] = None
+        if write_in_background:
+            self._background_writer = _BackgroundWriter(
+                self._dataset, self.background_write_queue_size)
+            self._background_writer.start()
+
     def add_result(self, *res_tuple: res_type) -> None:
         """
         Add a result to the measurement results. Represents a measurement
@@ -163,11 +421,11 @@ class DataSaver:
                 results_dict.update(
                     self._unpack_partial_result(partial_result))
 
-        self._validate_result_deps(results_dict)
-        self._validate_result_shapes(results_dict)
-        self._validate_result_types(results_dict)
+        schema = self._result_schema(results_dict)
+        self._validate_result_shapes(results_dict, schema)
+        self._validate_result_types(results_dict, schema)
 
-        self._enqueue_results(results_dict)
+        self._enqueue_results(results_dict, schema)
 
         if perf_counter() - self._last_save_time > self.write_period:
             self.flush_data_to_database()
@@ -318,59 +576,62 @@ class DataSaver:
 
         return result_dict
 
-    def _validate_result_deps(
-            self, results_dict: Mapping[ParamSpecBase, values_type]) -> None:
+    def _result_schema(
+            self, results_dict: Mapping[ParamSpecBase, np.ndarray]
+            ) -> _ResultSchema:
         """
-        Validate that the dependencies of the ``results_dict`` are met,
-        meaning that (some) values for all required setpoints and inferences
-        are present
+        The schema of results of the parameters of the ``results_dict``,
+        which is compiled (validating that the dependencies of the
+        parameters are met, meaning that (some) values for all required
+        setpoints and inferences are present) the first time results of
+        these parameters are added
         """
-        try:
-            self._interdeps.validate_subset(list(results_dict.keys()))
-        except (DependencyError, InferenceError) as err:
-            raise ValueError('Can not add result, some required parameters '
-                             'are missing.') from err
+        params = frozenset(results_dict)
+        schema = self._schemas.get(params)
+        if schema is None:
+            schema = _ResultSchema(self._interdeps, params)
+            self._schemas[params] = schema
+        return schema
 
+    @staticmethod
     def _validate_result_shapes(
-            self, results_dict: Mapping[ParamSpecBase, values_type]) -> None:
+            results_dict: Mapping[ParamSpecBase, np.ndarray],
+            schema: _ResultSchema) -> None:
         """
         Validate that all sizes of the ``results_dict`` are consistent.
         This means that array-values of parameters and their setpoints are
         of the same size, whereas parameters with no setpoint relation to
         each other can have different sizes.
         """
-        toplevel_params = (set(self._interdeps.dependencies)
-                           .intersection(set(results_dict)))
-        for toplevel_param in toplevel_params:
-            required_shape = np.shape(results_dict[toplevel_param])
-            for setpoint in self._interdeps.dependencies[toplevel_param]:
+        for tree in schema.trees:
+            required_shape = results_dict[tree.toplevel].shape
+            for setpoint in tree.setpoints:
                 # a setpoint is allowed to be a scalar; shape is then ()
-                setpoint_shape = np.shape(results_dict[setpoint])
-                if setpoint_shape not in [(), required_shape]:
+                setpoint_shape = results_dict[setpoint].shape
+                if setpoint_shape and setpoint_shape != required_shape:
                     raise ValueError(f'Incompatible shapes. Parameter '
-                                     f"{toplevel_param.name} has shape "
+                                     f"{tree.toplevel.name} has shape "
                                      f"{required_shape}, but its setpoint "
                                      f"{setpoint.name} has shape "
                                      f"{setpoint_shape}.")
 
     @staticmethod
     def _validate_result_types(
-            results_dict: Dict[ParamSpecBase, np.ndarray]) -> None:
+            results_dict: Mapping[ParamSpecBase, np.ndarray],
+            schema: _ResultSchema) -> None:
         """
         Validate the type of the results
         """
-
-        allowed_kinds = {'numeric': 'iuf', 'text': 'SU', 'array': 'iufc',
-                         'complex': 'c'}
-
-        for ps, vals in results_dict.items():
-                if vals.dtype.kind not in allowed_kinds[ps.type]:
-                    raise ValueError(f'Parameter {ps.name} is of type '
-                                     f'"{ps.type}", but got a result of '
-                                     f'type {vals.dtype} ({vals}).')
+        for ps, kinds in schema.kinds:
+            vals = results_dict[ps]
+            if vals.dtype.kind not in kinds:
+                raise ValueError(f'Parameter {ps.name} is of type '
+                                 f'"{ps.type}", but got a result of '
+                                 f'type {vals.dtype} ({vals}).')
 
     def _enqueue_results(
-            self, result_dict: Mapping[ParamSpecBase, values_type]) -> None:
+            self, result_dict: Mapping[ParamSpecBase, np.ndarray],
+            schema: _ResultSchema) -> None:
         """
         Enqueue the results into self._results
 
@@ -379,160 +640,159 @@ class DataSaver:
         effectively mimicking making one call to add_result per parameter
         tree.
 
-        Deal with 'numeric' type parameters. If a 'numeric' top level parameter
-        has non-scalar shape, it must be unrolled into a list of dicts of
-        single values (database).
-        """
-
-        interdeps = self._interdeps
-
-        toplevel_params = (set(interdeps.dependencies)
-                           .intersection(set(result_dict)))
-        for toplevel_param in toplevel_params:
-            inff_params = set(interdeps.inferences.get(toplevel_param, ()))
-            deps_params = set(interdeps.dependencies.get(toplevel_param, ()))
-            all_params = (inff_params
-                          .union(deps_params)
-                          .union({toplevel_param}))
-            res_dict: Dict[str, VALUE] = {}  # the dict to append to _results
-            if toplevel_param.type == 'array':
-                res_list = self._finalize_res_dict_array(
-                    result_dict, all_params)
-            elif toplevel_param.type in ('numeric', 'text', 'complex'):
-                res_list = self._finalize_res_dict_numeric_text_or_complex(
-                               result_dict, toplevel_param,
-                               inff_params, deps_params)
+        The results are enqueued as chunks of columns, one column per
+        parameter. Deal with 'numeric' type parameters. If a 'numeric' top
+        level parameter has non-scalar shape, it is unrolled into flat
+        columns of single values (database).
+        """
+        for tree in schema.trees:
+            if (tree.toplevel.type == 'array'
+                    or result_dict[tree.toplevel].shape == ()):
+                res_columns = self._finalize_res_columns_single_values(
+                    result_dict, tree)
             else:
-                res_dict = {ps.name: result_dict[ps] for ps in all_params}
-                res_list = [res_dict]
-            self._results += res_list
+                res_columns = self._finalize_res_columns_numeric_text_or_complex(
+                    result_dict, tree)
+            self._results.append(res_columns)
+            self._buffer_results(tree.toplevel.name, res_columns)
 
         # Finally, handle standalone parameters
 
-        standalones = (set(interdeps.standalones)
-                       .intersection(set(result_dict)))
+        if schema.standalones:
+            stdln_dict = {st: result_dict[st] for st in schema.standalones}
+            stdln_columns = self._finalize_res_columns_standalones(
+                stdln_dict)
+            self._results += stdln_columns
+            for columns in stdln_columns:
+                for name in columns:
+                    self._buffer_results(name, columns)
+
+    def _buffer_results(self, name: str,
+                        columns: result_columns_type) -> None:
+        """
+        Fill the columns of the results of a parameter tree into its
+        buffers, if the top level parameter has a declared shape. Like in
+        :meth:`.DataSet.get_parameter_data`, single values of setpoints of
+        an 'array' parameter are expanded to the shape of its arrays.
+        """
+        buffers = self._buffers.get(name)
+        if buffers is None:
+            return
+        n_values = np.asarray(columns[name]).size
+        for param, buffer in buffers.items():
+            column = columns.get(param)
+            if column is None:
+                continue
+            values = np.asarray(column)
+            if 0 < values.size < n_values:
+                values = np.repeat(values, n_values // values.size)
+            buffer.append(values)
 
-        if standalones:
-            stdln_dict = {st: result_dict[st] for st in standalones}
-            self._results += self._finalize_res_dict_standalones(stdln_dict)
+    @property
+    def shaped_data(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        The results added so far to the parameters with a declared shape
+        (see :meth:`Measurement.set_shapes`) and their setpoints, in the
+        same format as :meth:`.DataSet.get_parameter_data`. The arrays are
+        preallocated in the declared shapes, and the values that have not
+        been added yet are NaN (or None for non-numeric values). The arrays
+        are views on the buffers, which are filled further as results are
+        added.
+        """
+        return {name: {param: buffer.data
+                       for param, buffer in buffers.items()}
+                for name, buffers in self._buffers.items()}
 
     @staticmethod
-    def _finalize_res_dict_array(
-            result_dict: Mapping[ParamSpecBase, values_type],
-            all_params: Set[ParamSpecBase]) -> List[Dict[str, VALUE]]:
-        """
-        Make a list of res_dicts out of the results for a 'array' type
-        parameter. The results are assumed to already have been validated for
-        type and shape
-        """
-        def reshaper(val: Any, ps: ParamSpecBase) -> VALUE:
-            paramtype = ps.type
-            if paramtype == 'numeric':
-                return float(val)
-            elif paramtype == 'text':
-                return str(val)
-            elif paramtype == 'complex':
-                return complex(val)
-            elif paramtype == 'array':
-                if val.shape:
-                    return val
-                else:
-                    return np.reshape(val, (1,))
-            else:
-                raise ValueError(f'Cannot handle unknown paramtype '
-                                 f'{paramtype!r} of {ps!r}.')
-
-        res_dict = {ps.name: reshaper(result_dict[ps], ps)
-                    for ps in all_params}
-
-        return [res_dict]
+    def _finalize_res_columns_single_values(
+            result_dict: Mapping[ParamSpecBase, np.ndarray],
+            tree: _ResultTree) -> result_columns_type:
+        """
+        Make the columns (of a single value each) out of the results for an
+        'array' type parameter or a single value of a 'numeric', 'text' or
+        'complex' type parameter. The results are assumed to already have
+        been validated for type and shape
+        """
+        return {name: [convert(result_dict[ps])]
+                for name, ps, convert in tree.columns}
 
     @staticmethod
-    def _finalize_res_dict_numeric_text_or_complex(
+    def _finalize_res_columns_numeric_text_or_complex(
             result_dict: Mapping[ParamSpecBase, np.ndarray],
-            toplevel_param: ParamSpecBase,
-            inff_params: Set[ParamSpecBase],
-            deps_params: Set[ParamSpecBase]) -> List[Dict[str, VALUE]]:
+            tree: _ResultTree) -> result_columns_type:
         """
-        Make a res_dict in the format expected by DataSet.add_results out
-        of the results for a 'numeric' or text type parameter. This includes
-        replicating and unrolling values as needed and also handling the corner
-        case of np.array(1) kind of values
+        Make the columns in the format expected by DataSet.add_result_columns
+        out of the array of results for a 'numeric' or text type parameter.
+        This includes replicating and unrolling values as needed
         """
+        # We massage all values into flat np.arrays of the same length,
+        # which are the columns
+        flat_results: Dict[str, np.ndarray] = {}
+
+        toplevel_val = result_dict[tree.toplevel]
+        flat_results[tree.toplevel.name] = toplevel_val.ravel()
+        N = len(flat_results[tree.toplevel.name])
+        for param in tree.setpoints + tree.inferred:
+            if result_dict[param].shape == ():
+                flat_results[param.name] = np.repeat(result_dict[param], N)
+            else:
+                flat_results[param.name] = result_dict[param].ravel()
 
-        res_list: List[Dict[str, VALUE]] = []
-        all_params = inff_params.union(deps_params).union({toplevel_param})
-
-        t_map = {'numeric': float, 'text': str, 'complex': complex}
-
-        toplevel_shape = result_dict[toplevel_param].shape
-        if toplevel_shape == ():
-            # In the case of a single value, life is reasonably simple
-            res_list = [{ps.name: t_map[ps.type](result_dict[ps])
-                         for ps in all_params}]
-        else:
-            # We first massage all values into np.arrays of the same
-            # shape
-            flat_results: Dict[str, np.ndarray] = {}
-
-            toplevel_val = result_dict[toplevel_param]
-            flat_results[toplevel_param.name] = toplevel_val.ravel()
-            N = len(flat_results[toplevel_param.name])
-            for dep in deps_params:
-                if result_dict[dep].shape == ():
-                    flat_results[dep.name] = np.repeat(result_dict[dep], N)
-                else:
-                    flat_results[dep.name] = result_dict[dep].ravel()
-            for inff in inff_params:
-                if np.shape(result_dict[inff]) == ():
-                    flat_results[inff.name] = np.repeat(result_dict[dep], N)
-                else:
-                    flat_results[inff.name] = result_dict[inff].ravel()
-
-            # And then put everything into the list
-
-            res_list = [{p.name: flat_results[p.name][ind] for p in all_params}
-                        for ind in range(N)]
-
-        return res_list
+        return flat_results
 
     @staticmethod
-    def _finalize_res_dict_standalones(
+    def _finalize_res_columns_standalones(
             result_dict: Mapping[ParamSpecBase, np.ndarray]
-            ) -> List[Dict[str, VALUE]]:
+            ) -> List[result_columns_type]:
         """
-        Massage all standalone parameters into the correct shape
+        Massage all standalone parameters into the correct shape, one chunk
+        of columns per parameter
         """
-        res_list: List[Dict[str, VALUE]] = []
+        res_columns: List[result_columns_type] = []
         for param, value in result_dict.items():
+            column: Union[np.ndarray, List[VALUE]]
             if param.type == 'text':
                 if value.shape:
-                    res_list += [{param.name: str(val)} for val in value]
+                    column = [str(val) for val in value]
                 else:
-                    res_list += [{param.name: str(value)}]
+                    column = [str(value)]
             elif param.type == 'numeric':
-                if value.shape:
-                    res_list += [{param.name: number} for number in value]
+                if value.ndim == 1:
+                    column = value
+                elif value.shape:
+                    column = list(value)
                 else:
-                    res_list += [{param.name: float(value)}]
+                    column = [float(value)]
             elif param.type == 'complex':
-                if value.shape:
-                    res_list += [{param.name: number} for number in value]
+                if value.ndim == 1:
+                    column = value
+                elif value.shape:
+                    column = list(value)
                 else:
-                    res_list += [{param.name: complex(value)}]
+                    column = [complex(value)]
             else:
-                res_list += [{param.name: value}]
+                column = [value]
+            res_columns.append({param.name: column})
 
-        return res_list
+        return res_columns
 
     def flush_data_to_database(self) -> None:
         """
-        Write the in-memory results to the database.
+        Write the in-memory results to the database. If the results are
+        written in the background, they are handed over to the background
+        writer instead.
+
+        Raises:
+            RuntimeError: If writing in the background has failed
         """
         log.debug('Flushing to database')
-        if self._results != []:
+        if self._results != [] and self._background_writer is not None:
+            self._background_writer.put(self._results)
+            log.debug('Handed results over to background writer')
+            self._results = []
+        elif self._results != []:
             try:
-                write_point = self._dataset.add_results(self._results)
+                write_point = self._dataset.add_result_columns(self._results)
                 log.debug(f'Successfully wrote from index {write_point}')
                 self._results = []
             except Exception as e:
@@ -540,6 +800,53 @@ class DataSaver:
         else:
             log.debug('No results to flush')
 
+    def _stop_background_writer(self) -> None:
+        """
+        Flush the remaining results, wait for the background writer (if
+        any) to write everything, and stop it.
+
+        Raises:
+            RuntimeError: If writing in the background has failed
+        """
+        if self._background_writer is None:
+            return
+        writer = self._background_writer
+        try:
+            self.flush_data_to_database()
+        finally:
+            self._background_writer = None
+            writer.shutdown()
+
+    @property
+    def write_queue_depth(self) -> int:
+        """
+        The number of flushed batches of results that are waiting to be
+        written by the background writer. Always 0 if the results are not
+        written in the background.
+        """
+        if self._background_writer is None:
+            return 0
+        return self._background_writer.queue_depth
+
+    @property
+    def write_metrics(self) -> Dict[str, float]:
+        """
+        Metrics of the background writer: the current queue depth, the
+        number of performed writes and the last, mean and max latency (in
+        seconds) of those writes. Empty if the results are not written in
+        the background.
+        """
+        writer = self._background_writer
+        if writer is None:
+            return {}
+        n_writes = writer.n_writes
+        return {'queue_depth': writer.queue_depth,
+                'n_writes': n_writes,
+                'last_write_latency': writer.last_write_latency,
+                'mean_write_latency': (writer.total_write_time / n_writes
+                                       if n_writes else 0.0),
+                'max_write_latency': writer.max_write_latency}
+
     @property
     def run_id(self) -> int:
         return self._dataset.run_id
@@ -575,7 +882,11 @@ class Runner:
                                         Union[MutableSequence,
                                               MutableMapping]]] = None,
             parent_datasets: List[Dict] = [],
-            extra_log_info: str = '') -> None:
+            extra_log_info: str = '',
+            write_in_background: bool = False,
+            indexed_parameters: Sequence[str] = (),
+            compression: Optional[Mapping[str, str]] = None,
+            shapes: Optional[Mapping[str, Sequence[int]]] = None) -> None:
 
         self.enteractions = enteractions
         self.exitactions = exitactions
@@ -596,6 +907,10 @@ class Runner:
         self.name = name if name else 'results'
         self._parent_datasets = parent_datasets
         self._extra_log_info = extra_log_info
+        self._write_in_background = write_in_background
+        self._indexed_parameters = indexed_parameters
+        self._compression = compression
+        self._shapes = shapes
 
     def __enter__(self) -> DataSaver:
         # TODO: should user actions really precede the dataset?
@@ -626,6 +941,11 @@ class Runner:
         else:
             self.ds.set_interdependencies(self._interdependencies)
 
+        if self._compression:
+            self.ds.set_compression(self._compression)
+        if self._shapes:
+            self.ds.set_shapes(self._shapes)
+
         links = [Link(head=self.ds.guid, **pdict)
                  for pdict in self._parent_datasets]
         self.ds.parent_dataset_links = links
@@ -646,7 +966,8 @@ class Runner:
 
         self.datasaver = DataSaver(dataset=self.ds,
                                    write_period=self.write_period,
-                                   interdeps=self._interdependencies)
+                                   interdeps=self._interdependencies,
+                                   write_in_background=self._write_in_background)
 
         return self.datasaver
 
@@ -654,6 +975,13 @@ class Runner:
                  exception_type, exception_value, traceback
                  ) -> None:
         with DelayedKeyboardInterrupt():
+            # the dataset must be completed even if writing in the
+            # background failed, so that error is raised at the very end
+            writer_error: Optional[RuntimeError] = None
+            try:
+                self.datasaver._stop_background_writer()
+            except RuntimeError as e:
+                writer_error = e
             self.datasaver.flush_data_to_database()
 
             # perform the "teardown" events
@@ -671,6 +999,11 @@ class Runner:
                 log.warning('An exception occured in measurement with guid: '
                             f'{self.ds.guid};\nTraceback:\n{stream.getvalue()}')
 
+            # the indexes are built once all the results are written, such
+            # that they do not slow down the writing
+            if self._indexed_parameters:
+                self.ds.add_index(*self._indexed_parameters)
+
             # and finally mark the dataset as closed, thus
             # finishing the measurement
             self.ds.mark_completed()
@@ -678,6 +1011,14 @@ class Runner:
                      f'{self._extra_log_info}')
             self.ds.unsubscribe_all()
 
+            if writer_error is not None:
+                # an exception of the measurement itself takes precedence
+                if exception_type is None:
+                    raise writer_error
+                log.error('Writing results to the database in the '
+                          'background failed in measurement with guid: '
+                          f'{self.ds.guid}', exc_info=writer_error)
+
 
 T = TypeVar('T', bound='Measurement')
 
@@ -695,11 +1036,21 @@ class Measurement:
         name: Name of the experiment. This will be passed down to the dataset
             produced by the measurement. If not given, a default value of
             'results' is used for the dataset.
+        array_compression: The compression of the values of all 'array'
+            parameters that are not registered with a compression of their
+            own, one of
+            :data:`qcodes.dataset.sqlite.database.ARRAY_COMPRESSIONS`. If not
+            given, the values are not compressed.
+        shapes: The expected shapes of the data of parameters, see
+            :meth:`set_shapes`.
     """
 
     def __init__(self, exp: Optional[Experiment] = None,
                  station: Optional[qc.Station] = None,
-                 name: str = '') -> None:
+                 name: str = '',
+                 array_compression: Optional[str] = None,
+                 shapes: Optional[Mapping[str, Sequence[int]]] = None
+                 ) -> None:
         self.exitactions: List[Tuple[Callable, Sequence]] = []
         self.enteractions: List[Tuple[Callable, Sequence]] = []
         self.subscribers: List[Tuple[Callable, Union[MutableSequence,
@@ -712,6 +1063,13 @@ class Measurement:
         self._interdeps = InterDependencies_()
         self._parent_datasets: List[Dict] = []
         self._extra_log_info: str = ''
+        self._indexed_parameters: List[str] = []
+        _array_compression_flags(array_compression)
+        self.array_compression = array_compression
+        self._compression: Dict[str, str] = {}
+        self._shapes: Dict[str, Tuple[int, ...]] = {}
+        if shapes is not None:
+            self.set_shapes(shapes)
 
     @property
     def parameters(self) -> Dict[str, ParamSpecBase]:
@@ -799,7 +1157,10 @@ class Measurement:
             self: T, parameter: _BaseParameter,
             setpoints: setpoints_type = None,
             basis: setpoints_type = None,
-            paramtype: Optional[str] = None) -> T:
+            paramtype: Optional[str] = None,
+            indexed: bool = False,
+            compression: Optional[str] = None,
+            shape: Optional[Sequence[int]] = None) -> T:
         """
         Add QCoDeS Parameter to the dataset produced by running this
         measurement.
@@ -815,6 +1176,20 @@ class Measurement:
             paramtype: Type of the parameter, i.e. the SQL storage class,
                 If None the paramtype will be inferred from the parameter type
                 and the validator of the supplied parameter.
+            indexed: if True, the values of the parameter are indexed in the
+                database once the measurement is done, such that the results
+                can quickly be selected by the values of this parameter, see
+                :meth:`.DataSet.add_index`. Only a plain Parameter can be
+                indexed, typically a setpoint.
+            compression: The compression of the values of the parameter, one
+                of :data:`qcodes.dataset.sqlite.database.ARRAY_COMPRESSIONS`
+                for a parameter of type 'array' that is not a MultiParameter,
+                or 'categorical' for a parameter of type 'text', see
+                :meth:`.DataSet.set_compression`. If not given, the
+                ``array_compression`` of the measurement is used for 'array'
+                parameters.
+            shape: The expected shape of the data of the parameter, see
+                :meth:`set_shapes`.
         """
         if not isinstance(parameter, _BaseParameter):
             raise ValueError('Can not register object of type {}. Can only '
@@ -838,6 +1213,21 @@ class Measurement:
         # a more robust Parameter2String function?
         name = str(parameter)
 
+        if indexed and (paramtype == 'array'
+                        or not isinstance(parameter, Parameter)
+                        or isinstance(parameter, (ParameterWithSetpoints,
+                                                  MultiParameterWithSetpoints))):
+            raise ValueError('Can only index a Parameter with a single '
+                             'value per result.')
+
+        if compression is not None and isinstance(
+                parameter, (MultiParameter, MultiParameterWithSetpoints)):
+            raise ValueError('Can not compress a MultiParameter, use the '
+                             'array_compression of the Measurement instead.')
+        _validate_compression(paramtype, compression)
+        if shape is not None:
+            shape = self._validate_shape(name, shape)
+
         if isinstance(parameter, ArrayParameter):
             self._register_arrayparameter(parameter,
                                           setpoints,
@@ -865,10 +1255,17 @@ class Measurement:
                                      parameter.unit,
                                      setpoints,
                                      basis, paramtype)
+            if indexed:
+                self._add_indexed_parameter(name)
         else:
             raise RuntimeError("Does not know how to register a parameter"
                                f"of type {type(parameter)}")
 
+        if compression is not None:
+            self._compression[name] = compression
+        if shape is not None:
+            self._shapes[name] = shape
+
         return self
 
     @staticmethod
@@ -1134,7 +1531,10 @@ class Measurement:
             label: str = None, unit: str = None,
             basis: setpoints_type = None,
             setpoints: setpoints_type = None,
-            paramtype: str = 'numeric') -> T:
+            paramtype: str = 'numeric',
+            indexed: bool = False,
+            compression: Optional[str] = None,
+            shape: Optional[Sequence[int]] = None) -> T:
         """
         Register a custom parameter with this measurement
 
@@ -1151,13 +1551,92 @@ class Measurement:
                 of parameters already registered in the measurement that
                 are the setpoints of this parameter
             paramtype: Type of the parameter, i.e. the SQL storage class
+            indexed: if True, the values of the parameter are indexed in the
+                database once the measurement is done, see
+                :meth:`register_parameter`
+            compression: The compression of the values of an 'array' or
+                'text' parameter, see :meth:`register_parameter`
+            shape: The expected shape of the data of the parameter, see
+                :meth:`set_shapes`.
+        """
+        if indexed and paramtype == 'array':
+            raise ValueError('Can only index a Parameter with a single '
+                             'value per result.')
+        _validate_compression(paramtype, compression)
+        if shape is not None:
+            shape = self._validate_shape(name, shape)
+        self._register_parameter(name,
+                                 label,
+                                 unit,
+                                 setpoints,
+                                 basis,
+                                 paramtype)
+        if indexed:
+            self._add_indexed_parameter(name)
+        if compression is not None:
+            self._compression[name] = compression
+        if shape is not None:
+            self._shapes[name] = shape
+        return self
+
+    def set_shapes(self: T, shapes: Mapping[str, Optional[Sequence[int]]]
+                   ) -> T:
         """
-        return self._register_parameter(name,
-                                        label,
-                                        unit,
-                                        setpoints,
-                                        basis,
-                                        paramtype)
+        Declare the expected shapes of the data of parameters, e.g.
+        ``{'signal': (n_x, n_y)}`` for a 'signal' measured on a grid of
+        ``n_x`` times ``n_y`` setpoints, or ``{'trace': (n_x, n_points)}``
+        for an 'array' parameter 'trace' of ``n_points`` values measured at
+        ``n_x`` setpoints. The shapes are stored with the dataset (see
+        :meth:`.DataSet.set_shapes`), such that its data is read in these
+        shapes without having to infer them from the setpoints, and they
+        are used to preallocate the buffers of the results in memory, see
+        :attr:`DataSaver.shaped_data`.
+
+        Args:
+            shapes: mapping from the names of (top level) parameters to
+                their shapes. None removes the shape of a parameter.
+        """
+        for name, shape in shapes.items():
+            if shape is None:
+                self._shapes.pop(name, None)
+            else:
+                self._shapes[name] = self._validate_shape(name, shape)
+        return self
+
+    @staticmethod
+    def _validate_shape(name: str, shape: Sequence[int]) -> Tuple[int, ...]:
+        shape = tuple(shape)
+        if not all(isinstance(dim, (int, np.integer)) and dim >= 0
+                   for dim in shape):
+            raise ValueError(f'Invalid shape {shape} of parameter {name}, '
+                             f'a shape must be a sequence of non-negative '
+                             f'integers.')
+        return tuple(int(dim) for dim in shape)
+
+    def _shapes_of_parameters(self) -> Dict[str, Tuple[int, ...]]:
+        """
+        The declared shapes of the registered parameters of this measurement
+        """
+        return {name: shape for name, shape in self._shapes.items()
+                if name in self._interdeps._id_to_paramspec}
+
+    def _add_indexed_parameter(self, name: str) -> None:
+        if name not in self._indexed_parameters:
+            self._indexed_parameters.append(name)
+
+    def _compression_of_parameters(self) -> Dict[str, str]:
+        """
+        The compression of the 'array' parameters of this measurement
+        """
+        compression: Dict[str, str] = {}
+        if self.array_compression is not None:
+            for paramspec in self._interdeps.paramspecs:
+                if paramspec.type == 'array':
+                    compression[paramspec.name] = self.array_compression
+        compression.update((name, codec)
+                           for name, codec in self._compression.items()
+                           if name in self._interdeps._id_to_paramspec)
+        return compression
 
     def unregister_parameter(self,
                              parameter: setpoints_type) -> None:
@@ -1179,6 +1658,10 @@ class Measurement:
             return
 
         self._interdeps = self._interdeps.remove(paramspec)
+        if param in self._indexed_parameters:
+            self._indexed_parameters.remove(param)
+        self._compression.pop(param, None)
+        self._shapes.pop(param, None)
 
         log.info(f'Removed {param} from Measurement.')
 
@@ -1234,9 +1717,17 @@ class Measurement:
 
         return self
 
-    def run(self) -> Runner:
+    def run(self, write_in_background: bool = False) -> Runner:
         """
         Returns the context manager for the experimental run
+
+        Args:
+            write_in_background: if True, results are written to the
+                database by a separate thread with its own connection to the
+                database, such that ``add_result`` does not have to wait for
+                the writes. Errors that happen while writing are raised when
+                the context manager exits (or by the next ``add_result`` call
+                that flushes results).
         """
         return Runner(self.enteractions, self.exitactions,
                       self.experiment, station=self.station,
@@ -1245,4 +1736,8 @@ class Measurement:
                       name=self.name,
                       subscribers=self.subscribers,
                       parent_datasets=self._parent_datasets,
-                      extra_log_info=self._extra_log_info)
+                      extra_log_info=self._extra_log_info,
+                      write_in_background=write_in_background,
+                      indexed_parameters=list(self._indexed_parameters),
+                      compression=self._compression_of_parameters(),
+                      shapes=self._shapes_of_parameters())
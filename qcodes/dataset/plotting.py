@@ -17,7 +17,9 @@ from contextlib import contextmanager
 
 import qcodes as qc
 from qcodes.dataset.data_set import load_by_run_spec, DataSet
-from qcodes.utils.plotting import auto_color_scale_from_config
+from qcodes.utils.plotting import (auto_color_scale_from_config,
+                                   bin_scatter, decimate_lttb,
+                                   decimate_min_max, thin_scatter)
 
 from .data_export import (get_data_by_id, flatten_1D_data_for_plot,
                           get_1D_plottype, get_2D_plottype, reshape_2D_data,
@@ -45,6 +47,10 @@ FIGURE_KWARGS = set(inspect.signature(plt.figure).parameters.keys())
 FIGURE_KWARGS.remove('kwargs')
 SUBPLOTS_KWARGS = SUBPLOTS_OWN_KWARGS.union(FIGURE_KWARGS)
 
+# the size of the bins, in pixels, of the heatmaps that large 2D scatter
+# plots are binned into, which is about the size of a scatter plot marker
+SCATTER_BIN_PIXELS = 4
+
 
 @contextmanager
 def _appropriate_kwargs(plottype: str,
@@ -98,6 +104,7 @@ def plot_dataset(dataset: DataSet,
                                                    Number]] = None,
                  complex_plot_type: str = 'real_and_imag',
                  complex_plot_phase: str = 'radians',
+                 decimate: Optional[bool] = None,
                  **kwargs: Any) -> AxesTupleList:
     """
     Construct all plots for a given dataset
@@ -106,6 +113,7 @@ def plot_dataset(dataset: DataSet,
        * 1D line and scatter plots
        * 2D plots on filled out rectangular grids
        * 2D scatterplots (fallback)
+       * 2D heatmaps of binned scatterplots (for large datasets)
 
     The function can optionally be supplied with a matplotlib axes or a list
     of axes that will be used for plotting. The user should ensure that the
@@ -122,6 +130,15 @@ def plot_dataset(dataset: DataSet,
     for scatter plots and heatmaps if more than 5000 points are supplied.
     This can be overridden by supplying the `rasterized` kwarg.
 
+    Line and scatter plots of more points than
+    ``config.plotting.decimation.threshold`` are decimated to the resolution
+    of the axes before they are handed to matplotlib: lines are reduced to
+    a few points per pixel column (as configured by
+    ``config.plotting.decimation.line_method``), 1D scatter plots are reduced
+    to one point per pixel, and 2D scatter plots are drawn as heatmaps of the
+    data binned into squares of `SCATTER_BIN_PIXELS` pixels. This can be
+    switched off with the `decimate` argument.
+
     Args:
         dataset: The dataset to plot
         axes: Optional Matplotlib axes to plot on. If not provided, new axes
@@ -145,6 +162,9 @@ def plot_dataset(dataset: DataSet,
         complex_plot_phase: Format of phase for plotting complex-valued data,
             either ``"radians"`` or ``"degrees"``. Applicable only for the
             cases where the dataset contains complex numbers
+        decimate: If True, large line and scatter plots are decimated to
+            the resolution of the axes. Default value is read from
+            ``config.plotting.decimation.enabled``.
 
     Returns:
         A list of axes and a list of colorbars of the same length. The
@@ -169,6 +189,10 @@ def plot_dataset(dataset: DataSet,
             'but can only accept "degrees" or "radians".')
     degrees = complex_plot_phase == "degrees"
 
+    if decimate is None:
+        decimate = qc.config.plotting.decimation.enabled
+    decimation_threshold = qc.config.plotting.decimation.threshold
+
     # Retrieve info about the run for the title
 
     experiment_name = dataset.exp_name
@@ -220,16 +244,29 @@ def plot_dataset(dataset: DataSet,
             plottype = get_1D_plottype(xpoints, ypoints)
             log.debug(f'Determined plottype: {plottype}')
 
+            decimate_plot = (decimate
+                             and len(xpoints) > decimation_threshold
+                             and _is_numeric_array(xpoints)
+                             and _is_numeric_array(ypoints))
+
             if plottype == '1D_line':
                 # sort for plotting
-                order = xpoints.argsort()
-                xpoints = xpoints[order]
-                ypoints = ypoints[order]
+                if not _is_sorted(xpoints):
+                    order = xpoints.argsort()
+                    xpoints = xpoints[order]
+                    ypoints = ypoints[order]
+                if decimate_plot:
+                    xpoints, ypoints = _decimate_line(xpoints, ypoints, ax)
 
                 with _appropriate_kwargs(plottype,
                                          colorbar is not None, **kwargs) as k:
                     ax.plot(xpoints, ypoints, **k)
             elif plottype == '1D_point':
+                if decimate_plot:
+                    kept = thin_scatter(xpoints, ypoints,
+                                        _axes_size_in_pixels(ax))
+                    xpoints = xpoints[kept]
+                    ypoints = ypoints[kept]
                 with _appropriate_kwargs(plottype,
                                          colorbar is not None, **kwargs) as k:
                     ax.scatter(xpoints, ypoints, **k)
@@ -270,6 +307,12 @@ def plot_dataset(dataset: DataSet,
                            '2D_unknown': plot_2d_scatterplot}
             plot_func = how_to_plot[plottype]
 
+            if (plot_func is plot_2d_scatterplot and decimate
+                    and len(zpoints) > decimation_threshold
+                    and all(_is_numeric_array(points)
+                            for points in (xpoints, ypoints, zpoints))):
+                plot_func = plot_2d_binned_scatterplot
+
             with _appropriate_kwargs(plottype,
                                      colorbar is not None, **kwargs) as k:
                 ax, colorbar = plot_func(xpoints, ypoints, zpoints,
@@ -313,6 +356,7 @@ def plot_by_id(run_id: int,
                                                  Number]] = None,
                complex_plot_type: str = 'real_and_imag',
                complex_plot_phase: str = 'radians',
+               decimate: Optional[bool] = None,
                **kwargs: Any) -> AxesTupleList:
     """
     Construct all plots for a given `run_id`. Here `run_id` is an
@@ -331,6 +375,7 @@ def plot_by_id(run_id: int,
                         cutoff_percentile,
                         complex_plot_type,
                         complex_plot_phase,
+                        decimate,
                         **kwargs)
 
 
@@ -526,6 +571,52 @@ def plot_2d_scatterplot(x: np.ndarray, y: np.ndarray, z: np.ndarray,
     return ax, colorbar
 
 
+def plot_2d_binned_scatterplot(x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                               ax: matplotlib.axes.Axes,
+                               colorbar: matplotlib.colorbar.Colorbar = None,
+                               **kwargs: Any) -> AxesTuple:
+    """
+    Plot a 2D scatterplot of numeric data as a heatmap of the average z
+    value in square bins of `SCATTER_BIN_PIXELS` pixels, which is much
+    faster than :func:`plot_2d_scatterplot` for large datasets and looks
+    alike. ``**kwargs`` are passed to matplotlib's pcolormesh used for the
+    plotting. By default the data in any vector plot will be rasterized
+    if there are more than 5000 bins. This can be overridden by supplying
+    the `rasterized` kwarg.
+
+    Args:
+        x: The x values
+        y: The y values
+        z: The z values
+        ax: The axis to plot onto
+        colorbar: The colorbar to plot into
+
+    Returns:
+        The matplotlib axis handles for plot and colorbar
+    """
+    width, height = _axes_size_in_pixels(ax)
+    shape = (max(width // SCATTER_BIN_PIXELS, 1),
+             max(height // SCATTER_BIN_PIXELS, 1))
+    x_edges, y_edges, z_binned = bin_scatter(x, y, z, shape)
+
+    if 'rasterized' in kwargs.keys():
+        rasterized = kwargs.pop('rasterized')
+    else:
+        rasterized = z_binned.size > qc.config.plotting.rasterize_threshold
+
+    colormesh = ax.pcolormesh(x_edges, y_edges,
+                              np.ma.masked_invalid(z_binned),
+                              rasterized=rasterized,
+                              **kwargs)
+
+    if colorbar is not None:
+        colorbar = ax.figure.colorbar(colormesh, ax=ax, cax=colorbar.ax)
+    else:
+        colorbar = ax.figure.colorbar(colormesh, ax=ax)
+
+    return ax, colorbar
+
+
 def plot_on_a_plain_grid(x: np.ndarray,
                          y: np.ndarray,
                          z: np.ndarray,
@@ -776,3 +867,35 @@ def _is_string_valued_array(values: np.ndarray) -> bool:
         True, if the array contains string; False otherwise
     """
     return isinstance(values[0], str)
+
+
+def _is_numeric_array(values: np.ndarray) -> bool:
+    return values.dtype.kind in 'biuf'
+
+
+def _is_sorted(values: np.ndarray) -> bool:
+    return bool(np.all(values[1:] >= values[:-1]))
+
+
+def _axes_size_in_pixels(ax: matplotlib.axes.Axes) -> Tuple[int, int]:
+    """
+    The width and height of the given axes in pixels of the figure
+    """
+    bbox = ax.get_window_extent()
+    return max(int(np.ceil(bbox.width)), 1), max(int(np.ceil(bbox.height)), 1)
+
+
+def _decimate_line(x: np.ndarray, y: np.ndarray, ax: matplotlib.axes.Axes
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decimate the sorted data of a line plot to the width of the given axes
+    with the method in ``config.plotting.decimation.line_method``
+    """
+    width, _ = _axes_size_in_pixels(ax)
+    method = qc.config.plotting.decimation.line_method
+    if method == 'lttb':
+        return decimate_lttb(x, y, 2 * width)
+    elif method == 'min_max':
+        return decimate_min_max(x, y, width)
+    raise ValueError(f'Invalid line decimation method {method!r}, '
+                     'can only accept "min_max" or "lttb".')
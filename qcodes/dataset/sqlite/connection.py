@@ -4,9 +4,11 @@ This module provides a wrapper class :class:`ConnectionPlus` around
 performing nested atomic transactions on an SQLite database.
 """
 import logging
+import random
 import sqlite3
+import time
 from contextlib import contextmanager
-from typing import Union, Any, Iterator
+from typing import Union, Any, Iterator, Dict, NamedTuple, Optional, Tuple
 
 import wrapt
 
@@ -15,6 +17,32 @@ from qcodes.utils.delaykeyboardinterrupt import DelayedKeyboardInterrupt
 log = logging.getLogger(__name__)
 
 
+class WriteCoordination(NamedTuple):
+    """
+    The settings of the coordination of the writes of several connections
+    (typically of several processes) to one database file, see
+    :func:`atomic`.
+
+    Attributes:
+        busy_timeout: the time (in seconds) that SQLite waits for a lock
+            held by another connection before giving up
+        retries: how many more times to try to start a write transaction
+            after SQLite gave up waiting for the lock
+        max_rows_per_transaction: the maximal number of rows that
+            :func:`.insert_many_values` inserts in one transaction, unless
+            it is called within an atomic block, or None for no maximum
+    """
+    busy_timeout: float = 5.0
+    retries: int = 5
+    max_rows_per_transaction: Optional[int] = 10000
+
+
+# the first backoff (in seconds) before retrying to start a write
+# transaction, which doubles with every retry up to the maximal backoff
+WRITE_RETRY_BACKOFF = 0.01
+WRITE_RETRY_MAX_BACKOFF = 1.0
+
+
 class ConnectionPlus(wrapt.ObjectProxy):
     """
     A class to extend the sqlite3.Connection object. Since sqlite3.Connection
@@ -29,9 +57,21 @@ class ConnectionPlus(wrapt.ObjectProxy):
             currently in the middle of an atomic block of transactions, thus
             allowing to nest `atomic` context managers
         path_to_dbfile: Path to the database file of the connection.
+        insert_statements: cache of the INSERT statements that have been
+            built for this connection, see
+            :func:`qcodes.dataset.sqlite.query_helpers.insert_many_values`
+        write_coordination: the coordination of the writes of this
+            connection with other connections to the database file, or None
+            for no coordination, see :func:`atomic`
+        pooled: whether the connection has been handed out by the
+            :class:`qcodes.dataset.sqlite.database.ConnectionPool`, and may
+            thus be shared by many users, which must not close it
     """
     atomic_in_progress: bool = False
     path_to_dbfile = ''
+    insert_statements: Dict[Tuple[str, Tuple[str, ...], int], str] = {}
+    write_coordination: Optional[WriteCoordination] = None
+    pooled: bool = False
 
     def __init__(self, sqlite3_connection: sqlite3.Connection):
         super(ConnectionPlus, self).__init__(sqlite3_connection)
@@ -41,6 +81,9 @@ class ConnectionPlus(wrapt.ObjectProxy):
                              '`ConnectionPlus` object which is not allowed.')
 
         self.path_to_dbfile = path_to_dbfile(sqlite3_connection)
+        self.insert_statements = {}
+        self.write_coordination = None
+        self.pooled = False
 
 
 def make_connection_plus_from(conn: Union[sqlite3.Connection, ConnectionPlus]
@@ -65,7 +108,8 @@ def make_connection_plus_from(conn: Union[sqlite3.Connection, ConnectionPlus]
 
 
 @contextmanager
-def atomic(conn: ConnectionPlus) -> Iterator[ConnectionPlus]:
+def atomic(conn: ConnectionPlus,
+           read_only: bool = False) -> Iterator[ConnectionPlus]:
     """
     Guard a series of transactions as atomic.
 
@@ -76,8 +120,20 @@ def atomic(conn: ConnectionPlus) -> Iterator[ConnectionPlus]:
     but we want to guard any transaction that modifies the database (e.g. also
     ALTER)
 
+    If the writes of the connection are coordinated with other connections
+    (see :class:`WriteCoordination`), the transaction is started with
+    'BEGIN IMMEDIATE', which takes the write lock of the database file
+    right away. Otherwise the transaction takes a read lock first, and
+    SQLite can not wait for the write lock once the transaction writes if
+    another connection has written in the meantime, but fails with
+    'database is locked'. If SQLite gives up waiting for the lock, starting
+    the transaction is retried after a random backoff, such that waiting
+    writers do not retry in lockstep.
+
     Args:
         conn: connection to guard
+        read_only: whether the transactions only read from the database, in
+            which case the transaction never takes the write lock
     """
     with DelayedKeyboardInterrupt():
         if not isinstance(conn, ConnectionPlus):
@@ -99,7 +155,10 @@ def atomic(conn: ConnectionPlus) -> Iterator[ConnectionPlus]:
             if is_outmost:
                 old_level = conn.isolation_level
                 conn.isolation_level = None
-                conn.cursor().execute('BEGIN')
+                if conn.write_coordination is None or read_only:
+                    conn.cursor().execute('BEGIN')
+                else:
+                    _begin_immediate(conn, conn.write_coordination)
             yield conn
         except Exception as e:
             conn.rollback()
@@ -114,6 +173,27 @@ def atomic(conn: ConnectionPlus) -> Iterator[ConnectionPlus]:
             conn.atomic_in_progress = old_atomic_in_progress
 
 
+def _begin_immediate(conn: ConnectionPlus,
+                     coordination: WriteCoordination) -> None:
+    """
+    Start a write transaction, retrying with a jittered exponential backoff
+    while the database file is locked by another connection
+    """
+    backoff = WRITE_RETRY_BACKOFF
+    for retry in range(coordination.retries + 1):
+        try:
+            conn.cursor().execute('BEGIN IMMEDIATE')
+            return
+        except sqlite3.OperationalError as e:
+            if ('locked' not in str(e) and 'busy' not in str(e)
+                    or retry == coordination.retries):
+                raise
+            log.debug(f'Database is locked, retrying to start a write '
+                      f'transaction ({retry + 1}/{coordination.retries})')
+            time.sleep(random.uniform(0.5, 1.5) * backoff)
+            backoff = min(2 * backoff, WRITE_RETRY_MAX_BACKOFF)
+
+
 def transaction(conn: ConnectionPlus,
                 sql: str, *args: Any) -> sqlite3.Cursor:
     """Perform a transaction.
@@ -155,7 +235,8 @@ def atomic_transaction(conn: ConnectionPlus,
         sqlite cursor
 
     """
-    with atomic(conn) as atomic_conn:
+    read_only = sql.lstrip()[:6].upper() == 'SELECT'
+    with atomic(conn, read_only=read_only) as atomic_conn:
         c = transaction(atomic_conn, sql, *args)
     return c
 
@@ -4,44 +4,276 @@ initialising it. Note that connecting/initialisation take into account
 database version and possibly perform database upgrades.
 """
 import io
+import lzma
+import os
 import sqlite3
+import struct
 import sys
-from os.path import expanduser, normpath
-from typing import Union, Tuple, Optional
+import time
+import zlib
+from os.path import abspath, expanduser, normpath
+from threading import Lock, get_ident
+from typing import Dict, Union, Tuple, Optional, Callable
+from urllib.request import pathname2url
 
 import numpy as np
 from numpy import ndarray
 
-from qcodes.dataset.sqlite.connection import ConnectionPlus
+from qcodes.dataset.sqlite.connection import ConnectionPlus, \
+    WriteCoordination
 from qcodes.dataset.sqlite.db_upgrades import _latest_available_version, \
     get_user_version, perform_db_upgrade
 from qcodes.dataset.sqlite.initial_schema import init_db
+from qcodes.dataset.sqlite.sidecars import register_sidecar_dir, \
+    resolve_sidecar_file
 import qcodes.config
 from qcodes.utils.types import complex_types, complex_type_union
 
 
+# Compact binary encoding of arrays. Each cell holds a small fixed header
+# followed by the raw little-endian array data:
+#
+#   magic (4 bytes) | flags (1 byte) | len(dtype) (1 byte) | dtype (ascii) |
+#   ndim (1 byte) | shape (ndim x uint64, little-endian) | data
+#
+# Compared to the full ``.npy`` format (which is what ``np.save`` produces and
+# what was used before database version 9) the header is a few bytes instead
+# of a padded python dict literal, and decoding is a zero-copy
+# ``np.frombuffer`` instead of a call to ``np.load``. Cells written in the
+# ``.npy`` format can still be read.
+#
+# The data may be compressed, which is recorded in the flags: the lower four
+# bits hold the codec (see ``_ARRAY_CODECS``), and the ``_ARRAY_FLAG_SHUFFLE``
+# bit marks that the bytes of the elements were shuffled before compression,
+# i.e. that the data holds the first bytes of all elements, then the second
+# bytes of all elements, and so on. Shuffling groups the bytes of similar
+# significance, which makes arrays of floats compress much better. As the
+# compression is recorded per cell, compressed cells are decoded
+# transparently, and cells whose data does not compress are stored plain.
+#
+# Large arrays may be stored in a sidecar file next to the database file
+# instead (see ``qcodes.dataset.sqlite.sidecars``), which is marked by the
+# ``_ARRAY_FLAG_SIDECAR`` bit. The data of such a cell is the reference to
+# the array data in the sidecar file:
+#
+#   offset (uint64, little-endian) | name of the sidecar file (ascii)
+#
+# and the array is decoded as a read-only ``np.memmap`` of the sidecar file.
+_ARRAY_MAGIC = b'\x93QCA'
+_NPY_MAGIC = b'\x93NUMPY'
+_ARRAY_FLAGS_PLAIN = 0
+_ARRAY_FLAG_SHUFFLE = 0x10
+_ARRAY_FLAG_SIDECAR = 0x20
+_ARRAY_CODEC_MASK = 0x0f
+_array_header_prefix = struct.Struct('<4sBB')
+_shape_element = struct.Struct('<Q')
+
+# codec id: (name, compress, decompress)
+_ARRAY_CODECS: Dict[int, Tuple[str, Callable[[bytes], bytes],
+                               Callable[[bytes], bytes]]] = {
+    1: ('zlib', zlib.compress, zlib.decompress),
+    2: ('lzma', lzma.compress, lzma.decompress)}
+
+# the valid values of the compression of an 'array' parameter
+ARRAY_COMPRESSIONS = tuple(
+    name + shuffle for name, _, _ in _ARRAY_CODECS.values()
+    for shuffle in ('', '+shuffle'))
+
+
+# the valid values of the compression of a 'text' parameter. 'categorical'
+# stores the distinct values of the parameter in the categories table of the
+# run, and their integer codes in the results table, see
+# :func:`qcodes.dataset.sqlite.queries.get_categories`
+TEXT_COMPRESSIONS = ('categorical',)
+
+
+def _validate_compression(paramtype: Optional[str],
+                          compression: Optional[str]) -> None:
+    """
+    Validate that the values of a parameter of the given type can be stored
+    with the given compression, which is None (no compression), one of
+    ``ARRAY_COMPRESSIONS`` for an 'array' parameter or one of
+    ``TEXT_COMPRESSIONS`` for a 'text' parameter
+
+    Raises:
+        ValueError: if the compression is not known or does not apply to
+            the type of the parameter
+    """
+    if compression is None:
+        return
+    if paramtype == 'text':
+        if compression not in TEXT_COMPRESSIONS:
+            raise ValueError(f'Unknown text compression {compression!r}, '
+                             f'must be one of {TEXT_COMPRESSIONS}.')
+    elif paramtype == 'array':
+        _array_compression_flags(compression)
+    else:
+        raise ValueError("Can only compress parameters of type 'array' or "
+                         "'text'.")
+
+
+def _array_compression_flags(compression: Optional[str]) -> int:
+    """
+    Get the flags of the compact binary format for the given compression,
+    which is None (no compression) or one of ``ARRAY_COMPRESSIONS``
+
+    Raises:
+        ValueError: if the compression is not known
+    """
+    if compression is None:
+        return _ARRAY_FLAGS_PLAIN
+    if compression not in ARRAY_COMPRESSIONS:
+        raise ValueError(f'Unknown array compression {compression!r}, '
+                         f'must be one of {ARRAY_COMPRESSIONS}.')
+    name, _, shuffle = compression.partition('+')
+    codec = next(codec for codec, (codec_name, _, _) in _ARRAY_CODECS.items()
+                 if codec_name == name)
+    return codec | (_ARRAY_FLAG_SHUFFLE if shuffle else 0)
+
+
+def _shuffle(data: bytes, itemsize: int) -> bytes:
+    return np.frombuffer(data, dtype=np.uint8).reshape(
+        -1, itemsize).T.tobytes()
+
+
+def _unshuffle(data: bytes, itemsize: int) -> bytes:
+    return np.frombuffer(data, dtype=np.uint8).reshape(
+        itemsize, -1).T.tobytes()
+
+
+def _encode_array(arr: ndarray, compression: Optional[str] = None) -> bytes:
+    """
+    Encode an array into the compact binary format described above. Arrays
+    that can not be represented by a plain dtype string (object and
+    structured arrays) are encoded in the ``.npy`` format.
+
+    Args:
+        arr: the array to encode
+        compression: None or one of ``ARRAY_COMPRESSIONS``. If the
+            compressed data is not smaller than the data, the data is
+            stored uncompressed.
+    """
+    dtype = arr.dtype
+    if dtype.hasobject or dtype.fields is not None:
+        out = io.BytesIO()
+        np.save(out, arr)
+        return out.getvalue()
+    if dtype.byteorder == '>':
+        dtype = dtype.newbyteorder('<')
+        arr = arr.astype(dtype)
+    data = arr.tobytes(order='C')
+    flags = _array_compression_flags(compression)
+    if flags != _ARRAY_FLAGS_PLAIN:
+        if flags & _ARRAY_FLAG_SHUFFLE and dtype.itemsize > 1:
+            compressed = _shuffle(data, dtype.itemsize)
+        else:
+            flags &= _ARRAY_CODEC_MASK
+            compressed = data
+        compressed = _ARRAY_CODECS[flags & _ARRAY_CODEC_MASK][1](compressed)
+        if len(compressed) < len(data):
+            data = compressed
+        else:
+            flags = _ARRAY_FLAGS_PLAIN
+    return _array_header(flags, dtype, arr.shape) + data
+
+
+def _array_header(flags: int, dtype: np.dtype, shape: Tuple[int, ...]
+                  ) -> bytes:
+    dtype_str = dtype.str.encode('ascii')
+    return b''.join(
+        (_array_header_prefix.pack(_ARRAY_MAGIC, flags, len(dtype_str)),
+         dtype_str,
+         bytes((len(shape),)),
+         b''.join(_shape_element.pack(dim) for dim in shape)))
+
+
+def _can_store_in_sidecar(arr: ndarray) -> bool:
+    """
+    Whether the array can be stored in a sidecar file, which requires a
+    plain dtype, at least one dimension and at least one element
+    """
+    dtype = arr.dtype
+    return (not dtype.hasobject and dtype.fields is None
+            and dtype.byteorder != '>' and arr.ndim > 0 and arr.size > 0)
+
+
+def _encode_sidecar_reference(arr: ndarray, file_name: str,
+                              offset: int) -> bytes:
+    """
+    Encode the reference to an array stored at the given offset in the
+    given sidecar file, see :func:`_can_store_in_sidecar` for the arrays
+    that can be stored in a sidecar file
+    """
+    return b''.join((_array_header(_ARRAY_FLAG_SIDECAR, arr.dtype,
+                                   arr.shape),
+                     _shape_element.pack(offset),
+                     file_name.encode('ascii')))
+
+
+def _decode_array(data: bytes) -> ndarray:
+    """
+    Decode an array stored in either the compact binary format or the
+    ``.npy`` format. Uncompressed arrays in the compact format are returned
+    as read-only views on ``data``, i.e. without copying the array data,
+    and arrays stored in sidecar files as read-only ``np.memmap`` views on
+    the sidecar file.
+    """
+    if data[:4] != _ARRAY_MAGIC:
+        out = io.BytesIO(data)
+        return np.load(out)
+    _, flags, dtype_len = _array_header_prefix.unpack_from(data)
+    codec = flags & _ARRAY_CODEC_MASK
+    if (flags & ~(_ARRAY_CODEC_MASK | _ARRAY_FLAG_SHUFFLE
+                  | _ARRAY_FLAG_SIDECAR)
+            or (codec != 0 and codec not in _ARRAY_CODECS)
+            or (flags & _ARRAY_FLAG_SIDECAR
+                and flags != _ARRAY_FLAG_SIDECAR)):
+        raise ValueError(f'Unknown array encoding flags: {flags}')
+    pos = _array_header_prefix.size
+    dtype = np.dtype(data[pos:pos+dtype_len].decode('ascii'))
+    pos += dtype_len
+    ndim = data[pos]
+    pos += 1
+    shape = tuple(_shape_element.unpack_from(data, pos + i*8)[0]
+                  for i in range(ndim))
+    pos += ndim*8
+    if flags & _ARRAY_FLAG_SIDECAR:
+        offset = _shape_element.unpack_from(data, pos)[0]
+        file_name = bytes(data[pos+8:]).decode('ascii')
+        return np.memmap(resolve_sidecar_file(file_name), dtype=dtype,
+                         mode='r', offset=offset, shape=shape)
+    count = int(np.prod(shape, dtype=np.int64))
+    if count == 0:
+        return np.empty(shape, dtype=dtype)
+    if codec != 0:
+        data = _ARRAY_CODECS[codec][2](memoryview(data)[pos:])
+        pos = 0
+        if flags & _ARRAY_FLAG_SHUFFLE:
+            data = _unshuffle(data, dtype.itemsize)
+    return np.frombuffer(data, dtype=dtype, count=count,
+                         offset=pos).reshape(shape)
+
+
 # utility function to allow sqlite/numpy type
-def _adapt_array(arr: ndarray) -> sqlite3.Binary:
+def _adapt_array(arr: ndarray,
+                 compression: Optional[str] = None) -> sqlite3.Binary:
     """
     See this:
     https://stackoverflow.com/questions/3425320/sqlite3-programmingerror-you-must-not-use-8-bit-bytestrings-unless-you-use-a-te
+
+    The adapter that is registered with sqlite3 does not compress the
+    array, compressed arrays are adapted explicitly before they are
+    inserted, see :meth:`.DataSet.set_compression`.
     """
-    out = io.BytesIO()
-    np.save(out, arr)
-    out.seek(0)
-    return sqlite3.Binary(out.read())
+    return sqlite3.Binary(_encode_array(arr, compression))
 
 
 def _convert_array(text: bytes) -> ndarray:
-    out = io.BytesIO(text)
-    out.seek(0)
-    return np.load(out)
+    return _decode_array(text)
 
 
 def _convert_complex(text: bytes) -> complex_type_union:
-    out = io.BytesIO(text)
-    out.seek(0)
-    return np.load(out)[0]
+    return _decode_array(text)[0]
 
 
 this_session_default_encoding = sys.getdefaultencoding()
@@ -100,40 +332,106 @@ def _adapt_float(fl: float) -> Union[float, str]:
 
 
 def _adapt_complex(value: complex_type_union) -> sqlite3.Binary:
-    out = io.BytesIO()
-    np.save(out, np.array([value]))
-    out.seek(0)
-    return sqlite3.Binary(out.read())
+    return sqlite3.Binary(_encode_array(np.array([value])))
+
+
+def _register_adapters_and_converters() -> None:
+    """
+    Register the numpy/sqlite type adapters and converters that we need.
+    The registration is global to the sqlite3 module.
+    """
+    # register numpy->binary(TEXT) adapter
+    # the typing here is ignored due to what we think is a flaw in typeshed
+    # see https://github.com/python/typeshed/issues/2429
+    sqlite3.register_adapter(np.ndarray, _adapt_array)
+    # register binary(TEXT) -> numpy converter
+    # for some reasons mypy complains about this
+    sqlite3.register_converter("array", _convert_array)
+
+    # Make sure numpy ints and floats types are inserted properly
+    for numpy_int in [
+        np.int, np.int8, np.int16, np.int32, np.int64,
+        np.uint, np.uint8, np.uint16, np.uint32, np.uint64
+    ]:
+        sqlite3.register_adapter(numpy_int, int)
+
+    sqlite3.register_converter("numeric", _convert_numeric)
+
+    for numpy_float in [np.float, np.float16, np.float32, np.float64]:
+        sqlite3.register_adapter(numpy_float, _adapt_float)
+
+    for complex_type in complex_types:
+        sqlite3.register_adapter(complex_type, _adapt_complex)
+    sqlite3.register_converter("complex", _convert_complex)
+
+
+_adapters_and_converters_registered = False
+
+
+def write_coordination_from_config() -> Optional[WriteCoordination]:
+    """
+    The coordination of the writes to database files set in the
+    ``core.db_write_coordination`` config option, or None if it is not
+    enabled
+    """
+    config = qcodes.config['core']['db_write_coordination']
+    if not config['enabled']:
+        return None
+    return WriteCoordination(
+        busy_timeout=float(config['busy_timeout']),
+        retries=int(config['retries']),
+        max_rows_per_transaction=config['max_rows_per_transaction'])
 
 
 def connect(name: str, debug: bool = False,
-            version: int = -1) -> ConnectionPlus:
+            version: int = -1, read_only: bool = False) -> ConnectionPlus:
     """
     Connect or create  database. If debug the queries will be echoed back.
     This function takes care of registering the numpy/sqlite type
     converters that we need.
 
+    Connecting to a database file that is already in the latest version
+    skips the initialisation and upgrade of the database.
+
     Args:
         name: name or path to the sqlite file
         debug: whether or not to turn on tracing
         version: which version to create. We count from 0. -1 means 'latest'.
             Should always be left at -1 except when testing.
+        read_only: if True, the database file is opened for reading only
+            (with the SQLite URI parameter ``mode=ro``), which any number of
+            threads and processes can do at once. The database file must
+            exist and be in the latest version, since it can then not be
+            initialised or upgraded.
+
+    The writes of the connection are coordinated with other connections to
+    the database file as set in the ``core.db_write_coordination`` config
+    option, see :func:`.atomic`.
 
     Returns:
         conn: connection object to the database (note, it is
             `ConnectionPlus`, not `sqlite3.Connection`
 
     """
-    # register numpy->binary(TEXT) adapter
-    # the typing here is ignored due to what we think is a flaw in typeshed
-    # see https://github.com/python/typeshed/issues/2429
-    sqlite3.register_adapter(np.ndarray, _adapt_array)
-    # register binary(TEXT) -> numpy converter
-    # for some reasons mypy complains about this
-    sqlite3.register_converter("array", _convert_array)
-
-    sqlite3_conn = sqlite3.connect(name, detect_types=sqlite3.PARSE_DECLTYPES)
+    global _adapters_and_converters_registered
+    if not _adapters_and_converters_registered:
+        _register_adapters_and_converters()
+        _adapters_and_converters_registered = True
+
+    coordination = None if read_only else write_coordination_from_config()
+    timeout = (5.0 if coordination is None  # the default of sqlite3
+               else coordination.busy_timeout)
+    if read_only:
+        sqlite3_conn = sqlite3.connect(
+            f'file:{pathname2url(abspath(expanduser(name)))}?mode=ro',
+            uri=True, detect_types=sqlite3.PARSE_DECLTYPES, timeout=timeout)
+    else:
+        sqlite3_conn = sqlite3.connect(name,
+                                       detect_types=sqlite3.PARSE_DECLTYPES,
+                                       timeout=timeout)
     conn = ConnectionPlus(sqlite3_conn)
+    conn.write_coordination = coordination
+    register_sidecar_dir(conn.path_to_dbfile)
 
     latest_supported_version = _latest_available_version()
     db_version = get_user_version(conn)
@@ -146,30 +444,168 @@ def connect(name: str, debug: bool = False,
     # sqlite3 options
     conn.row_factory = sqlite3.Row
 
-    # Make sure numpy ints and floats types are inserted properly
-    for numpy_int in [
-        np.int, np.int8, np.int16, np.int32, np.int64,
-        np.uint, np.uint8, np.uint16, np.uint32, np.uint64
-    ]:
-        sqlite3.register_adapter(numpy_int, int)
-
-    sqlite3.register_converter("numeric", _convert_numeric)
-
-    for numpy_float in [np.float, np.float16, np.float32, np.float64]:
-        sqlite3.register_adapter(numpy_float, _adapt_float)
-
-    for complex_type in complex_types:
-        sqlite3.register_adapter(complex_type, _adapt_complex)
-    sqlite3.register_converter("complex", _convert_complex)
-
     if debug:
         conn.set_trace_callback(print)
 
-    init_db(conn)
-    perform_db_upgrade(conn, version=version)
+    if read_only and db_version != latest_supported_version:
+        conn.close()
+        raise RuntimeError(f"Database {name} is version {db_version} and "
+                           f"can not be upgraded to version "
+                           f"{latest_supported_version} when it is opened "
+                           f"for reading only")
+
+    # the version is only set by the upgrades, which run after the
+    # initialisation, hence a database in the latest version is known to be
+    # initialised and upgraded
+    if version != -1 or db_version != latest_supported_version:
+        init_db(conn)
+        perform_db_upgrade(conn, version=version)
     return conn
 
 
+class ConnectionPool:
+    """
+    A pool of connections to database files, such that loading many runs
+    from the same database file does not open a new connection for each of
+    them.
+
+    The connections are kept per absolute path of the database file and per
+    thread, since a sqlite3 connection may only be used in the thread that
+    created it. A connection is handed out again as long as it is open and
+    the database file has not been replaced. Connections that have not been
+    handed out for ``max_idle_time`` seconds are removed from the pool, and
+    are thus closed as soon as nothing uses them anymore.
+
+    The pool is used by :func:`conn_from_dbpath_or_conn` if the
+    ``core.db_connection_pool`` config option is enabled. A pooled
+    connection is shared by everything that got it from the pool in the same
+    thread, e.g. all the :class:`.DataSet` objects loaded from the same file,
+    hence it must not be closed by any of them. Pooled connections are
+    marked by their ``pooled`` attribute, see :class:`.ConnectionPlus`.
+
+    Attributes:
+        n_connects: the number of connections that the pool has opened
+        n_reuses: the number of times that the pool has handed out an
+            already open connection
+        total_connect_time: the time (in seconds) spent opening connections
+    """
+
+    max_idle_time: float = 600.0
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        # (path, thread, debug) -> (connection, file identity, last use)
+        self._connections: Dict[Tuple[str, int, bool],
+                                Tuple[ConnectionPlus, Tuple[int, int],
+                                      float]] = {}
+        self.n_connects = 0
+        self.n_reuses = 0
+        self.total_connect_time = 0.0
+
+    def get(self, path_to_db: str, debug: bool = False) -> ConnectionPlus:
+        """
+        Get a connection to the given database file for the current thread,
+        reusing a pooled connection if possible.
+
+        Args:
+            path_to_db: the path to the database file
+            debug: whether or not to turn on tracing
+        """
+        path_to_db = abspath(expanduser(path_to_db))
+        key = (path_to_db, get_ident(), debug)
+        now = time.perf_counter()
+        with self._lock:
+            self._remove_idle(now, self.max_idle_time)
+            pooled = self._connections.get(key)
+            if pooled is not None:
+                conn, file_id, _ = pooled
+                if self._is_usable(conn, path_to_db, file_id):
+                    self._connections[key] = (conn, file_id, now)
+                    self.n_reuses += 1
+                    return conn
+                del self._connections[key]
+
+        conn = connect(path_to_db, debug)
+        conn.pooled = True
+        connect_time = time.perf_counter() - now
+        file_id = self._file_id(path_to_db)
+        with self._lock:
+            self._connections[key] = (conn, file_id, time.perf_counter())
+            self.n_connects += 1
+            self.total_connect_time += connect_time
+        return conn
+
+    def close_idle(self, max_idle_time: Optional[float] = None) -> int:
+        """
+        Remove the connections that have not been handed out for the given
+        time from the pool, and close those that are not used anymore.
+
+        Args:
+            max_idle_time: the time in seconds. If None, the
+                ``max_idle_time`` of the pool is used.
+
+        Returns:
+            The number of connections removed from the pool
+        """
+        if max_idle_time is None:
+            max_idle_time = self.max_idle_time
+        with self._lock:
+            return self._remove_idle(time.perf_counter(), max_idle_time)
+
+    def close_all(self) -> None:
+        """
+        Close all the connections of the pool. Note that this also closes
+        the connections that are still used, e.g. by a :class:`.DataSet`.
+        """
+        with self._lock:
+            connections = [conn for conn, _, _ in self._connections.values()]
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        The number of connections opened and reused by the pool, the time
+        spent opening connections, and the number of pooled connections
+        """
+        return {'n_connects': self.n_connects,
+                'n_reuses': self.n_reuses,
+                'total_connect_time': self.total_connect_time,
+                'n_pooled': len(self)}
+
+    def _remove_idle(self, now: float, max_idle_time: float) -> int:
+        idle_keys = [key for key, (_, _, last_use)
+                     in self._connections.items()
+                     if now - last_use > max_idle_time]
+        for key in idle_keys:
+            del self._connections[key]
+        return len(idle_keys)
+
+    @staticmethod
+    def _file_id(path_to_db: str) -> Tuple[int, int]:
+        try:
+            stat = os.stat(path_to_db)
+        except OSError:
+            return (-1, -1)
+        return (stat.st_dev, stat.st_ino)
+
+    def _is_usable(self, conn: ConnectionPlus, path_to_db: str,
+                   file_id: Tuple[int, int]) -> bool:
+        try:
+            conn.in_transaction
+        except sqlite3.ProgrammingError:
+            # the connection has been closed
+            return False
+        return self._file_id(path_to_db) == file_id
+
+
+connection_pool = ConnectionPool()
+
+
 def get_db_version_and_newest_available_version(path_to_db: str) -> Tuple[int,
                                                                           int]:
     """
@@ -264,7 +700,9 @@ def conn_from_dbpath_or_conn(conn: Optional[ConnectionPlus],
     A small helper function to abstract the logic needed for functions
     that take either a `ConnectionPlus` or the path to a db file.
     If neither is given this will fall back to the default db location.
-    It is an error to supply both.
+    It is an error to supply both. If the ``core.db_connection_pool``
+    config option is enabled, connections to db files are taken from the
+    :class:`ConnectionPool`.
 
     Args:
         conn: A ConnectionPlus object pointing to a sqlite database
@@ -281,7 +719,10 @@ def conn_from_dbpath_or_conn(conn: Optional[ConnectionPlus],
         path_to_db = get_DB_location()
 
     if conn is None and path_to_db is not None:
-        conn = connect(path_to_db, get_DB_debug())
+        if qcodes.config['core']['db_connection_pool']:
+            conn = connection_pool.get(path_to_db, get_DB_debug())
+        else:
+            conn = connect(path_to_db, get_DB_debug())
     elif conn is not None:
         conn = conn
     else:
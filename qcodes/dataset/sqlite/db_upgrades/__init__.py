@@ -317,3 +317,59 @@ def perform_db_upgrade_7_to_8(conn: ConnectionPlus) -> None:
         # prints that the database is being upgraded
         for _ in pbar:
             insert_column(conn, 'runs', 'parent_datasets', 'TEXT')
+
+
+@upgrader
+def perform_db_upgrade_8_to_9(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 8 to version 9.
+
+    From version 9 on, values of 'array' and 'complex' columns are stored in
+    a compact binary encoding (a short header followed by the raw
+    little-endian data) instead of the ``.npy`` format. The schema itself
+    does not change; the version bump ensures that older versions of QCoDeS,
+    which can not decode the new encoding, refuse to open the database.
+    Values that were stored in the ``.npy`` format remain readable and are
+    left untouched.
+    """
+    with atomic(conn) as conn:
+        pbar = tqdm(range(1), file=sys.stdout)
+        pbar.set_description("Upgrading database; v8 -> v9")
+        # iterate through the pbar for the sake of the side effect; it
+        # prints that the database is being upgraded
+        for _ in pbar:
+            pass
+
+
+@upgrader
+def perform_db_upgrade_9_to_10(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 9 to version 10.
+
+    Store each distinct snapshot once in a new 'snapshots' table, keyed by
+    the hash of its canonical JSON, and let the runs refer to their snapshot
+    via a new 'snapshot_id' column of the 'runs' table.
+    """
+    from qcodes.dataset.sqlite.db_upgrades.upgrade_9_to_10 import \
+        upgrade_9_to_10
+    upgrade_9_to_10(conn)
+
+
+@upgrader
+def perform_db_upgrade_10_to_11(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 10 to version 11.
+
+    Add indexes to the 'runs' table for looking up runs by experiment and
+    captured counter, by captured run id and by time. Looking up runs by
+    guid is already indexed since version 2.
+    """
+    indexes = {'IX_runs_exp_id_captured_counter': 'exp_id, captured_counter',
+               'IX_runs_captured_run_id': 'captured_run_id',
+               'IX_runs_run_timestamp': 'run_timestamp'}
+    with atomic(conn) as conn:
+        pbar = tqdm(indexes.items(), file=sys.stdout)
+        pbar.set_description("Upgrading database; v10 -> v11")
+        for index_name, columns in pbar:
+            transaction(conn, f'CREATE INDEX IF NOT EXISTS {index_name} '
+                              f'ON runs ({columns})')
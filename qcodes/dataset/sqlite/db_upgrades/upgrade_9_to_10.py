@@ -0,0 +1,66 @@
+import hashlib
+import json
+import sys
+
+from tqdm import tqdm
+
+from qcodes.dataset.sqlite.connection import ConnectionPlus, atomic, \
+    atomic_transaction, transaction
+from qcodes.dataset.sqlite.query_helpers import insert_column
+
+
+_snapshots_table_schema = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id INTEGER PRIMARY KEY,
+    -- the hash of the canonical JSON of the snapshot
+    hash TEXT NOT NULL,
+    -- the id of the full snapshot that this snapshot is a delta against,
+    -- or NULL if this snapshot is stored in full
+    base_id INTEGER,
+    snapshot TEXT
+);
+"""
+
+_snapshots_hash_index = """
+CREATE UNIQUE INDEX IF NOT EXISTS snapshots_hash_idx ON snapshots (hash);
+"""
+
+
+def upgrade_9_to_10(conn: ConnectionPlus) -> None:
+    """
+    Perform the upgrade from version 9 to version 10.
+
+    Add the 'snapshots' table and the 'snapshot_id' column of the 'runs'
+    table, and move the snapshots of the existing runs into the 'snapshots'
+    table, such that runs with identical snapshots share a single row of it.
+    The snapshots are moved as they are, i.e. not as deltas.
+    """
+    sql = "SELECT run_id, snapshot FROM runs WHERE snapshot IS NOT NULL"
+    run_ids_and_snapshots = atomic_transaction(conn, sql).fetchall()
+
+    # If one run fails, we want the whole upgrade to roll back, hence the
+    # entire upgrade is one atomic transaction
+
+    with atomic(conn) as conn:
+        transaction(conn, _snapshots_table_schema)
+        transaction(conn, _snapshots_hash_index)
+        insert_column(conn, 'runs', 'snapshot_id', 'INTEGER')
+
+        pbar = tqdm(run_ids_and_snapshots, file=sys.stdout)
+        pbar.set_description("Upgrading database; v9 -> v10")
+
+        snapshot_ids = {}
+        for run_id, snapshot_raw in pbar:
+            canonical = json.dumps(json.loads(snapshot_raw), sort_keys=True,
+                                   separators=(',', ':'))
+            hash_ = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+            if hash_ not in snapshot_ids:
+                cursor = transaction(conn,
+                                     'INSERT INTO snapshots (hash, snapshot) '
+                                     'VALUES (?, ?)',
+                                     hash_, snapshot_raw)
+                snapshot_ids[hash_] = cursor.lastrowid
+            transaction(conn,
+                        'UPDATE runs SET snapshot_id=?, snapshot=NULL '
+                        'WHERE run_id=?',
+                        snapshot_ids[hash_], run_id)
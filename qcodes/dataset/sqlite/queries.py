@@ -5,7 +5,9 @@ specific to the domain of QCoDeS database.
 Historically this code was part of sqlite_base.py file.
 """
 import logging
+import re
 import sqlite3
+import threading
 import time
 import unicodedata
 import warnings
@@ -15,6 +17,7 @@ from typing import Dict, List, Optional, Any, Sequence, Union, Tuple, \
 import numpy as np
 
 import qcodes as qc
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
 from qcodes.dataset.descriptions.rundescriber import RunDescriber
 from qcodes.dataset.descriptions.param_spec import ParamSpec
 from qcodes.dataset.descriptions.versioning.converters import old_to_new
@@ -27,6 +30,7 @@ from qcodes.dataset.sqlite.query_helpers import (
     sql_placeholder_string, many_many, one, many, select_one_where,
     select_many_where, insert_values, insert_column, is_column_in_table,
     VALUES, update_where)
+from qcodes.dataset.sqlite.sidecars import stack_sidecar_arrays
 from qcodes.utils.deprecate import deprecate
 
 
@@ -42,7 +46,7 @@ RUNS_TABLE_COLUMNS = ["run_id", "exp_id", "name", "result_table_name",
                       "result_counter", "run_timestamp", "completed_timestamp",
                       "is_completed", "parameters", "guid",
                       "run_description", "snapshot", "parent_datasets",
-                      "captured_run_id", "captured_counter"]
+                      "captured_run_id", "captured_counter", "snapshot_id"]
 
 
 def is_run_id_in_database(conn: ConnectionPlus,
@@ -139,8 +143,13 @@ def get_parameter_data(conn: ConnectionPlus,
                        start: Optional[int] = None,
                        end: Optional[int] = None,
                        where_statement: Optional[str] = None,
-                       include_setpoints = True) -> \
-        Dict[str, Dict[str, np.ndarray]]:
+                       include_setpoints = True,
+                       id_range: Optional[Tuple[int, int]] = None,
+                       interdeps: Optional[InterDependencies_] = None,
+                       filters: Optional[Mapping[str, Any]] = None,
+                       decode_categories: bool = True,
+                       categories: Optional[Dict[str, List[str]]] = None
+                       ) -> Dict[str, Dict[str, np.ndarray]]:
     """
     Get data for one or more parameters and its dependencies. The data
     is returned as numpy arrays within 2 layers of nested dicts. The keys of
@@ -158,6 +167,12 @@ def get_parameter_data(conn: ConnectionPlus,
     Note that all numeric data will at the moment be returned as floating point
     values.
 
+    The values of parameters with categorical compression (see
+    :func:`get_categories`) are decoded, unless ``decode_categories`` is
+    False. Since the ``where_statement`` would compare the codes of their
+    values rather than the values, it must not refer to such parameters,
+    use the ``filters`` instead.
+
     Args:
         conn: database connection
         table_name: name of the table
@@ -167,15 +182,46 @@ def get_parameter_data(conn: ConnectionPlus,
         end: end of range; if None, then ends at the bottom of the table
         include_setpoints: if False, only return the values for the
             top level parameters instead of the entire trees
+        id_range: if given, only consider the rows with an id in the range
+            (first, last], i.e. excluding first and including last
+        interdeps: the interdependencies of the run. If None, they are
+            loaded from the run description in the database
+        filters: conditions on the values of the parameters that the rows
+            must fulfill, see :func:`_build_filter_condition`. Unlike the
+            ``where_statement``, the filters are applied before the range
+            filter, such that they can make use of the indexes of the
+            result table.
+        decode_categories: if False, the values of parameters with
+            categorical compression are returned as their integer codes,
+            i.e. the indices into their categories, with -1 for missing
+            values (like :py:meth:`pandas.Categorical.from_codes` expects)
+        categories: the categories of the table as returned by
+            :func:`get_categories`, which are loaded if None. As the
+            categories of a table only ever grow, they are reloaded into
+            this dict if the data has codes that it does not include, such
+            that the caller can keep it to read the table repeatedly.
+
+    Raises:
+        ValueError: if the ``where_statement`` refers to a parameter with
+            categorical compression
     """
-    sql = """
-    SELECT run_id FROM runs WHERE result_table_name = ?
-    """
-    c = atomic_transaction(conn, sql, table_name)
-    run_id = one(c, 'run_id')
+    if interdeps is None:
+        sql = """
+        SELECT run_id FROM runs WHERE result_table_name = ?
+        """
+        c = atomic_transaction(conn, sql, table_name)
+        run_id = one(c, 'run_id')
 
-    rd = serial.from_json_to_current(get_run_description(conn, run_id))
-    interdeps = rd.interdeps
+        interdeps = get_run_describer(conn, run_id).interdeps
+
+    if categories is None:
+        categories = get_categories(conn, table_name)
+    if where_statement is not None:
+        _validate_where_statement(where_statement, categories)
+    if filters is not None and categories:
+        if _has_unknown_category_values(filters, categories):
+            categories.update(get_categories(conn, table_name))
+        filters = _encode_category_filters(filters, categories)
 
     output = {}
     if len(columns) == 0:
@@ -191,13 +237,35 @@ def get_parameter_data(conn: ConnectionPlus,
         param_names = [param.name for param in paramspecs]
         types = [param.type for param in paramspecs]
 
+        if all(paramtype == 'numeric' or name in categories
+               for paramtype, name in zip(types, param_names)):
+            # large numeric runs are read column-wise straight into numpy
+            # arrays; this bails out (returns None) on values that can not
+            # be represented as floats, e.g. NULLs or strings. The codes of
+            # the values of categorical parameters are numeric as well.
+            numeric_data = get_numeric_parameter_tree_arrays(
+                conn,
+                table_name,
+                output_param,
+                *param_names[1:],
+                start=start,
+                end=end,
+                where_statement=where_statement,
+                id_range=id_range,
+                filters=filters)
+            if numeric_data is not None:
+                output[output_param] = numeric_data
+                continue
+
         res = get_parameter_tree_values(conn,
                                         table_name,
                                         output_param,
                                         *param_names[1:],
                                         start=start,
                                         end=end,
-                                        where_statement=where_statement)
+                                        where_statement=where_statement,
+                                        id_range=id_range,
+                                        filters=filters)
 
         # if we have array type parameters expand all other parameters
         # to arrays
@@ -209,7 +277,9 @@ def get_parameter_data(conn: ConnectionPlus,
             complex_elms = [i for i, x in enumerate(types)
                             if x == 'complex']
             text_elms = [i for i, x in enumerate(types)
-                         if x == "text"]
+                         if x == "text" and param_names[i] not in categories]
+            categorical_elms = [i for i, name in enumerate(param_names)
+                                if name in categories]
             for row in res:
                 for element in numeric_elms:
                     row[element] = np.full_like(row[first_array_element],
@@ -229,17 +299,189 @@ def get_parameter_data(conn: ConnectionPlus,
                     row[element] = np.full_like(row[first_array_element],
                                                 row[element],
                                                 dtype=f'U{strlen}')
+                for element in categorical_elms:
+                    code = row[element]
+                    row[element] = np.full_like(row[first_array_element],
+                                                -1 if code is None else code,
+                                                dtype=np.int64)
 
         # Benchmarking shows that transposing the data with python types is
         # faster than transposing the data using np.array.transpose
         res_t = map(list, zip(*res))
-        output[output_param] = {name: np.array(column_data)
+        output[output_param] = {name: _column_to_array(column_data)
                                 for name, column_data
                                 in zip(param_names, res_t)}
 
+    if categories:
+        _decode_category_columns(conn, table_name, output, categories,
+                                 decode_categories)
     return output
 
 
+def reshape_parameter_data(data: Dict[str, Dict[str, np.ndarray]],
+                           shapes: Mapping[str, Sequence[int]]
+                           ) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Bring the data of parameter trees, as returned by
+    :func:`get_parameter_data`, into the declared shapes of their top level
+    parameters. Data with fewer values than its shape has, e.g. the data of
+    an interrupted run, is padded with NaN, or with None if it is not
+    numeric. Data with more values than its shape has is left as it is.
+
+    Args:
+        data: the data of the parameter trees
+        shapes: the shapes by the names of the top level parameters
+    """
+    output = {}
+    for name, tree in data.items():
+        shape = shapes.get(name)
+        if shape is None:
+            output[name] = tree
+        else:
+            output[name] = {param: _reshape_to_shape(values, tuple(shape))
+                            for param, values in tree.items()}
+    return output
+
+
+def _reshape_to_shape(values: np.ndarray,
+                      shape: Tuple[int, ...]) -> np.ndarray:
+    size = int(np.prod(shape, dtype=np.int64))
+    if values.size == size:
+        return values.reshape(shape)
+    if values.size > size or values.dtype.hasobject:
+        return values
+    if values.dtype.kind in 'fc':
+        padded = np.full(size, np.nan, dtype=values.dtype)
+    elif values.dtype.kind in 'iub':
+        padded = np.full(size, np.nan)
+    else:
+        padded = np.full(size, None, dtype=object)
+    padded[:values.size] = values.ravel()
+    return padded.reshape(shape)
+
+
+def _column_to_array(column_data: List[Any]) -> np.ndarray:
+    """
+    Make an array of the values of a column. Arrays stored in a sidecar
+    file are stacked without copying them if possible.
+    """
+    if column_data and isinstance(column_data[0], np.memmap):
+        stacked = stack_sidecar_arrays(column_data)
+        if stacked is not None:
+            return stacked
+    return np.array(column_data)
+
+
+def _category_codes(values: np.ndarray) -> np.ndarray:
+    """
+    The integer codes of the values of a parameter with categorical
+    compression as read from the database, with -1 for missing values
+    """
+    if values.dtype.hasobject:
+        values = np.where(np.equal(values, None), -1, values)
+    return values.astype(np.int64, copy=False)
+
+
+def _decode_categories(codes: np.ndarray,
+                       categories: Sequence[str]) -> np.ndarray:
+    """
+    Decode the integer codes of the values of a parameter with categorical
+    compression, where missing values are -1
+    """
+    if np.any(codes < 0):
+        # the missing values are decoded as the None after the categories
+        return np.array(list(categories) + [None], dtype=object)[codes]
+    return np.array(categories, dtype=str)[codes]
+
+
+def _decode_category_columns(conn: ConnectionPlus, table_name: str,
+                             output: Dict[str, Dict[str, np.ndarray]],
+                             categories: Dict[str, List[str]],
+                             decode: bool) -> None:
+    """
+    Decode the columns of the data of parameter trees that hold the codes
+    of the values of categorical parameters in place, see
+    :func:`_decode_categories`. If ``decode`` is False, the codes are
+    returned as integers with -1 for missing values. The categories are
+    reloaded if the data has codes that they do not include yet.
+    """
+    columns = [(tree, name) for tree in output.values()
+               for name in tree.keys() & categories.keys()]
+    for tree, name in columns:
+        tree[name] = _category_codes(tree[name])
+    if any(tree[name].size and tree[name].max() >= len(categories[name])
+           for tree, name in columns):
+        categories.update(get_categories(conn, table_name))
+    if decode:
+        for tree, name in columns:
+            tree[name] = _decode_categories(tree[name], categories[name])
+
+
+def _validate_where_statement(where_statement: str,
+                              categories: Mapping[str, Sequence[str]]
+                              ) -> None:
+    """
+    Raise a ValueError if the where statement refers to a parameter with
+    categorical compression, whose column holds the codes of its values
+    """
+    for name in categories:
+        if re.search(rf'\b{re.escape(name)}\b', where_statement):
+            raise ValueError(f'The where statement can not refer to {name}, '
+                             f'which has categorical compression. Filter '
+                             f'its values with the filters instead.')
+
+
+def _has_unknown_category_values(filters: Mapping[str, Any],
+                                 categories: Mapping[str, Sequence[str]]
+                                 ) -> bool:
+    return any(name in categories and not isinstance(value, tuple)
+               and value not in categories[name]
+               for name, value in filters.items())
+
+
+def _encode_category_filters(filters: Mapping[str, Any],
+                             categories: Mapping[str, Sequence[str]]
+                             ) -> Dict[str, Any]:
+    """
+    Replace the values in the filters on parameters with categorical
+    compression by their codes. A value that is not among the categories of
+    its parameter is replaced by a code that no value has.
+
+    Raises:
+        ValueError: if a range of the values of a parameter with categorical
+            compression is selected, since the order of the codes is not the
+            order of the values
+    """
+    encoded = dict(filters)
+    for name, value in filters.items():
+        if name not in categories:
+            continue
+        if isinstance(value, tuple):
+            raise ValueError(f'Can not select a range of the values of '
+                             f'{name}, which has categorical compression.')
+        known = categories[name]
+        encoded[name] = known.index(value) if value in known else -1
+    return encoded
+
+
+def get_last_result_id(conn: ConnectionPlus, table_name: str) -> int:
+    """
+    Get the id of the last row of a results table
+
+    Args:
+        conn: Connection to the database
+        table_name: Name of the results table
+
+    Returns:
+        The id of the last row, or 0 if the table is empty
+    """
+    sql = f"""
+    SELECT IFNULL(MAX(id), 0) AS last_id FROM "{table_name}"
+    """
+    c = atomic_transaction(conn, sql)
+    return one(c, 'last_id')
+
+
 def get_values(conn: ConnectionPlus,
                table_name: str,
                param_name: str) -> List[List[Any]]:
@@ -270,7 +512,10 @@ def get_parameter_tree_values(conn: ConnectionPlus,
                               *other_param_names: str,
                               start: Optional[int] = None,
                               end: Optional[int] = None,
-                              where_statement: Optional[str] = None) -> List[List[Any]]:
+                              where_statement: Optional[str] = None,
+                              id_range: Optional[Tuple[int, int]] = None,
+                              filters: Optional[Mapping[str, Any]] = None
+                              ) -> List[List[Any]]:
     """
     Get the values of one or more columns from a data table. The rows
     retrieved are the rows where the 'toplevel_param_name' column has
@@ -290,12 +535,56 @@ def get_parameter_tree_values(conn: ConnectionPlus,
         end: The (1-indexed) result to include as the last result to be
             returned. None is equivalent to "all the rest". If start > end,
             nothing is returned.
+        where_statement: condition on the selected values to filter the
+            rows by
+        id_range: if given, only the rows with an id in the range
+            (first, last] are considered, i.e. excluding first and
+            including last. Start and end are then counted within this
+            range.
+        filters: conditions on the values of the columns of the table that
+            the rows must fulfill, see :func:`_build_filter_condition`.
+            Start and end are counted within the rows that fulfill them.
 
     Returns:
         A list of list. The outer list index is row number, the inner list
         index is parameter value (first toplevel_param, then other_param_names)
     """
 
+    columns = [toplevel_param_name] + list(other_param_names)
+    sql, params = _build_parameter_tree_query(result_table_name, columns,
+                                              start=start, end=end,
+                                              where_statement=where_statement,
+                                              id_range=id_range,
+                                              filters=filters)
+
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    res = many_many(cursor, *columns)
+
+    return res
+
+
+def _build_parameter_tree_query(result_table_name: str,
+                                columns: Sequence[str],
+                                start: Optional[int] = None,
+                                end: Optional[int] = None,
+                                where_statement: Optional[str] = None,
+                                bypass_converters: bool = False,
+                                id_range: Optional[Tuple[int, int]] = None,
+                                filters: Optional[Mapping[str, Any]] = None
+                                ) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build the query that selects the given columns of a result table for
+    the rows where the first column (the top level parameter) is not NULL.
+    See :func:`get_parameter_tree_values` for the meaning of the arguments.
+    Returns the query and the values to bind to its placeholders.
+
+    If ``bypass_converters`` is True, the columns are selected as expressions
+    which have no declared type, meaning that the values are returned as
+    stored instead of going through the registered sqlite3 converters. NULLs
+    are then returned as the string 'NULL' so that they can not silently be
+    mistaken for other values.
+    """
     offset = (start - 1) if start is not None else 0
     limit = (end - offset) if end is not None else -1
 
@@ -308,13 +597,36 @@ def get_parameter_tree_values(conn: ConnectionPlus,
     #
     # Also, placeholders seem to be ignored in the WHERE X IS NOT NULL line
 
-    columns = [toplevel_param_name] + list(other_param_names)
+    toplevel_param_name = columns[0]
     columns_for_select = ','.join(columns)
 
+    if bypass_converters:
+        outer_columns_for_select = ','.join(
+            f"IFNULL({column}, 'NULL') AS {column}" for column in columns)
+    else:
+        outer_columns_for_select = columns_for_select
+
+    # the range of ids is a range of the primary key, hence only the rows
+    # within it are visited
+    id_condition = ''
+    if id_range is not None:
+        first_id, last_id = id_range
+        id_condition = f"AND id > {int(first_id)} AND id <= {int(last_id)}"
+
+    # the filters are applied in the innermost query, where they can be
+    # answered with the indexes of the table
+    filter_condition = ''
+    params: Tuple[Any, ...] = ()
+    if filters:
+        filter_sql, params = _build_filter_condition(filters)
+        filter_condition = f"AND {filter_sql}"
+
     sql_subsubquery = f"""
                    (SELECT {columns_for_select}
                     FROM "{result_table_name}"
-                    WHERE {toplevel_param_name} IS NOT NULL)
+                    WHERE {toplevel_param_name} IS NOT NULL
+                    {id_condition}
+                    {filter_condition})
                    """
     sql_subquery = f"""
           (SELECT {columns_for_select}
@@ -322,18 +634,115 @@ def get_parameter_tree_values(conn: ConnectionPlus,
           LIMIT {limit} OFFSET {offset})
           """
     sql = f"""
-          SELECT {columns_for_select}
+          SELECT {outer_columns_for_select}
           FROM {sql_subquery}
           """
 
     if where_statement is not None:
         sql += f"WHERE {where_statement}"
 
+    return sql, params
+
+
+def _build_filter_condition(filters: Mapping[str, Any]
+                            ) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Compile filters on the values of columns into an SQL condition with
+    placeholders. The conditions are of the form that SQLite can answer
+    with an index on the column.
+
+    Args:
+        filters: a mapping from column name to either a value, meaning that
+            the column must be equal to that value, or a tuple
+            ``(low, high)``, meaning that the column must be within that
+            range (both ends included). Either end of a range may be None,
+            meaning that the range is open at that end.
+
+    Returns:
+        The condition and the values to bind to its placeholders
+    """
+    conditions: List[str] = []
+    params: List[Any] = []
+    for column, value in filters.items():
+        if isinstance(value, tuple):
+            if len(value) != 2:
+                raise ValueError(f'The range for {column} must be a tuple '
+                                 f'(low, high), got {value}.')
+            low, high = value
+            if low is not None:
+                conditions.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                conditions.append(f'{column} <= ?')
+                params.append(high)
+        else:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+    if len(conditions) == 0:
+        return '1', ()
+    return ' AND '.join(conditions), tuple(params)
+
+
+def get_numeric_parameter_tree_arrays(
+        conn: ConnectionPlus,
+        result_table_name: str,
+        toplevel_param_name: str,
+        *other_param_names: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        where_statement: Optional[str] = None,
+        id_range: Optional[Tuple[int, int]] = None,
+        filters: Optional[Mapping[str, Any]] = None
+        ) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Get the values of a parameter tree whose parameters are all of 'numeric'
+    type as one numpy array per column. This selects the same rows as
+    :func:`get_parameter_tree_values` (see there for the meaning of the
+    arguments), but streams the rows from the cursor directly into a numpy
+    buffer instead of building python lists of rows and transposing them,
+    and skips the per-value 'numeric' converter.
+
+    As for :func:`get_parameter_tree_values`, columns that only hold
+    integral values are returned as integer arrays.
+
+    Returns:
+        A dict from column name to array of values. The dict is empty if
+        no rows are selected. None is returned if some of the values can
+        not be represented as floating point numbers (e.g. NULLs or
+        strings); the data should then be loaded with
+        :func:`get_parameter_tree_values`.
+    """
+    columns = [toplevel_param_name] + list(other_param_names)
+    sql, params = _build_parameter_tree_query(result_table_name, columns,
+                                              start=start, end=end,
+                                              where_statement=where_statement,
+                                              bypass_converters=True,
+                                              id_range=id_range,
+                                              filters=filters)
+
     cursor = conn.cursor()
-    cursor.execute(sql, ())
-    res = many_many(cursor, *columns)
+    # plain tuples are much cheaper to produce than sqlite3.Row objects
+    cursor.row_factory = None
+    cursor.execute(sql, params)
 
-    return res
+    # numpy does not allow for duplicate field names, so we use positional
+    # field names
+    row_dtype = np.dtype([(f'f{i}', np.float64) for i in range(len(columns))])
+    try:
+        rows = np.fromiter(cursor, dtype=row_dtype)
+    except (TypeError, ValueError):
+        return None
+
+    if rows.size == 0:
+        return {}
+
+    output: Dict[str, np.ndarray] = {}
+    for i, column in enumerate(columns):
+        values = np.ascontiguousarray(rows[f'f{i}'])
+        if np.isfinite(values).all() and (np.floor(values) == values).all():
+            values = values.astype(np.int64)
+        output[column] = values
+    return output
 
 
 def get_setpoints(conn: ConnectionPlus,
@@ -467,7 +876,10 @@ def get_guids_from_run_spec(conn: ConnectionPlus,
                             captured_run_id: Optional[int] = None,
                             captured_counter: Optional[int] = None,
                             experiment_name: Optional[str] = None,
-                            sample_name: Optional[str] = None) -> List[str]:
+                            sample_name: Optional[str] = None,
+                            sample_id: Optional[int] = None,
+                            location: Optional[int] = None,
+                            work_station: Optional[int] = None) -> List[str]:
     """
     Get the GUIDs of runs matching the supplied run specifications.
 
@@ -481,58 +893,162 @@ def get_guids_from_run_spec(conn: ConnectionPlus,
             run at capture time.
         experiment_name: Name of the experiment that the runs should belong to.
         sample_name: Name of the sample that the query should be restricted to.
+        sample_id: The sample_id assigned as part of the GUID.
+        location: The location code assigned as part of the GUID.
+        work_station: The workstation assigned as part of the GUID.
 
     Returns:
         A list of the GUIDs matching the supplied specifications.
     """
-    # first find all experiments that match the given sample
-    # and experiment name
-    exp_query = {}
-    exp_ids: Optional[List[int]]
-    if experiment_name is not None or sample_name is not None:
-        if sample_name is not None:
-            exp_query['sample_name'] = sample_name
-        if experiment_name is not None:
-            exp_query['name'] = experiment_name
-        exp_ids = get_matching_exp_ids(conn,
-                                       **exp_query)
-        if exp_ids == []:
-            return []
-    else:
-        exp_ids = None
+    where_clause, inputs = _build_run_spec_condition(
+        captured_run_id=captured_run_id, captured_counter=captured_counter,
+        experiment_name=experiment_name, sample_name=sample_name,
+        sample_id=sample_id, location=location, work_station=work_station)
+
+    query = f"""
+            SELECT r.guid
+            FROM runs AS r
+            JOIN experiments AS e ON r.exp_id = e.exp_id
+            {where_clause}
+            ORDER BY r.run_id
+            """
+    cursor = atomic_transaction(conn, query, *inputs)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _build_run_spec_condition(
+        exp_id: Optional[int] = None,
+        captured_run_id: Optional[int] = None,
+        captured_counter: Optional[int] = None,
+        experiment_name: Optional[str] = None,
+        sample_name: Optional[str] = None,
+        sample_id: Optional[int] = None,
+        location: Optional[int] = None,
+        work_station: Optional[int] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None) -> Tuple[str, List[Any]]:
+    """
+    Build the WHERE clause that selects the runs matching the supplied run
+    specifications from the 'runs' table aliased as 'r' joined with the
+    'experiments' table aliased as 'e'. The parts of the GUID are compared as
+    substrings of the GUID such that the GUIDs need not be parsed.
 
+    Returns:
+        The WHERE clause (empty if there are no specifications) and the
+        values of its placeholders
+    """
     conds = []
-    inputs = []
-
-    if exp_ids is not None:
-        exp_placeholder = sql_placeholder_string(len(exp_ids))
-        conds.append(f"exp_id in {exp_placeholder}")
-        inputs.extend(exp_ids)
-    if captured_run_id is not None:
-        conds.append("captured_run_id is ?")
-        inputs.append(captured_run_id)
-    if captured_counter is not None:
-        conds.append("captured_counter is ?")
-        inputs.append(captured_counter)
-
-    if len(conds) >= 1:
-        where_clause = " WHERE " + " AND ".join(conds)
-    else:
-        where_clause = ""
+    inputs: List[Any] = []
+
+    equal_conditions = (('r.exp_id', exp_id),
+                        ('r.captured_run_id', captured_run_id),
+                        ('r.captured_counter', captured_counter),
+                        ('e.name', experiment_name),
+                        ('e.sample_name', sample_name))
+    for column, value in equal_conditions:
+        if value is not None:
+            conds.append(f"{column} = ?")
+            inputs.append(value)
+
+    # see generate_guid for the layout of the GUID
+    if sample_id is not None:
+        conds.append("substr(r.guid, 1, 8) = ?")
+        inputs.append(f'{sample_id:08x}')
+    if location is not None:
+        conds.append("substr(r.guid, 10, 2) = ?")
+        inputs.append(f'{location:02x}')
+    if work_station is not None:
+        conds.append("substr(r.guid, 12, 2) || substr(r.guid, 15, 4) = ?")
+        inputs.append(f'{work_station:06x}')
+
+    if start_time is not None:
+        conds.append("r.run_timestamp >= ?")
+        inputs.append(start_time)
+    if end_time is not None:
+        conds.append("r.run_timestamp <= ?")
+        inputs.append(end_time)
+
+    if len(conds) == 0:
+        return "", inputs
+    return "WHERE " + " AND ".join(conds), inputs
+
+
+# the fields of the run catalog and the columns they are selected from
+RUN_CATALOG_FIELDS = (('run_id', np.int64, 'r.run_id'),
+                      ('exp_id', np.int64, 'r.exp_id'),
+                      ('name', object, 'r.name'),
+                      ('experiment_name', object, 'e.name'),
+                      ('sample_name', object, 'e.sample_name'),
+                      ('guid', object, 'r.guid'),
+                      ('captured_run_id', np.int64, 'r.captured_run_id'),
+                      ('captured_counter', np.int64, 'r.captured_counter'),
+                      ('result_counter', np.int64, 'r.result_counter'),
+                      ('run_timestamp', np.float64, 'r.run_timestamp'),
+                      ('completed_timestamp', np.float64,
+                       'r.completed_timestamp'),
+                      ('is_completed', np.bool_, 'r.is_completed'))
+
+
+def get_run_catalog(conn: ConnectionPlus,
+                    exp_id: Optional[int] = None,
+                    captured_run_id: Optional[int] = None,
+                    captured_counter: Optional[int] = None,
+                    experiment_name: Optional[str] = None,
+                    sample_name: Optional[str] = None,
+                    sample_id: Optional[int] = None,
+                    location: Optional[int] = None,
+                    work_station: Optional[int] = None,
+                    start_time: Optional[float] = None,
+                    end_time: Optional[float] = None) -> np.ndarray:
+    """
+    Get a summary of the runs matching the supplied run specifications with
+    a single query.
 
-    query = "SELECT guid from runs" + where_clause + " ORDER BY run_id"
+    Args:
+        conn: connection to the database.
+        exp_id: the id of the experiment that the runs should belong to.
+        captured_run_id: the run_id that was assigned to the run at capture
+            time.
+        captured_counter: the counter that was assigned to the run at
+            capture time.
+        experiment_name: Name of the experiment that the runs should belong to.
+        sample_name: Name of the sample that the runs should belong to.
+        sample_id: The sample_id assigned as part of the GUID.
+        location: The location code assigned as part of the GUID.
+        work_station: The workstation assigned as part of the GUID.
+        start_time: the earliest run timestamp (in seconds since the epoch)
+            of the runs.
+        end_time: the latest run timestamp (in seconds since the epoch) of
+            the runs.
 
+    Returns:
+        A structured array with one row per run, ordered by run_id, with the
+        fields of ``RUN_CATALOG_FIELDS``. Timestamps of runs that have not
+        been started or completed are NaN.
+    """
+    where_clause, inputs = _build_run_spec_condition(
+        exp_id=exp_id, captured_run_id=captured_run_id,
+        captured_counter=captured_counter, experiment_name=experiment_name,
+        sample_name=sample_name, sample_id=sample_id, location=location,
+        work_station=work_station, start_time=start_time, end_time=end_time)
+
+    columns = ', '.join(column for _, _, column in RUN_CATALOG_FIELDS)
+    # the runs are sorted after the query, since sorting in the query would
+    # make SQLite scan the runs in the order of run_id instead of using the
+    # indexes of the 'runs' table
+    query = f"""
+            SELECT {columns}
+            FROM runs AS r
+            JOIN experiments AS e ON r.exp_id = e.exp_id
+            {where_clause}
+            """
     cursor = conn.cursor()
-    if len(inputs) > 0:
-        cursor.execute(query, inputs)
-    else:
-        cursor.execute(query)
-
-    rows = cursor.fetchall()
-    results = []
-    for r in rows:
-        results.append(r['guid'])
-    return results
+    # plain tuples are much faster to convert than sqlite3.Row objects
+    cursor.row_factory = None
+    cursor.execute(query, inputs)
+    dtype = [(name, type_) for name, type_, _ in RUN_CATALOG_FIELDS]
+    catalog = np.array(cursor.fetchall(), dtype=dtype)
+    return catalog[np.argsort(catalog['run_id'], kind='stable')]
 
 
 @deprecate()
@@ -1295,6 +1811,8 @@ def _update_run_description(conn: ConnectionPlus, run_id: int,
           """
     with atomic(conn) as conn:
         conn.cursor().execute(sql, (description, run_id))
+    with _run_describer_cache_lock:
+        _run_describer_cache.pop((conn.path_to_dbfile, run_id), None)
 
 
 def update_parent_datasets(conn: ConnectionPlus,
@@ -1553,6 +2071,49 @@ def get_run_description(conn: ConnectionPlus, run_id: int) -> str:
                             "run_id", run_id)
 
 
+# The parsed run descriptions of started runs, keyed by the path to the
+# database file and the run_id. The description of a run does not change
+# once the run has been started, unless it is overwritten with
+# _update_run_description, which removes it from the cache. The guid of the
+# run is stored alongside the description, such that a database file that
+# has been replaced by another one is not mistaken for the original one.
+# The cache is shared by all threads, hence it is only accessed while
+# holding the lock.
+_run_describer_cache: Dict[Tuple[str, int], Tuple[str, RunDescriber]] = {}
+_run_describer_cache_lock = threading.Lock()
+RUN_DESCRIBER_CACHE_SIZE = 10000
+
+
+def get_run_describer(conn: ConnectionPlus, run_id: int) -> RunDescriber:
+    """
+    Return the run description of the specified run as a RunDescriber
+    object. The descriptions of started runs in database files (i.e. not
+    in-memory databases) are cached, such that they are only parsed once.
+    """
+    sql = """
+    SELECT guid, run_timestamp, run_description FROM runs WHERE run_id = ?
+    """
+    c = atomic_transaction(conn, sql, run_id)
+    row = c.fetchone()
+    if row is None:
+        raise RuntimeError(f'Run with run_id {run_id} does not exist.')
+    guid, run_timestamp, desc_str = row
+
+    key = (conn.path_to_dbfile, run_id)
+    with _run_describer_cache_lock:
+        cached = _run_describer_cache.get(key)
+    if cached is not None and cached[0] == guid:
+        return cached[1]
+
+    describer = serial.from_json_to_current(desc_str)
+    if key[0] != '' and run_timestamp is not None:
+        with _run_describer_cache_lock:
+            if len(_run_describer_cache) >= RUN_DESCRIBER_CACHE_SIZE:
+                del _run_describer_cache[next(iter(_run_describer_cache))]
+            _run_describer_cache[key] = (guid, describer)
+    return describer
+
+
 def get_parent_dataset_links(conn: ConnectionPlus, run_id: int) -> str:
     """
     Return the (JSON string) of the parent-child dataset links for the
@@ -1783,3 +2344,132 @@ def remove_trigger(conn: ConnectionPlus, trigger_id: str) -> None:
         name: id of the trigger
     """
     transaction(conn, f"DROP TRIGGER IF EXISTS {trigger_id};")
+
+
+def _result_table_index_name(table_name: str, column: str) -> str:
+    return f"{table_name}-{column}-idx"
+
+
+def create_result_table_index(conn: ConnectionPlus,
+                              table_name: str,
+                              column: str) -> None:
+    """
+    Create an index on a column of a result table, if it does not exist
+    yet. The index speeds up the reading of the rows that fulfill conditions
+    on the values of the column, see :func:`get_parameter_data`, at the
+    expense of slightly slower inserts.
+
+    Args:
+        conn: database connection
+        table_name: name of the result table
+        column: name of the column to index
+    """
+    index_name = _result_table_index_name(table_name, column)
+    sql = f"""
+    CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({column})
+    """
+    atomic_transaction(conn, sql)
+
+
+def get_result_table_indexed_columns(conn: ConnectionPlus,
+                                     table_name: str) -> List[str]:
+    """
+    Get the names of the columns of a result table that have been indexed
+    with :func:`create_result_table_index`
+
+    Args:
+        conn: database connection
+        table_name: name of the result table
+
+    Returns:
+        The names of the indexed columns
+    """
+    sql = """
+    SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?
+    """
+    c = atomic_transaction(conn, sql, table_name)
+    index_names = [row[0] for row in many_many(c, 'name')]
+    prefix = f"{table_name}-"
+    return [name[len(prefix):-len("-idx")] for name in index_names
+            if name.startswith(prefix) and name.endswith("-idx")]
+
+
+def _categories_table_name(table_name: str) -> str:
+    return f"{table_name}-categories"
+
+
+def create_categories_table(conn: ConnectionPlus, table_name: str) -> None:
+    """
+    Create the categories table of a result table, if it does not exist
+    yet. The categories table holds the distinct values of the parameters
+    with categorical compression (see :meth:`.DataSet.set_compression`),
+    whose values are stored in the result table as integer codes. The code
+    of a value is its position among the categories of its parameter.
+
+    Args:
+        conn: database connection
+        table_name: name of the result table
+    """
+    sql = f"""
+    CREATE TABLE IF NOT EXISTS "{_categories_table_name(table_name)}" (
+        parameter TEXT NOT NULL,
+        code INTEGER NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (parameter, code)
+    )
+    """
+    atomic_transaction(conn, sql)
+
+
+def add_categories(conn: ConnectionPlus, table_name: str, parameter: str,
+                   first_code: int, values: Sequence[str]) -> None:
+    """
+    Add values to the categories of a parameter in the categories table of
+    a result table, see :func:`create_categories_table`
+
+    Args:
+        conn: database connection
+        table_name: name of the result table
+        parameter: name of the parameter
+        first_code: the code of the first value, which is the number of
+            categories the parameter already has
+        values: the new values, that get consecutive codes
+    """
+    sql = f"""
+    INSERT INTO "{_categories_table_name(table_name)}" (parameter, code, value)
+    VALUES (?, ?, ?)
+    """
+    with atomic(conn) as conn:
+        conn.cursor().executemany(
+            sql, [(parameter, first_code + i, value)
+                  for i, value in enumerate(values)])
+
+
+def get_categories(conn: ConnectionPlus,
+                   table_name: str) -> Dict[str, List[str]]:
+    """
+    Get the categories of the parameters with categorical compression of a
+    result table, see :func:`create_categories_table`
+
+    Args:
+        conn: database connection
+        table_name: name of the result table
+
+    Returns:
+        The categories, ordered by their codes, by the names of the
+        parameters. Empty if the result table has no categories table.
+    """
+    categories_table = _categories_table_name(table_name)
+    sql = """
+    SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?
+    """
+    if atomic_transaction(conn, sql, categories_table).fetchone() is None:
+        return {}
+    sql = f"""
+    SELECT parameter, value FROM "{categories_table}"
+    ORDER BY parameter, code
+    """
+    categories: Dict[str, List[str]] = {}
+    for parameter, value in atomic_transaction(conn, sql).fetchall():
+        categories.setdefault(parameter, []).append(value)
+    return categories
@@ -6,7 +6,8 @@ import itertools
 import sqlite3
 from distutils.version import LooseVersion
 
-from typing import List, Any, Union, Dict, Tuple, Optional
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Sequence,
+                    Tuple, Union)
 
 import numpy as np
 from numpy import ndarray
@@ -134,6 +135,10 @@ def insert_values(conn: ConnectionPlus,
     """
     Inserts values for the specified columns.
     Will pad with null if not all parameters are specified.
+    The row is inserted in one transaction, which takes the write lock of
+    the database file right away if the writes of the connection are
+    coordinated (see :func:`.atomic`).
+
     NOTE this need to be committed before closing the connection.
     """
     _columns = ",".join(columns)
@@ -148,10 +153,52 @@ def insert_values(conn: ConnectionPlus,
     return c.lastrowid
 
 
+# From this number of columns on, inserting the rows one by one with
+# ``executemany`` is faster than inserting them with multi-row INSERT
+# statements, see the ``InsertManyValues`` benchmark
+EXECUTEMANY_MIN_COLUMNS = 25
+
+INSERT_STRATEGIES = ('multi_row', 'executemany')
+
+# The number of INSERT statements cached per connection, which matches the
+# size of the statement cache of sqlite3 connections
+INSERT_STATEMENT_CACHE_SIZE = 100
+
+
+def _insert_statement(conn: ConnectionPlus,
+                      formatted_name: str,
+                      columns: List[str],
+                      no_of_rows: int) -> str:
+    """
+    Return the INSERT statement for inserting ``no_of_rows`` rows into the
+    given columns of the given table. The statements are cached on the
+    connection, such that for a recurring combination of table, columns and
+    number of rows the very same string is used, and hence the statement
+    compiled by SQLite is reused from the statement cache of the connection.
+    The oldest statement is dropped when the cache is full.
+    """
+    key = (formatted_name, tuple(columns), no_of_rows)
+    query = conn.insert_statements.get(key)
+    if query is None:
+        _columns = ",".join(columns)
+        _values = "(" + ",".join(["?"] * len(columns)) + ")"
+        _values_x_params = ",".join([_values] * no_of_rows)
+        query = f"""INSERT INTO "{formatted_name}"
+                    ({_columns})
+                    VALUES
+                    {_values_x_params}
+                 """
+        if len(conn.insert_statements) >= INSERT_STATEMENT_CACHE_SIZE:
+            del conn.insert_statements[next(iter(conn.insert_statements))]
+        conn.insert_statements[key] = query
+    return query
+
+
 def insert_many_values(conn: ConnectionPlus,
                        formatted_name: str,
                        columns: List[str],
                        values: List[VALUES],
+                       strategy: Optional[str] = None
                        ) -> int:
     """
     Inserts many values for the specified columns.
@@ -160,7 +207,30 @@ def insert_many_values(conn: ConnectionPlus,
     columns: ['xparam', 'yparam']
     values: [[x1, y1], [x2, y2], [x3, y3]]
 
+    The values are either inserted with multi-row INSERT statements, each
+    as large as SQLite allows, or by executing a single-row INSERT statement
+    for every row (``executemany``). Unless a strategy is given, the fastest
+    one for the number of columns is picked.
+
+    The values are inserted in one transaction, unless the writes of the
+    connection are coordinated with a maximal number of rows per
+    transaction (see :class:`.WriteCoordination`) and no atomic block is in
+    progress. The values are then inserted in several transactions of at
+    most that many rows, such that other connections can write in between.
+
     NOTE this need to be committed before closing the connection.
+
+    Args:
+        conn: database connection
+        formatted_name: name of the table
+        columns: the columns to insert values into
+        values: the values to insert, one list per row
+        strategy: either 'multi_row' or 'executemany'. If None, the strategy
+            is picked automatically.
+
+    Returns:
+        The id of the last inserted row, whichever the strategy and the
+        number of statements or transactions the values are inserted with.
     """
     # We demand that all values have the same length
     lengths = [len(val) for val in values]
@@ -171,6 +241,129 @@ def insert_many_values(conn: ConnectionPlus,
     no_of_rows = len(lengths)
     no_of_columns = lengths[0]
 
+    def rows(start: int, stop: int) -> Iterable[VALUES]:
+        return values[start:stop]
+
+    def flat(start: int, stop: int) -> VALUES:
+        # we need to make values a flat list from a list of list
+        return list(itertools.chain.from_iterable(values[start:stop]))
+
+    return _insert_many(conn, formatted_name, columns, no_of_columns,
+                        no_of_rows, rows, flat, strategy)
+
+
+def insert_many_columns(conn: ConnectionPlus,
+                        formatted_name: str,
+                        columns: List[str],
+                        values: Sequence[Sequence[VALUE]],
+                        strategy: Optional[str] = None
+                        ) -> int:
+    """
+    Inserts many values for the specified columns, given column by column.
+    The statements are filled straight from the columns, i.e. without
+    building a list of values per row first. See :func:`insert_many_values`
+    for how the values are inserted.
+
+    Example input:
+    columns: ['xparam', 'yparam']
+    values: [[x1, x2, x3], [y1, y2, y3]]
+
+    Args:
+        conn: database connection
+        formatted_name: name of the table
+        columns: the columns to insert values into
+        values: the values to insert, one sequence per column
+        strategy: either 'multi_row' or 'executemany'. If None, the strategy
+            is picked automatically.
+
+    Returns:
+        The id of the last inserted row
+    """
+    lengths = [len(column) for column in values]
+    if len(set(lengths)) > 1:
+        raise ValueError('Wrong input format for values. Must specify the '
+                         'same number of values for all columns. Received'
+                         f' lengths {lengths}.')
+    no_of_columns = len(values)
+    no_of_rows = lengths[0]
+    if no_of_rows == 0:
+        raise ValueError('Can not insert columns without values.')
+
+    def rows(start: int, stop: int) -> Iterable[VALUES]:
+        # the rows are only made one at a time while they are inserted
+        return zip(*(column[start:stop] for column in values))
+
+    def flat(start: int, stop: int) -> VALUES:
+        flattened: VALUES = [None] * ((stop - start) * no_of_columns)
+        for offset, column in enumerate(values):
+            flattened[offset::no_of_columns] = column[start:stop]
+        return flattened
+
+    return _insert_many(conn, formatted_name, columns, no_of_columns,
+                        no_of_rows, rows, flat, strategy)
+
+
+def _insert_many(conn: ConnectionPlus,
+                 formatted_name: str,
+                 columns: List[str],
+                 no_of_columns: int,
+                 no_of_rows: int,
+                 rows: Callable[[int, int], Iterable[VALUES]],
+                 flat: Callable[[int, int], VALUES],
+                 strategy: Optional[str]) -> int:
+    """
+    Insert the rows of values that ``rows(start, stop)`` and (flattened)
+    ``flat(start, stop)`` provide by position, see
+    :func:`insert_many_values`
+    """
+    if strategy is None:
+        if no_of_columns >= EXECUTEMANY_MIN_COLUMNS:
+            strategy = 'executemany'
+        else:
+            strategy = 'multi_row'
+    elif strategy not in INSERT_STRATEGIES:
+        raise ValueError(f'Unknown insert strategy {strategy!r}, must be one '
+                         f'of {INSERT_STRATEGIES}.')
+
+    coordination = conn.write_coordination
+    if (coordination is not None
+            and coordination.max_rows_per_transaction is not None
+            and no_of_rows > coordination.max_rows_per_transaction
+            and not conn.atomic_in_progress):
+        # other connections can only write in between our transactions
+        step = coordination.max_rows_per_transaction
+        for start in range(0, no_of_rows, step):
+            return_value = _insert_range(
+                conn, formatted_name, columns, no_of_columns, start,
+                min(start + step, no_of_rows), rows, flat, strategy)
+        return return_value
+
+    return _insert_range(conn, formatted_name, columns, no_of_columns, 0,
+                         no_of_rows, rows, flat, strategy)
+
+
+def _insert_range(conn: ConnectionPlus,
+                  formatted_name: str,
+                  columns: List[str],
+                  no_of_columns: int,
+                  start: int,
+                  stop: int,
+                  rows: Callable[[int, int], Iterable[VALUES]],
+                  flat: Callable[[int, int], VALUES],
+                  strategy: str) -> int:
+    """
+    Insert the rows from ``start`` to ``stop`` in one transaction, and
+    return the id of the last inserted row
+    """
+    if strategy == 'executemany':
+        query = _insert_statement(conn, formatted_name, columns, 1)
+        with atomic(conn) as conn:
+            c = conn.cursor()
+            c.executemany(query, rows(start, stop))
+            c.execute('SELECT last_insert_rowid()')
+            return_value = one(c, 0)
+        return return_value
+
     # The TOTAL number of inserted values in one query
     # must be less than the SQLITE_MAX_VARIABLE_NUMBER
 
@@ -188,36 +381,13 @@ def insert_many_values(conn: ConnectionPlus,
         max_var = SQLiteSettings.limits['MAX_VARIABLE_NUMBER']
     rows_per_transaction = int(int(max_var)/no_of_columns)
 
-    _columns = ",".join(columns)
-    _values = "(" + ",".join(["?"] * len(values[0])) + ")"
-
-    a, b = divmod(no_of_rows, rows_per_transaction)
-    chunks = a*[rows_per_transaction] + [b]
-    if chunks[-1] == 0:
-        chunks.pop()
-
-    start = 0
-    stop = 0
-
     with atomic(conn) as conn:
-        for ii, chunk in enumerate(chunks):
-            _values_x_params = ",".join([_values] * chunk)
-
-            query = f"""INSERT INTO "{formatted_name}"
-                        ({_columns})
-                        VALUES
-                        {_values_x_params}
-                     """
-            stop += chunk
-            # we need to make values a flat list from a list of list
-            flattened_values = list(
-                itertools.chain.from_iterable(values[start:stop]))
-
-            c = transaction(conn, query, *flattened_values)
-
-            if ii == 0:
-                return_value = c.lastrowid
-            start += chunk
+        for chunk_start in range(start, stop, rows_per_transaction):
+            chunk_stop = min(chunk_start + rows_per_transaction, stop)
+            query = _insert_statement(conn, formatted_name, columns,
+                                      chunk_stop - chunk_start)
+            c = transaction(conn, query, *flat(chunk_start, chunk_stop))
+            return_value = c.lastrowid
 
     return return_value
 
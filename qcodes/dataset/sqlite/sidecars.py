@@ -0,0 +1,183 @@
+"""
+This module contains the storage of large array values in sidecar files.
+
+Instead of storing large arrays as BLOBs in the results table, which makes
+the database file grow, fragments its pages and means that the arrays have
+to be copied out of the database when they are read, large arrays can be
+appended to a sidecar file next to the database file. The results table
+then only holds a reference to the array, i.e. the name of the sidecar file,
+the offset of the array data in the file, and the shape and dtype of the
+array (see :mod:`qcodes.dataset.sqlite.database`), and the arrays are read
+as read-only ``np.memmap`` views on the sidecar file.
+
+The sidecar files of a database file ``experiments.db`` are kept in the
+directory ``experiments_sidecars`` next to it, with one append-only file
+per run named after the GUID of the run. The file starts with a short
+header, after which the raw little-endian data of the arrays follows, each
+array aligned to ``SIDECAR_ALIGNMENT`` bytes. As the GUID of a run is
+unique, the sidecar file of a run keeps its name when the run is extracted
+into another database file.
+
+The references only hold the name of the sidecar file, such that the
+database file can be moved together with its sidecar directory. The
+sidecar files are looked up in the sidecar directories of the database
+files that have been connected to in this session.
+"""
+import os
+import shutil
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+SIDECAR_DIR_SUFFIX = '_sidecars'
+SIDECAR_FILE_EXTENSION = '.npa'
+# the sidecar files start with this magic, padded to the alignment
+SIDECAR_MAGIC = b'\x93QCSIDECAR\x01'
+SIDECAR_ALIGNMENT = 64
+
+_lock = Lock()
+# the sidecar directories of the database files connected to, in order
+_sidecar_dirs: Dict[str, None] = {}
+# the resolved paths of the sidecar files by file name
+_sidecar_paths: Dict[str, str] = {}
+
+
+def sidecar_dir(path_to_db: str) -> str:
+    """
+    The directory of the sidecar files of the given database file
+    """
+    return os.path.splitext(os.path.abspath(path_to_db))[0] \
+        + SIDECAR_DIR_SUFFIX
+
+
+def sidecar_file_name(guid: str) -> str:
+    """
+    The name of the sidecar file of the run with the given GUID
+    """
+    return guid + SIDECAR_FILE_EXTENSION
+
+
+def register_sidecar_dir(path_to_db: str) -> None:
+    """
+    Register the sidecar directory of the given database file, such that
+    the sidecar files in it are found when arrays stored in them are read.
+    This is done by :func:`qcodes.dataset.sqlite.database.connect`.
+    """
+    if path_to_db == '':
+        return
+    with _lock:
+        _sidecar_dirs[sidecar_dir(path_to_db)] = None
+
+
+def resolve_sidecar_file(file_name: str) -> str:
+    """
+    Get the path to the sidecar file with the given name.
+
+    Raises:
+        FileNotFoundError: if the sidecar file is not in the sidecar
+            directory of any database file connected to
+    """
+    path = _sidecar_paths.get(file_name)
+    if path is not None and os.path.exists(path):
+        return path
+    with _lock:
+        # the most recently registered directories are searched first
+        for directory in reversed(list(_sidecar_dirs)):
+            path = os.path.join(directory, file_name)
+            if os.path.exists(path):
+                _sidecar_paths[file_name] = path
+                return path
+    raise FileNotFoundError(f'Could not find the sidecar file {file_name} '
+                            f'in any of the sidecar directories '
+                            f'{list(_sidecar_dirs)}')
+
+
+def append_to_sidecar(path_to_db: str, guid: str,
+                      arrays: Sequence[np.ndarray]) -> List[int]:
+    """
+    Append the data of the given arrays to the sidecar file of a run. The
+    arrays must have a plain (non-object, non-structured) little-endian
+    dtype.
+
+    Args:
+        path_to_db: the path to the database file of the run
+        guid: the GUID of the run
+        arrays: the arrays to append
+
+    Returns:
+        The offsets of the data of the arrays in the sidecar file
+    """
+    directory = sidecar_dir(path_to_db)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, sidecar_file_name(guid))
+    offsets = []
+    with open(path, 'ab') as file:
+        position = file.tell()
+        if position == 0:
+            header = SIDECAR_MAGIC.ljust(SIDECAR_ALIGNMENT, b'\x00')
+            file.write(header)
+            position = len(header)
+        for arr in arrays:
+            padding = -position % SIDECAR_ALIGNMENT
+            file.write(b'\x00' * padding)
+            position += padding
+            offsets.append(position)
+            data = np.ascontiguousarray(arr).data
+            file.write(data)
+            position += data.nbytes
+    return offsets
+
+
+def copy_run_sidecar(source_db_path: str, target_db_path: str,
+                     guid: str) -> None:
+    """
+    Copy the sidecar file of a run (if it has one) from the sidecar
+    directory of the source database file to the one of the target
+    database file
+    """
+    file_name = sidecar_file_name(guid)
+    source = os.path.join(sidecar_dir(source_db_path), file_name)
+    if not os.path.exists(source):
+        return
+    target_dir = sidecar_dir(target_db_path)
+    os.makedirs(target_dir, exist_ok=True)
+    shutil.copyfile(source, os.path.join(target_dir, file_name))
+    register_sidecar_dir(target_db_path)
+
+
+def stack_sidecar_arrays(arrays: Sequence[np.ndarray]
+                         ) -> Optional[np.memmap]:
+    """
+    Stack arrays read from a sidecar file into one array without copying
+    their data, which is possible if they all have the same shape and
+    dtype, and are stored in the same sidecar file at equally spaced
+    offsets, as is the case for arrays of equal size that have been
+    appended one after the other.
+
+    Returns:
+        A read-only ``np.memmap`` of the stacked arrays, or None if the
+        arrays can not be stacked without copying
+    """
+    if len(arrays) == 0 or not all(isinstance(arr, np.memmap)
+                                   and arr.filename is not None
+                                   for arr in arrays):
+        return None
+    first = arrays[0]
+    step = arrays[1].offset - first.offset if len(arrays) > 1 \
+        else first.nbytes
+    if (step < first.nbytes or step % first.itemsize != 0
+            or not first.flags.c_contiguous):
+        return None
+    for i, arr in enumerate(arrays):
+        if (arr.filename != first.filename or arr.shape != first.shape
+                or arr.dtype != first.dtype
+                or arr.offset != first.offset + i*step):
+            return None
+    data = np.memmap(first.filename, dtype=first.dtype, mode='r',
+                     offset=first.offset,
+                     shape=((step*(len(arrays) - 1) + first.nbytes)
+                            // first.itemsize,))
+    return np.lib.stride_tricks.as_strided(
+        data, shape=(len(arrays),) + first.shape,
+        strides=(step,) + first.strides, subok=True, writeable=False)
@@ -0,0 +1,251 @@
+"""
+This module contains the storage of the snapshots of runs.
+
+From database version 10 on, each distinct snapshot is stored once in the
+``snapshots`` table, keyed by the hash of its canonical JSON (the JSON with
+sorted keys and without whitespace), and the runs refer to their snapshot
+via the ``snapshot_id`` column of the ``runs`` table. Runs with identical
+snapshots thus share one row of the ``snapshots`` table.
+
+A snapshot can optionally be stored as a delta against a full snapshot,
+typically the one of a previous run. The delta holds the values that have
+been set and the paths that have been deleted with respect to the base
+snapshot, which is much smaller than the full snapshot if only a few
+parameters have changed.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from qcodes.dataset.sqlite.connection import ConnectionPlus, atomic, \
+    transaction
+
+# a delta is only stored if it is smaller than this fraction of the size of
+# the full snapshot
+DELTA_MAX_SIZE_RATIO = 0.5
+
+
+def canonical_snapshot_json(snapshot: Dict[str, Any]) -> str:
+    """
+    The canonical JSON of a snapshot, which is the same for snapshots with
+    the same content irrespective of the order of their keys
+    """
+    return json.dumps(snapshot, sort_keys=True, separators=(',', ':'))
+
+
+def snapshot_hash(canonical_json: str) -> str:
+    """
+    The hash of the canonical JSON of a snapshot, that identifies a snapshot
+    in the ``snapshots`` table
+    """
+    return hashlib.sha256(canonical_json.encode('utf-8')).hexdigest()
+
+
+def snapshot_delta(base: Dict[str, Any],
+                   snapshot: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """
+    Compute the delta of a snapshot with respect to a base snapshot.
+    Dictionaries are compared key by key, all other values are compared as
+    a whole.
+
+    Returns:
+        A dict with the list of ``[path, value]`` pairs of the values to set
+        under 'set', and the list of the paths to delete under 'del', where a
+        path is the list of keys of a value.
+    """
+    sets: List[Any] = []
+    dels: List[Any] = []
+    _diff(base, snapshot, [], sets, dels)
+    return {'set': sets, 'del': dels}
+
+
+def _diff(base: Dict[str, Any], snapshot: Dict[str, Any], path: List[str],
+          sets: List[Any], dels: List[Any]) -> None:
+    for key, value in snapshot.items():
+        if key not in base:
+            sets.append([path + [key], value])
+        elif isinstance(value, dict) and isinstance(base[key], dict):
+            _diff(base[key], value, path + [key], sets, dels)
+        elif not _json_equal(base[key], value):
+            sets.append([path + [key], value])
+    for key in base:
+        if key not in snapshot:
+            dels.append(path + [key])
+
+
+def _json_equal(value1: Any, value2: Any) -> bool:
+    # comparing the JSON tells apart e.g. 1 and True, and treats NaNs as
+    # equal
+    if type(value1) is not type(value2):
+        return False
+    if isinstance(value1, (str, int)):
+        return value1 == value2
+    return json.dumps(value1, sort_keys=True) == json.dumps(value2,
+                                                            sort_keys=True)
+
+
+def apply_snapshot_delta(base: Dict[str, Any],
+                         delta: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """
+    Apply a delta computed with :func:`snapshot_delta` to (and thus modify)
+    the base snapshot
+
+    Returns:
+        The modified base snapshot
+    """
+    for path, value in delta['set']:
+        _parent(base, path)[path[-1]] = value
+    for path in delta['del']:
+        del _parent(base, path)[path[-1]]
+    return base
+
+
+def _parent(snapshot: Dict[str, Any], path: List[str]) -> Dict[str, Any]:
+    parent = snapshot
+    for key in path[:-1]:
+        parent = parent[key]
+    return parent
+
+
+def insert_snapshot(conn: ConnectionPlus, snapshot_raw: str,
+                    delta_base_id: Optional[int] = None) -> int:
+    """
+    Insert a snapshot into the ``snapshots`` table, unless a snapshot with
+    the same content is already in there.
+
+    Args:
+        conn: database connection
+        snapshot_raw: the snapshot as JSON
+        delta_base_id: if given, the snapshot is stored as a delta against
+            the full snapshot that the snapshot of this id is (or is a delta
+            against), if that delta is sufficiently small
+
+    Returns:
+        The id of the snapshot in the ``snapshots`` table
+    """
+    snapshot = json.loads(snapshot_raw)
+    hash_ = snapshot_hash(canonical_snapshot_json(snapshot))
+
+    with atomic(conn) as conn:
+        cursor = transaction(conn,
+                             'SELECT snapshot_id FROM snapshots WHERE hash=?',
+                             hash_)
+        row = cursor.fetchone()
+        if row is not None:
+            return row[0]
+
+        base_id = None
+        stored = snapshot_raw
+        if delta_base_id is not None:
+            base_id, base_raw = _get_full_snapshot(conn, delta_base_id)
+            delta_raw = json.dumps(snapshot_delta(json.loads(base_raw),
+                                                  snapshot))
+            if len(delta_raw) < DELTA_MAX_SIZE_RATIO * len(snapshot_raw):
+                stored = delta_raw
+            else:
+                base_id = None
+
+        cursor = transaction(conn,
+                             'INSERT INTO snapshots (hash, base_id, snapshot) '
+                             'VALUES (?, ?, ?)',
+                             hash_, base_id, stored)
+        return cursor.lastrowid
+
+
+def _get_full_snapshot(conn: ConnectionPlus,
+                       snapshot_id: int) -> Tuple[int, str]:
+    """
+    Get the id and the JSON of the full snapshot that the snapshot of the
+    given id is, or is a delta against
+    """
+    cursor = transaction(conn,
+                         'SELECT base_id, snapshot FROM snapshots '
+                         'WHERE snapshot_id=?',
+                         snapshot_id)
+    base_id, stored = cursor.fetchone()
+    if base_id is None:
+        return snapshot_id, stored
+    return _get_full_snapshot(conn, base_id)
+
+
+def get_snapshot_raw(conn: ConnectionPlus, snapshot_id: int) -> str:
+    """
+    Get the JSON of the snapshot of the given id of the ``snapshots``
+    table. Snapshots that are stored as a delta are reconstructed, hence
+    their JSON may differ in formatting from the JSON that was inserted.
+    """
+    cursor = transaction(conn,
+                         'SELECT base_id, snapshot FROM snapshots '
+                         'WHERE snapshot_id=?',
+                         snapshot_id)
+    base_id, stored = cursor.fetchone()
+    if base_id is None:
+        return stored
+    _, base_raw = _get_full_snapshot(conn, base_id)
+    return json.dumps(apply_snapshot_delta(json.loads(base_raw),
+                                           json.loads(stored)))
+
+
+def get_run_snapshot_id(conn: ConnectionPlus,
+                        run_id: int) -> Optional[int]:
+    """
+    Get the id of the snapshot of a run, or None if the run has no snapshot
+    in the ``snapshots`` table
+    """
+    cursor = transaction(conn, 'SELECT snapshot_id FROM runs WHERE run_id=?',
+                         run_id)
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def get_run_snapshot_raw(conn: ConnectionPlus,
+                         run_id: int) -> Optional[str]:
+    """
+    Get the JSON of the snapshot of a run, or None if the run has no
+    snapshot. Snapshots that were written into the ``snapshot`` column of
+    the ``runs`` table (e.g. as metadata) are returned as well.
+    """
+    cursor = transaction(conn,
+                         'SELECT snapshot, snapshot_id FROM runs '
+                         'WHERE run_id=?',
+                         run_id)
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    snapshot_raw, snapshot_id = row
+    if snapshot_id is None:
+        return snapshot_raw
+    return get_snapshot_raw(conn, snapshot_id)
+
+
+def set_run_snapshot(conn: ConnectionPlus, run_id: int, snapshot_raw: str,
+                     delta_encode: bool = False) -> None:
+    """
+    Set the snapshot of a run, storing the snapshot in the ``snapshots``
+    table if no snapshot with the same content is in there yet.
+
+    Args:
+        conn: database connection
+        run_id: the run to set the snapshot of
+        snapshot_raw: the snapshot as JSON
+        delta_encode: if True, a new snapshot is stored as a delta against
+            the snapshot of the last run before this one that has a
+            snapshot, if that delta is sufficiently small
+    """
+    with atomic(conn) as conn:
+        delta_base_id = None
+        if delta_encode:
+            cursor = transaction(conn,
+                                 'SELECT snapshot_id FROM runs '
+                                 'WHERE run_id<? AND snapshot_id IS NOT NULL '
+                                 'ORDER BY run_id DESC LIMIT 1',
+                                 run_id)
+            row = cursor.fetchone()
+            if row is not None:
+                delta_base_id = row[0]
+        snapshot_id = insert_snapshot(conn, snapshot_raw,
+                                      delta_base_id=delta_base_id)
+        transaction(conn,
+                    'UPDATE runs SET snapshot_id=?, snapshot=NULL '
+                    'WHERE run_id=?',
+                    snapshot_id, run_id)
@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pytest
+
+import qcodes as qc
+from qcodes import load_by_guid, load_by_run_spec
+from qcodes.dataset.catalog import DatabaseCatalog
+from qcodes.dataset.data_set import new_data_set
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
+from qcodes.dataset.experiment_container import new_experiment
+from qcodes.dataset.sqlite.database import connect
+# pylint: disable=unused-import
+from qcodes.tests.dataset.temporary_databases import empty_temp_db
+
+
+def make_runs(path, sample_name, parameters):
+    """
+    Make a database file with a run per parameter, and return the GUIDs of
+    the runs
+    """
+    conn = connect(path)
+    try:
+        exp = new_experiment('cooldown', sample_name=sample_name, conn=conn)
+        guids = []
+        for name in parameters:
+            ps = ParamSpecBase(name, 'numeric')
+            dataset = new_data_set(name, exp_id=exp.exp_id, conn=conn)
+            dataset.set_interdependencies(InterDependencies_(standalones=(ps,)))
+            dataset.mark_started()
+            dataset.add_results([{name: 1.0}])
+            dataset.mark_completed()
+            guids.append(dataset.guid)
+    finally:
+        conn.close()
+    return guids
+
+
+@pytest.fixture
+def two_db_files(tmp_path):
+    january = str(tmp_path / 'january.db')
+    february = str(tmp_path / 'february.db')
+    return {january: make_runs(january, 'qubit_a', ['x', 'y']),
+            february: make_runs(february, 'qubit_b', ['y'])}
+
+
+def test_catalog_indexes_runs_of_many_files(two_db_files, tmp_path):
+    (january, jan_guids), (february, feb_guids) = two_db_files.items()
+    with DatabaseCatalog(str(tmp_path / 'catalog.db')) as catalog:
+        catalog.register(january, february)
+        assert catalog.registered_files == [january, february]
+        assert catalog.locate_guid(feb_guids[0]) == february
+        assert catalog.locate_guid(jan_guids[1]) == january
+        assert catalog.locate_guid('not-a-guid') is None
+
+        runs = catalog.get_run_catalog(captured_run_id=1)
+        assert list(runs['guid']) == [jan_guids[0], feb_guids[0]]
+        assert list(runs['sample_name']) == ['qubit_a', 'qubit_b']
+        assert list(runs['path']) == [january, february]
+        assert np.all(runs['is_completed'])
+        assert catalog.get_guids_from_run_spec(parameter='y') \
+            == {jan_guids[1]: january, feb_guids[0]: february}
+        assert catalog.get_guids_from_run_spec(
+            sample_name='qubit_a', parameter='y') == {jan_guids[1]: january}
+
+        # only changed files are indexed again
+        assert catalog.refresh() == []
+        new_guid, = make_runs(february, 'qubit_b', ['z'])
+        assert catalog.refresh() == [february]
+        assert catalog.locate_guid(new_guid) == february
+
+        os.remove(february)
+        assert catalog.refresh() == [february]
+        assert catalog.locate_guid(new_guid) is None
+        catalog.unregister(january)
+        assert catalog.registered_files == [february]
+        assert len(catalog.get_run_catalog()) == 0
+
+        with pytest.raises(FileNotFoundError):
+            catalog.register(str(tmp_path / 'missing.db'))
+
+    # the index is kept in the catalog file
+    with DatabaseCatalog(str(tmp_path / 'catalog.db')) as catalog:
+        assert catalog.registered_files == [february]
+
+
+@pytest.mark.usefixtures('empty_temp_db')
+def test_load_runs_through_catalog_from_config(two_db_files, tmp_path,
+                                               monkeypatch):
+    (january, jan_guids), (february, feb_guids) = two_db_files.items()
+    catalog_path = str(tmp_path / 'catalog.db')
+    with DatabaseCatalog(catalog_path) as catalog:
+        catalog.register(january, february)
+
+    with pytest.raises(NameError):
+        load_by_guid(feb_guids[0])
+
+    monkeypatch.setitem(qc.config['core'], 'db_catalog', catalog_path)
+    dataset = load_by_guid(feb_guids[0])
+    assert dataset.path_to_db == february
+    assert dataset.sample_name == 'qubit_b'
+
+    dataset = load_by_run_spec(sample_name='qubit_a', captured_run_id=2)
+    assert dataset.guid == jan_guids[1]
+    with pytest.raises(NameError, match='More than one'):
+        load_by_run_spec(captured_run_id=1)
+    with pytest.raises(NameError, match='No run'):
+        load_by_run_spec(sample_name='qubit_c')
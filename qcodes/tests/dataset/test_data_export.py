@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from qcodes.dataset.data_export import (GRID_COMPLETE, GRID_IRREGULAR,
+                                        GRID_PARTIAL, _rows_from_datapoints,
+                                        _strings_as_ints,
+                                        datatype_from_setpoints_2d,
+                                        grid_coordinates, infer_grid,
+                                        reshape_2D_data, sweep_grid)
+
+
+def grid_setpoints(*axes):
+    return [points.ravel() for points in np.meshgrid(*axes, indexing='ij')]
+
+
+def test_infer_grid_complete_and_partial():
+    x, y = grid_setpoints(np.arange(5.), np.linspace(0, 1, 4))
+
+    grid = infer_grid(x, y)
+    assert grid.kind == GRID_COMPLETE
+    assert grid.shape == (5, 4)
+    assert grid.order == (0, 1)
+
+    # an interrupted sweep, with the inner axis first
+    grid = infer_grid(y[:-2], x[:-2])
+    assert grid.kind == GRID_PARTIAL
+    assert grid.order == (1, 0)
+
+    # data missing at the start, duplicated data and scattered data
+    assert infer_grid(x[2:], y[2:]).kind == GRID_IRREGULAR
+    assert infer_grid(np.append(x, x[0]),
+                      np.append(y, y[0])).kind == GRID_IRREGULAR
+    assert infer_grid(np.random.rand(20),
+                      np.random.rand(20)).kind == GRID_IRREGULAR
+
+
+def test_infer_grid_with_constant_axes():
+    rng = np.random.default_rng(0)
+    n_points = 20000
+    constant = np.zeros(n_points)
+    # a scattered cloud under a fixed outer setpoint is not a grid, and is
+    # rejected without allocating anything of the size of the grid
+    grid = infer_grid(constant, rng.random(n_points), rng.random(n_points))
+    assert grid.kind == GRID_IRREGULAR
+
+    x, y = grid_setpoints(np.arange(5.), np.arange(4.))
+    constant = np.zeros(len(x))
+    assert infer_grid(constant, x, y).kind == GRID_COMPLETE
+    assert infer_grid(constant[:-2], x[:-2], y[:-2]).kind == GRID_PARTIAL
+    assert infer_grid(constant[2:], x[2:], y[2:]).kind == GRID_IRREGULAR
+    assert infer_grid(np.zeros(1), np.ones(1)).kind == GRID_COMPLETE
+    assert infer_grid(np.zeros(2), np.ones(2)).kind == GRID_IRREGULAR
+
+
+def test_infer_grid_n_dimensional_and_shuffled():
+    x, y, z = grid_setpoints(np.arange(3), np.arange(4), np.arange(2))
+    values = x * 100 + y * 10 + z
+    order = np.random.permutation(len(x))
+
+    grid = infer_grid(x[order], y[order], z[order])
+    assert grid.kind == GRID_COMPLETE
+    assert_array_equal(grid.on_grid(values[order]),
+                       values.reshape(3, 4, 2))
+
+
+@pytest.mark.parametrize('n_missing', [0, 1, 3])
+def test_reshape_2D_data(n_missing):
+    x, y = grid_setpoints(np.arange(5.), np.arange(4.))
+    n_points = len(x) - n_missing
+    z = x * 10 + y
+    expected = z.reshape(5, 4).T.copy()
+    if n_missing:
+        expected[-n_missing:, -1] = np.nan
+
+    assert datatype_from_setpoints_2d(x[:n_points],
+                                      y[:n_points]) == '2D_grid'
+    xrow, yrow, z_to_plot = reshape_2D_data(x[:n_points], y[:n_points],
+                                            z[:n_points])
+    assert_array_equal(xrow, np.arange(5.))
+    assert_array_equal(yrow, np.arange(4.))
+    assert_array_equal(z_to_plot, expected)
+
+
+def test_reshape_2D_string_data():
+    x, y = grid_setpoints(np.arange(2.), np.arange(2.))
+    z = np.array(['a', 'b', 'c', 'd'])
+    _, _, z_to_plot = reshape_2D_data(x[:3], y[:3], z[:3])
+    assert_array_equal(z_to_plot, [['a', 'c'], ['b', '']])
+
+
+def test_equidistant_and_unknown_2d_data():
+    x = np.array([0., 1., 3., 0., 1., 3.])
+    y = np.array([0., 0., 0., 1., 1., 1.])
+    assert datatype_from_setpoints_2d(x[[0, 2, 3, 4, 5]],
+                                      y[[0, 2, 3, 4, 5]]) == '2D_equidistant'
+    assert datatype_from_setpoints_2d(np.array([0., 1., 2.5, 0.]),
+                                      np.array([0., 1., 0., 3.3])) \
+        == '2D_unknown'
+
+
+def test_rows_from_datapoints():
+    setpoints = np.array([1., 2., 3., 1., 2., 1.])
+    rows = _rows_from_datapoints(setpoints)
+    assert [list(row) for row in rows] == [[1., 2., 3.], [1., 2.], [1.]]
+    assert_array_equal(_rows_from_datapoints(np.array([2., 1., 2., 1.])),
+                       [[1., 2.], [1., 2.]])
+
+
+def test_strings_as_ints():
+    assert_array_equal(_strings_as_ints(np.array(['b', 'a', 'c', 'a'])),
+                       [1., 0., 2., 0.])
+
+
+def test_sweep_grid():
+    # the inner axis is swept downwards
+    x, y = grid_setpoints(np.arange(3.), np.arange(4.)[::-1])
+    assert sweep_grid(x, y) == ((0, 1), (3, 4))
+    assert sweep_grid(y, x) == ((1, 0), (3, 4))
+    coordinates = grid_coordinates((y, x), (1, 0), (3, 4))
+    assert_array_equal(coordinates[0], np.arange(3.))
+    assert_array_equal(coordinates[1], [3., 2., 1., 0.])
+    assert np.shares_memory(coordinates[1], y)
+
+    assert sweep_grid(x, y, shape=(3, 4)) == ((0, 1), (3, 4))
+    assert sweep_grid(x, y, shape=(4, 3)) is None
+    # interrupted, shuffled and scattered data is not a complete sweep
+    assert sweep_grid(x[:-1], y[:-1]) is None
+    order = np.random.permutation(len(x))
+    assert sweep_grid(x[order], y[order]) is None
+    assert sweep_grid(np.random.rand(12), np.random.rand(12)) is None
+    assert sweep_grid(np.array([0., 1., 0.])) is None
@@ -1,23 +1,30 @@
+import io
 import json
 import logging
 import os
+import sqlite3
 import tempfile
+import threading
 from contextlib import contextmanager
 from copy import deepcopy
+from unittest.mock import patch
 
+import numpy as np
 import pytest
 
 import qcodes as qc
 import qcodes.dataset.descriptions.versioning.serialization as serial
 import qcodes.tests.dataset
 from qcodes import new_data_set, new_experiment
+from qcodes.dataset.data_set import DataSet
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.descriptions.versioning.v0 import InterDependencies
 from qcodes.dataset.guids import parse_guid
 from qcodes.dataset.sqlite.connection import atomic_transaction, ConnectionPlus
 from qcodes.dataset.sqlite.database import (
-    connect, get_db_version_and_newest_available_version, initialise_database,
+    ConnectionPool, connect, conn_from_dbpath_or_conn, connection_pool,
+    get_db_version_and_newest_available_version, initialise_database,
     initialise_or_create_database_at)
 # pylint: disable=unused-import
 from qcodes.dataset.sqlite.db_upgrades import (_latest_available_version,
@@ -30,10 +37,15 @@ from qcodes.dataset.sqlite.db_upgrades import (_latest_available_version,
                                                perform_db_upgrade_5_to_6,
                                                perform_db_upgrade_6_to_7,
                                                perform_db_upgrade_7_to_8,
+                                               perform_db_upgrade_8_to_9,
+                                               perform_db_upgrade_9_to_10,
+                                               perform_db_upgrade_10_to_11,
                                                perform_db_upgrade,
                                                set_user_version)
 from qcodes.dataset.sqlite.queries import get_run_description, update_GUIDs
+from qcodes.dataset.sqlite.initial_schema import init_db
 from qcodes.dataset.sqlite.query_helpers import is_column_in_table, one
+from qcodes.dataset.sqlite.snapshots import get_run_snapshot_raw
 from qcodes.tests.common import error_caused_by
 from qcodes.tests.dataset.temporary_databases import (empty_temp_db,
                                                       experiment,
@@ -80,7 +92,8 @@ def test_tables_exist(empty_temp_db, version):
                    version=version)
     cursor = conn.execute("select sql from sqlite_master"
                           " where type = 'table'")
-    expected_tables = ['experiments', 'runs', 'layouts', 'dependencies']
+    expected_tables = ['experiments', 'runs', 'layouts', 'dependencies',
+                       'snapshots']
     rows = [row for row in cursor]
     assert len(rows) == len(expected_tables)
     for row, expected_table in zip(rows, expected_tables):
@@ -902,8 +915,194 @@ def test_cannot_connect_to_newer_db():
                        qc.config["core"]["db_debug"])
 
 
+def test_connect_skips_init_of_latest_version_db(tmp_path):
+    db_location = str(tmp_path / 'temp.db')
+    connect(db_location).close()
+    old_db_location = str(tmp_path / 'old.db')
+    connect(old_db_location, version=LATEST_VERSION - 1).close()
+
+    with patch('qcodes.dataset.sqlite.database.init_db',
+               wraps=init_db) as mock_init_db:
+        conn = connect(db_location)
+        assert get_user_version(conn) == LATEST_VERSION
+        mock_init_db.assert_not_called()
+        conn.close()
+
+        # a database in an older version is still initialised and upgraded
+        conn = connect(old_db_location)
+        mock_init_db.assert_called_once()
+        assert get_user_version(conn) == LATEST_VERSION
+        conn.close()
+
+
+def test_connect_read_only(tmp_path):
+    db_location = str(tmp_path / 'temp.db')
+    with pytest.raises(sqlite3.OperationalError):
+        connect(db_location, read_only=True)
+    connect(db_location, version=LATEST_VERSION - 1).close()
+    with pytest.raises(RuntimeError, match='when it is opened for reading'):
+        connect(db_location, read_only=True)
+
+    connect(db_location).close()
+    conn = connect(db_location, read_only=True)
+    assert get_user_version(conn) == LATEST_VERSION
+    assert conn.path_to_dbfile == db_location
+    with pytest.raises(sqlite3.OperationalError, match='readonly'):
+        conn.execute('CREATE TABLE more_results (x)')
+    conn.close()
+
+
+def test_connection_pool(tmp_path):
+    pool = ConnectionPool()
+    db_location = str(tmp_path / 'temp.db')
+
+    conn = pool.get(db_location)
+    assert pool.get(db_location) is conn
+    assert pool.stats['n_connects'] == 1
+    assert pool.stats['n_reuses'] == 1
+    assert pool.stats['n_pooled'] == 1
+
+    # connections are not shared between threads
+    other_threads_conn = []
+    thread = threading.Thread(
+        target=lambda: other_threads_conn.append(pool.get(db_location)))
+    thread.start()
+    thread.join()
+    assert other_threads_conn[0] is not conn
+    assert pool.stats['n_pooled'] == 2
+
+    # a closed connection is replaced
+    conn.close()
+    new_conn = pool.get(db_location)
+    assert new_conn is not conn
+    assert get_user_version(new_conn) == LATEST_VERSION
+
+    assert pool.close_idle(max_idle_time=0) == 2
+    assert len(pool) == 0
+
+    conn = pool.get(db_location)
+    pool.close_all()
+    assert len(pool) == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+
+
+def test_conn_from_dbpath_uses_pool_if_enabled(tmp_path):
+    db_location = str(tmp_path / 'temp.db')
+    conn = conn_from_dbpath_or_conn(conn=None, path_to_db=db_location)
+    assert conn_from_dbpath_or_conn(conn=None, path_to_db=db_location) \
+        is not conn
+    conn.close()
+
+    qc.config['core']['db_connection_pool'] = True
+    try:
+        conn = conn_from_dbpath_or_conn(conn=None, path_to_db=db_location)
+        assert conn_from_dbpath_or_conn(conn=None, path_to_db=db_location) \
+            is conn
+    finally:
+        qc.config['core']['db_connection_pool'] = False
+        connection_pool.close_all()
+
+
+def test_toggle_debug_keeps_pooled_connection_open(tmp_path):
+    db_location = str(tmp_path / 'temp.db')
+    conn = connect(db_location)
+    new_experiment('exp', 'sample', conn=conn)
+    run_id = new_data_set('pooled', conn=conn).run_id
+    conn.close()
+
+    qc.config['core']['db_connection_pool'] = True
+    try:
+        dataset = DataSet(path_to_db=db_location, run_id=run_id)
+        other_dataset = DataSet(path_to_db=db_location, run_id=run_id)
+        assert dataset.conn is other_dataset.conn
+        assert dataset.conn.pooled
+
+        dataset.toggle_debug()
+        assert dataset.conn is not other_dataset.conn
+        assert not dataset.conn.pooled
+        assert other_dataset.name == 'pooled'
+        assert dataset.name == 'pooled'
+        dataset.toggle_debug()
+        assert other_dataset.name == 'pooled'
+        dataset.conn.close()
+    finally:
+        qc.config['core']['db_connection_pool'] = False
+        connection_pool.close_all()
+
+
+def test_perform_upgrade_8_to_9_keeps_npy_arrays_readable():
+    # write an array in the pre-version-9 (.npy) format into a version 8 db
+    # and check that it can still be read after the upgrade
+    conn = connect(':memory:', version=8)
+    assert get_user_version(conn) == 8
+
+    arr = np.arange(6, dtype=np.float32).reshape(2, 3)
+    out = io.BytesIO()
+    np.save(out, arr)
+    atomic_transaction(conn, 'CREATE TABLE arrays (x array)')
+    atomic_transaction(conn, 'INSERT INTO arrays (x) VALUES (?)',
+                       sqlite3.Binary(out.getvalue()))
+
+    perform_db_upgrade_8_to_9(conn)
+    assert get_user_version(conn) == 9
+
+    cursor = atomic_transaction(conn, 'SELECT x FROM arrays')
+    np.testing.assert_array_equal(one(cursor, 'x'), arr)
+    conn.close()
+
+
+def test_perform_upgrade_9_to_10_deduplicates_snapshots():
+    conn = connect(':memory:', version=9)
+    snapshots = ['{"station": {"a": 1, "b": 2}}',
+                 '{"station": {"b": 2, "a": 1}}',
+                 '{"station": {"a": 3}}',
+                 None]
+    for snapshot in snapshots:
+        atomic_transaction(conn, 'INSERT INTO runs (snapshot) VALUES (?)',
+                           snapshot)
+
+    perform_db_upgrade_9_to_10(conn)
+    assert get_user_version(conn) == 10
+
+    cursor = atomic_transaction(conn, 'SELECT COUNT(*) FROM snapshots')
+    assert one(cursor, 'COUNT(*)') == 2
+    cursor = atomic_transaction(conn, 'SELECT snapshot_id, snapshot FROM runs '
+                                      'ORDER BY run_id')
+    rows = cursor.fetchall()
+    assert [row[1] for row in rows] == [None] * 4
+    assert rows[0][0] == rows[1][0] != rows[2][0]
+    assert rows[3][0] is None
+    # the first of identical snapshots is kept
+    expected = [snapshots[0], snapshots[0], snapshots[2], None]
+    for run_id, snapshot in enumerate(expected, 1):
+        assert get_run_snapshot_raw(conn, run_id) == snapshot
+    conn.close()
+
+
+def test_perform_upgrade_10_to_11_indexes_runs():
+    conn = connect(':memory:', version=10)
+    perform_db_upgrade_10_to_11(conn)
+    assert get_user_version(conn) == 11
+
+    queries = {'IX_runs_guid': 'SELECT run_id FROM runs WHERE guid = ?',
+               'IX_runs_exp_id_captured_counter':
+                   'SELECT run_id FROM runs '
+                   'WHERE exp_id = ? AND captured_counter = ?',
+               'IX_runs_captured_run_id':
+                   'SELECT run_id FROM runs WHERE captured_run_id = ?',
+               'IX_runs_run_timestamp':
+                   'SELECT run_id FROM runs WHERE run_timestamp > ?'}
+    for index_name, query in queries.items():
+        n_params = query.count('?')
+        plan = atomic_transaction(conn, 'EXPLAIN QUERY PLAN ' + query,
+                                  *range(n_params)).fetchall()
+        assert index_name in ' '.join(row[-1] for row in plan)
+    conn.close()
+
+
 def test_latest_available_version():
-    assert _latest_available_version() == 8
+    assert _latest_available_version() == 11
 
 
 @pytest.mark.parametrize('version', VERSIONS)
@@ -16,9 +16,14 @@ from qcodes.dataset.experiment_container import Experiment,\
 from qcodes.dataset.data_set import (DataSet, load_by_guid, load_by_counter,
                                      load_by_id, load_by_run_spec,
                                      generate_dataset_table)
-from qcodes.dataset.sqlite.database import get_db_version_and_newest_available_version
+from qcodes.dataset.sqlite.database import connect, \
+    get_db_version_and_newest_available_version
 from qcodes.dataset.sqlite.connection import path_to_dbfile
-from qcodes.dataset.database_extract_runs import extract_runs_into_db
+from qcodes.dataset.sqlite.sidecars import sidecar_dir, sidecar_file_name
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
+from qcodes.dataset.database_extract_runs import extract_runs_into_db, \
+    extract_runs_into_dbs
 from qcodes.dataset.sqlite.queries import get_experiments
 from qcodes.tests.dataset.temporary_databases import (  # pylint: disable=unused-import
     two_empty_temp_db_connections,
@@ -271,10 +276,11 @@ def test_correct_experiment_routing(two_empty_temp_db_connections,
         assert source_data == target_data
 
 
-def test_runs_from_different_experiments_raises(two_empty_temp_db_connections,
-                                                some_interdeps):
+def test_runs_from_different_experiments(two_empty_temp_db_connections,
+                                         some_interdeps):
     """
-    Test that inserting runs from multiple experiments raises
+    Test that runs from multiple experiments are inserted into the matching
+    experiments in one call
     """
     source_conn, target_conn = two_empty_temp_db_connections
 
@@ -319,14 +325,76 @@ def test_runs_from_different_experiments_raises(two_empty_temp_db_connections,
                                        for name in some_interdeps[1].names})
         source_dataset.mark_completed()
 
-    run_ids = exp_1_run_ids + exp_2_run_ids
-    source_exp_ids = np.unique([1, 2])
-    matchstring = ('Did not receive runs from a single experiment\\. '
-                   f'Got runs from experiments {source_exp_ids}')
-    # make the matchstring safe to use as a regexp
-    matchstring = matchstring.replace('[', '\\[').replace(']', '\\]')
-    with pytest.raises(ValueError, match=matchstring):
-        extract_runs_into_db(source_path, target_path, *run_ids)
+    # interleave the runs of the two experiments
+    run_ids = [run_id for run_ids in zip(exp_1_run_ids, exp_2_run_ids)
+               for run_id in run_ids]
+    extract_runs_into_db(source_path, target_path, *run_ids)
+
+    assert len(get_experiments(target_conn)) == 2
+    target_exp_1 = load_experiment_by_name(source_exp_1.name,
+                                           conn=target_conn)
+    target_exp_2 = load_experiment_by_name(source_exp_2.name,
+                                           conn=target_conn)
+    assert len(target_exp_1) == 5
+    assert len(target_exp_2) == 5
+
+    for run_id in run_ids:
+        source_ds = DataSet(conn=source_conn, run_id=run_id)
+        target_ds = load_by_guid(guid=source_ds.guid, conn=target_conn)
+
+        assert source_ds.the_same_dataset_as(target_ds)
+        assert source_ds.get_data(*source_ds.parameters.split(',')) == \
+            target_ds.get_data(*target_ds.parameters.split(','))
+
+
+def test_extract_runs_into_dbs(two_empty_temp_db_connections,
+                               some_interdeps, tmp_path, capsys):
+    """
+    Test the extraction of runs into several DB files at once, and the
+    progress bar
+    """
+    source_conn, _ = two_empty_temp_db_connections
+    source_path = path_to_dbfile(source_conn)
+
+    source_exp = Experiment(conn=source_conn)
+    run_ids = []
+    for _ in range(4):
+        source_dataset = DataSet(conn=source_conn, exp_id=source_exp.exp_id)
+        run_ids.append(source_dataset.run_id)
+        source_dataset.set_interdependencies(some_interdeps[1])
+        source_dataset.mark_started()
+        source_dataset.add_results([{name: val
+                                     for name in some_interdeps[1].names}
+                                    for val in range(10)])
+        source_dataset.mark_completed()
+
+    target_paths = [str(tmp_path / f'target_{n}.db') for n in range(2)]
+    extract_runs_into_dbs(source_path,
+                          {target_paths[0]: run_ids[:3],
+                           target_paths[1]: run_ids[2:]},
+                          show_progress=True,
+                          max_workers=2)
+
+    assert '30/30' in capsys.readouterr().out
+
+    for target_path, target_run_ids in zip(target_paths,
+                                           (run_ids[:3], run_ids[2:])):
+        target_conn = connect(target_path)
+        try:
+            assert len(Experiment(conn=target_conn, exp_id=1)) == \
+                len(target_run_ids)
+            for run_id in target_run_ids:
+                source_ds = DataSet(conn=source_conn, run_id=run_id)
+                target_ds = load_by_guid(guid=source_ds.guid,
+                                         conn=target_conn)
+                assert source_ds.get_data(
+                    *source_ds.parameters.split(',')) == \
+                    target_ds.get_data(*target_ds.parameters.split(','))
+        finally:
+            target_conn.close()
+
+    with pytest.raises(ValueError, match="not all run_ids exist"):
+        extract_runs_into_dbs(source_path, {target_paths[0]: [100]})
 
 
 def test_extracting_dataless_run(two_empty_temp_db_connections):
@@ -351,6 +419,102 @@ def test_extracting_dataless_run(two_empty_temp_db_connections):
     assert loaded_ds.the_same_dataset_as(source_ds)
 
 
+def test_extraction_carries_sidecars(two_empty_temp_db_connections):
+    source_conn, target_conn = two_empty_temp_db_connections
+
+    source_path = path_to_dbfile(source_conn)
+    target_path = path_to_dbfile(target_conn)
+
+    Experiment(conn=source_conn)
+
+    x = ParamSpecBase('x', 'numeric')
+    y = ParamSpecBase('y', 'array')
+    source_ds = DataSet(conn=source_conn)
+    source_ds.set_interdependencies(InterDependencies_(dependencies={y: (x,)}))
+    source_ds.sidecar_threshold = 0
+    source_ds.mark_started()
+    arrays = [np.random.rand(50) for _ in range(4)]
+    source_ds.add_results([{'x': i, 'y': arr}
+                           for i, arr in enumerate(arrays)])
+    source_ds.mark_completed()
+
+    extract_runs_into_db(source_path, target_path, source_ds.run_id)
+
+    sidecar_file = sidecar_file_name(source_ds.guid)
+    assert os.path.exists(os.path.join(sidecar_dir(target_path),
+                                       sidecar_file))
+    os.remove(os.path.join(sidecar_dir(source_path), sidecar_file))
+
+    target_ds = DataSet(conn=target_conn, run_id=1)
+    loaded = target_ds.get_parameter_data('y')['y']['y']
+    assert isinstance(loaded, np.memmap)
+    assert loaded.filename.startswith(sidecar_dir(target_path))
+    np.testing.assert_array_equal(loaded, np.stack(arrays))
+
+
+def test_extraction_decodes_categorical_parameters(
+        two_empty_temp_db_connections):
+    source_conn, target_conn = two_empty_temp_db_connections
+
+    source_path = path_to_dbfile(source_conn)
+    target_path = path_to_dbfile(target_conn)
+
+    Experiment(conn=source_conn)
+
+    x = ParamSpecBase('x', 'numeric')
+    mode = ParamSpecBase('mode', 'text')
+    source_ds = DataSet(conn=source_conn)
+    source_ds.set_interdependencies(
+        InterDependencies_(dependencies={mode: (x,)}))
+    source_ds.set_compression({'mode': 'categorical'})
+    source_ds.mark_started()
+    modes = ['on', 'off', 'on', None, 'off']
+    source_ds.add_results([{'x': i, 'mode': value}
+                           for i, value in enumerate(modes)])
+    source_ds.mark_completed()
+
+    extract_runs_into_db(source_path, target_path, source_ds.run_id)
+
+    target_ds = DataSet(conn=target_conn, run_id=1)
+    assert target_ds.get_data('mode') == [[value] for value in modes]
+    np.testing.assert_array_equal(
+        target_ds.get_parameter_data('mode')['mode']['mode'],
+        ['on', 'off', 'on', 'off'])
+    assert target_ds.compression == {}
+
+
+def test_extraction_preserves_run_description(two_empty_temp_db_connections):
+    source_conn, target_conn = two_empty_temp_db_connections
+
+    source_path = path_to_dbfile(source_conn)
+    target_path = path_to_dbfile(target_conn)
+
+    Experiment(conn=source_conn)
+
+    x = ParamSpecBase('x', 'numeric')
+    y = ParamSpecBase('y', 'numeric')
+    trace = ParamSpecBase('trace', 'array')
+    source_ds = DataSet(conn=source_conn)
+    source_ds.set_interdependencies(
+        InterDependencies_(dependencies={y: (x,), trace: (x,)}))
+    source_ds.set_shapes({'y': (2, 3)})
+    source_ds.set_compression({'trace': 'zlib'})
+    source_ds.mark_started()
+    source_ds.add_results([{'x': i, 'y': i ** 2} for i in range(6)])
+    source_ds.add_results([{'x': 0, 'trace': np.arange(10.)}])
+    source_ds.mark_completed()
+
+    extract_runs_into_db(source_path, target_path, source_ds.run_id)
+
+    target_ds = DataSet(conn=target_conn, run_id=1)
+    assert target_ds.description == source_ds.description
+    assert target_ds.description.shapes == {'y': (2, 3)}
+    assert target_ds.get_parameter_data('y')['y']['y'].shape == (2, 3)
+    np.testing.assert_array_equal(
+        target_ds.get_parameter_data('trace')['trace']['trace'],
+        [np.arange(10.)])
+
+
 def test_result_table_naming_and_run_id(two_empty_temp_db_connections,
                                         some_interdeps):
     """
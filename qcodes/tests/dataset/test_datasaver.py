@@ -8,6 +8,8 @@ import qcodes as qc
 from qcodes.dataset.measurements import DataSaver
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.experiment_container import load_or_create_experiment
+from qcodes.dataset.sqlite.database import connect
 # pylint: disable=unused-import
 from qcodes.tests.dataset.temporary_databases import empty_temp_db, experiment
 
@@ -122,3 +124,166 @@ def test_saving_numeric_values_as_text(numeric_type):
             data_saver.add_result((p.name, value))
     finally:
         data_saver.dataset.conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+def test_background_writer_writes_in_order():
+    p = ParamSpecBase(name="p", paramtype="numeric")
+    idps = InterDependencies_(standalones=(p,))
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(dataset=test_set, write_period=0, interdeps=idps,
+                           write_in_background=True)
+    for n in range(20):
+        data_saver.add_result(("p", n))
+    data_saver._stop_background_writer()
+
+    assert test_set.get_data("p") == [[n] for n in range(20)]
+    assert data_saver.write_queue_depth == 0
+    assert data_saver.write_metrics == {}
+
+
+@pytest.mark.usefixtures("experiment")
+def test_background_writer_metrics():
+    p = ParamSpecBase(name="p", paramtype="numeric")
+    idps = InterDependencies_(standalones=(p,))
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(dataset=test_set, write_period=0, interdeps=idps,
+                           write_in_background=True)
+    writer = data_saver._background_writer
+    try:
+        data_saver.add_result(("p", 1))
+        metrics = data_saver.write_metrics
+        assert set(metrics) == {'queue_depth', 'n_writes',
+                                'last_write_latency', 'mean_write_latency',
+                                'max_write_latency'}
+    finally:
+        data_saver._stop_background_writer()
+    assert writer.n_writes == 1
+    assert writer.max_write_latency >= writer.last_write_latency > 0
+
+
+@pytest.mark.usefixtures("experiment")
+def test_background_writer_raises_write_errors():
+    p = ParamSpecBase(name="p", paramtype="numeric")
+    idps = InterDependencies_(standalones=(p,))
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(dataset=test_set, write_period=0, interdeps=idps,
+                           write_in_background=True)
+    # sneak a result for an unknown column past the validation of add_result
+    data_saver._results.append({'not_a_column': [1]})
+
+    with pytest.raises(RuntimeError, match='in the background failed'):
+        data_saver._stop_background_writer()
+
+
+def test_background_writer_refuses_in_memory_db():
+    conn = connect(':memory:')
+    try:
+        exp = load_or_create_experiment('exp', 'sample', conn=conn)
+        p = ParamSpecBase(name="p", paramtype="numeric")
+        idps = InterDependencies_(standalones=(p,))
+        test_set = qc.new_data_set("test-dataset", exp_id=exp.exp_id,
+                                   conn=conn)
+        test_set.set_interdependencies(idps)
+        test_set.mark_started()
+        with pytest.raises(ValueError, match='in-memory'):
+            DataSaver(dataset=test_set, write_period=0, interdeps=idps,
+                      write_in_background=True)
+    finally:
+        conn.close()
+
+
+@pytest.mark.usefixtures("experiment")
+def test_numeric_arrays_are_buffered_as_columns():
+    x = ParamSpecBase(name="x", paramtype="numeric")
+    y = ParamSpecBase(name="y", paramtype="numeric")
+    idps = InterDependencies_(dependencies={y: (x,)})
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(dataset=test_set, write_period=100,
+                           interdeps=idps)
+    xvals = np.linspace(0, 1, 1000)
+    data_saver.add_result(("x", xvals), ("y", 2 * xvals))
+    data_saver.add_result(("x", 2.0), ("y", 4.0))
+
+    assert len(data_saver._results) == 2
+    np.testing.assert_array_equal(data_saver._results[0]['x'], xvals)
+
+    data_saver.flush_data_to_database()
+    assert data_saver._results == []
+    data = test_set.get_parameter_data()['y']
+    np.testing.assert_array_equal(data['x'], np.append(xvals, 2.0))
+    np.testing.assert_array_equal(data['y'], np.append(2 * xvals, 4.0))
+
+
+@pytest.mark.usefixtures("experiment")
+def test_result_schema_is_compiled_once_per_set_of_parameters():
+    x = ParamSpecBase(name="x", paramtype="numeric")
+    y = ParamSpecBase(name="y", paramtype="numeric")
+    z = ParamSpecBase(name="z", paramtype="numeric")
+    # an equal, but not the same, paramspec as the setpoint of z
+    x_copy = ParamSpecBase(name="x", paramtype="numeric")
+    idps = InterDependencies_(dependencies={y: (x,), z: (x_copy,)},
+                              inferences={y: (x,)})
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(dataset=test_set, write_period=100,
+                           interdeps=idps)
+    data_saver.add_result(("x", 1.0), ("y", 2.0))
+    data_saver.add_result(("y", 4.0), ("x", 2.0))
+    assert len(data_saver._schemas) == 1
+    data_saver.add_result(("x", 1.0), ("y", 1.0), ("z", 3.0))
+    data_saver.add_result(("x", 3.0), ("y", np.arange(3.)),
+                          ("z", np.arange(3.)))
+    assert len(data_saver._schemas) == 2
+
+    # results with missing dependencies are rejected every time, and
+    # their schema is not kept
+    for _ in range(2):
+        with pytest.raises(ValueError, match='some required parameters'):
+            data_saver.add_result(("y", 1.0))
+    assert len(data_saver._schemas) == 2
+    with pytest.raises(ValueError, match='Incompatible shapes'):
+        data_saver.add_result(("x", np.arange(2.)), ("y", np.arange(3.)))
+    with pytest.raises(ValueError, match='is of type "numeric"'):
+        data_saver.add_result(("x", 1.0), ("y", 'a'))
+
+    data_saver.flush_data_to_database()
+    data = test_set.get_parameter_data()
+    np.testing.assert_array_equal(data['y']['y'],
+                                  [2.0, 4.0, 1.0, 0.0, 1.0, 2.0])
+    np.testing.assert_array_equal(data['y']['x'],
+                                  [1.0, 2.0, 1.0, 3.0, 3.0, 3.0])
+    np.testing.assert_array_equal(data['z']['z'], [3.0, 0.0, 1.0, 2.0])
+
+
+@pytest.mark.usefixtures("experiment")
+def test_single_inferred_value_is_repeated_for_arrays():
+    x = ParamSpecBase(name="x", paramtype="numeric")
+    y = ParamSpecBase(name="y", paramtype="numeric")
+    gate = ParamSpecBase(name="gate", paramtype="numeric")
+    idps = InterDependencies_(dependencies={y: (x,)},
+                              inferences={y: (gate,)})
+    test_set = qc.new_data_set("test-dataset")
+    test_set.set_interdependencies(idps)
+    test_set.mark_started()
+
+    data_saver = DataSaver(dataset=test_set, write_period=100,
+                           interdeps=idps)
+    data_saver.add_result(("x", np.arange(3.)), ("y", np.arange(3.)),
+                          ("gate", 5.0))
+    np.testing.assert_array_equal(data_saver._results[0]['gate'],
+                                  [5.0, 5.0, 5.0])
@@ -1,5 +1,6 @@
 import itertools
-from copy import copy
+import json
+from copy import copy, deepcopy
 import re
 from unittest.mock import patch
 import random
@@ -22,9 +23,11 @@ from qcodes.dataset.sqlite.queries import get_non_dependencies, \
     _unicode_categories
 from qcodes.tests.common import error_caused_by
 from qcodes.dataset.sqlite.database import get_DB_location
-from qcodes.dataset.data_set import CompletedError, DataSet
+from qcodes.dataset.data_set import (CompletedError, DataSet,
+                                     load_run_catalog,
+                                     load_run_catalog_as_dataframe)
 from qcodes.dataset.guids import parse_guid
-from qcodes.dataset.sqlite.connection import path_to_dbfile
+from qcodes.dataset.sqlite.connection import atomic_transaction, path_to_dbfile
 from qcodes.utils.deprecate import QCoDeSDeprecationWarning
 # pylint: disable=unused-import
 from qcodes.tests.dataset.temporary_databases import (empty_temp_db,
@@ -420,6 +423,32 @@ def test_add_data_array():
     np.testing.assert_allclose(y_data, expected_y)
 
 
+@pytest.mark.usefixtures("experiment")
+def test_read_arrays_are_read_only():
+    idps = InterDependencies_(
+        standalones=(ParamSpecBase("y", "array"),))
+    dataset = new_data_set("test_read_arrays_are_read_only")
+    dataset.set_interdependencies(idps)
+    # the second array is stored in the sidecar file of the run
+    dataset.sidecar_threshold = 100
+    dataset.mark_started()
+    dataset.add_results([{"y": np.arange(3.)}])
+    dataset.add_results([{"y": np.arange(20.)}])
+
+    small, large = (row[0] for row in dataset.get_data('y'))
+    for arr in (small, large):
+        assert not arr.flags.writeable
+        with pytest.raises(ValueError, match='read-only'):
+            arr -= 1
+        copied = arr.copy()
+        copied -= 1
+        np.testing.assert_array_equal(copied, arr - 1)
+
+    data = dataset.get_parameter_data(start=2)['y']['y']
+    assert isinstance(data, np.memmap)
+    assert not data.flags.writeable
+
+
 @pytest.mark.usefixtures("experiment")
 def test_adding_too_many_results():
     """
@@ -449,6 +478,211 @@ def test_adding_too_many_results():
     dataset.add_results(results)
 
 
+@pytest.mark.usefixtures("experiment")
+def test_add_result_columns():
+    dataset = new_data_set("test_add_result_columns")
+    xparam = ParamSpecBase("x", "numeric")
+    yparam = ParamSpecBase("y", "numeric")
+    tparam = ParamSpecBase("t", "text")
+    idps = InterDependencies_(dependencies={yparam: (xparam,)},
+                              standalones=(tparam,))
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+
+    first_index = dataset.add_result_columns(
+        [{'x': np.array([0., 1.]), 'y': np.array([2., np.nan])},
+         {'x': [2.], 'y': [4.]},
+         {'t': ['a', 'b']},
+         {'x': np.array([3.]), 'y': np.array([6.])}])
+    assert first_index == 0
+    assert dataset.add_result_columns([{'t': ['c']}]) == 6
+
+    np.testing.assert_equal(dataset.get_data('x', 'y', 't'), [
+        [0., 2., None], [1., np.nan, None], [2., 4., None],
+        [None, None, 'a'], [None, None, 'b'], [3., 6., None],
+        [None, None, 'c']])
+
+    dataset.mark_completed()
+    with pytest.raises(CompletedError):
+        dataset.add_result_columns([{'x': [1.]}])
+
+
+@pytest.mark.usefixtures("experiment")
+def test_reader_reads_only_new_results():
+    dataset = new_data_set("test_reader")
+    xparam = ParamSpecBase("x", "numeric")
+    yparam = ParamSpecBase("y", "numeric")
+    tparam = ParamSpecBase("t", "text")
+    idps = InterDependencies_(dependencies={yparam: (xparam,),
+                                            tparam: (xparam,)})
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+
+    reader = dataset.reader()
+    assert reader.read_new() == {'y': {}, 't': {}}
+
+    dataset.add_results([{'x': 0, 'y': 1}, {'x': 1, 'y': 2},
+                         {'x': 0, 't': 'a'}])
+    data = reader.read_new('y')
+    assert list(data) == ['y']
+    np.testing.assert_array_equal(data['y']['x'], [0, 1])
+    np.testing.assert_array_equal(data['y']['y'], [1, 2])
+
+    dataset.add_results([{'x': 2, 'y': 3}, {'x': 1, 't': 'b'}])
+    data = reader.read_new()
+    np.testing.assert_array_equal(data['y']['x'], [2])
+    np.testing.assert_array_equal(data['y']['y'], [3])
+    # the text tree has not been read before, so all its rows are new
+    np.testing.assert_array_equal(data['t']['x'], [0, 1])
+    np.testing.assert_array_equal(data['t']['t'], ['a', 'b'])
+
+    assert reader.read_new() == {'y': {}, 't': {}}
+
+    with pytest.raises(ValueError, match="not read by this reader"):
+        dataset.reader('y').read_new('t')
+
+
+@pytest.mark.usefixtures("experiment")
+def test_get_parameter_data_with_filters():
+    dataset = new_data_set("test_filters")
+    xparam = ParamSpecBase("x", "numeric")
+    yparam = ParamSpecBase("y", "numeric")
+    zparam = ParamSpecBase("z", "numeric")
+    idps = InterDependencies_(dependencies={zparam: (xparam, yparam)})
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+    dataset.add_results([{'x': x, 'y': y, 'z': 10 * x + y}
+                         for x in range(4) for y in range(3)])
+
+    data = dataset.get_parameter_data(filters={'x': 2})
+    np.testing.assert_array_equal(data['z']['x'], [2, 2, 2])
+    np.testing.assert_array_equal(data['z']['y'], [0, 1, 2])
+    np.testing.assert_array_equal(data['z']['z'], [20, 21, 22])
+
+    data = dataset.get_parameter_data(filters={'x': (1, None), 'y': (1, 1)})
+    np.testing.assert_array_equal(data['z']['z'], [11, 21, 31])
+
+    # start and end are counted within the filtered results
+    data = dataset.get_parameter_data(filters={'y': 0}, start=2, end=3)
+    np.testing.assert_array_equal(data['z']['z'], [10, 20])
+
+    with pytest.raises(ValueError, match="Unknown parameter"):
+        dataset.get_parameter_data(filters={'w': 1})
+    with pytest.raises(ValueError, match="must be a tuple"):
+        dataset.get_parameter_data(filters={'x': (1, 2, 3)})
+
+
+@pytest.mark.usefixtures("experiment")
+def test_add_index():
+    dataset = new_data_set("test_index")
+    xparam = ParamSpecBase("x", "numeric")
+    yparam = ParamSpecBase("y", "numeric")
+    idps = InterDependencies_(dependencies={yparam: (xparam,)})
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+    dataset.add_results([{'x': x, 'y': -x} for x in range(10)])
+
+    assert dataset.indexed_parameters == []
+    dataset.add_index('x')
+    # indexing twice does nothing
+    dataset.add_index('x')
+    assert dataset.indexed_parameters == ['x']
+
+    sql = f"""
+    EXPLAIN QUERY PLAN SELECT y FROM "{dataset.table_name}"
+    WHERE y IS NOT NULL AND x = 3
+    """
+    plan = ' '.join(str(row[-1]) for row in
+                    atomic_transaction(dataset.conn, sql).fetchall())
+    assert f"{dataset.table_name}-x-idx" in plan
+
+    data = dataset.get_parameter_data(filters={'x': 3})
+    np.testing.assert_array_equal(data['y']['y'], [-3])
+
+    with pytest.raises(ValueError, match="Unknown parameter"):
+        dataset.add_index('w')
+
+
+@pytest.mark.usefixtures("experiment")
+def test_add_snapshot_shares_identical_snapshots():
+    snapshot = {'station': {'instruments': {'dac': {'ch1': 0.1}}}}
+    ds1 = new_data_set("test-dataset")
+    ds1.add_snapshot(json.dumps(snapshot))
+    ds2 = new_data_set("test-dataset")
+    # the same snapshot with a different order of the keys
+    ds2.add_snapshot(json.dumps(snapshot, sort_keys=True, indent=2))
+
+    assert ds1.snapshot == ds2.snapshot == snapshot
+    cursor = atomic_transaction(ds1.conn, 'SELECT COUNT(*) FROM snapshots')
+    assert cursor.fetchone()[0] == 1
+
+    ds2.add_snapshot(json.dumps({'station': {}}), overwrite=True)
+    assert ds2.snapshot == {'station': {}}
+    assert load_by_id(ds1.run_id).snapshot == snapshot
+
+
+@pytest.mark.usefixtures("experiment")
+def test_add_snapshot_delta_encoded():
+    parameters = {f'p{i}': {'value': i, 'unit': 'V'} for i in range(100)}
+    snapshot1 = {'station': {'parameters': parameters, 'removed': 1}}
+    snapshot2 = deepcopy(snapshot1)
+    snapshot2['station']['parameters']['p1']['value'] = True
+    snapshot2['station']['parameters']['p2']['value'] = float('nan')
+    snapshot2['station']['added'] = [1, 2]
+    del snapshot2['station']['removed']
+
+    ds1 = new_data_set("test-dataset")
+    ds1.add_snapshot(json.dumps(snapshot1), delta_encode=True)
+    ds2 = new_data_set("test-dataset")
+    ds2.add_snapshot(json.dumps(snapshot2), delta_encode=True)
+
+    cursor = atomic_transaction(ds1.conn, 'SELECT base_id, snapshot '
+                                          'FROM snapshots ORDER BY snapshot_id')
+    (base_id1, stored1), (base_id2, stored2) = cursor.fetchall()
+    assert base_id1 is None
+    assert base_id2 is not None
+    assert len(stored2) < len(stored1) / 10
+
+    loaded = load_by_id(ds2.run_id).snapshot
+    assert np.isnan(loaded['station']['parameters']['p2']['value'])
+    assert json.dumps(loaded, sort_keys=True) == json.dumps(snapshot2,
+                                                            sort_keys=True)
+    assert loaded['station']['parameters']['p1']['value'] is True
+    assert load_by_id(ds1.run_id).snapshot == snapshot1
+
+
+def test_load_run_catalog(experiment):
+    datasets = [new_data_set(f"run-{i}") for i in range(3)]
+    datasets[1].mark_started()
+    datasets[1].mark_completed()
+    other_exp = new_experiment("other-experiment", sample_name="other-sample")
+    other_ds = new_data_set("other-run")
+
+    catalog = load_run_catalog()
+    assert list(catalog['run_id']) == [ds.run_id for ds in datasets
+                                       + [other_ds]]
+    assert list(catalog['guid']) == [ds.guid for ds in datasets + [other_ds]]
+    assert list(catalog['experiment_name']) == [experiment.name] * 3 + [
+        other_exp.name]
+    assert list(catalog['is_completed']) == [False, True, False, False]
+    assert np.isnan(catalog['run_timestamp'][0])
+    assert catalog['run_timestamp'][1] == datasets[1].run_timestamp_raw
+
+    catalog = load_run_catalog(sample_name="other-sample")
+    assert list(catalog['name']) == ["other-run"]
+    catalog = load_run_catalog(exp_id=experiment.exp_id, captured_counter=2)
+    assert list(catalog['guid']) == [datasets[1].guid]
+    catalog = load_run_catalog(start_time=datasets[1].run_timestamp_raw)
+    assert list(catalog['run_id']) == [datasets[1].run_id]
+    sample_id = parse_guid(other_ds.guid)['sample']
+    assert len(load_run_catalog(sample_id=sample_id)) == 4
+    assert len(load_run_catalog(sample_id=sample_id + 1)) == 0
+
+    df = load_run_catalog_as_dataframe(exp_id=experiment.exp_id)
+    assert list(df.index) == [ds.run_id for ds in datasets]
+    assert list(df['name']) == ["run-0", "run-1", "run-2"]
+
+
 @pytest.mark.usefixtures("dataset")
 def test_load_by_counter():
     exps = experiments()
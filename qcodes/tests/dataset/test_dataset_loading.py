@@ -2,17 +2,21 @@
 import time
 from math import floor
 
+import numpy as np
 import pytest
 
+import qcodes.dataset.data_set as data_set_module
 from qcodes.dataset.data_set import (DataSet,
                                      new_data_set,
                                      load_by_guid,
                                      load_by_id,
                                      load_by_counter,
-                                     load_by_run_spec)
+                                     load_by_run_spec,
+                                     load_many)
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 from qcodes.dataset.data_export import get_data_by_id
+from qcodes.dataset.sqlite.connection import ConnectionPlus
 from qcodes.dataset.sqlite.queries import get_guids_from_run_spec
 from qcodes.dataset.experiment_container import new_experiment
 # pylint: disable=unused-import
@@ -322,3 +326,69 @@ def test_load_by_run_spec(empty_temp_db, some_interdeps):
     empty_guid_list = get_guids_from_run_spec(conn=conn,
                                               experiment_name='nosuchexp')
     assert empty_guid_list == []
+
+
+@pytest.mark.usefixtures("experiment")
+@pytest.mark.parametrize('use_processes', [False, True])
+def test_load_many(use_processes):
+    x = ParamSpecBase('x', 'numeric')
+    trace = ParamSpecBase('trace', 'array')
+    datasets = []
+    for i in range(6):
+        ds = new_data_set(f'run{i}')
+        ds.set_interdependencies(
+            InterDependencies_(dependencies={trace: (x,)}))
+        ds.mark_started()
+        ds.add_results([{'x': j, 'trace': np.arange(5.) * i * j}
+                        for j in range(3)])
+        ds.mark_completed()
+        datasets.append(ds)
+
+    run_specs = [ds.guid for ds in datasets[::-1]]
+    run_specs.append({'captured_run_id': datasets[2].captured_run_id})
+    loaded = load_many(run_specs, 'trace', max_workers=3,
+                       use_processes=use_processes)
+
+    expected = [ds.get_parameter_data('trace') for ds in datasets[::-1]]
+    expected.append(datasets[2].get_parameter_data('trace'))
+    assert len(loaded) == len(expected)
+    for data, expected_data in zip(loaded, expected):
+        np.testing.assert_array_equal(data['trace']['trace'],
+                                      expected_data['trace']['trace'])
+        np.testing.assert_array_equal(data['trace']['x'],
+                                      expected_data['trace']['x'])
+
+    assert load_many([]) == []
+    with pytest.raises(NameError, match='No run with GUID'):
+        load_many([datasets[0].guid, 'not-a-guid'])
+    with pytest.raises(NameError, match='0 runs matching'):
+        load_many([{'captured_run_id': 100}])
+
+
+@pytest.mark.usefixtures("experiment")
+def test_load_many_closes_its_connections(monkeypatch):
+    opened = []
+    closed = []
+
+    class RecordingConnection(ConnectionPlus):
+        def close(self):
+            closed.append(self)
+            self.__wrapped__.close()
+
+    original_connect = data_set_module.connect
+
+    def recording_connect(*args, **kwargs):
+        conn = RecordingConnection(
+            original_connect(*args, **kwargs).__wrapped__)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(data_set_module, 'connect', recording_connect)
+
+    datasets = [new_data_set(f'run{i}') for i in range(4)]
+    load_many([ds.guid for ds in datasets], max_workers=2)
+    with pytest.raises(NameError):
+        load_many(['not-a-guid'])
+
+    assert len(opened) == 5
+    assert sorted(map(id, closed)) == sorted(map(id, opened))
@@ -60,6 +60,29 @@ def test_to_and_from_dict_roundtrip(some_interdeps):
         assert desc == new_desc
 
 
+def test_compression_roundtrip_for_storage(some_interdeps):
+    idps = some_interdeps[1]
+    name = idps.paramspecs[0].name
+    desc = RunDescriber(interdeps=idps, compression={name: 'zlib+shuffle'})
+    assert desc != RunDescriber(interdeps=idps)
+
+    json_str = serial.to_json_for_storage(desc)
+    assert json.loads(json_str)['compression'] == {name: 'zlib+shuffle'}
+    assert serial.from_json_to_current(json_str) == desc
+
+
+def test_shapes_roundtrip_for_storage(some_interdeps):
+    idps = some_interdeps[1]
+    name = idps.paramspecs[0].name
+    desc = RunDescriber(interdeps=idps, shapes={name: [10, 20]})
+    assert desc.shapes == {name: (10, 20)}
+    assert desc != RunDescriber(interdeps=idps)
+
+    json_str = serial.to_json_for_storage(desc)
+    assert json.loads(json_str)['shapes'] == {name: [10, 20]}
+    assert serial.from_json_to_current(json_str) == desc
+
+
 def test_yaml_creation_and_loading(some_interdeps):
 
     yaml = YAML()
@@ -0,0 +1,195 @@
+import os
+
+import h5py
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+
+from qcodes.dataset.data_set import new_data_set
+from qcodes.dataset.measurements import Measurement
+from qcodes.dataset.descriptions.dependencies import InterDependencies_
+from qcodes.dataset.descriptions.param_spec import ParamSpecBase
+from qcodes.dataset.exporters import (export_to_hdf5, export_to_npy_columns,
+                                      export_to_text, load_npy_columns,
+                                      parameter_tree_to_pandas,
+                                      parameter_tree_to_xarray)
+# pylint: disable=unused-import
+from qcodes.tests.dataset.temporary_databases import empty_temp_db, experiment
+
+
+@pytest.fixture
+def dataset_to_export(experiment):
+    x = ParamSpecBase('x', 'numeric', unit='V')
+    y = ParamSpecBase('y', 'numeric', label='Current')
+    freq = ParamSpecBase('freq', 'array')
+    spectrum = ParamSpecBase('spectrum', 'array')
+    name = ParamSpecBase('name', 'text')
+    idps = InterDependencies_(dependencies={y: (x,), spectrum: (x, freq),
+                                            name: (x,)})
+    dataset = new_data_set('export')
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+    for i in range(10):
+        dataset.add_results([{'x': i, 'y': i ** 2}])
+        dataset.add_results([{'x': i, 'freq': np.arange(4.),
+                              'spectrum': np.arange(4.) * i,
+                              'name': f'trace {i}'}])
+    dataset.mark_completed()
+    return dataset
+
+
+def test_iter_parameter_data(dataset_to_export):
+    progress = []
+    chunks = list(dataset_to_export.iter_parameter_data(
+        chunk_size=3, progress=lambda done, total: progress.append(done)))
+
+    assert len(chunks) == 7
+    assert progress == [3, 6, 9, 12, 15, 18, 20]
+    expected = dataset_to_export.get_parameter_data()
+    for name, tree in expected.items():
+        for param, values in tree.items():
+            assert_array_equal(
+                np.concatenate([chunk[name][param] for chunk in chunks
+                                if len(chunk[name][param])]), values)
+
+    with pytest.raises(ValueError, match='chunk size must be positive'):
+        next(dataset_to_export.iter_parameter_data(chunk_size=0))
+
+
+def test_export_to_text_in_chunks(dataset_to_export, tmp_path):
+    chunked_dir = tmp_path / 'chunked'
+    whole_dir = tmp_path / 'whole'
+    chunked_dir.mkdir()
+    whole_dir.mkdir()
+
+    export_to_text(dataset_to_export, str(chunked_dir), 'y', 'spectrum',
+                   chunk_size=3)
+    export_to_text(dataset_to_export, str(whole_dir), 'y', 'spectrum',
+                   chunk_size=1000)
+    assert sorted(os.listdir(chunked_dir)) == ['spectrum.dat', 'y.dat']
+    for file_name in ('spectrum.dat', 'y.dat'):
+        assert (chunked_dir / file_name).read_text() \
+            == (whole_dir / file_name).read_text()
+    assert (chunked_dir / 'y.dat').read_text().splitlines()[3] == '3\t9'
+
+    # the rows of y and name are read in different chunks, but are
+    # written side by side
+    export_to_text(dataset_to_export, str(tmp_path), 'y', 'name',
+                   single_file=True, single_file_name='y_name', chunk_size=3)
+    lines = (tmp_path / 'y_name.dat').read_text().splitlines()
+    assert len(lines) == 10
+    assert lines[3] == '3\t9\ttrace 3'
+
+
+def test_export_to_text_single_file_checks_setpoints(experiment, tmp_path):
+    x = ParamSpecBase('x', 'numeric')
+    y = ParamSpecBase('y', 'numeric')
+    z = ParamSpecBase('z', 'numeric')
+    dataset = new_data_set('export')
+    dataset.set_interdependencies(
+        InterDependencies_(dependencies={y: (x,), z: (x,)}))
+    dataset.mark_started()
+    dataset.add_results([{'x': i, 'y': i} for i in range(5)])
+    # the same number of results as y, but at other setpoints
+    dataset.add_results([{'x': 4 - i, 'z': i} for i in range(5)])
+    dataset.mark_completed()
+
+    with pytest.raises(ValueError, match='different setpoints'):
+        export_to_text(dataset, str(tmp_path), 'y', 'z', single_file=True,
+                       single_file_name='y_z', chunk_size=3)
+    assert not (tmp_path / 'y_z.dat').exists()
+
+
+def test_export_to_hdf5(dataset_to_export, tmp_path):
+    path = str(tmp_path / 'export.h5')
+    export_to_hdf5(dataset_to_export, path, chunk_size=3)
+
+    with h5py.File(path, 'r') as file:
+        assert file.attrs['guid'] == dataset_to_export.guid
+        assert sorted(file) == ['name', 'spectrum', 'y']
+        assert_array_equal(file['y']['y'][()], np.arange(10.) ** 2)
+        assert file['y']['x'].attrs['unit'] == 'V'
+        assert file['y']['y'].attrs['label'] == 'Current'
+        assert file['spectrum']['spectrum'].shape == (10, 4)
+        assert_array_equal(file['spectrum']['spectrum'][3], np.arange(4.) * 3)
+        assert file['name']['name'].asstr()[3] == 'trace 3'
+
+
+def test_export_to_npy_columns(dataset_to_export, tmp_path):
+    export_to_npy_columns(dataset_to_export, str(tmp_path), chunk_size=3)
+
+    loaded = load_npy_columns(str(tmp_path))
+    expected = dataset_to_export.get_parameter_data()
+    assert sorted(loaded) == sorted(expected)
+    for name, tree in expected.items():
+        assert sorted(loaded[name]) == sorted(tree)
+        for param, values in tree.items():
+            assert_array_equal(loaded[name][param], values)
+    assert isinstance(loaded['spectrum']['spectrum'], np.memmap)
+    assert loaded['spectrum']['spectrum'].shape == (10, 4)
+
+
+@pytest.fixture
+def grid_dataset(experiment):
+    meas = Measurement()
+    meas.register_custom_parameter('x', unit='V')
+    meas.register_custom_parameter('y')
+    meas.register_custom_parameter('z', label='Signal', setpoints=('x', 'y'))
+    meas.register_custom_parameter('scattered', setpoints=('x',))
+    with meas.run() as datasaver:
+        for x in np.linspace(0, 1, 3):
+            for y in np.linspace(1, 0, 4):
+                datasaver.add_result(('x', x), ('y', y), ('z', x * 10 + y))
+        datasaver.add_result(('x', np.array([0.1, 0.2, 0.1])),
+                             ('scattered', np.arange(3.)))
+    return datasaver.dataset
+
+
+def test_to_pandas(grid_dataset):
+    dfs = grid_dataset.to_pandas()
+
+    assert dfs['z'].index.names == ['x', 'y']
+    assert_array_equal(dfs['z'].index.levels[1], np.sort(np.linspace(1, 0, 4)))
+    expected = grid_dataset.get_data_as_pandas_dataframe('z')['z']
+    assert dfs['z'].equals(expected)
+
+    assert dfs['scattered'].columns.tolist() == ['x', 'scattered']
+    assert_array_equal(dfs['scattered']['scattered'], np.arange(3.))
+
+
+def test_to_xarray(grid_dataset):
+    pytest.importorskip('xarray')
+    data_arrays = grid_dataset.to_xarray_dataarray_dict()
+
+    z = data_arrays['z']
+    assert z.dims == ('x', 'y')
+    assert_array_equal(z['y'], np.linspace(1, 0, 4))
+    assert_array_equal(z.values, np.linspace(0, 10, 3)[:, None]
+                       + np.linspace(1, 0, 4)[None, :])
+    assert z.attrs['long_name'] == 'Signal'
+    assert z['x'].attrs['units'] == 'V'
+
+    # repeated setpoints are not a grid
+    scattered = data_arrays['scattered']
+    assert scattered.dims == ('scattered_index',)
+    assert_array_equal(scattered['x'].values, [0.1, 0.2, 0.1])
+
+    # the scattered data shares the setpoint x with the gridded data
+    with pytest.raises(ValueError, match='can not be combined'):
+        grid_dataset.to_xarray()
+    dataset = grid_dataset.to_xarray('z')
+    assert dataset.attrs['guid'] == grid_dataset.guid
+    assert_array_equal(dataset['z'], z)
+
+
+def test_zero_copy_conversions():
+    pytest.importorskip('xarray')
+    x, y = (values.ravel() for values in np.meshgrid(
+        np.arange(3.), np.arange(4.), indexing='ij'))
+    tree = {'z': np.random.rand(12), 'x': x, 'y': y}
+
+    df = parameter_tree_to_pandas(tree)
+    assert np.shares_memory(df['z'].to_numpy(), tree['z'])
+    data_array = parameter_tree_to_xarray(tree, shape=(3, 4))
+    assert np.shares_memory(data_array.values, tree['z'])
+    assert data_array.shape == (3, 4)
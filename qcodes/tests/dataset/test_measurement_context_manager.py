@@ -413,6 +413,258 @@ def test_unregister_parameter(DAC, DMM):
     meas.unregister_parameter(DAC.ch2)
 
 
+@pytest.mark.usefixtures("experiment")
+def test_indexed_parameters(DAC, DMM):
+    """
+    Test that the parameters registered as indexed are indexed at the end
+    of the run
+    """
+    meas = Measurement()
+    meas.register_parameter(DAC.ch1, indexed=True)
+    meas.register_parameter(DAC.ch2, indexed=True)
+    meas.register_custom_parameter('t', indexed=True)
+    meas.register_parameter(DMM.v1, setpoints=(DAC.ch1, DAC.ch2, 't'))
+    meas.unregister_parameter(DMM.v1)
+    meas.unregister_parameter('t')
+    meas.register_parameter(DMM.v1, setpoints=(DAC.ch1, DAC.ch2))
+
+    with pytest.raises(ValueError, match="Can only index"):
+        meas.register_parameter(DMM.v2, paramtype='array', indexed=True)
+    with pytest.raises(ValueError, match="Can only index"):
+        meas.register_custom_parameter('a', paramtype='array', indexed=True)
+
+    with meas.run() as datasaver:
+        for ch1 in range(3):
+            for ch2 in range(4):
+                datasaver.add_result((DAC.ch1, ch1), (DAC.ch2, ch2),
+                                     (DMM.v1, ch1 * ch2))
+        assert datasaver.dataset.indexed_parameters == []
+
+    dataset = datasaver.dataset
+    assert sorted(dataset.indexed_parameters) == sorted([str(DAC.ch1),
+                                                         str(DAC.ch2)])
+    data = dataset.get_parameter_data(filters={str(DAC.ch2): 2})
+    assert_array_equal(data[str(DMM.v1)][str(DMM.v1)], [0, 2, 4])
+
+
+@pytest.mark.usefixtures("experiment")
+def test_compressed_array_parameters(DAC):
+    """
+    Test that the values of parameters registered with a compression are
+    stored compressed and read back transparently
+    """
+    meas = Measurement(array_compression='zlib')
+    meas.register_parameter(DAC.ch1, paramtype='array')
+    meas.register_custom_parameter('trace', setpoints=(DAC.ch1,),
+                                   paramtype='array',
+                                   compression='lzma+shuffle')
+
+    with pytest.raises(ValueError, match="Can only compress"):
+        meas.register_custom_parameter('n', compression='zlib')
+    with pytest.raises(ValueError, match="Unknown array compression"):
+        meas.register_custom_parameter('a', paramtype='array',
+                                       compression='gzip')
+
+    setpoints = np.linspace(0, 1, 500)
+    traces = [np.sin(setpoints * i) for i in range(3)]
+    with meas.run() as datasaver:
+        for trace in traces:
+            datasaver.add_result((DAC.ch1, setpoints), ('trace', trace))
+
+    dataset = datasaver.dataset
+    assert dataset.compression == {str(DAC.ch1): 'zlib',
+                                   'trace': 'lzma+shuffle'}
+    assert load_by_id(dataset.run_id).compression == dataset.compression
+
+    raw = atomic_transaction(
+        dataset.conn,
+        f'SELECT CAST(trace AS BLOB), CAST("{DAC.ch1}" AS BLOB) '
+        f'FROM "{dataset.table_name}"').fetchall()
+    for trace_blob, setpoints_blob in raw:
+        assert len(trace_blob) < setpoints.nbytes
+        assert len(setpoints_blob) < setpoints.nbytes
+
+    data = dataset.get_parameter_data('trace')['trace']
+    for i, trace in enumerate(traces):
+        assert_array_equal(data['trace'][i], trace)
+        assert_array_equal(data[str(DAC.ch1)][i], setpoints)
+
+
+@pytest.mark.usefixtures("experiment")
+def test_categorical_text_parameters(DAC):
+    """
+    Test that the values of text parameters with categorical compression
+    are stored as codes and read back transparently
+    """
+    meas = Measurement()
+    meas.register_parameter(DAC.ch1)
+    meas.register_custom_parameter('mode', paramtype='text',
+                                   compression='categorical')
+    meas.register_custom_parameter('signal', setpoints=(DAC.ch1, 'mode'))
+    meas.register_custom_parameter('trace', paramtype='array',
+                                   setpoints=('mode',))
+
+    with pytest.raises(ValueError, match="Unknown text compression"):
+        meas.register_custom_parameter('name', paramtype='text',
+                                       compression='zlib')
+
+    modes = ['fast', 'slow', 'fast', 'fast', 'averaged', 'slow']
+    with meas.run() as datasaver:
+        for i, mode in enumerate(modes):
+            datasaver.add_result((DAC.ch1, i), ('mode', mode),
+                                 ('signal', i ** 2))
+        datasaver.add_result(('mode', 'slow'), ('trace', np.arange(3.)))
+
+    dataset = datasaver.dataset
+    assert dataset.compression == {'mode': 'categorical'}
+    assert dataset.categories == {'mode': ['fast', 'slow', 'averaged']}
+    raw = atomic_transaction(
+        dataset.conn,
+        f'SELECT mode FROM "{dataset.table_name}"').fetchall()
+    assert [row[0] for row in raw] == [0, 1, 0, 0, 2, 1, 1]
+
+    data = load_by_id(dataset.run_id).get_parameter_data()
+    assert_array_equal(data['signal']['mode'], modes)
+    assert_array_equal(data['trace']['mode'], [['slow'] * 3])
+    codes = dataset.get_parameter_data(
+        'signal', decode_categories=False)['signal']['mode']
+    assert_array_equal(codes, [0, 1, 0, 0, 2, 1])
+
+    data = dataset.get_parameter_data('signal', filters={'mode': 'slow'})
+    assert_array_equal(data['signal']['signal'], [1, 25])
+    assert dataset.get_parameter_data(
+        'signal', filters={'mode': 'medium'}) == {'signal': {}}
+    with pytest.raises(ValueError, match='categorical compression'):
+        dataset.get_parameter_data(filters={'mode': ('a', 'z')})
+    assert dataset.get_values('mode')[:3] == [['fast'], ['slow'], ['fast']]
+
+    df = dataset.to_pandas('signal')['signal']
+    assert df['mode'].dtype == 'category'
+    assert list(df['mode']) == modes
+    df = dataset.get_data_as_pandas_dataframe('signal')['signal']
+    assert list(df.index.get_level_values('mode')) == modes
+
+
+@pytest.mark.usefixtures("experiment")
+def test_categories_are_loaded_once(DAC, monkeypatch):
+    """
+    Test that a DataSet loads the categories of its categorical parameters
+    once, and again only when the data has new values
+    """
+    loads = []
+    original = qc.dataset.sqlite.queries.get_categories
+
+    def counting_get_categories(conn, table_name):
+        loads.append(table_name)
+        return original(conn, table_name)
+
+    monkeypatch.setattr(qc.dataset.data_set, 'get_categories',
+                        counting_get_categories)
+    monkeypatch.setattr(qc.dataset.sqlite.queries, 'get_categories',
+                        counting_get_categories)
+
+    meas = Measurement()
+    meas.register_parameter(DAC.ch1)
+    meas.register_custom_parameter('mode', paramtype='text',
+                                   compression='categorical')
+    meas.register_custom_parameter('signal', setpoints=(DAC.ch1, 'mode'))
+
+    with meas.run() as datasaver:
+        for i, mode in enumerate(['fast', 'slow', 'fast']):
+            datasaver.add_result((DAC.ch1, i), ('mode', mode),
+                                 ('signal', i))
+        datasaver.flush_data_to_database()
+        loads.clear()
+        reader = load_by_id(datasaver.run_id)
+        for _ in range(3):
+            data = reader.get_parameter_data('signal')['signal']
+            assert_array_equal(data['mode'], ['fast', 'slow', 'fast'])
+        assert len(loads) == 1
+
+        loads.clear()
+        datasaver.add_result((DAC.ch1, 3), ('mode', 'averaged'),
+                             ('signal', 3))
+        datasaver.flush_data_to_database()
+        # the writer adds the new value, the reader does not know its code
+        assert len(loads) == 1
+        data = reader.get_parameter_data('signal')['signal']
+        assert_array_equal(data['mode'],
+                           ['fast', 'slow', 'fast', 'averaged'])
+        assert len(loads) == 2
+
+    # the codes would be compared with the values in a where statement
+    with pytest.raises(ValueError, match='can not refer to mode'):
+        reader.get_parameter_data('signal', where_statement="mode = 'slow'")
+    data = reader.get_parameter_data('signal',
+                                     where_statement='signal > 1')['signal']
+    assert_array_equal(data['mode'], ['fast', 'averaged'])
+
+    meas = Measurement()
+    meas.register_parameter(DAC.ch1)
+    meas.register_custom_parameter('mode', paramtype='text')
+    meas.register_custom_parameter('signal', setpoints=(DAC.ch1, 'mode'))
+    with meas.run() as datasaver:
+        datasaver.add_result((DAC.ch1, 0), ('mode', 'fast'), ('signal', 0))
+    loads.clear()
+    data = datasaver.dataset.get_parameter_data(
+        'signal', where_statement="mode = 'fast'")['signal']
+    assert_array_equal(data['mode'], ['fast'])
+    assert loads == []
+
+
+@pytest.mark.usefixtures("experiment")
+def test_shaped_parameters(DAC):
+    """
+    Test that the data of parameters with a declared shape is buffered and
+    read back in that shape, also if the run is interrupted
+    """
+    meas = Measurement(shapes={'signal': (3, 4)})
+    meas.register_parameter(DAC.ch1)
+    meas.register_parameter(DAC.ch2)
+    meas.register_custom_parameter('signal', setpoints=(DAC.ch1, DAC.ch2))
+    meas.register_custom_parameter('time', paramtype='array')
+    meas.register_custom_parameter('trace', setpoints=(DAC.ch1, 'time'),
+                                   paramtype='array', shape=(3, 5))
+
+    with pytest.raises(ValueError, match="Invalid shape"):
+        meas.set_shapes({'signal': (3, -1)})
+
+    time = np.linspace(0, 1, 5)
+    with meas.run() as datasaver:
+        for x in range(3):
+            datasaver.add_result((DAC.ch1, x), ('time', time),
+                                 ('trace', time * x))
+            for y in range(4):
+                # interrupt the sweep before the last two points
+                if (x, y) == (2, 2):
+                    break
+                datasaver.add_result((DAC.ch1, x), (DAC.ch2, y),
+                                     ('signal', 10 * x + y))
+        buffered = datasaver.shaped_data
+
+    expected_signal = np.array([[0, 1, 2, 3],
+                                [10, 11, 12, 13],
+                                [20, 21, np.nan, np.nan]])
+    assert_array_equal(buffered['signal']['signal'], expected_signal)
+
+    dataset = datasaver.dataset
+    assert dataset.shapes == {'signal': (3, 4), 'trace': (3, 5)}
+    assert load_by_id(dataset.run_id).shapes == dataset.shapes
+
+    data = dataset.get_parameter_data()
+    assert_array_equal(data['signal']['signal'], expected_signal)
+    assert_array_equal(data['signal'][str(DAC.ch2)][:2],
+                       np.tile(np.arange(4), (2, 1)))
+    assert_array_equal(data['trace']['trace'],
+                       np.outer(np.arange(3), time))
+    assert_array_equal(data['trace'][str(DAC.ch1)],
+                       buffered['trace'][str(DAC.ch1)])
+    assert_array_equal(data['trace']['time'], buffered['trace']['time'])
+
+    flat = dataset.get_parameter_data('signal', reshape=False)['signal']
+    assert flat['signal'].shape == (10,)
+
+
 @pytest.mark.usefixtures("experiment")
 def test_mixing_array_and_numeric(DAC):
     """
@@ -742,6 +994,60 @@ def test_subscribers_called_for_all_data_points(experiment, DAC, DMM, N):
     assert yvals == list(given_yvals)
 
 
+def test_write_in_background(experiment, DAC, DMM):
+    def sub_get_x_vals(results, length, state):
+        state += [res[0] for res in results]
+
+    meas = Measurement(exp=experiment)
+    meas.register_parameter(DAC.ch1)
+    meas.register_parameter(DMM.v1, setpoints=(DAC.ch1,))
+    meas.write_period = 0.001
+
+    xvals = []
+    meas.add_subscriber(sub_get_x_vals, state=xvals)
+
+    given_xvals = list(range(100))
+
+    with meas.run(write_in_background=True) as datasaver:
+        for x in given_xvals:
+            datasaver.add_result((DAC.ch1, x), (DMM.v1, 2 * x))
+        assert datasaver.write_metrics['n_writes'] <= len(given_xvals)
+
+    assert datasaver.dataset.completed
+    data = datasaver.dataset.get_parameter_data()['dummy_dmm_v1']
+    assert_array_equal(data['dummy_dac_ch1'], given_xvals)
+    assert_array_equal(data['dummy_dmm_v1'], [2 * x for x in given_xvals])
+    assert xvals == given_xvals
+
+
+def test_write_in_background_error_completes_dataset(experiment, DAC):
+    meas = Measurement(exp=experiment)
+    meas.register_parameter(DAC.ch1)
+
+    with pytest.raises(RuntimeError, match='in the background failed'):
+        with meas.run(write_in_background=True) as datasaver:
+            datasaver.add_result((DAC.ch1, 1))
+            # sneak a result for an unknown column past add_result
+            datasaver._results.append({'not_a_column': [1]})
+
+    assert datasaver.dataset.completed
+
+
+def test_write_in_background_error_does_not_mask_measurement_error(
+        experiment, DAC, caplog):
+    meas = Measurement(exp=experiment)
+    meas.register_parameter(DAC.ch1)
+
+    with pytest.raises(ZeroDivisionError):
+        with meas.run(write_in_background=True) as datasaver:
+            datasaver.add_result((DAC.ch1, 1))
+            datasaver._results.append({'not_a_column': [1]})
+            1 / 0
+
+    assert datasaver.dataset.completed
+    assert 'in the background failed' in caplog.text
+
+
 # There is no way around it: this test is slow. We test that write_period
 # works and hence we must wait for some time to elapse. Sorry.
 @settings(max_examples=5, deadline=None)
@@ -1,3 +1,5 @@
+import matplotlib
+import matplotlib.pyplot as plt
 import numpy as np
 from hypothesis import given, example, assume, settings, HealthCheck
 from hypothesis.strategies import text, sampled_from, floats, lists, data, \
@@ -122,6 +124,40 @@ def test_plot_by_id_line_and_heatmap(experiment, request):
     plot_by_id(dataid, cmap='bone')
 
 
+def test_plot_by_id_decimates_large_data(experiment, request):
+    """
+    Test that line plots and scatter plots of more points than the threshold
+    are decimated, unless decimation is switched off
+    """
+    meas = Measurement()
+    meas.register_custom_parameter('x')
+    meas.register_custom_parameter('y')
+    meas.register_custom_parameter('line', setpoints=('x',))
+    meas.register_custom_parameter('scatter', setpoints=('x', 'y'))
+
+    xs = np.sort(np.random.rand(2000))
+    ys = np.random.rand(2000)
+    with meas.run() as datasaver:
+        datasaver.add_result(('x', xs), ('line', np.sin(10 * xs)))
+        datasaver.add_result(('x', xs), ('y', ys), ('scatter', xs * ys))
+
+    threshold = qc.config.plotting.decimation.threshold
+    request.addfinalizer(
+        lambda: setattr(qc.config.plotting.decimation, 'threshold', threshold))
+    qc.config.plotting.decimation.threshold = 1000
+
+    axes, colorbars = plot_by_id(datasaver.run_id, figsize=(2, 2), dpi=50)
+    assert len(axes[0].lines[0].get_xdata()) < 2000
+    assert isinstance(colorbars[1].mappable,
+                      matplotlib.collections.QuadMesh)
+
+    axes, colorbars = plot_by_id(datasaver.run_id, decimate=False)
+    assert len(axes[0].lines[0].get_xdata()) == 2000
+    assert isinstance(colorbars[1].mappable,
+                      matplotlib.collections.PathCollection)
+    plt.close('all')
+
+
 def test_appropriate_kwargs():
 
     kwargs = {'cmap': 'bone'}
@@ -1,9 +1,11 @@
 # Since all other tests of data_set and measurements will inevitably also
 # test the sqlite module, we mainly test exceptions and small helper
 # functions here
+import io
 from sqlite3 import OperationalError
 import tempfile
 import os
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 import time
 
@@ -14,7 +16,7 @@ import unicodedata
 import numpy as np
 from unittest.mock import patch
 
-from qcodes.dataset.descriptions.param_spec import ParamSpec
+from qcodes.dataset.descriptions.param_spec import ParamSpec, ParamSpecBase
 from qcodes.dataset.descriptions.rundescriber import RunDescriber
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 import qcodes.dataset.descriptions.versioning.serialization as serial
@@ -26,6 +28,7 @@ from qcodes.dataset.data_set import DataSet
 from qcodes.tests.dataset.temporary_databases import \
     empty_temp_db, experiment, dataset
 from qcodes.tests.dataset.dataset_fixtures import scalar_dataset, \
+    scalar_dataset_with_nulls, \
     standalone_parameters_dataset
 from qcodes.tests.common import error_caused_by
 # pylint: enable=unused-import
@@ -36,6 +39,7 @@ from qcodes.dataset import sqlite_base
 # mut: module under test
 from qcodes.dataset.sqlite import queries as mut_queries
 from qcodes.dataset.sqlite import query_helpers as mut_help
+from qcodes.dataset.sqlite import sidecars as mut_sidecars
 from qcodes.dataset.sqlite import connection as mut_conn
 from qcodes.dataset.sqlite import database as mut_db
 
@@ -102,6 +106,116 @@ def test_insert_many_values_raises(experiment):
                                     values=[[1], [1, 3]])
 
 
+@pytest.mark.parametrize('strategy', [None, 'multi_row', 'executemany'])
+@pytest.mark.parametrize('no_of_columns', [1, 5, 50])
+def test_insert_many_values_strategies(strategy, no_of_columns):
+    conn = mut_db.connect(':memory:')
+    columns = [f'c{n}' for n in range(no_of_columns)]
+    mut_conn.atomic_transaction(
+        conn, f'CREATE TABLE "table" (id INTEGER PRIMARY KEY, '
+              f'{",".join(columns)})')
+    values = [[row * no_of_columns + col for col in range(no_of_columns)]
+              for row in range(10)]
+
+    last_id = mut_help.insert_many_values(conn, 'table', columns, values,
+                                          strategy=strategy)
+    assert last_id == 10
+    mut_help.insert_many_values(conn, 'table', columns, values,
+                                strategy=strategy)
+
+    rows = mut_conn.atomic_transaction(
+        conn, f'SELECT {",".join(columns)} FROM "table"').fetchall()
+    assert [list(row) for row in rows] == values + values
+    # the same statement is reused for the second insert
+    assert len(conn.insert_statements) == 1
+
+
+@pytest.mark.parametrize('strategy', ['multi_row', 'executemany'])
+def test_insert_many_values_in_many_statements(strategy, monkeypatch):
+    conn = mut_db.connect(':memory:')
+    mut_conn.atomic_transaction(
+        conn, 'CREATE TABLE "table" (id INTEGER PRIMARY KEY, c0, c1)')
+    # at most three rows per multi-row statement
+    monkeypatch.setitem(mut_help.SQLiteSettings.limits,
+                        'MAX_VARIABLE_NUMBER', 6)
+    monkeypatch.setitem(mut_help.SQLiteSettings.limits,
+                        'MAX_COMPOUND_SELECT', 6)
+    values = [[row, 2 * row] for row in range(10)]
+
+    last_id = mut_help.insert_many_values(conn, 'table', ['c0', 'c1'],
+                                          values, strategy=strategy)
+    assert last_id == 10
+
+
+@pytest.mark.parametrize('strategy', ['multi_row', 'executemany'])
+def test_insert_many_columns(strategy, monkeypatch):
+    conn = mut_db.connect(':memory:')
+    mut_conn.atomic_transaction(
+        conn, 'CREATE TABLE "table" (id INTEGER PRIMARY KEY, c0, c1)')
+    monkeypatch.setitem(mut_help.SQLiteSettings.limits,
+                        'MAX_VARIABLE_NUMBER', 6)
+    monkeypatch.setitem(mut_help.SQLiteSettings.limits,
+                        'MAX_COMPOUND_SELECT', 6)
+    c0 = list(range(10))
+    c1 = [2 * value for value in c0]
+
+    last_id = mut_help.insert_many_columns(conn, 'table', ['c0', 'c1'],
+                                           [c0, c1], strategy=strategy)
+    assert last_id == 10
+    rows = mut_conn.atomic_transaction(
+        conn, 'SELECT c0, c1 FROM "table"').fetchall()
+    assert [list(row) for row in rows] == [list(row) for row in zip(c0, c1)]
+
+    with pytest.raises(ValueError, match='same number of values'):
+        mut_help.insert_many_columns(conn, 'table', ['c0', 'c1'],
+                                     [c0, c1[:-1]], strategy=strategy)
+
+
+@pytest.mark.parametrize('strategy', ['multi_row', 'executemany'])
+def test_insert_many_values_in_bounded_transactions(strategy):
+    conn = mut_db.connect(':memory:')
+    mut_conn.atomic_transaction(
+        conn, 'CREATE TABLE "table" (id INTEGER PRIMARY KEY, c0, c1)')
+    conn.write_coordination = mut_conn.WriteCoordination(
+        max_rows_per_transaction=4)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    values = [[row, 2 * row] for row in range(10)]
+
+    last_id = mut_help.insert_many_values(conn, 'table', ['c0', 'c1'],
+                                          values, strategy=strategy)
+    assert last_id == 10
+    assert statements.count('BEGIN IMMEDIATE') == 3
+    assert statements.count('COMMIT') == 3
+
+    # in an atomic block, all values are inserted in its transaction
+    with mut_conn.atomic(conn):
+        mut_help.insert_many_values(conn, 'table', ['c0', 'c1'],
+                                    values, strategy=strategy)
+    assert statements.count('BEGIN IMMEDIATE') == 4
+
+    rows = mut_conn.atomic_transaction(
+        conn, 'SELECT c0, c1 FROM "table"').fetchall()
+    assert [list(row) for row in rows] == values + values
+
+
+def test_insert_many_values_unknown_strategy(experiment):
+    with pytest.raises(ValueError, match='Unknown insert strategy'):
+        mut_help.insert_many_values(experiment.conn, 'some_string',
+                                    ['column1'], values=[[1]],
+                                    strategy='row_by_row')
+
+
+def test_insert_statement_cache_is_bounded(experiment):
+    conn = experiment.conn
+    size = mut_help.INSERT_STATEMENT_CACHE_SIZE
+    for no_of_rows in range(1, size + 2):
+        mut_help._insert_statement(conn, 'table', ['x'], no_of_rows)
+    assert len(conn.insert_statements) == size
+    assert ('table', ('x',), 1) not in conn.insert_statements
+    assert ('table', ('x',), size + 1) in conn.insert_statements
+
+
 def test_get_metadata_raises(experiment):
     with pytest.raises(RuntimeError) as excinfo:
         mut_queries.get_metadata(experiment.conn, 'something', 'results')
@@ -279,6 +393,51 @@ def test_get_parameter_data_independent_parameters(
                      expected_shapes, expected_values)
 
 
+@pytest.mark.parametrize(('start', 'end'), [(None, None), (10, 20),
+                                            (500, None), (30, 10)])
+def test_get_numeric_parameter_tree_arrays(scalar_dataset, start, end):
+    ds = scalar_dataset
+    names = ['param_3', 'param_0', 'param_1', 'param_2']
+
+    data = mut_queries.get_numeric_parameter_tree_arrays(
+        ds.conn, ds.table_name, *names, start=start, end=end)
+    rows = mut_queries.get_parameter_tree_values(
+        ds.conn, ds.table_name, *names, start=start, end=end)
+
+    if len(rows) == 0:
+        assert data == {}
+    else:
+        assert list(data.keys()) == names
+        for name, column in zip(names, zip(*rows)):
+            assert data[name].dtype == np.array(column).dtype
+            np.testing.assert_array_equal(data[name], np.array(column))
+
+
+def test_get_numeric_parameter_tree_arrays_nan_and_floats(dataset):
+    x = ParamSpecBase('x', 'numeric')
+    y = ParamSpecBase('y', 'numeric')
+    dataset.set_interdependencies(InterDependencies_(dependencies={y: (x,)}))
+    dataset.mark_started()
+    dataset.add_results([{'x': 0.5, 'y': np.nan}, {'x': 1.5, 'y': 2}])
+
+    data = mut_queries.get_numeric_parameter_tree_arrays(
+        dataset.conn, dataset.table_name, 'y', 'x')
+
+    np.testing.assert_array_equal(data['x'], [0.5, 1.5])
+    np.testing.assert_array_equal(data['y'], [np.nan, 2])
+    assert data['y'].dtype == np.float64
+
+
+def test_get_numeric_parameter_tree_arrays_falls_back_on_nulls(
+        scalar_dataset_with_nulls):
+    ds = scalar_dataset_with_nulls
+    # first_value is NULL in the second row, but we select on second_value
+    # together with first_value to get a NULL into the selection
+    data = mut_queries.get_numeric_parameter_tree_arrays(
+        ds.conn, ds.table_name, 'second_value', 'first_value')
+    assert data is None
+
+
 def test_is_run_id_in_db(empty_temp_db):
     conn = mut_db.connect(get_DB_location())
     mut_queries.new_experiment(conn, 'test_exp', 'no_sample')
@@ -375,6 +534,88 @@ def test_set_run_timestamp(experiment):
     ds.conn.close()
 
 
+@pytest.mark.parametrize('arr', [np.arange(10, dtype=np.float64),
+                                 np.arange(12, dtype='>i4').reshape(3, 4),
+                                 np.array([1+2j, 3-4j]),
+                                 np.array([True, False]),
+                                 np.array(['a', 'bcd']),
+                                 np.array(3.5),
+                                 np.zeros((0, 3)),
+                                 np.arange(6.).reshape(2, 3).T])
+def test_array_encoding_roundtrip(arr):
+    data = mut_db._encode_array(arr)
+    assert data.startswith(mut_db._ARRAY_MAGIC)
+    decoded = mut_db._convert_array(data)
+    assert decoded.shape == arr.shape
+    assert decoded.dtype.newbyteorder('=') == arr.dtype.newbyteorder('=')
+    np.testing.assert_array_equal(decoded, arr)
+
+
+@pytest.mark.parametrize('compression', mut_db.ARRAY_COMPRESSIONS)
+@pytest.mark.parametrize('arr', [np.linspace(0, 1, 1000),
+                                 np.arange(1200, dtype='>i4').reshape(30, 40),
+                                 np.array(['a', 'bcd'] * 100),
+                                 np.random.rand(10),
+                                 np.zeros((0, 3))])
+def test_array_compression_roundtrip(arr, compression):
+    data = mut_db._encode_array(arr, compression)
+    decoded = mut_db._convert_array(data)
+    assert decoded.shape == arr.shape
+    np.testing.assert_array_equal(decoded, arr)
+
+
+@pytest.mark.parametrize('compression', mut_db.ARRAY_COMPRESSIONS)
+def test_array_compression_makes_compressible_arrays_smaller(compression):
+    arr = np.linspace(0, 1, 1000)
+    data = mut_db._encode_array(arr, compression)
+    assert data[4] != mut_db._ARRAY_FLAGS_PLAIN
+    assert len(data) < 0.7 * len(mut_db._encode_array(arr))
+
+
+def test_unknown_array_compression_raises():
+    with pytest.raises(ValueError, match="Unknown array compression"):
+        mut_db._encode_array(np.arange(3), 'gzip')
+
+
+def test_array_encoding_is_compact_and_reads_npy():
+    arr = np.random.rand(10)
+    npy = io.BytesIO()
+    np.save(npy, arr)
+
+    assert len(mut_db._encode_array(arr)) < len(npy.getvalue())
+    np.testing.assert_array_equal(mut_db._convert_array(npy.getvalue()), arr)
+
+
+def test_object_arrays_are_stored_as_npy():
+    arr = np.array([1, 'a'], dtype=object)
+    data = mut_db._encode_array(arr)
+    assert data.startswith(mut_db._NPY_MAGIC)
+
+
+def test_sidecar_references_are_read_as_memmaps(tmp_path):
+    path_to_db = str(tmp_path / 'sidecar.db')
+    mut_sidecars.register_sidecar_dir(path_to_db)
+    arrays = [np.arange(100, dtype=np.float64) + i for i in range(3)]
+    offsets = mut_sidecars.append_to_sidecar(path_to_db, 'some-guid', arrays)
+    assert all(offset % mut_sidecars.SIDECAR_ALIGNMENT == 0
+               for offset in offsets)
+
+    file_name = mut_sidecars.sidecar_file_name('some-guid')
+    decoded = [mut_db._convert_array(
+                   mut_db._encode_sidecar_reference(arr, file_name, offset))
+               for arr, offset in zip(arrays, offsets)]
+    for arr, dec in zip(arrays, decoded):
+        assert isinstance(dec, np.memmap)
+        np.testing.assert_array_equal(dec, arr)
+
+    stacked = mut_sidecars.stack_sidecar_arrays(decoded)
+    assert isinstance(stacked, np.memmap)
+    assert not stacked.flags.writeable
+    np.testing.assert_array_equal(stacked, np.stack(arrays))
+    assert mut_sidecars.stack_sidecar_arrays(decoded[::-1]) is None
+    assert mut_sidecars.stack_sidecar_arrays(arrays) is None
+
+
 def test_sqlite_base_is_tested_in_this_file():
     assert sqlite_base.set_run_timestamp is mut_queries.set_run_timestamp
     assert sqlite_base.transaction is mut_conn.transaction
@@ -401,3 +642,67 @@ def test_sqlite_base_is_tested_in_this_file():
     assert sqlite_base._validate_table_name is mut_queries._validate_table_name
     assert sqlite_base.get_layout_id is mut_queries.get_layout_id
     assert sqlite_base.is_column_in_table is mut_help.is_column_in_table
+
+
+def test_get_run_describer_caches_started_runs(experiment):
+    conn = experiment.conn
+    ds = DataSet(conn=conn)
+    x = ParamSpecBase('x', 'numeric')
+    ds.set_interdependencies(InterDependencies_(standalones=(x,)))
+
+    # the description of a pristine run may still change
+    mut_queries.get_run_describer(conn, ds.run_id)
+    assert (conn.path_to_dbfile, ds.run_id) \
+        not in mut_queries._run_describer_cache
+
+    ds.mark_started()
+    describer = mut_queries.get_run_describer(conn, ds.run_id)
+    assert describer.interdeps == ds.description.interdeps
+    assert mut_queries.get_run_describer(conn, ds.run_id) is describer
+
+    y = ParamSpecBase('y', 'numeric')
+    new_desc = RunDescriber(InterDependencies_(standalones=(x, y)))
+    mut_queries.update_run_description(conn, ds.run_id,
+                                       serial.to_json_for_storage(new_desc))
+    assert mut_queries.get_run_describer(conn, ds.run_id) == new_desc
+
+
+def test_get_run_describer_from_many_threads(experiment, monkeypatch):
+    conn = experiment.conn
+    x = ParamSpecBase('x', 'numeric')
+    run_ids = []
+    for _ in range(4):
+        ds = DataSet(conn=conn)
+        ds.set_interdependencies(InterDependencies_(standalones=(x,)))
+        ds.mark_started()
+        run_ids.append(ds.run_id)
+
+    # a tiny cache, such that the threads keep evicting each other's runs
+    monkeypatch.setattr(mut_queries, 'RUN_DESCRIBER_CACHE_SIZE', 1)
+    monkeypatch.setattr(mut_queries, '_run_describer_cache', {})
+
+    def get_describers(n_times):
+        thread_conn = mut_db.connect(conn.path_to_dbfile)
+        try:
+            for _ in range(n_times):
+                for run_id in run_ids:
+                    mut_queries.get_run_describer(thread_conn, run_id)
+        finally:
+            thread_conn.close()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(get_describers, [50] * 8))
+    assert len(mut_queries._run_describer_cache) == 1
+
+
+def test_get_run_describer_does_not_cache_in_memory_dbs():
+    conn = mut_db.connect(':memory:')
+    try:
+        exp_id = mut_queries.new_experiment(conn, 'exp', 'sample')
+        ds = DataSet(conn=conn, exp_id=exp_id)
+        ds.mark_started()
+        mut_queries.get_run_describer(conn, ds.run_id)
+        assert ('', ds.run_id) not in mut_queries._run_describer_cache
+    finally:
+        conn.close()
+
@@ -1,11 +1,14 @@
 import re
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 
 import pytest
 
+import qcodes as qc
+import qcodes.dataset.sqlite.connection as mut_conn
 from qcodes.dataset.sqlite.connection import ConnectionPlus, \
-    make_connection_plus_from, atomic, atomic_transaction
-from qcodes.dataset.sqlite.database import connect
+    make_connection_plus_from, atomic, atomic_transaction, WriteCoordination
+from qcodes.dataset.sqlite.database import connect, set_journal_mode
 from qcodes.tests.common import error_caused_by
 
 
@@ -330,3 +333,80 @@ def test_connect():
     assert False is conn.atomic_in_progress
 
     assert sqlite3.Row is conn.row_factory
+
+
+def test_connect_with_write_coordination(monkeypatch):
+    assert connect(':memory:').write_coordination is None
+
+    monkeypatch.setitem(qc.config['core'], 'db_write_coordination',
+                        {'enabled': True, 'busy_timeout': 0.5, 'retries': 2,
+                         'max_rows_per_transaction': None})
+    conn = connect(':memory:')
+    assert conn.write_coordination == WriteCoordination(
+        busy_timeout=0.5, retries=2, max_rows_per_transaction=None)
+
+
+def test_atomic_with_write_coordination(tmp_path, monkeypatch):
+    dbfile = str(tmp_path / 'temp.db')
+    monkeypatch.setitem(qc.config['core'], 'db_write_coordination',
+                        {'enabled': True, 'busy_timeout': 0.01, 'retries': 3,
+                         'max_rows_per_transaction': None})
+    writer = connect(dbfile)
+    other_writer = connect(dbfile)
+    statements = []
+    writer.set_trace_callback(statements.append)
+    backoffs = []
+    monkeypatch.setattr(mut_conn.time, 'sleep', backoffs.append)
+
+    with atomic(writer):
+        atomic_transaction(writer, 'CREATE TABLE smth (name TEXT)')
+        # the write lock is held from the start of the transaction, but
+        # reading is still possible
+        with pytest.raises(RuntimeError) as excinfo:
+            with atomic(other_writer):
+                pass
+        assert 'database is locked' in str(excinfo.value.__cause__)
+        with atomic(other_writer, read_only=True):
+            pass
+    assert statements[0] == 'BEGIN IMMEDIATE'
+
+    # exponential backoff with jitter
+    assert len(backoffs) == 3
+    for retry, backoff in enumerate(backoffs):
+        nominal = mut_conn.WRITE_RETRY_BACKOFF * 2 ** retry
+        assert 0.5 * nominal <= backoff <= 1.5 * nominal
+
+    with atomic(other_writer):
+        atomic_transaction(other_writer,
+                           'INSERT INTO smth (name) VALUES ("a")')
+    assert len(backoffs) == 3
+
+
+def _write_rows(dbfile, name, n_rows):
+    qc.config['core']['db_write_coordination'] = {
+        'enabled': True, 'busy_timeout': 0.1, 'retries': 50,
+        'max_rows_per_transaction': None}
+    conn = connect(dbfile)
+    try:
+        for _ in range(n_rows):
+            atomic_transaction(conn, 'INSERT INTO smth (name) VALUES (?)',
+                               name)
+    finally:
+        conn.close()
+
+
+def test_concurrent_writer_processes(tmp_path):
+    dbfile = str(tmp_path / 'temp.db')
+    conn = connect(dbfile)
+    set_journal_mode(conn, 'WAL')
+    atomic_transaction(conn, 'CREATE TABLE smth (name TEXT)')
+
+    names = [f'writer {n}' for n in range(3)]
+    with ProcessPoolExecutor(max_workers=len(names)) as executor:
+        for future in [executor.submit(_write_rows, dbfile, name, 50)
+                       for name in names]:
+            future.result()
+
+    rows = atomic_transaction(
+        conn, 'SELECT name, COUNT(*) FROM smth GROUP BY name').fetchall()
+    assert sorted(map(tuple, rows)) == [(name, 50) for name in names]
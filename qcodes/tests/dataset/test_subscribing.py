@@ -7,6 +7,7 @@ from numpy import ndarray
 import logging
 
 import qcodes
+from qcodes.dataset.data_set import DataSet
 from qcodes.dataset.descriptions.param_spec import ParamSpecBase
 from qcodes.dataset.descriptions.dependencies import InterDependencies_
 # pylint: disable=unused-import
@@ -214,3 +215,72 @@ def test_subscription_from_config_wrong_name(dataset):
         assert 'test_subscriber' not in qcodes.config.subscription.subscribers
         with pytest.raises(RuntimeError):
             sub_id_c = dataset.subscribe_from_config('test_subscriber')
+
+
+def test_subscription_publishes_batches_without_triggers(dataset,
+                                                         basic_subscriber):
+    xparam = ParamSpecBase(name='x', paramtype='numeric')
+    yparam = ParamSpecBase(name='y', paramtype='numeric')
+    zparam = ParamSpecBase(name='z', paramtype='numeric')
+    idps = InterDependencies_(dependencies={yparam: (xparam,)},
+                              standalones=(zparam,))
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+
+    sub_id = dataset.subscribe(basic_subscriber, min_wait=0, min_count=4,
+                               state={})
+
+    # the results are published by the dataset, no triggers are involved
+    get_triggers_sql = "SELECT * FROM sqlite_master WHERE TYPE = 'trigger';"
+    triggers = atomic_transaction(
+        dataset.conn, get_triggers_sql).fetchall()
+    assert len(triggers) == 0
+
+    dataset.add_results([{'x': x, 'y': -x} for x in range(3)])
+    dataset.add_result({'z': 1})
+
+    names = [p.name for p in dataset.get_parameters()]
+    expected = [tuple({'x': x, 'y': -x}.get(name) for name in names)
+                for x in range(3)]
+    expected.append(tuple(1 if name == 'z' else None for name in names))
+
+    @retry_until_does_not_throw(
+        exception_class_to_expect=AssertionError, delay=0, tries=10)
+    def assert_expected_state():
+        assert dataset.subscribers[sub_id].state == {4: expected}
+
+    assert_expected_state()
+
+    dataset.unsubscribe(sub_id)
+
+
+def test_subscription_to_results_written_through_other_datasets(
+        dataset, basic_subscriber):
+    xparam = ParamSpecBase(name='x', paramtype='numeric')
+    idps = InterDependencies_(standalones=(xparam,))
+    dataset.set_interdependencies(idps)
+    dataset.mark_started()
+
+    sub_id = dataset.subscribe(basic_subscriber, min_wait=0, min_count=1,
+                               state={})
+
+    # another DataSet object of the same run, on its own connection, shares
+    # the subscribers of the run
+    other_dataset = DataSet(path_to_db=dataset.path_to_db,
+                            run_id=dataset.run_id)
+    assert other_dataset.subscribers is dataset.subscribers
+    other_dataset.add_result({'x': 1})
+    dataset.add_result({'x': 2})
+
+    @retry_until_does_not_throw(
+        exception_class_to_expect=AssertionError, delay=0, tries=10)
+    def assert_expected_state():
+        state = dataset.subscribers[sub_id].state
+        assert [row for rows in state.values() for row in rows] \
+            == [(1,), (2,)]
+
+    assert_expected_state()
+
+    other_dataset.unsubscribe_all()
+    assert len(dataset.subscribers) == 0
+    other_dataset.conn.close()
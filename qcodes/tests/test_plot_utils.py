@@ -2,6 +2,8 @@
 Tests for `qcodes.utils.plotting`.
 """
 
+import numpy as np
+from numpy.testing import assert_array_equal
 from pytest import fixture
 
 from matplotlib import pyplot as plt
@@ -15,6 +17,8 @@ from qcodes.tests.dataset.temporary_databases import (empty_temp_db,
 
 from qcodes.tests.test_config import default_config
 from qcodes.dataset.plotting import plot_by_id
+from qcodes.utils.plotting import (bin_scatter, decimate_lttb,
+                                   decimate_min_max, thin_scatter)
 from .dataset_generators import dataset_with_outliers_generator
 import qcodes.config
 
@@ -62,3 +66,39 @@ def test_defaults(dataset_with_outliers):
         _, cb = plot_by_id(run_id)
         assert cb[0].extend == 'both'
     plt.close()
+
+
+def test_decimate_line():
+    x = np.linspace(0, 1, 10000)
+    y = np.sin(20 * x)
+    y[1234] = 5
+    y[4321] = -5
+    y[5000] = np.nan
+
+    x_min_max, y_min_max = decimate_min_max(x, y, n_buckets=100)
+    assert len(x_min_max) <= 400
+    assert np.all(np.diff(x_min_max) > 0)
+    assert {x[0], x[1234], x[4321], x[-1]} <= set(x_min_max)
+
+    x_lttb, y_lttb = decimate_lttb(x, y, n_out=200)
+    assert len(x_lttb) == 200
+    assert np.all(np.diff(x_lttb) > 0)
+    assert {x[0], x[1234], x[4321], x[-1]} <= set(x_lttb)
+
+    # nothing to decimate
+    x_small, y_small = decimate_min_max(x[:10], y[:10], n_buckets=100)
+    assert_array_equal(x_small, x[:10])
+    assert_array_equal(y_small, y[:10])
+
+
+def test_thin_and_bin_scatter():
+    x = np.array([0., 0.1, 1., 1., np.nan])
+    y = np.array([0., 0.1, 1., 0., 1.])
+    z = np.array([1., 3., 5., 7., 9.])
+
+    assert_array_equal(thin_scatter(x, y, (2, 2)), [1, 2, 3])
+
+    x_edges, y_edges, z_binned = bin_scatter(x, y, z, (2, 2))
+    assert_array_equal(x_edges, [0, 0.5, 1])
+    assert_array_equal(y_edges, [0, 0.5, 1])
+    assert_array_equal(z_binned, [[2, 7], [np.nan, 5]])
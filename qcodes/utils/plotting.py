@@ -9,6 +9,7 @@ import logging
 from typing import Tuple, Union, Optional, Any, cast
 import numpy as np
 import matplotlib
+import matplotlib.pyplot
 import qcodes
 
 log = logging.getLogger(__name__)
@@ -75,6 +76,228 @@ def auto_range_iqr(data_array: np.ndarray,
     return vmin, vmax
 
 
+# the decimation functions below process at most this many points at a time,
+# which bounds the size of the temporary arrays they allocate
+DECIMATION_CHUNK_SIZE = 2**20
+
+
+def decimate_min_max(x: np.ndarray, y: np.ndarray,
+                     n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decimate a line for plotting by dividing the x range into `n_buckets`
+    equally wide buckets and only keeping the first, the last, the smallest
+    and the largest point of each bucket (also known as M4 aggregation).
+    If the buckets are not wider than a pixel of the plot, the line through
+    the kept points covers the same pixels as the line through all points.
+
+    Args:
+        x: The x values, sorted in ascending order
+        y: The y values
+        n_buckets: The number of buckets, typically the width of the plot
+            in pixels
+
+    Returns:
+        The x and y values of the kept points
+    """
+    finite = np.isfinite(x)
+    if not finite.all():
+        x = x[finite]
+        y = y[finite]
+    n_points = len(x)
+    if n_points <= 4 * n_buckets:
+        return x, y
+
+    edges = np.linspace(x[0], x[-1], n_buckets + 1)[:-1]
+    starts = np.unique(np.searchsorted(x, edges, side='left'))
+
+    kept = []
+    first_bucket = 0
+    while first_bucket < len(starts):
+        begin = starts[first_bucket]
+        end_bucket = max(np.searchsorted(starts,
+                                         begin + DECIMATION_CHUNK_SIZE),
+                         first_bucket + 1)
+        end = starts[end_bucket] if end_bucket < len(starts) else n_points
+        kept.append(begin + _bucket_extrema(
+            y[begin:end], starts[first_bucket:end_bucket] - begin))
+        first_bucket = end_bucket
+    indices = np.concatenate(kept)
+    return x[indices], y[indices]
+
+
+def _bucket_extrema(y: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Get the sorted indices of the first, the last, the smallest and the
+    largest value of each of the consecutive buckets of `y` starting at
+    `starts`.
+    """
+    counts = np.diff(np.append(starts, len(y)))
+    bucket = np.repeat(np.arange(len(starts)), counts)
+    minima = np.fmin.reduceat(y, starts)[bucket]
+    maxima = np.fmax.reduceat(y, starts)[bucket]
+    return np.unique(np.concatenate((
+        starts, starts + counts - 1,
+        _first_in_bucket(np.flatnonzero(y == minima), bucket),
+        _first_in_bucket(np.flatnonzero(y == maxima), bucket))))
+
+
+def _first_in_bucket(indices: np.ndarray, bucket: np.ndarray) -> np.ndarray:
+    if len(indices) == 0:
+        return indices
+    buckets = bucket[indices]
+    return indices[np.concatenate(([True], buckets[1:] != buckets[:-1]))]
+
+
+def decimate_lttb(x: np.ndarray, y: np.ndarray,
+                  n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a line for plotting to `n_out` points with the
+    Largest-Triangle-Three-Buckets algorithm. The first and the last point
+    are kept, and the other points are divided into `n_out` - 2 buckets, from
+    each of which the point is kept that spans the largest triangle with the
+    point kept from the previous bucket and the average of the next bucket.
+    This keeps the visual shape of the line better than taking every n-th
+    point, but unlike :func:`decimate_min_max` does not keep all extrema.
+
+    Args:
+        x: The x values, sorted in ascending order
+        y: The y values
+        n_out: The number of points to keep
+
+    Returns:
+        The x and y values of the kept points
+    """
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        x = x[finite]
+        y = y[finite]
+    n_points = len(x)
+    if n_out < 3 or n_points <= n_out:
+        return x, y
+
+    x = x.astype(float, copy=False)
+    y = y.astype(float, copy=False)
+    bounds = np.linspace(1, n_points - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(bounds)
+    # the average of the next bucket, where the bucket after the last one
+    # is the last point
+    next_x = np.append(np.add.reduceat(x[:-1], bounds[:-1])[1:]
+                       / counts[1:], x[-1])
+    next_y = np.append(np.add.reduceat(y[:-1], bounds[:-1])[1:]
+                       / counts[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0] = previous = 0
+    indices[-1] = n_points - 1
+    for bucket in range(n_out - 2):
+        begin, end = bounds[bucket], bounds[bucket + 1]
+        areas = np.abs((x[previous] - next_x[bucket])
+                       * (y[begin:end] - y[previous])
+                       - (x[previous] - x[begin:end])
+                       * (next_y[bucket] - y[previous]))
+        previous = begin + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return x[indices], y[indices]
+
+
+def thin_scatter(x: np.ndarray, y: np.ndarray,
+                 shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Select the points to draw in a scatter plot, such that of all points
+    that fall into the same pixel of the plot only one is drawn. As the
+    markers of a scatter plot are larger than a pixel, the plot of the
+    selected points looks like the plot of all points.
+
+    Args:
+        x: The x values
+        y: The y values
+        shape: The width and height of the plot in pixels
+
+    Returns:
+        The sorted indices of the selected points
+    """
+    x_range, y_range = _finite_range(x), _finite_range(y)
+    n_cells = shape[0] * shape[1]
+    owner = np.zeros(n_cells, dtype=np.intp)
+    occupied = np.zeros(n_cells, dtype=bool)
+    for begin in range(0, len(x), DECIMATION_CHUNK_SIZE):
+        chunk = slice(begin, begin + DECIMATION_CHUNK_SIZE)
+        finite = np.flatnonzero(np.isfinite(x[chunk]) & np.isfinite(y[chunk]))
+        cells = _cell_indices(x[chunk][finite], y[chunk][finite],
+                              x_range, y_range, shape)
+        owner[cells] = begin + finite
+        occupied[cells] = True
+    return np.sort(owner[occupied])
+
+
+def bin_scatter(x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                shape: Tuple[int, int]
+                ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bin the points of a scatter plot, whose colors are given by `z`, onto a
+    rectangular grid of bins spanning the range of the points, such that the
+    points can be plotted as a heatmap of the average `z` in each bin.
+
+    Args:
+        x: The x values
+        y: The y values
+        z: The z values
+        shape: The number of bins along x and along y
+
+    Returns:
+        The edges of the bins along x and along y, and the average z values
+        in the bins in the layout of ``pcolormesh``, i.e. with the bins along
+        y as rows. Bins without points have the value NaN.
+    """
+    x_range, y_range = _finite_range(x), _finite_range(y)
+    n_cells = shape[0] * shape[1]
+    sums = np.zeros(n_cells)
+    counts = np.zeros(n_cells)
+    for begin in range(0, len(x), DECIMATION_CHUNK_SIZE):
+        chunk = slice(begin, begin + DECIMATION_CHUNK_SIZE)
+        finite = (np.isfinite(x[chunk]) & np.isfinite(y[chunk])
+                  & np.isfinite(z[chunk]))
+        cells = _cell_indices(x[chunk][finite], y[chunk][finite],
+                              x_range, y_range, shape)
+        sums += np.bincount(cells, weights=z[chunk][finite],
+                            minlength=n_cells)
+        counts += np.bincount(cells, minlength=n_cells)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        averages = sums / counts
+    averages[counts == 0] = np.nan
+    x_edges = np.linspace(x_range[0], x_range[1], shape[0] + 1)
+    y_edges = np.linspace(y_range[0], y_range[1], shape[1] + 1)
+    return x_edges, y_edges, averages.reshape(shape).T
+
+
+def _finite_range(values: np.ndarray) -> Tuple[float, float]:
+    """
+    The range of the finite values, widened if it is empty
+    """
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return -0.5, 0.5
+    low, high = float(finite.min()), float(finite.max())
+    if low == high:
+        return low - 0.5, high + 0.5
+    return low, high
+
+
+def _cell_indices(x: np.ndarray, y: np.ndarray,
+                  x_range: Tuple[float, float], y_range: Tuple[float, float],
+                  shape: Tuple[int, int]) -> np.ndarray:
+    """
+    The flat indices of the cells of a grid of the given shape spanning the
+    given ranges that contain the given points, which must lie in the ranges
+    """
+    columns = ((x - x_range[0]) * (shape[0] / (x_range[1] - x_range[0])))
+    rows = ((y - y_range[0]) * (shape[1] / (y_range[1] - y_range[0])))
+    # the points on the upper edges of the ranges belong to the last cells
+    columns = np.minimum(columns.astype(np.intp), shape[0] - 1)
+    rows = np.minimum(rows.astype(np.intp), shape[1] - 1)
+    return columns * shape[1] + rows
+
+
 # Matplotlib functions
 
 DEFAULT_COLOR_OVER = 'Magenta'
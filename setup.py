@@ -14,7 +14,9 @@ extras = {
     'MatPlot': ('matplotlib', '2.2.3'),
     'QtPlot': ('pyqtgraph', '0.10.0'),
     'coverage tests': ('coverage', '4.0'),
-    'Slack': ('slacker', '0.9.42')
+    'Slack': ('slacker', '0.9.42'),
+    # combine_attrs of xarray.merge is needed by DataSet.to_xarray
+    'xarray': ('xarray', '0.16.0')
 }
 extras_require = {k: '>='.join(v) for k, v in extras.items()}
 